@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+"""
+AsyncEnvPool 基准：单步耗时不均时「等全部」与「取最先完成的 K 个」的吞吐与尾延迟
+
+每个环境是 SimEnv 外包一层随机延迟（对数正态，模拟 Mod 协议往返 / 读盘抖动，
+约 5% 概率出现 10 倍长尾）。对 thread / process 两种后端分别运行：
+- sync:  batch_size = N（等同同步向量环境，每轮等最慢的一个）
+- async: batch_size = N / 4
+
+报告 env-steps/s、recv 等待时间与单步延迟的 p50 / p90 / p99 / max（毫秒），
+并在进程后端上 kill 一个子进程检查自动重启。
+
+用法: python scripts/bench_async_pool.py [--envs 8] [--steps 800] [--delay-ms 2]
+"""
+import os
+import sys
+import time
+import signal
+import argparse
+import logging
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.env.sim_env import SimEnv
+from src.env.async_pool import AsyncEnvPool
+
+
+class DelayedEnv:
+    """给 step 加随机延迟的环境包装（延迟期间释放 GIL，模拟 I/O 等待）"""
+
+    def __init__(self, env, delay_ms: float, seed: int):
+        self.env = env
+        self.delay_ms = delay_ms
+        self.rng = np.random.default_rng(seed)
+        self.observation_space = env.observation_space
+        self.action_space = env.action_space
+
+    def reset(self, seed=None, options=None):
+        return self.env.reset(seed=seed, options=options)
+
+    def step(self, action):
+        delay = self.delay_ms * self.rng.lognormal(0.0, 0.5)
+        if self.rng.random() < 0.05:
+            delay *= 10
+        time.sleep(delay / 1e3)
+        return self.env.step(action)
+
+    def close(self):
+        self.env.close()
+
+
+def env_fns(n: int, delay_ms: float):
+    return [lambda i=i: DelayedEnv(SimEnv(seed=i), delay_ms, seed=i) for i in range(n)]
+
+
+def run(pool: AsyncEnvPool, steps: int) -> float:
+    """推进直到累计 steps 个 env-steps，返回 env-steps/s"""
+    rng = np.random.default_rng(0)
+    pool.async_reset()
+    pool.recv(batch_size=pool.num_envs)
+    pool.send(np.full(pool.num_envs, 170), np.arange(pool.num_envs))
+    pool.reset_latency_stats()
+    done_steps = 0
+    t0 = time.perf_counter()
+    while done_steps < steps:
+        _, _, _, infos, env_ids = pool.recv()
+        actions = []
+        for info in infos:
+            mask = info.get("action_mask")
+            valid = np.flatnonzero(mask) if mask is not None else np.array([170])
+            actions.append(int(valid[rng.integers(len(valid))]) if len(valid) else 170)
+        pool.send(actions, env_ids)
+        done_steps += len(env_ids)
+    sps = done_steps / (time.perf_counter() - t0)
+    # 取回在途的环境
+    while pool.num_running:
+        pool.recv(batch_size=pool.num_running)
+    return sps
+
+
+def fmt(stats: dict) -> str:
+    if not stats:
+        return "-"
+    return f"p50={stats['p50']:6.2f} p90={stats['p90']:6.2f} p99={stats['p99']:6.2f} max={stats['max']:6.2f}"
+
+
+def check_process_restart(delay_ms: float) -> bool:
+    pool = AsyncEnvPool(env_fns(4, delay_ms), batch_size=4, backend="process")
+    try:
+        pool.async_reset()
+        _, _, _, _, ids = pool.recv()
+        os.kill(pool._backend._procs[2].pid, signal.SIGKILL)
+        time.sleep(0.1)
+        pool.send(np.full(4, 170), ids)
+        _, _, done, infos, ids = pool.recv()
+        hit = [int(i) for i, info in zip(ids, infos) if info.get("worker_restarted")]
+        ok = hit == [2] and bool(done[list(ids).index(2)])
+        pool.send(np.full(4, 170), ids)
+        pool.recv()
+        return ok and pool.restarts == 1
+    finally:
+        pool.close()
+
+
+def check_idle_restart(delay_ms: float) -> bool:
+    """空闲子进程退出：recv 不能返回未提交的环境，下次 send 时得到截断结束的重启结果"""
+    pool = AsyncEnvPool(env_fns(4, delay_ms), batch_size=1, backend="process")
+    try:
+        pool.async_reset()
+        for _ in range(4):
+            pool.recv()
+        os.kill(pool._backend._procs[3].pid, signal.SIGKILL)
+        time.sleep(0.1)
+        pool.send(np.full(1, 170), np.array([0]))
+        _, _, _, _, ids = pool.recv()
+        ok = list(ids) == [0] and pool.restarts == 0
+        pool.send(np.full(1, 170), np.array([3]))
+        _, _, done, infos, ids = pool.recv()
+        return ok and list(ids) == [3] and bool(done[0]) and bool(infos[0].get("worker_restarted")) \
+            and pool.restarts == 1
+    finally:
+        pool.close()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--envs", type=int, default=8)
+    parser.add_argument("--steps", type=int, default=800)
+    parser.add_argument("--delay-ms", type=float, default=2.0, help="单步基础延迟（毫秒）")
+    args = parser.parse_args()
+    logging.disable(logging.WARNING)
+
+    n = args.envs
+    print(f"{n} 个环境，基础延迟 {args.delay_ms} ms（对数正态，5% 概率 10x）\n")
+    for backend in ("thread", "process"):
+        for name, k in (("sync", n), ("async", max(1, n // 4))):
+            pool = AsyncEnvPool(env_fns(n, args.delay_ms), batch_size=k, backend=backend)
+            try:
+                sps = run(pool, args.steps)
+                stats = pool.get_latency_stats()
+            finally:
+                pool.close()
+            print(f"[{backend:>7} {name:>5} K={k:>2}] {sps:7.0f} env-steps/s")
+            print(f"    recv 等待(ms): {fmt(stats['recv_wait_ms'])}")
+            print(f"    单步延迟(ms):  {fmt(stats['step_ms'])}")
+
+    ok = check_process_restart(args.delay_ms)
+    print(f"\n进程后端子进程崩溃后自动重启: {ok}")
+    idle_ok = check_idle_restart(args.delay_ms)
+    print(f"空闲子进程退出后于下次提交时重启: {idle_ok}")
+    ok = ok and idle_ok
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
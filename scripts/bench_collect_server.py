@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+"""
+多局采集服务端到端测试：N 个本地 Mod 替身同时回放对局，经桥接脚本连到同一个采集服务
+
+每个 Mod 替身（scripts/mock_mod.py 的 run）启动一个 scripts/collect_bridge.py 子进程，
+握手后逐帧发送记录并校验回复命令；服务在后台线程运行。分别测试：
+- rule:        规则 Agent（每局独立实例，逐帧 select_action）
+- mlp batch=1: NumPy MLP 策略，每帧单独一次 encode + 前向
+- mlp batched: NumPy MLP 策略，待处理帧合成一次 encode_batch + 前向
+
+另外先直接校验批量模式的分流：战斗中有合法动作的帧走批量前向，事件 / 地图 / 奖励 / 无合法动作的帧
+交给 Agent 的 select_action。
+
+报告总吞吐、平均批大小、服务端延迟分位数与超预算帧数、各局非法命令数，并检查记录文件帧数。
+
+用法:
+  python scripts/bench_collect_server.py [--games 8] [--synthetic 2] [--budget-ms 20]
+  python scripts/bench_collect_server.py --log data/A20_Silent/Raw_Data_json_FORSL --frames 300
+"""
+import sys
+import time
+import random
+import argparse
+import logging
+import tempfile
+import threading
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from mock_mod import load_frames, run as run_mock_mod, MOD_READY_TIMEOUT
+from src.core import json_codec
+from src.core.action import ACTION_SPACE_SIZE, Action
+from src.env.collection_server import CollectionServer
+from src.training.encoder import encode_batch, get_output_dim
+
+
+class NumpyMLPPolicy:
+    """
+    随机权重的两层 MLP（2945 → hidden → 179），代表一次真实规模的策略前向；
+    策略空间外的界面（事件 / 奖励 / 地图）由规则 Agent 决定（服务把这些帧交给 select_action）
+    """
+
+    def __init__(self, hidden: int = 256, seed: int = 0):
+        from src.agents import create_agent
+        self._screens = create_agent("rule", "Screens")
+        rng = np.random.default_rng(seed)
+        d = get_output_dim()
+        self.w1 = (rng.standard_normal((d, hidden)) / np.sqrt(d)).astype(np.float32)
+        self.w2 = (rng.standard_normal((hidden, ACTION_SPACE_SIZE)) / np.sqrt(hidden)).astype(np.float32)
+
+    def predict_proba_batch(self, states) -> np.ndarray:
+        x = encode_batch([s.raw_response for s in states])
+        logits = np.maximum(x @ self.w1, 0.0) @ self.w2
+        logits -= logits.max(axis=1, keepdims=True)
+        p = np.exp(logits)
+        return p / p.sum(axis=1, keepdims=True)
+
+    def select_action(self, state):
+        return self._screens.select_action(state)
+
+
+class _RoutingProbe:
+    """记录哪些帧被交给 select_action；批量前向输出均匀分布"""
+
+    def __init__(self):
+        self.delegated = []
+
+    def predict_proba_batch(self, states) -> np.ndarray:
+        return np.full((len(states), ACTION_SPACE_SIZE), 1.0 / ACTION_SPACE_SIZE)
+
+    def select_action(self, state):
+        self.delegated.append(state)
+        return Action.proceed()
+
+
+def check_routing() -> bool:
+    """批量模式的分流：战斗中有合法动作的帧走策略，事件 / 地图 / 奖励 / 战斗中无合法动作的帧交给 select_action"""
+    from src.core.game_state import (
+        GameState, CombatState, Player, Monster, Card, CardType, IntentType, RoomPhase,
+    )
+    from src.env.action_mask import build_action_mask
+
+    combat = CombatState(hand=[Card(id="Strike_G", name="", cost=1, card_type=CardType.ATTACK, has_target=True)],
+                         player=Player(energy=3, max_energy=3, current_hp=50, max_hp=70),
+                         monsters=[Monster(id="JawWorm", name="", current_hp=40, max_hp=40,
+                                           intent=IntentType.ATTACK)], turn=1)
+    policy_states = [GameState(room_phase=RoomPhase.COMBAT, floor=1, act=1, combat=combat,
+                               available_commands=["play", "end"])]
+    screen_states = [
+        GameState(room_phase=RoomPhase.EVENT, floor=0, act=1, screen_type="EVENT",
+                  available_commands=["choose"], choice_list=["a", "b"]),
+        GameState(room_phase=RoomPhase.MAP, floor=1, act=1, screen_type="MAP",
+                  available_commands=["choose"], choice_list=["x=1"]),
+        GameState(room_phase=RoomPhase.NONE, floor=1, act=1, screen_type="COMBAT_REWARD",
+                  available_commands=["proceed"]),
+        GameState(room_phase=RoomPhase.COMBAT, floor=1, act=1, combat=combat, available_commands=["state"]),
+    ]
+    states = policy_states + screen_states
+    probe = _RoutingProbe()
+    server = CollectionServer(lambda: probe, address="127.0.0.1:0", record=False)
+    try:
+        commands = server._select_commands([None] * len(states), states)
+    finally:
+        server._shutdown()
+    ok_policy = all(build_action_mask(s)[Action.from_command(c).to_id()]
+                    for s, c in zip(policy_states, commands))
+    ok_screens = (commands[len(policy_states):] == ["proceed"] * len(screen_states)
+                  and [id(s) for s in probe.delegated] == [id(s) for s in screen_states])
+    print(f"分流：战斗帧走策略且合法 {ok_policy}；事件 / 地图 / 奖励 / 无合法动作帧交给 select_action {ok_screens}")
+    return ok_policy and ok_screens
+
+
+def run_session(agent_factory, games: list, budget_ms: float, max_batch: int, out_dir: str) -> dict:
+    """启动服务与 N 个 Mod 替身，返回统计"""
+    server = CollectionServer(agent_factory, address="127.0.0.1:0", output_dir=out_dir,
+                              latency_budget_ms=budget_ms, max_batch=max_batch)
+    serve = threading.Thread(target=server.serve_forever, kwargs={"max_games": len(games)}, daemon=True)
+    serve.start()
+
+    cmd = [sys.executable, "scripts/collect_bridge.py", "--address", server.address]
+    results = [None] * len(games)
+
+    def one(i):
+        results[i] = run_mock_mod(cmd, games[i], MOD_READY_TIMEOUT, 30.0, True)
+
+    t0 = time.perf_counter()
+    threads = [threading.Thread(target=one, args=(i,)) for i in range(len(games))]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    wall = time.perf_counter() - t0
+    serve.join(timeout=10)
+    server.stop()
+
+    stats = server.get_stats()
+    stats["wall_s"] = wall
+    stats["ok"] = all(r and r["ok"] for r in results)
+    stats["errors"] = [r.get("error") for r in results if r and not r["ok"]]
+    stats["invalid"] = sum(r["invalid"] for r in results if r)
+    stats["sent"] = sum(r["frames_sent"] for r in results if r)
+    stats["recorded"] = sum(len(json_codec.load(f)) for f in Path(out_dir).glob("*.json"))
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--games", type=int, default=8, help="同时连接的对局数")
+    parser.add_argument("--log", type=str, default=None, help="记录的对局 .json 文件或目录（每局都回放它）")
+    parser.add_argument("--frames", type=int, default=None, help="每局最多帧数")
+    parser.add_argument("--synthetic", type=int, default=2, help="无记录时每局合成 N 局对局")
+    parser.add_argument("--budget-ms", type=float, default=20.0, help="服务端延迟预算（毫秒）")
+    args = parser.parse_args()
+    logging.disable(logging.WARNING)
+
+    if args.log:
+        base = load_frames(Path(args.log), args.frames)
+        games = [base for _ in range(args.games)]
+    else:
+        from bench_replay_env import synthetic_game
+        games = []
+        for g in range(args.games):
+            rng = random.Random(g)
+            frames = [f for _ in range(args.synthetic) for f in synthetic_game(rng)]
+            games.append(frames[:args.frames] if args.frames else frames)
+    print(f"{args.games} 局并发，每局 {len(games[0])} 帧，延迟预算 {args.budget_ms:.0f} ms\n")
+
+    from src.agents import create_agent
+    sessions = [
+        ("rule", lambda: create_agent("rule", "DataCollector"), args.games),
+        ("mlp batch=1", NumpyMLPPolicy, 1),
+        ("mlp batched", NumpyMLPPolicy, args.games),
+    ]
+    ok = check_routing()
+    print()
+    for name, factory, max_batch in sessions:
+        with tempfile.TemporaryDirectory() as tmp:
+            s = run_session(factory, games, args.budget_ms, max_batch, tmp)
+        lat = s.get("latency_ms", {})
+        print(f"[{name:>12}] {s['frames'] / s['wall_s']:7.0f} 帧/s  批均 {s['mean_batch']:.2f}  "
+              f"推理 {s['infer_ms_ema']:.2f} ms/批")
+        print(f"    服务端延迟(ms): p50={lat.get('p50', 0):.2f} p90={lat.get('p90', 0):.2f} "
+              f"p99={lat.get('p99', 0):.2f} max={lat.get('max', 0):.2f}  超预算 {s['over_budget']}/{s['frames']}")
+        print(f"    非法命令 {s['invalid']}  发送 {s['sent']}  记录 {s['recorded']}  "
+              f"{'OK' if s['ok'] else s['errors']}")
+        ok = ok and s["ok"] and s["invalid"] == 0 and s["recorded"] == s["sent"]
+    print(f"\n{'✅ 全部通过' if ok else '❌ 存在失败'}")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+数据并行训练扩展性基准：1 / 2 / 4 / 8 个 gloo worker 的训练吞吐（样本/秒）
+
+随机生成 encoder 维度（2945）的分片数据，train_data_parallel 训练固定轮数（关闭早停与学习率调度），
+每个 worker 批大小固定（全局批随 worker 数增长，学习率线性缩放）：
+- 基线：单进程、batch 32、全部核给一个进程（对应原 _train_pytorch 的默认设置）
+- world_size = 1 / 2 / 4 / 8：每 worker 线程数 = 可用核数 // world_size（至少 1，超额订阅会标注）
+- 报告样本/秒（含验证）、相对 world_size=1 的加速比与并行效率、最终验证准确率
+
+需要 PyTorch；未安装时跳过。
+
+用法: python scripts/bench_ddp_scaling.py [--samples 65536] [--epochs 2] [--batch-size 256] [--workers 1 2 4 8]
+"""
+import os
+import sys
+import argparse
+import logging
+import importlib.util
+import tempfile
+from pathlib import Path
+
+_SCRIPTS = Path(__file__).resolve().parent
+sys.path.insert(0, str(_SCRIPTS))
+sys.path.insert(0, str(_SCRIPTS.parent))
+
+from bench_shard_dataset import make_shards
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--samples", type=int, default=65536)
+    parser.add_argument("--dim", type=int, default=2945)
+    parser.add_argument("--epochs", type=int, default=2)
+    parser.add_argument("--batch-size", type=int, default=256, help="每个 worker 的批大小")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--hidden-layers", type=int, nargs="+", default=[256, 128])
+    args = parser.parse_args()
+    logging.disable(logging.CRITICAL)
+
+    if importlib.util.find_spec("torch") is None:
+        print("PyTorch 未安装，跳过")
+        return 0
+    from src.training.distributed import train_data_parallel
+
+    n_cores = len(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else os.cpu_count()
+    common = dict(epochs=args.epochs, hidden_layers=args.hidden_layers, patience=args.epochs + 1,
+                  lr_schedule="none")
+    with tempfile.TemporaryDirectory() as tmp:
+        shard_dir = Path(tmp) / "shards"
+        make_shards(shard_dir, args.samples, args.dim, shard_size=16384)
+        print(f"数据：{args.samples} × {args.dim}，可用核 {n_cores}，每 worker 批 {args.batch_size}，{args.epochs} 轮\n")
+
+        base = train_data_parallel(str(shard_dir), world_size=1, batch_size=32, threads_per_worker=n_cores, **common)
+        print(f"{'基线（1 进程, batch 32）':<26}{base['samples_per_sec']:>12,.0f} 样本/秒  "
+              f"验证准确率 {base['best_val_acc']:.3f}\n")
+
+        print(f"{'workers':>8}{'线程/worker':>12}{'全局批':>8}{'学习率':>10}{'样本/秒':>12}{'加速比':>8}{'效率':>8}")
+        ref = None
+        for w in args.workers:
+            r = train_data_parallel(str(shard_dir), world_size=w, batch_size=args.batch_size, **common)
+            ref = ref or r["samples_per_sec"]
+            speedup = r["samples_per_sec"] / ref
+            note = "  (超额订阅)" if w * r["threads_per_worker"] > n_cores else ""
+            print(f"{w:>8}{r['threads_per_worker']:>12}{r['global_batch']:>8}{r['learning_rate']:>10.1e}"
+                  f"{r['samples_per_sec']:>12,.0f}{speedup:>7.2f}x{speedup / w:>8.0%}{note}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
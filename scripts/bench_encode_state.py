@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+"""
+StateEncoder.encode_state 直接编码路径：一致性校验 + StsEnvironment 单步延迟对比
+
+1. 一致性：encode_game_state(state) 与旧路径 encode(state.to_mod_response()) 逐维相等
+2. 延迟：在 StsEnvironment.step 循环里对比三种编码路径
+   - legacy: to_mod_response() + encode()（旧实现）
+   - typed:  encode_game_state()（无原始帧时）
+   - raw:    encode(raw_response)（from_mod_response 保留的原始帧）
+
+用法: python scripts/bench_encode_state.py [--states 200] [--steps 2000]
+有 data/A20_Silent/Raw_Data_json_FORSL 时额外用真实帧校验/计时。
+"""
+import sys
+import json
+import time
+import random
+import argparse
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.core.game_state import (
+    GameState, CombatState, Player, Monster, Card, CardType, IntentType, RoomPhase,
+)
+from src.core.action import ACTION_END_ID
+from src.env.sts_env import StsEnvironment
+from src.training.encoder import encode, encode_game_state, StateEncoder
+from src.training.encoder_utils import _load_ids
+
+DATA_DIR = Path(__file__).parent.parent / "data" / "A20_Silent" / "Raw_Data_json_FORSL"
+
+
+class LegacyStateEncoder(StateEncoder):
+    """旧实现：每步 to_mod_response() 再 encode()"""
+
+    def encode_state(self, state) -> np.ndarray:
+        if state is None:
+            return np.zeros(self._dim, dtype=np.float32)
+        return encode(state.to_mod_response())
+
+
+class TypedStateEncoder(StateEncoder):
+    """忽略原始帧，强制走 typed 字段路径"""
+
+    def encode_state(self, state) -> np.ndarray:
+        if state is None:
+            return np.zeros(self._dim, dtype=np.float32)
+        return encode_game_state(state)
+
+
+def random_state(rng: random.Random, ids: dict) -> GameState:
+    """随机构造一个 GameState（战斗或非战斗）"""
+    phase = rng.choice(list(RoomPhase))
+    in_combat = phase == RoomPhase.COMBAT and rng.random() < 0.9
+    combat = None
+    if in_combat:
+        hand = [
+            Card(
+                id=rng.choice(ids["cards"]),
+                name="",
+                cost=rng.randint(-1, 4),
+                card_type=rng.choice(list(CardType)),
+                is_playable=rng.random() < 0.7,
+                has_target=rng.random() < 0.5,
+            )
+            for _ in range(rng.randint(0, 10))
+        ]
+        monsters = [
+            Monster(
+                id=rng.choice(ids["monsters"]),
+                name="",
+                current_hp=rng.randint(0, 120),
+                max_hp=rng.randint(1, 120),
+                intent=rng.choice(list(IntentType)),
+                block=rng.randint(0, 30),
+                is_gone=rng.random() < 0.1,
+            )
+            for _ in range(rng.randint(1, 5))
+        ]
+        player = Player(
+            energy=rng.randint(0, 5),
+            max_energy=rng.randint(3, 5),
+            current_hp=rng.randint(0, 70),
+            max_hp=70,
+            block=rng.randint(0, 40),
+        )
+        combat = CombatState(
+            hand=hand,
+            player=player,
+            monsters=monsters,
+            turn=rng.randint(1, 10),
+            draw_pile_count=rng.randint(0, 40),
+            discard_pile_count=rng.randint(0, 40),
+        )
+    commands = rng.sample(["play", "end", "choose", "proceed", "potion", "confirm", "cancel"], rng.randint(0, 4))
+    return GameState(
+        room_phase=phase,
+        floor=rng.randint(0, 55),
+        act=rng.randint(1, 4),
+        combat=combat,
+        screen_type=rng.choice([None, "NONE", "MAP", "EVENT"]),
+        available_commands=commands,
+        ready_for_command=True,
+        choice_list=["x"] * rng.randint(0, 5),
+        gold=rng.randint(0, 500),
+        current_hp=rng.randint(0, 70),
+        max_hp=70,
+    )
+
+
+def load_raw_states(limit: int) -> list:
+    """读取真实 Mod 帧（若数据目录存在）"""
+    states = []
+    if not DATA_DIR.exists():
+        return states
+    for f in sorted(DATA_DIR.glob("*.json")):
+        with open(f, encoding="utf-8") as fp:
+            frames = json.load(fp)
+        for frame in frames:
+            if isinstance(frame, dict):
+                states.append(GameState.from_mod_response(frame))
+            if len(states) >= limit:
+                return states
+    return states
+
+
+def check_equivalence(states: list) -> int:
+    """typed 路径与旧路径逐维比较，返回不一致数"""
+    mismatches = 0
+    for i, state in enumerate(states):
+        if state.room_phase == RoomPhase.COMBAT and state.combat is None:
+            continue  # 旧路径在此情况下抛异常（combat_state=None），不可比
+        a = encode(state.to_mod_response())
+        b = encode_game_state(state)
+        if not np.array_equal(a, b):
+            mismatches += 1
+            diff = np.nonzero(a != b)[0]
+            print(f"  ❌ 状态 {i}: {len(diff)} 维不一致，前几维 {diff[:8].tolist()}")
+    return mismatches
+
+
+def bench_env(states: list, encoder: StateEncoder, steps: int) -> float:
+    """在 StsEnvironment.step 循环中计时，返回每步平均微秒"""
+    env = StsEnvironment()
+    env._encoder = encoder
+    combat_states = [s for s in states if s.combat is not None] or states
+    env.reset()
+    t0 = time.perf_counter()
+    for i in range(steps):
+        env.set_state(combat_states[i % len(combat_states)])
+        env.step(ACTION_END_ID)
+    return (time.perf_counter() - t0) / steps * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--states", type=int, default=200, help="随机状态数")
+    parser.add_argument("--steps", type=int, default=2000, help="每种路径计时步数")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    import logging
+    logging.disable(logging.WARNING)
+
+    ids = _load_ids()
+    rng = random.Random(args.seed)
+    synthetic = [random_state(rng, ids) for _ in range(args.states)]
+    raw_states = load_raw_states(args.states)
+
+    print("=" * 60)
+    print("一致性校验：encode_game_state vs encode(to_mod_response())")
+    print("=" * 60)
+    bad = check_equivalence(synthetic + raw_states)
+    print(f"  随机状态 {len(synthetic)} 个，真实帧 {len(raw_states)} 个，不一致 {bad} 个")
+
+    print("\n" + "=" * 60)
+    print(f"StsEnvironment.step 单步延迟（{args.steps} 步）")
+    print("=" * 60)
+    legacy = bench_env(synthetic, LegacyStateEncoder(), args.steps)
+    typed = bench_env(synthetic, TypedStateEncoder(), args.steps)
+    print(f"  随机状态  legacy: {legacy:8.1f} us/step")
+    print(f"  随机状态  typed:  {typed:8.1f} us/step  (节省 {1 - typed / legacy:.1%})")
+    if raw_states:
+        legacy_raw = bench_env(raw_states, LegacyStateEncoder(), args.steps)
+        direct_raw = bench_env(raw_states, StateEncoder(), args.steps)
+        print(f"  真实帧    legacy: {legacy_raw:8.1f} us/step")
+        print(f"  真实帧    raw:    {direct_raw:8.1f} us/step  (节省 {1 - direct_raw / legacy_raw:.1%})")
+
+    return 1 if bad else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
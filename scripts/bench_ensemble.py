@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""
+堆叠权重集成基准：K 个模型一次批量前向 vs 逐个 predict_proba
+
+1. 一致性：StackedPolicy 的 mean / vote / max 与逐个 NumpyPolicy.predict_proba 后再合并的结果相同；
+   不同类别集合的成员（模拟 sklearn 只输出训练中出现过的类别）可以堆叠；带掩码时非法动作概率为 0
+2. 延迟：K = 1 / 4 / 16，批大小 1（实时逐帧决策）与 256（离线评估），
+   对比单模型一次前向、逐个模型前向、堆叠前向，报告堆叠前向相当于几次单模型前向
+3. 端到端：EnsembleAgentImpl.select_action（含编码）的 p50 / p99
+
+用法: python scripts/bench_ensemble.py [--encoder encoder] [--hidden 256 128] [--ks 1 4 16]
+"""
+import os
+import sys
+import time
+import argparse
+import logging
+import importlib
+import tempfile
+import statistics
+from pathlib import Path
+
+import numpy as np
+
+_SCRIPTS = Path(__file__).resolve().parent
+sys.path.insert(0, str(_SCRIPTS))
+sys.path.insert(0, str(_SCRIPTS.parent))
+
+from bench_numpy_policy import random_numpy_policy
+from src.core.action import ACTION_SPACE_SIZE
+from src.agents.ensemble import StackedPolicy, EnsembleAgentImpl
+from src.agents.numpy_policy import NumpyPolicy
+from src.env.sim_env import SimEnv
+
+
+def _median_ms(fn, repeats: int) -> float:
+    fn()
+    times = []
+    for _ in range(repeats):
+        t0 = time.perf_counter()
+        fn()
+        times.append((time.perf_counter() - t0) * 1e3)
+    return statistics.median(times)
+
+
+def _reference(members, x, mask, combine):
+    p = np.stack([m.predict_proba(x, mask) for m in members])
+    if combine == "mean":
+        return p.mean(axis=0)
+    if combine == "vote":
+        votes = np.zeros(p.shape[1:], dtype=np.float32)
+        for pk in p:
+            votes[np.arange(len(x)), pk.argmax(axis=1)] += 1
+        return votes / len(members)
+    best = p.max(axis=2).argmax(axis=0)
+    return p[best, np.arange(len(x))]
+
+
+def check_equivalence(dim: int, hidden: list, encoder: str) -> bool:
+    rng = np.random.default_rng(0)
+    members = [random_numpy_policy(dim, hidden, "relu", encoder, seed=s) for s in range(5)]
+    # 一个成员只覆盖部分动作（sklearn 风格 classes）
+    classes = np.sort(rng.choice(ACTION_SPACE_SIZE, 40, replace=False))
+    sk = members[-1]
+    members[-1] = NumpyPolicy(sk.weights[:-1] + [sk.weights[-1][:, :40]], sk.biases[:-1] + [sk.biases[-1][:40]],
+                              sk.activations, classes=classes, encoder=encoder, source="sklearn-like")
+    x = rng.random((64, dim), dtype=np.float32)
+    mask = rng.random((64, ACTION_SPACE_SIZE)) < 0.3
+    ok = True
+    for combine in ("mean", "vote", "max"):
+        stacked = StackedPolicy(members, combine)
+        for m in (None, mask):
+            diff = np.abs(stacked.predict_proba(x, m) - _reference(members, x, m, combine)).max()
+            ok &= diff < 1e-5
+        print(f"  {combine:<5} 与逐个前向后合并的最大误差: {diff:.2e}")
+    illegal = StackedPolicy(members).predict_proba(x, mask)[~mask].max()
+    print(f"  掩码后非法动作最大概率: {illegal:.1e}")
+    ok &= illegal == 0.0
+    try:
+        StackedPolicy([members[0], random_numpy_policy(dim, [h * 2 for h in hidden], "relu", encoder)])
+        print("  结构不同的成员未被拒绝")
+        ok = False
+    except ValueError:
+        print("  结构不同的成员被拒绝: True")
+    return ok
+
+
+def bench_latency(dim: int, hidden: list, encoder: str, ks: list, repeats: int):
+    rng = np.random.default_rng(1)
+    print(f"  {'K':>3}{'批':>6}{'单模型(ms)':>12}{'逐个 K 次(ms)':>15}{'堆叠(ms)':>11}{'堆叠/单模型':>13}{'加速':>8}")
+    for k in ks:
+        members = [random_numpy_policy(dim, hidden, "relu", encoder, seed=s) for s in range(k)]
+        stacked = StackedPolicy(members)
+        for n in (1, 256):
+            x = rng.random((n, dim), dtype=np.float32)
+            single = _median_ms(lambda: members[0].predict_proba(x), repeats)
+            loop = _median_ms(lambda: np.mean([m.predict_proba(x) for m in members], axis=0), repeats)
+            fused = _median_ms(lambda: stacked.predict_proba(x), repeats)
+            print(f"  {k:>3}{n:>6}{single:>12.3f}{loop:>15.3f}{fused:>11.3f}{fused / single:>13.1f}"
+                  f"{loop / fused:>7.1f}x")
+
+
+def bench_agent(dim: int, hidden: list, encoder: str, k: int, decisions: int):
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = []
+        for s in range(k):
+            paths.append(os.path.join(tmp, f"m{s}.npz"))
+            random_numpy_policy(dim, hidden, "relu", encoder, seed=s).save(paths[-1])
+        agent = EnsembleAgentImpl("Bench", {"models": paths})
+        agent.save(os.path.join(tmp, "ensemble.json"))
+        agent = EnsembleAgentImpl("Bench")
+        agent.load(os.path.join(tmp, "ensemble.json"))
+        agent.set_training_mode(False)
+
+        env = SimEnv(seed=0)
+        env.reset()
+        states = []
+        for _ in range(decisions):
+            states.append(env._current_state)
+            _, _, done, truncated, _ = env.step(int(env.action_masks().argmax()))
+            if done or truncated:
+                env.reset()
+        lat = []
+        for state in states:
+            t0 = time.perf_counter()
+            agent.select_action(state)
+            lat.append((time.perf_counter() - t0) * 1e3)
+        print(f"  K={k}：p50 {np.percentile(lat, 50):.3f} ms，p99 {np.percentile(lat, 99):.3f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--encoder", type=str, choices=["encoder", "encoder_mvp"], default="encoder")
+    parser.add_argument("--hidden", type=int, nargs="+", default=[256, 128])
+    parser.add_argument("--ks", type=int, nargs="+", default=[1, 4, 16])
+    parser.add_argument("--repeats", type=int, default=50)
+    parser.add_argument("--decisions", type=int, default=500)
+    args = parser.parse_args()
+    logging.disable(logging.CRITICAL)
+    dim = importlib.import_module(f"src.training.{args.encoder}").get_output_dim()
+
+    print(f"模型：{args.encoder} {dim} → {args.hidden} → {ACTION_SPACE_SIZE}，ReLU")
+    print("\n=== 1. 一致性 ===")
+    ok = check_equivalence(dim, args.hidden, args.encoder)
+    print(f"\n=== 2. 前向延迟（{args.repeats} 次中位数）===")
+    bench_latency(dim, args.hidden, args.encoder, args.ks, args.repeats)
+    print("\n=== 3. EnsembleAgentImpl.select_action（含编码，SimEnv 状态）===")
+    for k in args.ks:
+        bench_agent(dim, args.hidden, args.encoder, k, args.decisions)
+
+    print(f"\n{'✅ 通过' if ok else '❌ 失败'}")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+"""
+扁平检查点（.flat，np.memmap 读取）基准：对比 pickle（SupervisedAgentImpl.save）与 .npz
+
+1. 一致性：.pkl → .flat 转换、.npz → .flat 后概率输出逐位相同；权重是 memmap 视图（未复制）；
+   编码器布局哈希不一致时加载报错
+2. 加载耗时：同一进程重复加载（页缓存已热）的中位数，及加载后首次前向耗时
+3. 多进程内存：N 个 spawn 子进程同时加载同一模型并前向一次，报告每进程匿名内存（RssAnon）
+   增量与全部进程合计 PSS（共享页按进程数分摊后的真实占用）
+
+用法: python scripts/bench_flat_checkpoint.py [--hidden 1024 512] [--procs 4] [--repeats 20]
+"""
+import os
+import sys
+import mmap
+import time
+import pickle
+import argparse
+import logging
+import tempfile
+import statistics
+import multiprocessing as mp
+from pathlib import Path
+
+import numpy as np
+
+_SCRIPTS = Path(__file__).resolve().parent
+sys.path.insert(0, str(_SCRIPTS))
+sys.path.insert(0, str(_SCRIPTS.parent))
+
+from bench_numpy_policy import random_numpy_policy
+from src.agents import flat_checkpoint
+from src.agents.flat_checkpoint import save_flat, load_flat, convert_to_flat, read_header
+from src.agents.numpy_policy import NumpyPolicy
+
+
+def _mem_kb() -> dict:
+    out = {}
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith(("RssAnon", "RssFile")):
+                key, val = line.split(":")
+                out[key] = int(val.split()[0])
+    with open("/proc/self/smaps_rollup") as f:
+        for line in f:
+            if line.startswith("Pss:"):
+                out["Pss"] = int(line.split()[1])
+    return out
+
+
+def _is_mapped(a) -> bool:
+    """数组是否为文件映射上的视图（沿 .base 链找 mmap）"""
+    while a is not None:
+        if isinstance(a, mmap.mmap):
+            return True
+        a = getattr(a, "base", None)
+    return False
+
+
+def _load(kind: str, path: str):
+    if kind == "pickle":
+        with open(path, "rb") as f:
+            return pickle.load(f)["model"]
+    if kind == "npz":
+        return NumpyPolicy.load(path)
+    return load_flat(path)
+
+
+def _child(kind: str, path: str, dim: int, barrier, queue):
+    before = _mem_kb()
+    policy = _load(kind, path)
+    policy.predict_proba(np.zeros((1, dim), dtype=np.float32))
+    barrier.wait()          # 所有进程都已加载：此刻的 PSS 反映共享
+    after = _mem_kb()
+    queue.put((after["RssAnon"] - before["RssAnon"], after["Pss"]))
+    barrier.wait()
+
+
+def multi_process(kind: str, path: str, dim: int, procs: int):
+    ctx = mp.get_context("spawn")
+    barrier = ctx.Barrier(procs)
+    queue = ctx.Queue()
+    workers = [ctx.Process(target=_child, args=(kind, path, dim, barrier, queue)) for _ in range(procs)]
+    for w in workers:
+        w.start()
+    results = [queue.get() for _ in range(procs)]
+    for w in workers:
+        w.join()
+    anon = statistics.mean(r[0] for r in results) / 1024
+    pss = sum(r[1] for r in results) / 1024
+    return anon, pss
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--dim", type=int, default=2945)
+    parser.add_argument("--hidden", type=int, nargs="+", default=[1024, 512])
+    parser.add_argument("--procs", type=int, default=4)
+    parser.add_argument("--repeats", type=int, default=20)
+    args = parser.parse_args()
+    logging.disable(logging.CRITICAL)
+    ok = True
+
+    policy = random_numpy_policy(args.dim, args.hidden, "relu", "encoder")
+    n_params = sum(w.size + b.size for w, b in zip(policy.weights, policy.biases))
+    x = np.random.default_rng(1).random((64, args.dim), dtype=np.float32)
+    ref = policy.predict_proba(x)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = {k: os.path.join(tmp, f"model.{ext}") for k, ext in
+                 (("pickle", "pkl"), ("npz", "npz"), ("flat", "flat"))}
+        # SupervisedAgentImpl.save 的 pickle 结构（numpy 后端模型对象）
+        with open(paths["pickle"], "wb") as f:
+            pickle.dump({"model": policy, "model_type": "numpy", "config": {}, "training_history": []}, f)
+        policy.save(paths["npz"])
+        save_flat(policy, paths["flat"])
+
+        print(f"模型：{args.dim} → {args.hidden} → 179，{n_params / 1e6:.2f}M 参数（{n_params * 4 / 2 ** 20:.1f} MB）")
+        print("\n=== 1. 一致性 ===")
+        flat = load_flat(paths["flat"], verify=True)
+        same = np.array_equal(flat.predict_proba(x), ref)
+        mapped = all(_is_mapped(w) for w in flat.weights + flat.biases)
+        from_pkl = convert_to_flat(paths["pickle"], os.path.join(tmp, "from_pkl.flat"))
+        from_npz = convert_to_flat(paths["npz"], os.path.join(tmp, "from_npz.flat"))
+        conv_same = (np.array_equal(from_pkl.predict_proba(x), ref) and np.array_equal(from_npz.predict_proba(x), ref))
+        header = read_header(paths["flat"])
+        print(f"  .flat 概率与原模型逐位相同: {same}；权重为映射视图（未复制）: {mapped}")
+        print(f"  .pkl / .npz → .flat 转换后逐位相同: {conv_same}")
+        print(f"  头部: encoder={header['encoder']} layout={header['encoder_layout_hash']} "
+              f"actions={header['action_space_size']} blob_offset={header['blob_offset']}")
+
+        original = flat_checkpoint.encoder_layout_hash
+        flat_checkpoint.encoder_layout_hash = lambda encoder: "0" * 16
+        try:
+            save_flat(policy, os.path.join(tmp, "stale.flat"))
+        finally:
+            flat_checkpoint.encoder_layout_hash = original
+        try:
+            load_flat(os.path.join(tmp, "stale.flat"))
+            rejected = False
+        except ValueError:
+            rejected = True
+        print(f"  编码器布局哈希不一致时拒绝加载: {rejected}")
+        ok &= same and mapped and conv_same and rejected
+
+        print(f"\n=== 2. 加载耗时（进程内，页缓存已热，{args.repeats} 次中位数）===")
+        print(f"  {'格式':<8}{'加载(ms)':>10}{'首次前向(ms)':>14}")
+        for kind in ("pickle", "npz", "flat"):
+            load_ms, fwd_ms = [], []
+            for _ in range(args.repeats):
+                t0 = time.perf_counter()
+                p = _load(kind, paths[kind])
+                t1 = time.perf_counter()
+                p.predict_proba(x[:1])
+                t2 = time.perf_counter()
+                load_ms.append((t1 - t0) * 1e3)
+                fwd_ms.append((t2 - t1) * 1e3)
+                del p
+            print(f"  {kind:<8}{statistics.median(load_ms):>10.2f}{statistics.median(fwd_ms):>14.2f}")
+
+        print(f"\n=== 3. {args.procs} 个进程同时加载 ===")
+        print(f"  {'格式':<8}{'每进程匿名内存增量(MB)':>24}{'合计 PSS(MB)':>16}")
+        for kind in ("pickle", "npz", "flat"):
+            anon, pss = multi_process(kind, paths[kind], args.dim, args.procs)
+            print(f"  {kind:<8}{anon:>24.1f}{pss:>16.1f}")
+
+    print(f"\n{'✅ 通过' if ok else '❌ 失败'}")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+"""
+微批推理服务基准：多个评估线程各自 batch=1 前向 vs 共享 InferenceServer
+
+N 个线程各驱动一个 SilentCombatSim，每步编码状态、构建动作掩码、取掩码后 argmax 动作，
+以 Mod 命令送入模拟器（非法动作以结束回合代替，见 bench_turn_planner.py）：
+1. 一致性：同一批状态经服务返回的动作 / 概率与直接前向一致
+2. 吞吐：每个线程一份模型直接前向（batch=1） vs 所有线程共享一个服务
+3. 服务统计：批大小分布、触发原因、排队延迟与总延迟 p50 / p90 / p99
+
+默认用随机初始化的 NumPy 策略（RL：encoder 2945 维 tanh [128, 128]；
+监督学习：encoder_mvp 31 维 relu [64, 32]），--rl-model / --sl-model 可指定已导出的 .npz。
+
+用法: python scripts/bench_inference_server.py [--threads 8] [--decisions 500] [--max-wait-ms 2]
+"""
+import sys
+import time
+import random
+import argparse
+import logging
+import tempfile
+import threading
+from pathlib import Path
+
+import numpy as np
+
+_SCRIPTS = Path(__file__).resolve().parent
+sys.path.insert(0, str(_SCRIPTS))
+sys.path.insert(0, str(_SCRIPTS.parent))
+
+from bench_numpy_policy import random_numpy_policy
+from bench_turn_planner import legal
+from src.agents import create_agent, InferenceServer
+from src.core.action import Action
+from src.core.game_state import GameState
+from src.env.action_mask import build_action_mask
+from src.env.silent_sim import SilentCombatSim, ENCOUNTERS, random_deck
+
+
+def direct_action(agent, state: GameState) -> int:
+    """不经服务：batch=1 前向 + 掩码 argmax（与服务线程相同的选择规则）"""
+    proba = agent.predict_proba_obs(agent.encode_obs(state).reshape(1, -1))[0]
+    masked = np.where(build_action_mask(state), proba, -np.inf)
+    return int(masked.argmax()) if np.isfinite(masked.max()) else int(proba.argmax())
+
+
+def drive(decide, seed: int, decisions: int, out: list, on_exit=None):
+    """驱动模拟器做 decisions 次决策；战斗结束后换遭遇重开"""
+    rng = random.Random(seed)
+    encounters = list(ENCOUNTERS)
+    sim = SilentCombatSim(seed=seed, deck=random_deck(rng, 5))
+    frame = sim.reset(rng.choice(encounters))
+    for _ in range(decisions):
+        if sim.done:
+            sim = SilentCombatSim(seed=rng.randrange(1 << 30), deck=random_deck(rng, 5))
+            frame = sim.reset(rng.choice(encounters))
+        action = Action.from_id(decide(GameState.from_mod_response(frame)))
+        frame = sim.step_command(action.to_command() if legal(sim, action) else "end")
+    out.append(decisions)
+    if on_exit is not None:
+        on_exit()
+
+
+def run_threads(deciders: list, decisions: int, on_exit: list = None) -> float:
+    """每个线程一个 decide 函数（on_exit：线程结束时的回调），返回总决策吞吐（次/秒）"""
+    done: list = []
+    on_exit = on_exit or [None] * len(deciders)
+    threads = [threading.Thread(target=drive, args=(d, i, decisions, done, cb))
+               for i, (d, cb) in enumerate(zip(deciders, on_exit))]
+    t0 = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return sum(done) / (time.perf_counter() - t0)
+
+
+def sample_states(n: int) -> list:
+    states = []
+    rng = random.Random(123)
+    while len(states) < n:
+        sim = SilentCombatSim(seed=len(states), deck=random_deck(rng, 5))
+        frame = sim.reset(rng.choice(list(ENCOUNTERS)))
+        for _ in range(10):
+            if sim.done:
+                break
+            states.append(GameState.from_mod_response(frame))
+            frame = sim.step_command("end" if rng.random() < 0.3 else f"play 1 {rng.randrange(len(sim.monsters))}")
+    return states[:n]
+
+
+def bench_agent(label: str, agent_type: str, model: str, args) -> bool:
+    agents = []
+    for i in range(args.threads + 1):
+        a = create_agent(agent_type, f"{label}-{i}")
+        a.load(model)
+        a.set_training_mode(False)
+        agents.append(a)
+    shared = agents[-1]
+    print(f"\n=== {label}（{agent_type}，{args.threads} 线程 × {args.decisions} 决策）===")
+
+    # 1. 一致性
+    states = sample_states(200)
+    with InferenceServer(shared, max_batch=args.max_batch, max_wait_ms=args.max_wait_ms) as server:
+        futures = [server.submit(shared.encode_obs(s), build_action_mask(s), with_proba=True) for s in states]
+        got = [f.result() for f in futures]
+        ok = all(a == direct_action(shared, s) for (a, _), s in zip(got, states))
+        client = server.client()
+        ok &= all(client.select_action(s).to_id() == direct_action(shared, s) for s in states[:20])
+        client.close()
+        ref = shared.predict_proba_obs(np.stack([shared.encode_obs(s) for s in states]))
+        diff = float(np.abs(np.stack([p for _, p in got]) - ref).max())
+        ok &= diff < 1e-5
+    print(f"  一致性：动作{'一致' if ok else '不一致'}，概率最大误差 {diff:.2e}")
+
+    # 2. 吞吐
+    direct = run_threads([lambda s, a=a: direct_action(a, s) for a in agents[:-1]], args.decisions)
+    for _ in range(args.repeats - 1):
+        direct = max(direct, run_threads([lambda s, a=a: direct_action(a, s) for a in agents[:-1]], args.decisions))
+    best = None
+    for _ in range(args.repeats):
+        with InferenceServer(shared, max_batch=args.max_batch, max_wait_ms=args.max_wait_ms) as server:
+            clients = [server.client(f"Client-{i}") for i in range(args.threads)]
+            rate = run_threads([lambda s, c=c: c.select_action(s).to_id() for c in clients], args.decisions,
+                               [c.close for c in clients])
+        if best is None or rate > best[0]:
+            best = (rate, server.get_stats())
+    served, stats = best
+    print(f"  每线程独立模型（batch=1）: {direct:>9,.0f} 决策/秒")
+    print(f"  共享推理服务             : {served:>9,.0f} 决策/秒  ({served / direct:.2f}x)")
+
+    # 3. 服务统计
+    print(f"  批次 {stats['batches']}，平均批大小 {stats['mean_batch']:.2f}，"
+          f"单批前向 {stats['forward_ms_per_batch']:.3f} ms，触发 {stats['flush_reasons']}")
+    hist = stats["batch_sizes"]
+    print("  批大小分布: " + "  ".join(f"{k}:{v}" for k, v in hist.items()))
+    for key, name in (("queue_ms", "排队延迟"), ("total_ms", "总延迟")):
+        s = stats[key]
+        print(f"  {name}(ms): p50={s['p50']:.3f} p90={s['p90']:.3f} p99={s['p99']:.3f} max={s['max']:.2f}")
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--threads", type=int, default=8, help="并发评估线程数")
+    parser.add_argument("--decisions", type=int, default=500, help="每线程决策数")
+    parser.add_argument("--max-batch", type=int, default=32)
+    parser.add_argument("--max-wait-ms", type=float, default=2.0)
+    parser.add_argument("--repeats", type=int, default=2, help="吞吐测量重复次数（取最好）")
+    parser.add_argument("--rl-model", type=str, default=None, help="RL .npz（默认随机初始化）")
+    parser.add_argument("--sl-model", type=str, default=None, help="监督学习 .npz（默认随机初始化）")
+    args = parser.parse_args()
+    logging.disable(logging.CRITICAL)
+
+    ok = True
+    with tempfile.TemporaryDirectory() as tmp:
+        rl_model = args.rl_model
+        if rl_model is None:
+            rl_model = str(Path(tmp) / "rl.npz")
+            random_numpy_policy(2945, [128, 128], "tanh", "encoder", seed=0).save(rl_model)
+        sl_model = args.sl_model
+        if sl_model is None:
+            sl_model = str(Path(tmp) / "sl.npz")
+            random_numpy_policy(31, [64, 32], "relu", "encoder_mvp", seed=1).save(sl_model)
+        ok &= bench_agent("RL", "rl", rl_model, args)
+        ok &= bench_agent("SL", "supervised", sl_model, args)
+    print(f"\n{'✅ 通过' if ok else '❌ 失败'}")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
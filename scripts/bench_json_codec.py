@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+JSON 编解码层基准：解析 / 序列化吞吐
+
+对比三种写法在 Mod 原始帧上的表现：
+- json(indent=2): 旧实现（标准库 + 缩进）
+- json(compact):  标准库 + 紧凑分隔符
+- codec:          src.core.json_codec 当前后端（orjson 或标准库）
+
+用法:
+  python scripts/bench_json_codec.py [--input data/A20_Silent/Raw_Data_json_FORSL] [--repeat 5]
+输入目录不存在时用合成的战斗帧代替。
+"""
+import sys
+import json
+import time
+import argparse
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.core import json_codec
+from src.core.game_state import GameState, CombatState, Player, Monster, Card, CardType, IntentType, RoomPhase
+
+
+def load_frames(input_dir: Path, limit: int) -> list:
+    """读取真实帧；目录不存在时返回空列表"""
+    frames = []
+    if not input_dir.exists():
+        return frames
+    for f in sorted(input_dir.glob("*.json")):
+        arr = json_codec.load(f)
+        if isinstance(arr, list):
+            frames.extend(x for x in arr if isinstance(x, dict))
+        if len(frames) >= limit:
+            break
+    return frames[:limit]
+
+
+def synthetic_frames(n: int) -> list:
+    """合成战斗帧（结构与 Mod 响应一致）"""
+    frames = []
+    for i in range(n):
+        state = GameState(
+            room_phase=RoomPhase.COMBAT,
+            floor=i % 50,
+            act=1 + i % 3,
+            combat=CombatState(
+                hand=[Card(id="Strike_G", name="打击", cost=1, card_type=CardType.ATTACK, has_target=True)
+                      for _ in range(5)],
+                player=Player(energy=3, max_energy=3, current_hp=60, max_hp=70, block=i % 12),
+                monsters=[Monster(id="JawWorm", name="大颚虫", current_hp=40, max_hp=44, intent=IntentType.ATTACK)],
+                turn=1 + i % 8,
+                draw_pile_count=15,
+                discard_pile_count=3,
+            ),
+            available_commands=["play", "end", "potion"],
+            ready_for_command=True,
+            gold=99,
+            current_hp=60,
+            max_hp=70,
+        )
+        frames.append(state.to_mod_response())
+    return frames
+
+
+def _best(fn, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--input", type=str, default="data/A20_Silent/Raw_Data_json_FORSL")
+    parser.add_argument("--frames", type=int, default=5000, help="最多使用的帧数")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    frames = load_frames(Path(args.input), args.frames)
+    source = "真实帧"
+    if not frames:
+        frames = synthetic_frames(args.frames)
+        source = "合成帧"
+
+    n = len(frames)
+    print(f"后端: {json_codec.BACKEND}，{source} {n} 个，取 {args.repeat} 次最优")
+
+    # 逐帧（对应采集端每行一帧）与整文件（对应加载端一个 JSON 数组）两种粒度
+    variants = {
+        "json(indent=2)": lambda o: json.dumps(o, ensure_ascii=False, indent=2).encode("utf-8"),
+        "json(compact)": lambda o: json.dumps(o, ensure_ascii=False, separators=(",", ":")).encode("utf-8"),
+        "codec": json_codec.dumps_bytes,
+    }
+    parsers = {
+        "json(indent=2)": json.loads,
+        "json(compact)": json.loads,
+        "codec": json_codec.loads,
+    }
+
+    print(f"\n{'写法':<16}{'dump 帧/s':>12}{'load 帧/s':>12}{'文件 MB':>10}{'dump MB/s':>11}{'load MB/s':>11}")
+    for name, dump_fn in variants.items():
+        lines = [dump_fn(f) for f in frames]
+        blob = dump_fn(frames)
+        mb = len(blob) / 1e6
+        load_fn = parsers[name]
+
+        t_dump = _best(lambda: [dump_fn(f) for f in frames], args.repeat)
+        t_load = _best(lambda: [load_fn(b) for b in lines], args.repeat)
+        t_dump_file = _best(lambda: dump_fn(frames), args.repeat)
+        t_load_file = _best(lambda: load_fn(blob), args.repeat)
+
+        assert load_fn(blob) == json.loads(blob), f"{name}: 解析结果不一致"
+        print(f"{name:<16}{n / t_dump:>12.0f}{n / t_load:>12.0f}{mb:>10.2f}"
+              f"{mb / t_dump_file:>11.1f}{mb / t_load_file:>11.1f}")
+
+
+if __name__ == "__main__":
+    main()
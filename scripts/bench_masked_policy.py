@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+掩码策略推理基准：非法动作浪费的环境步数与样本效率（掩码前 vs 掩码后）
+
+SimEnv × N 的 BatchedVecEnv，同一个随机初始化的 NumPy 策略（相当于训练起点的 PPO 策略），
+训练模式按概率采样，固定总环境步数：
+- 未掩码：model.predict(obs) 直接交给环境（SB3 PPO rollout 的行为），非法动作 -1 且不推进
+- 未掩码 + 回退：旧 select_action 的做法，非法时改走第一个合法动作（不浪费步，但扭曲了分布）
+- 掩码：RLAgentImpl.select_actions(obs, masks) 在前向中掩码后采样
+
+报告：浪费步比例、每万步完成的战斗数、每场战斗的有效步数、决策吞吐。
+SB3 / sb3-contrib 未安装时无法跑 PPO 与 MaskablePPO 的学习曲线对比，这里只统计 rollout 本身。
+
+用法: python scripts/bench_masked_policy.py [--envs 16] [--steps 20000]
+"""
+import sys
+import time
+import argparse
+import logging
+from pathlib import Path
+
+import numpy as np
+
+_SCRIPTS = Path(__file__).resolve().parent
+sys.path.insert(0, str(_SCRIPTS))
+sys.path.insert(0, str(_SCRIPTS.parent))
+
+from bench_numpy_policy import random_numpy_policy
+from src.agents.rl_agent import RLAgentImpl
+from src.env.sim_env import SimEnv
+from src.env.vec_env import BatchedVecEnv
+
+
+def rollout(agent: RLAgentImpl, mode: str, n_envs: int, total_steps: int, seed: int = 0) -> dict:
+    base = SimEnv(seed=seed)
+    vec = BatchedVecEnv([lambda i=i: base.clone(seed=seed + i) for i in range(n_envs)])
+    obs = vec.reset()
+    np.random.seed(seed)
+    agent._rng = np.random.default_rng(seed)
+
+    wasted = combats = fallbacks = 0
+    useful_in_finished = 0
+    t0 = time.perf_counter()
+    for _ in range(total_steps // n_envs):
+        masks = vec.action_masks()
+        if mode == "masked":
+            actions = agent.select_actions(obs, masks)
+        else:
+            actions, _ = agent._model.predict(obs, deterministic=False)
+            if mode == "fallback":
+                bad = ~masks[np.arange(n_envs), actions]
+                fallbacks += int(bad.sum())
+                actions = np.where(bad, masks.argmax(axis=1), actions)
+        obs, _, dones, infos = vec.step(actions)
+        for info in infos:
+            if info.get("error") == "invalid_action":
+                wasted += 1
+            if "episode" in info:
+                combats += 1
+                useful_in_finished += info["episode"]["l"]
+    elapsed = time.perf_counter() - t0
+    steps = total_steps // n_envs * n_envs
+    vec.close()
+    return {
+        "wasted": wasted / steps,
+        "fallback": fallbacks / steps,
+        "combats_per_10k": combats / steps * 1e4,
+        "useful_per_combat": useful_in_finished / combats if combats else float("nan"),
+        "steps_per_sec": steps / elapsed,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--envs", type=int, default=16)
+    parser.add_argument("--steps", type=int, default=20000)
+    parser.add_argument("--hidden", type=int, nargs="+", default=[128, 128])
+    args = parser.parse_args()
+    logging.disable(logging.CRITICAL)
+
+    agent = RLAgentImpl("Bench")
+    agent._model = random_numpy_policy(SimEnv().observation_dim, args.hidden, "tanh", "encoder")
+    agent.set_training_mode(True)
+
+    print(f"{args.envs} 个 SimEnv，{args.steps} 环境步，随机初始化策略 {args.hidden}，训练模式采样\n")
+    print(f"{'方式':<18}{'浪费步':>8}{'回退':>8}{'战斗/万步':>11}{'有效步/战斗':>12}{'步/秒':>10}")
+    results = {}
+    for mode, label in (("unmasked", "未掩码"), ("fallback", "未掩码+回退"), ("masked", "掩码")):
+        r = rollout(agent, mode, args.envs, args.steps)
+        results[mode] = r
+        print(f"{label:<18}{r['wasted']:>8.1%}{r['fallback']:>8.1%}{r['combats_per_10k']:>11.1f}"
+              f"{r['useful_per_combat']:>12.1f}{r['steps_per_sec']:>10,.0f}")
+
+    ok = results["masked"]["wasted"] == 0.0
+    before, after = results["unmasked"], results["masked"]
+    if before["combats_per_10k"] > 0:
+        print(f"\n同样的环境步数下掩码后完成的战斗数为未掩码的 {after['combats_per_10k'] / before['combats_per_10k']:.1f} 倍")
+    print(f"\n{'✅ 通过' if ok else '❌ 失败'}")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
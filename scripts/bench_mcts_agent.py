@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+MCTS Agent 基准：与规则 Agent（贪心 / 回合规划器）对比战斗强度，并检查决策时间预算
+
+在 SilentCombatSim 上对每个遭遇用相同种子、相同牌组各跑若干场（Mod 命令语义，见 bench_turn_planner.py）：
+1. 胜率、胜场剩余生命、平均回合数
+2. 单次决策延迟 p50 / p99 / max，MCTS 需在预算内（允许一次迭代的超出）
+3. MCTS 统计：nodes/s、迭代/s、置换表命中率、同回合复用的根节点访问数
+4. --model 给出监督学习模型（.pkl / .npz）时另测带先验的 MCTS
+
+用法:
+  python scripts/bench_mcts_agent.py [--combats 5] [--budget-ms 30]
+  python scripts/bench_mcts_agent.py --encounters "Gremlin Nob" Lagavulin --model models/sl.npz
+"""
+import sys
+import random
+import argparse
+import logging
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from bench_turn_planner import run_combat
+from src.agents import create_agent
+from src.env.silent_sim import ENCOUNTERS, random_deck
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--combats", type=int, default=5, help="每个遭遇的战斗场数")
+    parser.add_argument("--budget-ms", type=float, default=30.0, help="MCTS 单次决策预算（毫秒）")
+    parser.add_argument("--rollout-turns", type=int, default=0)
+    parser.add_argument("--extra-cards", type=int, default=5, help="初始牌组外随机追加的卡牌数")
+    parser.add_argument("--encounters", nargs="*", default=None, help="只测这些遭遇（默认全部 Act 1）")
+    parser.add_argument("--model", type=str, default=None, help="监督学习模型，作为 MCTS 先验")
+    args = parser.parse_args()
+    logging.disable(logging.CRITICAL)
+
+    mcts_config = {"mcts_budget_ms": args.budget_ms, "mcts_rollout_turns": args.rollout_turns}
+    agents = [
+        ("greedy", create_agent("rule", "Greedy")),
+        ("planner", create_agent("rule", "Planner", config={"planner": True})),
+        ("mcts", create_agent("mcts", "MCTS", config=dict(mcts_config))),
+    ]
+    if args.model:
+        agent = create_agent("mcts", "MCTS+prior", config=dict(mcts_config))
+        agent.load(args.model)
+        agents.append(("mcts+prior", agent))
+
+    encounters = args.encounters or list(ENCOUNTERS)
+    results = {name: [] for name, _ in agents}
+    latencies = {name: [] for name, _ in agents}
+    print(f"{'遭遇':<20}" + "".join(f"{name:>14}" for name, _ in agents) + "   （胜率 / 胜场剩余HP）")
+    for encounter in encounters:
+        row = f"{encounter:<20}"
+        decks = [random_deck(random.Random(k), args.extra_cards) for k in range(args.combats)]
+        for name, agent in agents:
+            rs = []
+            for k in range(args.combats):
+                if hasattr(agent, "mcts"):
+                    agent.mcts.reset()
+                elif agent._planner is not None:
+                    agent._planner.reset()
+                rs.append(run_combat(agent, k, encounter, decks[k], latencies[name]))
+            results[name].extend(rs)
+            wins = [r for r in rs if r["won"]]
+            row += f"{len(wins) / len(rs):>8.0%} {np.mean([r['hp'] for r in wins]) if wins else 0:>5.1f}"
+        print(row)
+
+    ok = True
+    print()
+    for name, agent in agents:
+        rs = results[name]
+        lat = np.asarray(latencies[name])
+        wins = [r for r in rs if r["won"]]
+        invalid = sum(r["invalid"] for r in rs)
+        ok &= invalid == 0
+        print(f"[{name:>10}] 胜率 {len(wins) / len(rs):.1%}  胜场剩余HP {np.mean([r['hp'] for r in wins]) if wins else 0:.1f}  "
+              f"平均回合 {np.mean([r['turns'] for r in rs]):.1f}  非法动作 {invalid}")
+        print(f"             决策延迟(ms): p50={np.percentile(lat, 50):.2f} p99={np.percentile(lat, 99):.2f} "
+              f"max={lat.max():.2f}")
+        if hasattr(agent, "mcts"):
+            s = agent.get_stats()
+            print(f"             {s['nodes_per_sec']:,.0f} nodes/s  {s['iterations_per_sec']:,.0f} 迭代/s  "
+                  f"置换表命中率 {s['table_hit_rate']:.1%}  复用根访问 {s['reused_root_visits']}  "
+                  f"最长决策 {s['max_decision_ms']:.1f} ms")
+            ok &= s["max_decision_ms"] <= args.budget_ms * 1.5 + 10
+    print(f"\n{'✅ 通过' if ok else '❌ 失败'}")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
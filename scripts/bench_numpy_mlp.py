@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+"""
+NumPy MLP 训练基准：可流式的小批量训练 vs sklearn MLPClassifier.fit
+
+1. 梯度检查：解析梯度与中心差分（float64 副本）的相对误差
+2. 同一份合成数据（随机教师网络打标签，带噪声）上：
+   - sklearn MLPClassifier.fit（整表，_train_sklearn 的设置；未安装 sklearn 时跳过）
+   - NumpyMLPTrainer 整表内存小批量
+   - NumpyMLPTrainer 从 memmap 分片流式读取
+   训练耗时、样本/秒、验证准确率、训练过程的 Python 堆峰值（tracemalloc，NumPy 分配计入）
+3. 续训：第 k 轮后中断，同一检查点目录续训；最终权重须与不中断训练完全一致
+
+用法: python scripts/bench_numpy_mlp.py [--samples 50000] [--dim 31] [--epochs 30]
+"""
+import sys
+import time
+import argparse
+import logging
+import tempfile
+import tracemalloc
+from pathlib import Path
+
+import numpy as np
+
+_SCRIPTS = Path(__file__).resolve().parent
+sys.path.insert(0, str(_SCRIPTS))
+sys.path.insert(0, str(_SCRIPTS.parent))
+
+from bench_trainer import make_data
+from src.training.numpy_mlp import NumpyMLPTrainer
+from src.training.shard_dataset import ShardWriter, ShardDataset, BlockShuffleSampler, iter_batches
+
+
+def _has(module: str) -> bool:
+    import importlib.util
+    return importlib.util.find_spec(module) is not None
+
+
+def gradient_check() -> float:
+    rng = np.random.default_rng(0)
+    t = NumpyMLPTrainer(7, (5, 4), n_classes=6, alpha=0.01)
+    X = rng.standard_normal((9, 7)).astype(np.float32)
+    y = rng.integers(0, 6, 9)
+    # float64 计算以便差分精确
+    t.weights = [w.astype(np.float64) for w in t.weights]
+    t.biases = [b.astype(np.float64) for b in t.biases]
+    X = X.astype(np.float64)
+    _, _, grads = t.gradients(X, y)
+    worst = 0.0
+    eps = 1e-6
+    for p, g in zip(t._params(), grads):
+        num = np.zeros_like(p)
+        for idx in np.ndindex(p.shape):
+            old = p[idx]
+            p[idx] = old + eps
+            lp = t.gradients(X, y)[0]
+            p[idx] = old - eps
+            lm = t.gradients(X, y)[0]
+            p[idx] = old
+            num[idx] = (lp - lm) / (2 * eps)
+        worst = max(worst, float(np.abs(num - g).max() / (np.abs(num).max() + 1e-12)))
+    return worst
+
+
+def timed(fn):
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    out = fn()
+    elapsed = time.perf_counter() - t0
+    peak = tracemalloc.get_traced_memory()[1] / 2 ** 20
+    tracemalloc.stop()
+    return out, elapsed, peak
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--samples", type=int, default=50_000)
+    parser.add_argument("--dim", type=int, default=31)
+    parser.add_argument("--epochs", type=int, default=30)
+    parser.add_argument("--batch-size", type=int, default=256)
+    parser.add_argument("--hidden-layers", type=int, nargs="+", default=[64, 32])
+    parser.add_argument("--crash-epoch", type=int, default=4)
+    args = parser.parse_args()
+    logging.disable(logging.CRITICAL)
+    ok = True
+
+    print("=== 1. 梯度检查 ===")
+    err = gradient_check()
+    print(f"  最大相对误差 {err:.2e}")
+    ok &= err < 1e-5
+
+    X, y = make_data(args.samples, args.dim, 12, noise=0.1)
+    hidden = tuple(args.hidden_layers)
+    print(f"\n=== 2. 训练（{args.samples} × {args.dim}，隐藏层 {hidden}，batch {args.batch_size}，"
+          f"最多 {args.epochs} 轮，验证 20%）===")
+    rows = []
+    if _has("sklearn"):
+        from sklearn.neural_network import MLPClassifier
+        n_val = int(args.samples * 0.2)
+        perm = np.random.RandomState(42).permutation(args.samples)
+        tr, va = perm[n_val:], perm[:n_val]
+
+        def sk_fit():
+            clf = MLPClassifier(hidden_layer_sizes=hidden, solver="adam", max_iter=args.epochs, early_stopping=True,
+                                validation_fraction=0.1, n_iter_no_change=20, random_state=42,
+                                batch_size=args.batch_size)
+            return clf.fit(X[tr], y[tr])
+        clf, elapsed, peak = timed(sk_fit)
+        rows.append(("sklearn fit（整表）", clf.n_iter_, elapsed, len(tr) * clf.n_iter_ / elapsed,
+                     float((clf.predict(X[va]) == y[va]).mean()), peak))
+    else:
+        print("  sklearn: 未安装，跳过对照")
+
+    from src.agents.supervised import SupervisedAgentImpl
+    agent = SupervisedAgentImpl("Bench", {"model_type": "numpy"})
+    agent._encoder_output_dim = args.dim
+    res, elapsed, peak = timed(lambda: agent._train_numpy(X, y, epochs=args.epochs, batch_size=args.batch_size,
+                                                          hidden_layers=hidden, n_iter_no_change=20))
+    rows.append(("NumPy MLP（内存）", res["epochs_run"], elapsed, res["samples_per_sec"], res["accuracy"], peak))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        shard_dir = Path(tmp) / "shards"
+        with ShardWriter(shard_dir, args.dim, shard_size=8192) as writer:
+            writer.extend(X, y)
+        dataset = ShardDataset(shard_dir)
+        res, elapsed, peak = timed(lambda: agent._train_numpy_shards(
+            dataset, 0.2, args.epochs, args.batch_size, 0.001, hidden, n_iter_no_change=20))
+        rows.append(("NumPy MLP（分片流式）", res["epochs_run"], elapsed, res["samples_per_sec"], res["accuracy"], peak))
+        data_mb = X.nbytes / 2 ** 20
+        print(f"  {'方法':<22}{'轮数':>6}{'耗时(s)':>10}{'样本/秒':>12}{'验证准确率':>12}{'堆峰值(MB)':>12}")
+        for name, epochs, elapsed, sps, acc, peak in rows:
+            print(f"  {name:<22}{epochs:>6}{elapsed:>10.1f}{sps:>12,.0f}{acc:>12.4f}{peak:>12.1f}")
+        print(f"  （数据矩阵本身 {data_mb:.1f} MB；流式路径的堆峰值不随样本数增长）")
+        ok &= rows[-1][4] > 0.5
+
+        print("\n=== 3. 中断后续训 ===")
+        train_idx, val_idx = dataset.split(0.2)
+
+        def run(ckpt, stop_after=None):
+            t = NumpyMLPTrainer(args.dim, hidden)
+            sampler = BlockShuffleSampler(train_idx, args.batch_size)
+
+            def train_batches(epoch):
+                if stop_after is not None and epoch == stop_after:
+                    raise KeyboardInterrupt
+                sampler.set_epoch(epoch)
+                return iter_batches(dataset, sampler)
+
+            val = lambda: iter_batches(dataset, BlockShuffleSampler(val_idx, 4096, shuffle=False))
+            t.fit_stream(train_batches, val, epochs=args.crash_epoch * 2, checkpoint_dir=ckpt)
+            return t
+
+        ref = run(str(Path(tmp) / "ref"))
+        try:
+            run(str(Path(tmp) / "crash"), stop_after=args.crash_epoch)
+        except KeyboardInterrupt:
+            pass
+        resumed = run(str(Path(tmp) / "crash"))
+        diff = max(float(np.abs(a - b).max()) for a, b in zip(ref._params(), resumed._params()))
+        print(f"  第 {args.crash_epoch} 轮后中断并续训：{resumed.epoch} 轮，与不中断训练的权重最大差 {diff:.1e}")
+        ok &= diff == 0.0 and resumed.epoch == ref.epoch
+
+    print(f"\n{'✅ 通过' if ok else '❌ 失败'}")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
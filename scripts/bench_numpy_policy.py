@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+"""
+NumPy 推理运行时基准：导出一致性、采集脚本启动耗时与单次决策延迟
+
+1. 一致性：框架可用时（torch / sklearn / SB3）随机初始化对应网络，导出后比较概率输出
+2. 加载耗时：子进程中 import Agent + load(model) 的耗时（.npz 对比原框架模型）
+3. 端到端：mock_mod 启动 collect_data.py --real-game，报告 ready、首帧（含 Agent 导入与加载）
+   与逐帧往返延迟；.npz 对比原框架模型
+4. 进程内单次决策延迟：agent.select_action 的 p50 / p99
+
+未安装的框架对应项会标注跳过。
+
+用法: python scripts/bench_numpy_policy.py [--frames 200] [--decisions 2000]
+"""
+import os
+import sys
+import time
+import random
+import argparse
+import logging
+import tempfile
+import subprocess
+from pathlib import Path
+
+import numpy as np
+
+_SCRIPTS = Path(__file__).resolve().parent
+sys.path.insert(0, str(_SCRIPTS))
+sys.path.insert(0, str(_SCRIPTS.parent))
+
+from src.core.action import ACTION_SPACE_SIZE
+from src.agents.numpy_policy import NumpyPolicy, from_torch_sequential, from_sklearn_mlp, from_sb3_model
+
+
+def _has(module: str) -> bool:
+    import importlib.util
+    return importlib.util.find_spec(module) is not None
+
+
+def random_numpy_policy(input_dim: int, hidden: list, activation: str, encoder: str, seed: int = 0) -> NumpyPolicy:
+    """与导出网络同形状的随机 NumPy 策略（框架未安装时用于测启动与延迟）"""
+    rng = np.random.default_rng(seed)
+    dims = [input_dim] + list(hidden) + [ACTION_SPACE_SIZE]
+    weights = [rng.standard_normal((a, b)).astype(np.float32) / np.sqrt(a) for a, b in zip(dims[:-1], dims[1:])]
+    biases = [np.zeros(b, dtype=np.float32) for b in dims[1:]]
+    activations = [activation] * len(hidden) + ["identity"]
+    return NumpyPolicy(weights, biases, activations, encoder=encoder, source="random")
+
+
+# ==================== 1. 一致性 ====================
+
+def check_equivalence() -> bool:
+    ok = True
+    rng = np.random.default_rng(0)
+    if _has("torch"):
+        import torch
+        from src.agents.supervised import _create_policy_net
+        net = _create_policy_net(31, (64, 32), ACTION_SPACE_SIZE).eval()
+        x = rng.random((256, 31), dtype=np.float32)
+        with torch.no_grad():
+            ref = torch.softmax(net(torch.FloatTensor(x)), dim=1).numpy()
+        diff = np.abs(from_torch_sequential(net, encoder="encoder_mvp").predict_proba(x) - ref).max()
+        print(f"  pytorch _create_policy_net: 最大误差 {diff:.2e}")
+        ok &= diff < 1e-5
+    else:
+        print("  pytorch: 未安装，跳过")
+
+    if _has("sklearn"):
+        from sklearn.neural_network import MLPClassifier
+        x = rng.random((300, 31), dtype=np.float32)
+        y = rng.choice([0, 5, 170, 171], size=300)
+        clf = MLPClassifier(hidden_layer_sizes=(64, 32), max_iter=20, random_state=0).fit(x, y)
+        ref = np.zeros((300, ACTION_SPACE_SIZE))
+        ref[:, clf.classes_] = clf.predict_proba(x)
+        diff = np.abs(from_sklearn_mlp(clf).predict_proba(x) - ref).max()
+        print(f"  sklearn MLPClassifier: 最大误差 {diff:.2e}")
+        ok &= diff < 1e-5
+    else:
+        print("  sklearn: 未安装，跳过")
+
+    if _has("stable_baselines3"):
+        import torch
+        from stable_baselines3 import PPO
+        from src.env.sim_env import SimEnv
+        model = PPO("MlpPolicy", SimEnv(seed=0), policy_kwargs={"net_arch": [128, 128]}, device="cpu")
+        x = rng.random((64, model.observation_space.shape[0]), dtype=np.float32)
+        with torch.no_grad():
+            obs = model.policy.obs_to_tensor(x)[0]
+            ref = model.policy.get_distribution(obs).distribution.probs.numpy()
+        diff = np.abs(from_sb3_model(model).predict_proba(x) - ref).max()
+        print(f"  SB3 PPO: 最大误差 {diff:.2e}")
+        ok &= diff < 1e-5
+    else:
+        print("  stable_baselines3: 未安装，跳过")
+    return bool(ok)
+
+
+# ==================== 2/3/4. 启动与延迟 ====================
+
+def load_time(agent_type: str, model: str, repeats: int = 3) -> float:
+    """子进程中导入 Agent 并加载模型的耗时（毫秒，取最小值）"""
+    code = (
+        "import sys, time; t = time.perf_counter(); sys.path.insert(0, '.');"
+        "from src.agents import create_agent;"
+        f"a = create_agent({agent_type!r}, 'Bench'); a.load({model!r});"
+        "print((time.perf_counter() - t) * 1e3)"
+    )
+    times = []
+    for _ in range(repeats):
+        out = subprocess.run([sys.executable, "-c", code], cwd=str(_SCRIPTS.parent),
+                             capture_output=True, text=True, check=True)
+        times.append(float(out.stdout.strip().splitlines()[-1]))
+    return min(times)
+
+
+def end_to_end(agent_type: str, model: str, frames: list) -> dict:
+    from mock_mod import run, MOD_READY_TIMEOUT
+    with tempfile.TemporaryDirectory() as tmp:
+        cmd = [sys.executable, "scripts/collect_data.py", "--real-game", "--output-dir", tmp,
+               "--agent-type", agent_type, "--model", model]
+        # collect_data.log 也写到临时目录，不在仓库里留下 data/
+        return run(cmd, frames, MOD_READY_TIMEOUT, 30.0, False, env=dict(os.environ, STS_COLLECT_LOG_DIR=tmp))
+
+
+def decision_latency(agent_type: str, model: str, states: list, n: int) -> np.ndarray:
+    from src.agents import create_agent
+    agent = create_agent(agent_type, "Bench")
+    agent.load(model)
+    agent.set_training_mode(False)
+    lat = np.empty(n)
+    for i in range(n):
+        s = states[i % len(states)]
+        t0 = time.perf_counter()
+        agent.select_action(s)
+        lat[i] = (time.perf_counter() - t0) * 1e3
+    return lat
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--frames", type=int, default=200, help="端到端回放帧数")
+    parser.add_argument("--decisions", type=int, default=2000, help="进程内决策次数")
+    args = parser.parse_args()
+    logging.disable(logging.WARNING)
+
+    print("1. 导出一致性")
+    ok = check_equivalence()
+
+    from bench_replay_env import synthetic_game
+    from src.core.game_state import GameState
+    rng = random.Random(0)
+    frames = []
+    while len(frames) < args.frames:
+        frames.extend(synthetic_game(rng))
+    frames = frames[:args.frames]
+    states = [GameState.from_mod_response({k: v for k, v in f.items() if k != "action"}) for f in frames]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # 与 train_sl.py / rl_agent 默认结构相同的网络
+        models = [
+            ("supervised", "numpy", random_numpy_policy(31, [64, 32], "relu", "encoder_mvp")),
+            ("rl", "numpy", random_numpy_policy(2945, [128, 128], "tanh", "encoder")),
+        ]
+        paths = []
+        for agent_type, kind, policy in models:
+            path = str(Path(tmp) / f"{agent_type}.npz")
+            policy.save(path)
+            paths.append((agent_type, kind, path))
+        if _has("torch"):
+            from src.agents.supervised import SupervisedAgentImpl, _create_policy_net
+            agent = SupervisedAgentImpl("Bench", {"model_type": "pytorch"})
+            agent._model = _create_policy_net(31, (64, 32), ACTION_SPACE_SIZE).eval()
+            path = str(Path(tmp) / "supervised_torch.pkl")
+            agent.save(path)
+            paths.append(("supervised", "pytorch", path))
+        else:
+            print("\n（torch 未安装：无法测原框架基线，仅报告 NumPy 运行时）")
+
+        print("\n2. 导入 Agent + 加载模型（子进程，ms）")
+        for agent_type, kind, path in paths:
+            print(f"  [{agent_type:>10} {kind:>7}] {load_time(agent_type, path):8.1f}")
+
+        print(f"\n3. collect_data.py 端到端（{len(frames)} 帧，随机权重，不校验命令）")
+        for agent_type, kind, path in paths:
+            r = end_to_end(agent_type, path, frames)
+            lat = np.asarray(r["latencies_ms"])
+            if not r["ok"] or not len(lat):
+                print(f"  [{agent_type:>10} {kind:>7}] 失败: {r.get('error')}")
+                ok = False
+                continue
+            steady = lat[1:]
+            print(f"  [{agent_type:>10} {kind:>7}] ready {r['startup_ms']:6.0f} ms  首帧 {lat[0]:7.1f} ms  "
+                  f"逐帧 p50={np.percentile(steady, 50):.2f} p99={np.percentile(steady, 99):.2f} ms")
+
+        print(f"\n4. 进程内单次决策（{args.decisions} 次，ms）")
+        for agent_type, kind, path in paths:
+            lat = decision_latency(agent_type, path, states, args.decisions)
+            print(f"  [{agent_type:>10} {kind:>7}] p50={np.percentile(lat, 50):.3f} p99={np.percentile(lat, 99):.3f}")
+
+    print(f"\n{'✅ 通过' if ok else '❌ 失败'}")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,223 @@
+#!/usr/bin/env python3
+"""
+优先经验回放缓冲区基准：线段树正确性、落盘一致性、采样吞吐、日志批量加载
+
+1. 线段树：随机批量更新后各节点与暴力求和 / 求最小一致；前缀和查找与 cumsum + searchsorted 一致；
+   采样频率与优先级成正比；重要性权重与公式一致
+2. 落盘：内存上限小于数据量时，采到的每行与写入时逐位相同（含打包的掩码），环形覆盖正确
+3. 采样吞吐：全部在内存 vs 大部分落盘，不同批大小，转移/秒
+4. 日志批量加载：SimEnv 随机对局构建 ReplayStore（save 后 mmap 读取），add_replay_store 的转移/秒，
+   奖励与 ReplayEnv 逐步回放一致；在线写入 RLAgentImpl.learn_from_experience（含编码）的条/秒
+
+用法: python scripts/bench_replay_buffer.py [--capacity 100000] [--memory-mb 256] [--obs-dtype float16]
+"""
+import sys
+import time
+import argparse
+import logging
+import tempfile
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from src.core.action import Action, ACTION_SPACE_SIZE
+from src.training.replay_buffer import PrioritizedReplayBuffer, SumSegmentTree, MinSegmentTree
+
+
+# ==================== 1. 线段树 ====================
+
+def check_trees(rng) -> bool:
+    n = 1000
+    s, m = SumSegmentTree(n), MinSegmentTree(n)
+    values = np.zeros(n)
+    written = np.zeros(n, dtype=bool)
+    for _ in range(50):
+        idx = rng.integers(0, n, 64)
+        v = rng.random(64)
+        s.update(idx, v)
+        m.update(idx, v)
+        # 重复索引以最后一次为准
+        _, last = np.unique(idx[::-1], return_index=True)
+        values[idx[::-1][last]] = v[::-1][last]
+        written[idx] = True
+    ok_sum = np.isclose(s.root(), values.sum())
+    ok_min = np.isclose(m.root(), values[written].min())
+    prefix = rng.random(10000) * values.sum()
+    found = s.find_prefixsum_idx(prefix)
+    expected = np.searchsorted(np.cumsum(values), prefix, side="right")
+    ok_find = np.array_equal(found, expected)
+    print(f"  求和 / 求最小与暴力结果一致: {ok_sum} / {ok_min}；前缀和查找与 searchsorted 一致: {ok_find}")
+    return bool(ok_sum and ok_min and ok_find)
+
+
+def check_sampling(rng) -> bool:
+    n, draws = 100, 400_000
+    buf = PrioritizedReplayBuffer(n, obs_dim=4, alpha=0.7, seed=0)
+    obs = np.arange(n, dtype=np.float32)[:, None].repeat(4, axis=1)
+    pr = rng.random(n) * 10 + 0.1
+    buf.extend(obs, np.zeros(n), np.zeros(n), obs, np.zeros(n, bool), priorities=pr)
+    counts = np.zeros(n)
+    for _ in range(draws // 1000):
+        batch = buf.sample(1000, beta=0.5)
+        np.add.at(counts, batch["indices"], 1)
+    target = pr ** 0.7 / (pr ** 0.7).sum()
+    rel = np.abs(counts / draws - target) / target
+    batch = buf.sample(256, beta=0.5)
+    p = target[batch["indices"]]
+    w = (n * p) ** -0.5 / (n * target.min()) ** -0.5
+    ok_w = np.allclose(batch["weights"], w, rtol=1e-5)
+    ok_obs = np.array_equal(batch["obs"][:, 0], batch["indices"].astype(np.float32))
+    print(f"  {draws} 次采样频率与 p^alpha 占比的最大相对偏差: {rel.max():.3f}（中位 {np.median(rel):.3f}）")
+    print(f"  重要性权重与 (N·P)^-beta / max 一致: {ok_w}；采到的观察与索引对应: {ok_obs}")
+    return bool(rel.max() < 0.1 and ok_w and ok_obs)
+
+
+# ==================== 2. 落盘 ====================
+
+def check_spill(rng, obs_dim: int) -> bool:
+    cap, n = 5000, 7000
+    obs = rng.random((n, obs_dim), dtype=np.float32)
+    next_obs = rng.random((n, obs_dim), dtype=np.float32)
+    actions = rng.integers(0, ACTION_SPACE_SIZE, n)
+    rewards = rng.standard_normal(n).astype(np.float32)
+    dones = rng.random(n) < 0.1
+    masks = rng.random((n, ACTION_SPACE_SIZE)) < 0.2
+    next_masks = rng.random((n, ACTION_SPACE_SIZE)) < 0.2
+    row_mb = (2 * obs_dim * 4 + 2 + 4 + 1 + 2 * 23) / 2 ** 20
+    with PrioritizedReplayBuffer(cap, obs_dim, memory_limit_mb=1000 * row_mb, seed=0) as buf:
+        for start in range(0, n, 700):
+            sl = slice(start, start + 700)
+            buf.extend(obs[sl], actions[sl], rewards[sl], next_obs[sl], dones[sl], masks[sl], next_masks[sl])
+        stats = buf.stats()
+        batch = buf.sample(2048)
+        # 环形覆盖后留下最后 cap 条：第 j 条（j >= n - cap）在位置 j mod cap
+        src = (np.arange(n)[-cap:])[(batch["indices"] - n % cap) % cap]
+        same = all(np.array_equal(batch[k], v[src]) for k, v in (
+            ("obs", obs), ("next_obs", next_obs), ("actions", actions), ("rewards", rewards),
+            ("dones", dones), ("masks", masks), ("next_masks", next_masks)))
+        on_disk = int((batch["indices"] >= buf.ram_rows).sum())
+    print(f"  容量 {cap}，写入 {n}（环形覆盖），内存 {stats['ram_rows']} 行 / 磁盘 {stats['spilled_rows']} 行；"
+          f"采样 2048 行（{on_disk} 行来自磁盘）与写入逐位相同: {same}")
+    return same and stats["spilled_rows"] > 0 and on_disk > 0
+
+
+# ==================== 3. 采样吞吐 ====================
+
+def bench_sampling(capacity: int, obs_dim: int, memory_mb: float, obs_dtype):
+    rng = np.random.default_rng(0)
+    chunk = 4096
+    obs = rng.random((chunk, obs_dim), dtype=np.float32).astype(obs_dtype)
+    print(f"  {'存储':<10}{'内存行':>9}{'磁盘行':>9}{'批':>6}{'采样(ms)':>10}{'转移/秒':>11}{'+更新优先级(ms)':>17}")
+    for label, limit in (("全内存", None), (f"{memory_mb:g}MB 上限", memory_mb)):
+        with PrioritizedReplayBuffer(capacity, obs_dim, memory_limit_mb=limit, obs_dtype=obs_dtype, seed=0) as buf:
+            for _ in range(0, capacity, chunk):
+                buf.extend(obs, rng.integers(0, 170, chunk), rng.standard_normal(chunk), obs,
+                           rng.random(chunk) < 0.05, priorities=rng.random(chunk) + 0.01)
+            for batch_size in (32, 256, 1024):
+                buf.sample(batch_size)
+                reps = max(5, 20000 // batch_size)
+                t0 = time.perf_counter()
+                for _ in range(reps):
+                    batch = buf.sample(batch_size)
+                t1 = time.perf_counter()
+                for _ in range(reps):
+                    buf.update_priorities(batch["indices"], rng.random(batch_size))
+                t2 = time.perf_counter()
+                ms = (t1 - t0) / reps * 1e3
+                print(f"  {label:<10}{buf.ram_rows:>9}{buf.spilled_rows:>9}{batch_size:>6}{ms:>10.2f}"
+                      f"{batch_size / ms * 1e3:>11,.0f}{(t2 - t1) / reps * 1e3:>17.3f}")
+
+
+# ==================== 4. 日志批量加载 / 在线写入 ====================
+
+def simulated_games(n_steps: int, seed: int = 0):
+    """SimEnv 随机合法动作对局，记录为 Mod 帧 + 动作命令（与采集日志同格式）"""
+    from src.env.sim_env import SimEnv
+
+    env = SimEnv(seed=seed)
+    env.reset()
+    rng = np.random.default_rng(seed)
+    games, cur, states = [], [], []
+    for _ in range(n_steps):
+        state = env._current_state
+        a = int(rng.choice(np.flatnonzero(env.action_masks())))
+        cur.append({"state": state.to_mod_response(), "action": Action.from_id(a).to_command()})
+        states.append((state, a))
+        _, _, done, truncated, _ = env.step(a)
+        if done or truncated:
+            cur.append({"state": env._current_state.to_mod_response(), "action": None})
+            games.append(cur)
+            cur = []
+            env.reset()
+    return games, states
+
+
+def bench_loading(n_steps: int) -> bool:
+    from src.env.replay_env import ReplayStore, ReplayEnv
+    from src.agents.rl_agent import RLAgentImpl
+
+    games, states = simulated_games(n_steps)
+    with tempfile.TemporaryDirectory() as tmp:
+        ReplayStore.from_games(games, keep_frames=False).save(tmp)
+        store = ReplayStore.load(tmp, mmap=True)
+        buf = PrioritizedReplayBuffer(len(store.actions), store.obs.shape[1], seed=0)
+        t0 = time.perf_counter()
+        n = buf.add_replay_store(tmp)
+        elapsed = time.perf_counter() - t0
+
+        # 参照：ReplayEnv 沿记录动作逐步回放的奖励总和
+        env = ReplayEnv(store, unit="combat")
+        ref = 0.0
+        for k in range(store.num_combats):
+            env.reset(options={"index": k})
+            while True:
+                action = int(store.actions[env._t])
+                _, r, terminated, _, _ = env.step(max(action, 0))
+                ref += r if action >= 0 else 0.0
+                if terminated or env._t >= env._end - 1:
+                    break
+        got = float(buf._arrays["rewards"].ram[:n].astype(np.float64).sum())
+        same = np.isclose(got, ref, atol=1e-3)
+    print(f"  {len(games)} 局 / {store.num_combats} 场战斗 / {store.num_frames} 帧 → {n} 条转移，"
+          f"{elapsed:.2f}s（{n / elapsed:,.0f} 条/秒）；奖励总和与 ReplayEnv 回放一致: {same}")
+
+    agent = RLAgentImpl("Bench", {"replay_buffer": {"capacity": 10000, "seed": 0}})
+    m = min(2000, len(states) - 1)
+    t0 = time.perf_counter()
+    for (s, a), (s2, _) in zip(states[:m], states[1:m + 1]):
+        agent.learn_from_experience((s, Action.from_id(a), 0.0, s2, False))
+    elapsed = time.perf_counter() - t0
+    print(f"  RLAgentImpl.learn_from_experience（编码 + 掩码 + 写入）: {m / elapsed:,.0f} 条/秒，"
+          f"缓冲区 {len(agent.replay_buffer)} 条")
+    return bool(same) and len(agent.replay_buffer) == m
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--capacity", type=int, default=100_000)
+    parser.add_argument("--obs-dim", type=int, default=2945)
+    parser.add_argument("--memory-mb", type=float, default=256)
+    parser.add_argument("--obs-dtype", type=str, choices=["float32", "float16"], default="float16")
+    parser.add_argument("--sim-steps", type=int, default=5000)
+    args = parser.parse_args()
+    logging.disable(logging.CRITICAL)
+    rng = np.random.default_rng(0)
+
+    print("=== 1. 线段树与采样分布 ===")
+    ok = check_trees(rng)
+    ok &= check_sampling(rng)
+    print("\n=== 2. 落盘一致性 ===")
+    ok &= check_spill(rng, 64)
+    print(f"\n=== 3. 采样吞吐（容量 {args.capacity}，obs {args.obs_dim} 维 {args.obs_dtype}）===")
+    bench_sampling(args.capacity, args.obs_dim, args.memory_mb, np.dtype(args.obs_dtype))
+    print("\n=== 4. 日志批量加载 / 在线写入 ===")
+    ok &= bench_loading(args.sim_steps)
+
+    print(f"\n{'✅ 通过' if ok else '❌ 失败'}")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+"""
+ReplayEnv 冒烟测试 + 吞吐基准
+
+1. 构建 ReplayStore（有真实数据目录时用真实对局，否则合成带 action 的战斗对局）
+2. 保存 → mmap 加载，校验数组一致
+3. 用「记录动作」回放：一致率应为 100%，奖励与逐帧 set_state + _compute_reward 一致
+4. 随机合法动作回放，报告 steps/sec（内存与 mmap 两种存储）
+
+用法: python scripts/bench_replay_env.py [--input DIR] [--games 20] [--steps 20000]
+"""
+import sys
+import time
+import random
+import argparse
+import logging
+import tempfile
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.core.game_state import (
+    GameState, CombatState, Player, Monster, Card, CardType, IntentType, RoomPhase,
+)
+from src.env.replay_env import ReplayEnv, ReplayStore
+
+
+def synthetic_game(rng: random.Random, n_combats: int = 3) -> list:
+    """合成一局：事件帧 + 若干场战斗（每步出一张打击或结束回合），帧带 action 字段"""
+    frames = []
+    event = GameState(
+        room_phase=RoomPhase.EVENT, floor=0, act=1, screen_type="EVENT",
+        available_commands=["choose"], choice_list=["a", "b"], current_hp=70, max_hp=70,
+    )
+    frames.append(dict(event.to_mod_response(), action="choose 0"))
+    hp = 70
+    for c in range(n_combats):
+        monsters = [Monster(id="JawWorm", name="", current_hp=40, max_hp=40, intent=IntentType.ATTACK)]
+        turn = 1
+        while monsters[0].current_hp > 0 and hp > 0:
+            energy = 3
+            hand = [Card(id="Strike_G", name="", cost=1, card_type=CardType.ATTACK, has_target=True)
+                    for _ in range(5)]
+            while True:
+                state = GameState(
+                    room_phase=RoomPhase.COMBAT, floor=c + 1, act=1,
+                    combat=CombatState(
+                        hand=list(hand),
+                        player=Player(energy=energy, max_energy=3, current_hp=hp, max_hp=70),
+                        monsters=[Monster(id=m.id, name="", current_hp=m.current_hp, max_hp=m.max_hp,
+                                          intent=m.intent) for m in monsters],
+                        turn=turn,
+                    ),
+                    available_commands=["play", "end"],
+                    current_hp=hp, max_hp=70,
+                )
+                if energy > 0 and hand and monsters[0].current_hp > 0 and rng.random() < 0.8:
+                    frames.append(dict(state.to_mod_response(), action="play 1 0"))
+                    hand.pop(0)
+                    energy -= 1
+                    monsters[0] = Monster(id="JawWorm", name="", current_hp=max(0, monsters[0].current_hp - 6),
+                                          max_hp=40, intent=IntentType.ATTACK)
+                    if monsters[0].current_hp == 0:
+                        break
+                else:
+                    frames.append(dict(state.to_mod_response(), action="end"))
+                    hp = max(0, hp - rng.randint(3, 11))
+                    turn += 1
+                    break
+        reward_screen = GameState(
+            room_phase=RoomPhase.COMBAT, floor=c + 1, act=1, screen_type="COMBAT_REWARD",
+            available_commands=["proceed"], current_hp=hp, max_hp=70,
+        )
+        frames.append(dict(reward_screen.to_mod_response(), action="proceed"))
+    return frames
+
+
+def check_rewards(store: ReplayStore, env: ReplayEnv) -> float:
+    """用记录动作回放所有单元，返回一致率，并与逐帧 set_state + _compute_reward 对照奖励"""
+    from src.env.sts_env import StsEnvironment
+    ref_env = StsEnvironment(observation_dim=1)
+    env.reset_stats()
+    max_diff = 0.0
+    for k in range(len(store.segments(env.unit))):
+        _, info = env.reset(options={"index": k})
+        start = info["frame_index"]
+        ref_env.reset()
+        ref_env.set_state(store.get_state(start))
+        done = truncated = False
+        while not done and not truncated:
+            logged = info["logged_action"]
+            _, reward, done, truncated, info = env.step(logged if logged >= 0 else 0)
+            ref_env._current_state = store.get_state(info["frame_index"])
+            ref_env._episode_length += 1
+            max_diff = max(max_diff, abs(reward - ref_env._compute_reward()))
+    print(f"  奖励与 _compute_reward 逐帧对照最大误差: {max_diff:.2e}")
+    return env.agreement_rate
+
+
+def bench(env: ReplayEnv, steps: int, seed: int = 0) -> float:
+    """随机合法动作回放，返回 steps/sec"""
+    rng = np.random.default_rng(seed)
+    _, info = env.reset()
+    t0 = time.perf_counter()
+    for _ in range(steps):
+        valid = info["valid_actions"]
+        action = int(valid[rng.integers(len(valid))]) if valid else 0
+        _, _, done, truncated, info = env.step(action)
+        if done or truncated:
+            _, info = env.reset()
+    return steps / (time.perf_counter() - t0)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--input", type=str, default="data/A20_Silent/Raw_Data_json_FORSL")
+    parser.add_argument("--games", type=int, default=20, help="合成对局数（无真实数据时）")
+    parser.add_argument("--steps", type=int, default=20000)
+    parser.add_argument("--unit", type=str, choices=["combat", "episode"], default="combat")
+    args = parser.parse_args()
+    logging.disable(logging.WARNING)
+
+    t0 = time.perf_counter()
+    if Path(args.input).exists():
+        store = ReplayStore.from_directory(args.input)
+        source = args.input
+    else:
+        rng = random.Random(0)
+        store = ReplayStore.from_games([synthetic_game(rng) for _ in range(args.games)])
+        source = "合成对局"
+    build_time = time.perf_counter() - t0
+    print(f"数据: {source}")
+    print(f"  {store.num_episodes} 局, {store.num_combats} 场战斗, {store.num_frames} 帧, "
+          f"构建 {build_time:.2f}s ({store.num_frames / max(build_time, 1e-9):.0f} 帧/s)")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        store.save(tmp)
+        mm = ReplayStore.load(tmp, mmap=True)
+        same = all(np.array_equal(getattr(store, n), getattr(mm, n))
+                   for n in ("obs", "masks", "actions", "player_hp", "monster_hp", "flags", "episodes"))
+        print(f"  保存/mmap 加载一致: {same}，combat 索引一致: {np.array_equal(store.combats, mm.combats)}")
+
+        env = ReplayEnv(store, unit=args.unit)
+        rate = check_rewards(store, env)
+        print(f"  记录动作回放一致率: {rate:.2%}")
+
+        mem_sps = bench(ReplayEnv(store, unit=args.unit, shuffle=True), args.steps)
+        mmap_sps = bench(ReplayEnv(mm, unit=args.unit, shuffle=True), args.steps)
+        print(f"\n吞吐（随机合法动作，{args.steps} 步）")
+        print(f"  内存存储: {mem_sps:10.0f} steps/s")
+        print(f"  mmap 存储: {mmap_sps:10.0f} steps/s")
+        del mm
+
+    return 0 if same and rate == 1.0 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,208 @@
+#!/usr/bin/env python3
+"""
+分片数据集基准：整表内存训练数据 vs memmap 分片流式读取
+
+1. 正确性：分片写入后 dataset[indices] 与原数组逐行一致；BlockShuffleSampler 每个 epoch 恰好覆盖每个样本一次，
+   不同 epoch 顺序不同；打乱程度（相邻样本原始位置差的中位数）
+2. 峰值内存（子进程，/proc/self/status 的 RssAnon 峰值，即堆内存；memmap 的文件页属于页缓存、可回收，单列 RssFile）：
+   - 内存路径：逐条编码成列表 → np.array → 再复制一份（对应 torch.FloatTensor）
+   - 流式路径：ShardDataset + BlockShuffleSampler 读完一个 epoch
+3. 吞吐（样本/秒）：流式逐批读取；torch 可用时另测 DataLoader num_workers=0 / 2
+
+默认用随机数据（encoder 的 2945 维），--samples 控制规模。
+
+用法: python scripts/bench_shard_dataset.py [--samples 40000] [--dim 2945] [--batch-size 256]
+"""
+import sys
+import time
+import argparse
+import logging
+import tempfile
+import subprocess
+from pathlib import Path
+
+import numpy as np
+
+_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(_ROOT))
+
+from src.training.shard_dataset import ShardWriter, ShardDataset, BlockShuffleSampler, iter_batches
+
+
+def _has(module: str) -> bool:
+    import importlib.util
+    return importlib.util.find_spec(module) is not None
+
+
+def make_shards(out_dir: Path, n: int, dim: int, shard_size: int, seed: int = 0):
+    """分块生成随机样本写入分片（生成时也只保留一块）"""
+    rng = np.random.default_rng(seed)
+    with ShardWriter(out_dir, dim, shard_size, encoder="random") as writer:
+        for start in range(0, n, 4096):
+            m = min(4096, n - start)
+            writer.extend(rng.standard_normal((m, dim), dtype=np.float32), rng.integers(0, 179, m))
+
+
+# ==================== 1. 正确性 ====================
+
+def check_correctness(tmp: Path) -> bool:
+    rng = np.random.default_rng(1)
+    X = rng.standard_normal((10_000, 17), dtype=np.float32)
+    y = rng.integers(0, 179, 10_000)
+    with ShardWriter(tmp / "small", 17, shard_size=1500) as writer:
+        writer.extend(X[:3333], y[:3333])
+        for i in range(3333, 10_000):
+            writer.append(X[i], y[i])
+    ds = ShardDataset(tmp / "small")
+    ok = len(ds) == 10_000 and len(ds.index["shards"]) == 7
+
+    idx = rng.integers(0, 10_000, 777)
+    Xb, yb = ds[idx]
+    ok &= np.array_equal(Xb, X[idx]) and np.array_equal(yb, y[idx])
+    x0, y0 = ds[4321]
+    ok &= np.array_equal(x0, X[4321]) and y0 == y[4321]
+
+    train_idx, val_idx = ds.split(0.2)
+    ok &= len(np.intersect1d(train_idx, val_idx)) == 0 and len(train_idx) + len(val_idx) == 10_000
+    sampler = BlockShuffleSampler(train_idx, batch_size=64, seed=3)
+    orders = []
+    for epoch in range(2):
+        sampler.set_epoch(epoch)
+        perm = np.concatenate(list(sampler))
+        ok &= np.array_equal(np.sort(perm), train_idx)
+        orders.append(perm)
+    ok &= not np.array_equal(orders[0], orders[1])
+    gap = np.median(np.abs(np.diff(orders[0])))
+    seen = sum(len(yb) for _, yb in iter_batches(ds, BlockShuffleSampler(val_idx, 100, shuffle=False)))
+    ok &= seen == len(val_idx)
+    print(f"  分片读取 / 采样覆盖: {'一致' if ok else '不一致'}  相邻样本原始位置差中位数 {gap:.0f}"
+          f"（块大小 {sampler.block_size}）")
+    return bool(ok)
+
+
+# ==================== 2. 峰值内存（子进程） ====================
+
+_CHILD = r"""
+import sys, time, threading
+import numpy as np
+sys.path.insert(0, {root!r})
+
+peak = {{"anon": 0, "file": 0}}
+def rss():
+    out = {{}}
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith(("RssAnon", "RssFile")):
+                k, v = line.split(":")
+                out[k] = int(v.split()[0]) / 1024
+    return out
+def watch():
+    while True:
+        r = rss()
+        peak["anon"] = max(peak["anon"], r["RssAnon"])
+        peak["file"] = max(peak["file"], r["RssFile"])
+        time.sleep(0.005)
+threading.Thread(target=watch, daemon=True).start()
+base = rss()["RssAnon"]
+
+mode, shard_dir, n, dim, batch = sys.argv[1], sys.argv[2], int(sys.argv[3]), int(sys.argv[4]), int(sys.argv[5])
+t0 = time.perf_counter()
+if mode == "memory":
+    # 原路径：逐条编码 → 列表 → np.array → Tensor 复制
+    rng = np.random.default_rng(0)
+    rows = [rng.standard_normal(dim, dtype=np.float32) for _ in range(n)]
+    X = np.array(rows)
+    X_t = X.copy()
+    y = rng.integers(0, 179, n)
+    perm = np.random.permutation(n)
+    for s in range(0, n, batch):
+        xb = X_t[perm[s:s + batch]]
+else:
+    from src.training.shard_dataset import ShardDataset, BlockShuffleSampler, iter_batches
+    ds = ShardDataset(shard_dir)
+    for xb, yb in iter_batches(ds, BlockShuffleSampler(np.arange(len(ds)), batch)):
+        pass
+elapsed = time.perf_counter() - t0
+time.sleep(0.02)
+print(peak["anon"] - base, peak["file"], elapsed)
+"""
+
+
+def peak_memory(mode: str, shard_dir: Path, n: int, dim: int, batch: int) -> tuple:
+    code = _CHILD.format(root=str(_ROOT))
+    out = subprocess.run([sys.executable, "-c", code, mode, str(shard_dir), str(n), str(dim), str(batch)],
+                         capture_output=True, text=True, check=True)
+    anon, file, elapsed = map(float, out.stdout.split())
+    return anon, file, elapsed
+
+
+# ==================== 3. 吞吐 ====================
+
+def throughput(ds: ShardDataset, batch: int, epochs: int = 2) -> float:
+    sampler = BlockShuffleSampler(np.arange(len(ds)), batch)
+    t0 = time.perf_counter()
+    n = 0
+    for epoch in range(epochs):
+        sampler.set_epoch(epoch)
+        for xb, yb in iter_batches(ds, sampler):
+            n += len(yb)
+    return n / (time.perf_counter() - t0)
+
+
+def dataloader_throughput(ds: ShardDataset, batch: int, num_workers: int, epochs: int = 2) -> float:
+    from src.training.shard_dataset import make_dataloader
+    loader = make_dataloader(ds, np.arange(len(ds)), batch, num_workers=num_workers)
+    t0 = time.perf_counter()
+    n = 0
+    for epoch in range(epochs):
+        loader.sampler.set_epoch(epoch)
+        for xb, yb in loader:
+            n += len(yb)
+    return n / (time.perf_counter() - t0)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--samples", type=int, default=40_000)
+    parser.add_argument("--dim", type=int, default=2945)
+    parser.add_argument("--batch-size", type=int, default=256)
+    parser.add_argument("--shard-size", type=int, default=8192)
+    args = parser.parse_args()
+    logging.disable(logging.CRITICAL)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        print("=== 1. 正确性 ===")
+        ok = check_correctness(tmp)
+
+        shard_dir = tmp / "big"
+        t0 = time.perf_counter()
+        make_shards(shard_dir, args.samples, args.dim, args.shard_size)
+        size_mb = args.samples * args.dim * 4 / 2 ** 20
+        print(f"\n数据：{args.samples} × {args.dim} float32 = {size_mb:.0f} MB，"
+              f"写分片 {time.perf_counter() - t0:.1f} s")
+
+        print("\n=== 2. 峰值内存（RssAnon 相对启动的增量） ===")
+        mem = peak_memory("memory", shard_dir, args.samples, args.dim, args.batch_size)
+        stream = peak_memory("stream", shard_dir, args.samples, args.dim, args.batch_size)
+        print(f"  内存路径（列表 + 数组 + Tensor 副本）: {mem[0]:>8.1f} MB")
+        print(f"  分片流式（1 epoch）                 : {stream[0]:>8.1f} MB   RssFile 峰值 {stream[1]:.0f} MB（页缓存）")
+        batch_mb = args.batch_size * args.dim * 4 / 2 ** 20
+        print(f"  单批 {batch_mb:.1f} MB；流式路径峰值 / 数据量 = {stream[0] / size_mb:.1%}")
+        ok &= stream[0] < mem[0] / 4
+
+        print("\n=== 3. 吞吐（样本/秒，2 epoch） ===")
+        ds = ShardDataset(shard_dir)
+        print(f"  iter_batches（单进程）: {throughput(ds, args.batch_size):>12,.0f}")
+        if _has("torch"):
+            for w in (0, 2):
+                print(f"  DataLoader num_workers={w}: {dataloader_throughput(ds, args.batch_size, w):>12,.0f}")
+        else:
+            print("  DataLoader: torch 未安装，跳过")
+
+    print(f"\n{'✅ 通过' if ok else '❌ 失败'}")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
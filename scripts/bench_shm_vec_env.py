@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""
+ShmVecEnv 一致性 / 容错校验 + 多进程扩展基准
+
+1. 同种子、同动作序列下 ShmVecEnv 与进程内 BatchedVecEnv 的观察 / 奖励 / done / 掩码逐位一致
+2. 运行中 kill 一个子进程：环境继续推进，该段环境记为 done 且 worker_restarted=True；
+   空闲时 kill 子进程后 get_attr 重启并重试成功，子进程内调用报错时抛出 RuntimeError
+3. 子进程数 1 → CPU 核数（每个子进程 --envs-per-worker 个环境），报告 env-steps/s 与相对单进程的加速比
+
+用法: python scripts/bench_shm_vec_env.py [--steps 3000] [--envs-per-worker 4] [--max-workers N]
+"""
+import os
+import sys
+import time
+import signal
+import argparse
+import logging
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.env.sim_env import SimEnv
+from src.env.vec_env import BatchedVecEnv
+from src.env.shm_vec_env import ShmVecEnv
+
+
+def env_fns(n: int):
+    return [lambda i=i: SimEnv(seed=i) for i in range(n)]
+
+
+def sample_actions(masks: np.ndarray, rng: np.random.Generator) -> np.ndarray:
+    noise = rng.random(masks.shape)
+    return np.argmax(np.where(masks, noise, -1.0), axis=1)
+
+
+def check_equivalence(n_envs: int, n_workers: int, steps: int) -> bool:
+    ref = BatchedVecEnv(env_fns(n_envs))
+    vec = ShmVecEnv(env_fns(n_envs), n_workers=n_workers)
+    try:
+        ok = np.array_equal(ref.reset(), vec.reset()) and np.array_equal(ref.action_masks(), vec.action_masks())
+        rng = np.random.default_rng(0)
+        for _ in range(steps):
+            actions = sample_actions(ref.action_masks(), rng)
+            o1, r1, d1, i1 = ref.step(actions)
+            o2, r2, d2, i2 = vec.step(actions)
+            ok &= np.array_equal(o1, o2) and np.array_equal(r1, r2) and np.array_equal(d1, d2)
+            ok &= np.array_equal(ref.action_masks(), vec.action_masks())
+            for a, b, d in zip(i1, i2, d1):
+                if d:
+                    ok &= np.array_equal(a["terminal_observation"], b["terminal_observation"])
+                    ok &= a["episode"] == b["episode"]
+            if not ok:
+                break
+        return bool(ok)
+    finally:
+        vec.close()
+
+
+def check_crash_recovery(steps: int) -> bool:
+    vec = ShmVecEnv(env_fns(8), n_workers=2)
+    try:
+        vec.reset()
+        rng = np.random.default_rng(1)
+        restarted = 0
+        for t in range(steps):
+            if t == steps // 2:
+                os.kill(vec._procs[1].pid, signal.SIGKILL)
+            _, _, dones, infos = vec.step(sample_actions(vec.action_masks(), rng))
+            hit = [i for i, info in enumerate(infos) if info.get("worker_restarted")]
+            if hit:
+                restarted += 1
+                if not all(dones[i] for i in hit) or hit != list(range(4, 8)):
+                    return False
+        print(f"  kill 子进程后继续 {steps - steps // 2} 步，重启 {vec.restarts} 次")
+        return restarted == 1 and vec.restarts == 1
+    finally:
+        vec.close()
+
+
+def check_call_recovery() -> bool:
+    vec = ShmVecEnv(env_fns(8), n_workers=2)
+    try:
+        vec.reset()
+        os.kill(vec._procs[0].pid, signal.SIGKILL)
+        time.sleep(0.1)
+        spaces = vec.get_attr("action_space")
+        ok = len(spaces) == 8 and vec.restarts == 1
+        vec.step(sample_actions(vec.action_masks(), np.random.default_rng(3)))
+        try:
+            vec.get_attr("no_such_attr", indices=[5])
+            ok = False
+        except RuntimeError:
+            pass
+        vec.step(sample_actions(vec.action_masks(), np.random.default_rng(4)))
+        print(f"  get_attr / env_method 遇子进程失败：重启 {vec.restarts} 次")
+        return ok
+    finally:
+        vec.close()
+
+
+def bench(vec, steps: int) -> float:
+    rng = np.random.default_rng(2)
+    vec.reset()
+    t0 = time.perf_counter()
+    for _ in range(steps):
+        vec.step(sample_actions(vec.action_masks(), rng))
+    return steps * vec.num_envs / (time.perf_counter() - t0)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--steps", type=int, default=3000, help="每个配置的总 env-steps")
+    parser.add_argument("--envs-per-worker", type=int, default=4)
+    parser.add_argument("--max-workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--check-steps", type=int, default=100)
+    args = parser.parse_args()
+    logging.disable(logging.WARNING)
+
+    same = check_equivalence(8, 3, args.check_steps)
+    print(f"ShmVecEnv 与 BatchedVecEnv 逐位一致（8 envs / 3 workers, {args.check_steps} 步）: {same}")
+    recovered = check_crash_recovery(40)
+    print(f"子进程崩溃恢复: {recovered}")
+    called = check_call_recovery()
+    print(f"属性 / 方法调用遇子进程失败: {called}")
+    recovered = recovered and called
+
+    print(f"\nCPU 核数: {os.cpu_count()}，每个子进程 {args.envs_per_worker} 个环境")
+    k = args.envs_per_worker
+    base = bench(BatchedVecEnv(env_fns(k)), max(1, args.steps // k))
+    print(f"{'workers':>8}{'envs':>6}{'env-steps/s':>14}{'加速':>8}")
+    print(f"{'进程内':>8}{k:>6}{base:>14.0f}{1.0:>7.2f}x")
+    counts = sorted({2 ** p for p in range(args.max_workers.bit_length()) if 2 ** p <= args.max_workers}
+                    | {args.max_workers})
+    for workers in counts:
+        n = workers * k
+        vec = ShmVecEnv(env_fns(n), n_workers=workers)
+        try:
+            sps = bench(vec, max(1, args.steps // n))
+        finally:
+            vec.close()
+        print(f"{workers:>8}{n:>6}{sps:>14.0f}{sps / base:>7.2f}x")
+    return 0 if same and recovered else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
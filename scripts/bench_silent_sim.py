@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+"""
+SilentCombatSim 冒烟测试 + 吞吐基准
+
+1. 每个 Act 1 遭遇跑若干场随机合法动作的战斗，检查帧可被 GameState 解析、
+   encode() 输出 2945 维、encode_silent_sim 与 encode(帧) 逐维一致、
+   动作掩码与模拟器的可出牌判断一致，并统计胜率/回合数
+2. 引擎吞吐：只调用 play_card / end_turn（不生成帧），报告 steps/s
+3. 引擎 + 帧生成 + encode 吞吐；引擎 + encode_silent_sim（不生成帧）吞吐
+4. SimEnv（StsEnvironment 子类）端到端 steps/s
+
+用法: python scripts/bench_silent_sim.py [--steps 200000] [--combats 20]
+"""
+import sys
+import time
+import random
+import argparse
+import logging
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.core.game_state import GameState
+from src.env.action_mask import build_action_mask
+from src.env.silent_sim import SilentCombatSim, ENCOUNTERS, NORMAL_ENCOUNTERS, random_deck
+from src.env.sim_env import SimEnv
+from src.training.encoder import encode, encode_silent_sim, silent_sim_template
+
+
+def random_engine_action(sim: SilentCombatSim, rng: random.Random):
+    """直接在引擎上随机出一张可出的牌（70%）或结束回合"""
+    playable = [i for i, c in enumerate(sim.hand) if sim.card_playable(c)]
+    if playable and rng.random() < 0.7:
+        sim.play_card(rng.choice(playable), rng.randrange(len(sim.monsters)))
+    else:
+        sim.end_turn()
+
+
+def check_encounters(combats: int) -> int:
+    """每个遭遇跑 combats 场，校验帧 / 掩码 / 编码，返回错误数"""
+    rng = random.Random(0)
+    errors = 0
+    print(f"{'遭遇':<20}{'胜率':>8}{'平均回合':>10}{'平均步数':>10}")
+    for name in ENCOUNTERS:
+        wins = turns = steps = 0
+        for k in range(combats):
+            sim = SilentCombatSim(seed=k, deck=random_deck(rng, 5))
+            frame = sim.reset(name)
+            template = silent_sim_template(frame)
+            n = 0
+            while not sim.done and n < 2000:
+                state = GameState.from_mod_response(frame)
+                mask = build_action_mask(state)
+                # 掩码中的无目标出牌位应与引擎的可出牌判断一致
+                expect = np.zeros(10, dtype=bool)
+                for i, c in enumerate(sim.hand[:10]):
+                    expect[i] = sim.card_playable(c)
+                if not np.array_equal(mask[:10], expect):
+                    errors += 1
+                vec = encode(frame)
+                if vec.shape != (2945,) or not np.isfinite(vec).all():
+                    errors += 1
+                if not np.array_equal(encode_silent_sim(sim, template), vec):
+                    errors += 1
+                valid = np.flatnonzero(mask)
+                playable = valid[valid < 70]
+                action = int(rng.choice(playable)) if len(playable) and rng.random() < 0.7 else 170
+                frame = sim.step_action(action)
+                n += 1
+            wins += int(sim.won)
+            turns += sim.turn
+            steps += n
+        print(f"{name:<20}{wins / combats:>8.0%}{turns / combats:>10.1f}{steps / combats:>10.1f}")
+    return errors
+
+
+def bench_engine(steps: int) -> float:
+    rng = random.Random(1)
+    sim = SilentCombatSim(seed=1)
+    sim.reset()
+    t0 = time.perf_counter()
+    for _ in range(steps):
+        random_engine_action(sim, rng)
+        if sim.done:
+            sim.reset()
+    return steps / (time.perf_counter() - t0)
+
+
+def bench_frames(steps: int) -> tuple:
+    rng = random.Random(2)
+    sim = SilentCombatSim(seed=2)
+    sim.reset()
+    t_frame = t_encode = 0.0
+    t0 = time.perf_counter()
+    for _ in range(steps):
+        random_engine_action(sim, rng)
+        if sim.done:
+            sim.reset()
+        t1 = time.perf_counter()
+        frame = sim.frame()
+        t2 = time.perf_counter()
+        encode(frame)
+        t3 = time.perf_counter()
+        t_frame += t2 - t1
+        t_encode += t3 - t2
+    total = time.perf_counter() - t0
+    return steps / total, t_frame / steps * 1e6, t_encode / steps * 1e6
+
+
+def bench_direct(steps: int) -> tuple:
+    rng = random.Random(2)
+    sim = SilentCombatSim(seed=2)
+    template = silent_sim_template(sim.reset())
+    out = np.zeros(2945, dtype=np.float32)
+    t_encode = 0.0
+    t0 = time.perf_counter()
+    for _ in range(steps):
+        random_engine_action(sim, rng)
+        if sim.done:
+            template = silent_sim_template(sim.reset())
+        t1 = time.perf_counter()
+        encode_silent_sim(sim, template, out=out)
+        t_encode += time.perf_counter() - t1
+    total = time.perf_counter() - t0
+    return steps / total, t_encode / steps * 1e6
+
+
+def bench_env(steps: int) -> tuple:
+    env = SimEnv(seed=3, encounters=NORMAL_ENCOUNTERS)
+    rng = np.random.default_rng(3)
+    _, info = env.reset()
+    t0 = time.perf_counter()
+    for _ in range(steps):
+        valid = info["valid_actions"]
+        _, _, done, truncated, info = env.step(int(valid[rng.integers(len(valid))]))
+        if done or truncated:
+            _, info = env.reset()
+    sps = steps / (time.perf_counter() - t0)
+    return sps, env.get_sim_stats()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--steps", type=int, default=200000, help="引擎基准步数")
+    parser.add_argument("--frame-steps", type=int, default=20000, help="帧 + 编码基准步数")
+    parser.add_argument("--env-steps", type=int, default=10000, help="SimEnv 基准步数")
+    parser.add_argument("--combats", type=int, default=20, help="每个遭遇的校验场数")
+    args = parser.parse_args()
+    logging.disable(logging.WARNING)
+
+    errors = check_encounters(args.combats)
+    print(f"\n帧 / 掩码 / 编码 / 直连编码校验错误: {errors}")
+
+    print("\n吞吐（随机合法动作）")
+    print(f"  引擎:                {bench_engine(args.steps):10.0f} steps/s")
+    sps, frame_us, encode_us = bench_frames(args.frame_steps)
+    print(f"  引擎 + 帧 + encode:  {sps:10.0f} steps/s（frame {frame_us:.0f} µs, encode {encode_us:.0f} µs）")
+    sps, direct_us = bench_direct(args.frame_steps)
+    print(f"  引擎 + 直连编码:     {sps:10.0f} steps/s（encode_silent_sim {direct_us:.0f} µs）")
+    sps, stats = bench_env(args.env_steps)
+    print(f"  SimEnv:              {sps:10.0f} steps/s（{stats['combats']} 场, 胜率 {stats['win_rate']:.0%}）")
+    return 0 if errors == 0 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
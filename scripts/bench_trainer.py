@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+训练引擎基准：固定轮数 vs 早停、达标时间、崩溃后续训
+
+合成可学习数据（随机教师网络打标签，带标签噪声），SupervisedAgentImpl(model_type="pytorch") 训练：
+1. 固定轮数（patience 足够大，相当于原先跑满 epochs） vs 早停（training.early_stopping_patience）：
+   训练轮数、耗时、最优验证准确率
+2. 达标时间：首次达到 --target-accuracy 的轮数与秒数；stop_at_target 的耗时
+3. 续训：第 k 轮后模拟崩溃，同一检查点目录重跑；最终权重须与不中断的训练逐元素一致
+
+需要 PyTorch；未安装时跳过。
+
+用法: python scripts/bench_trainer.py [--samples 20000] [--epochs 100] [--target-accuracy 0.8]
+"""
+import sys
+import time
+import argparse
+import logging
+import tempfile
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+
+class _Crash(Exception):
+    pass
+
+
+def make_data(n: int, dim: int, n_classes: int, noise: float, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    X = rng.standard_normal((n, dim), dtype=np.float32)
+    W1 = rng.standard_normal((dim, 64)).astype(np.float32)
+    W2 = rng.standard_normal((64, n_classes)).astype(np.float32)
+    y = (np.tanh(X @ W1) @ W2).argmax(axis=1)
+    flip = rng.random(n) < noise
+    y[flip] = rng.integers(0, n_classes, flip.sum())
+    return X, y.astype(np.int64)
+
+
+def train(X, y, args, **kwargs) -> dict:
+    import torch
+    from src.agents.supervised import SupervisedAgentImpl
+    torch.manual_seed(0)
+    agent = SupervisedAgentImpl("Bench", {"model_type": "pytorch"})
+    t0 = time.perf_counter()
+    result = agent._train_pytorch(X, y, epochs=args.epochs, batch_size=args.batch_size,
+                                  hidden_layers=(128, 64), **kwargs)
+    result["wall_s"] = time.perf_counter() - t0
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--samples", type=int, default=20_000)
+    parser.add_argument("--dim", type=int, default=31)
+    parser.add_argument("--epochs", type=int, default=100)
+    parser.add_argument("--batch-size", type=int, default=128)
+    parser.add_argument("--target-accuracy", type=float, default=0.8)
+    parser.add_argument("--crash-epoch", type=int, default=7)
+    args = parser.parse_args()
+    logging.disable(logging.CRITICAL)
+
+    try:
+        import torch
+    except ImportError:
+        print("PyTorch 未安装，跳过")
+        return 0
+    torch.set_num_threads(1)
+
+    X, y = make_data(args.samples, args.dim, 12, noise=0.1)
+    ok = True
+
+    print("=== 1. 固定轮数 vs 早停 ===")
+    full = train(X, y, args, patience=args.epochs + 1, lr_schedule="none", target_accuracy=args.target_accuracy)
+    early = train(X, y, args, patience=10, target_accuracy=args.target_accuracy)
+    for name, r in (("固定轮数", full), ("早停", early)):
+        print(f"  {name:<6}: {r['epochs_run']:>3} 轮（{r['stop_reason']}，最优第 {r['best_epoch']} 轮）"
+              f"  {r['wall_s']:>6.1f}s  验证准确率 {r['accuracy']:.4f}  验证损失 {r['val_loss']:.4f}")
+    print(f"  早停节省 {1 - early['wall_s'] / full['wall_s']:.0%} 时间，准确率差 {early['accuracy'] - full['accuracy']:+.4f}")
+    ok &= early["epochs_run"] <= full["epochs_run"]
+
+    print("\n=== 2. 达标时间 ===")
+    for name, r in (("固定轮数", full), ("早停", early)):
+        if r["time_to_target_s"] is None:
+            print(f"  {name:<6}: 未达到 {args.target_accuracy}")
+        else:
+            print(f"  {name:<6}: 第 {r['target_epoch']} 轮达到 {args.target_accuracy}，{r['time_to_target_s']:.1f}s")
+    at_target = train(X, y, args, patience=10, target_accuracy=args.target_accuracy, stop_at_target=True)
+    print(f"  stop_at_target: {at_target['epochs_run']} 轮，{at_target['wall_s']:.1f}s（{at_target['stop_reason']}）")
+
+    print("\n=== 3. 崩溃后续训 ===")
+    from src.agents import supervised
+    with tempfile.TemporaryDirectory() as tmp:
+        ref_dir, crash_dir = Path(tmp) / "ref", Path(tmp) / "crash"
+        reference = train(X, y, args, patience=10, checkpoint_dir=str(ref_dir))
+
+        original = supervised.SupervisedAgentImpl._fit_pytorch
+
+        def crashing_fit(self, input_dim, train_batches, *a, **kw):
+            def batches(epoch):
+                if epoch == args.crash_epoch:
+                    raise _Crash()
+                return train_batches(epoch)
+            return original(self, input_dim, batches, *a, **kw)
+
+        supervised.SupervisedAgentImpl._fit_pytorch = crashing_fit
+        try:
+            train(X, y, args, patience=10, checkpoint_dir=str(crash_dir))
+            print("  未触发崩溃")
+            ok = False
+        except _Crash:
+            print(f"  第 {args.crash_epoch + 1} 轮开始时崩溃，检查点: {sorted(p.name for p in crash_dir.iterdir())}")
+        finally:
+            supervised.SupervisedAgentImpl._fit_pytorch = original
+
+        resumed = train(X, y, args, patience=10, checkpoint_dir=str(crash_dir))
+        ref_sd, res_sd = reference["model"].state_dict(), resumed["model"].state_dict()
+        max_diff = max(float((ref_sd[k] - res_sd[k]).abs().max()) for k in ref_sd)
+        print(f"  续训: {resumed['epochs_run']} 轮（不中断: {reference['epochs_run']} 轮），"
+              f"续训阶段 {resumed['wall_s']:.1f}s，最终权重最大差 {max_diff:.2e}")
+        ok &= resumed["epochs_run"] == reference["epochs_run"] and max_diff == 0.0
+
+    print(f"\n{'✅ 通过' if ok else '❌ 失败'}")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
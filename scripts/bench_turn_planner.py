@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+回合规划器对比：规则 Agent 贪心出牌 vs 时间预算内束搜索整回合序列
+
+在 SilentCombatSim 上对每个遭遇用相同种子、相同牌组各跑若干场：
+1. 胜率、胜场剩余生命、平均回合数（越高 / 越高 / 越低越好）
+2. 单次决策延迟 p50 / p99 / max（规划器的搜索只发生在每回合首个决策与偏离计划后的重规划）
+3. 规划器统计：规划次数、缓存命中、重规划、超预算提前返回、记忆化剪枝数、单次规划耗时
+4. 动作以 Mod 命令（play i t / end）送入模拟器；出牌须可打出、需要目标的牌须指向存活怪物，
+   非法动作计数并以结束回合代替
+
+战斗出牌直接调用 _decide_combat_action，不经过 select_action 的防卡住检测。
+
+用法: python scripts/bench_turn_planner.py [--combats 20] [--budget-ms 20] [--extra-cards 5]
+"""
+import sys
+import time
+import random
+import argparse
+import logging
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from src.core.game_state import GameState
+from src.core.action import Action, ActionType
+from src.env.silent_sim import SilentCombatSim, ENCOUNTERS, random_deck
+from src.agents.rule_based import RuleBasedAgentImpl
+
+
+def legal(sim: SilentCombatSim, action: Action) -> bool:
+    """按 Mod 语义检查动作：出牌须可打出，需要目标的牌须指向存活怪物（target_index 为 1-based）"""
+    if action.type == ActionType.END_TURN:
+        return True
+    if action.type != ActionType.PLAY_CARD:
+        return False
+    i = action.card_index
+    if not (0 <= i < len(sim.hand) and sim.card_playable(sim.hand[i])):
+        return False
+    t = (action.target_index or 0) - 1
+    return not sim.hand[i].spec.target or (0 <= t < len(sim.monsters) and sim.monsters[t].alive)
+
+
+def run_combat(agent: RuleBasedAgentImpl, seed: int, encounter: str, deck: list, latencies: list) -> dict:
+    sim = SilentCombatSim(seed=seed, deck=list(deck))
+    frame = sim.reset(encounter)
+    steps = invalid = 0
+    while not sim.done and steps < 2000:
+        state = GameState.from_mod_response(frame)
+        t0 = time.perf_counter()
+        # 战斗出牌直接走战斗决策（模拟器帧的 screen_type 恒为 NONE，会误触发防卡住检测）
+        if state.is_ready_for_combat and not agent._is_card_selection_screen(state):
+            action = agent._decide_combat_action(state)
+        else:
+            action = agent.select_action(state)
+        latencies.append((time.perf_counter() - t0) * 1e3)
+        command = action.to_command()
+        if not legal(sim, action):
+            invalid += 1
+            command = "end"
+        frame = sim.step_command(command)
+        steps += 1
+    return {"won": sim.won, "hp": sim.player_hp if sim.won else 0, "turns": sim.turn, "invalid": invalid}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--combats", type=int, default=20, help="每个遭遇的战斗场数")
+    parser.add_argument("--budget-ms", type=float, default=20.0, help="单次规划时间预算（毫秒）")
+    parser.add_argument("--beam-width", type=int, default=32)
+    parser.add_argument("--extra-cards", type=int, default=5, help="初始牌组外随机追加的卡牌数")
+    args = parser.parse_args()
+    logging.disable(logging.CRITICAL)
+
+    agents = [
+        ("greedy", RuleBasedAgentImpl("Greedy")),
+        ("planner", RuleBasedAgentImpl("Planner", {"planner": True, "planner_budget_ms": args.budget_ms,
+                                                   "planner_beam_width": args.beam_width})),
+    ]
+    results = {name: [] for name, _ in agents}
+    latencies = {name: [] for name, _ in agents}
+    print(f"{'遭遇':<20}" + "".join(f"{name + ' 胜率':>14}{name + ' 剩余HP':>14}" for name, _ in agents))
+    for encounter in ENCOUNTERS:
+        row = f"{encounter:<20}"
+        decks = [random_deck(random.Random(k), args.extra_cards) for k in range(args.combats)]
+        for name, agent in agents:
+            rs = []
+            for k in range(args.combats):
+                if agent._planner is not None:
+                    agent._planner.reset()
+                rs.append(run_combat(agent, k, encounter, decks[k], latencies[name]))
+            results[name].extend(rs)
+            wins = [r for r in rs if r["won"]]
+            row += f"{len(wins) / len(rs):>14.0%}{np.mean([r['hp'] for r in wins]) if wins else 0:>14.1f}"
+        print(row)
+
+    ok = True
+    print()
+    for name, agent in agents:
+        rs = results[name]
+        lat = np.asarray(latencies[name])
+        wins = [r for r in rs if r["won"]]
+        invalid = sum(r["invalid"] for r in rs)
+        ok &= invalid == 0
+        print(f"[{name:>7}] 胜率 {len(wins) / len(rs):.1%}  胜场剩余HP {np.mean([r['hp'] for r in wins]):.1f}  "
+              f"平均回合 {np.mean([r['turns'] for r in rs]):.1f}  非法动作 {invalid}")
+        print(f"          决策延迟(ms): p50={np.percentile(lat, 50):.3f} p99={np.percentile(lat, 99):.3f} "
+              f"max={lat.max():.2f}")
+        if agent._planner is not None:
+            s = agent._planner.get_stats()
+            print(f"          规划 {s['plans']} 次（缓存命中 {s['cache_hits']}，重规划 {s['replans']}，"
+                  f"超预算 {s['timeouts']}），记忆化剪枝 {s['memo_hits']}，"
+                  f"单次规划 平均 {s['mean_plan_ms']:.2f} / 最大 {s['max_plan_ms']:.2f} ms")
+            ok &= s["max_plan_ms"] <= args.budget_ms * 2 + 5
+    print(f"\n{'✅ 通过' if ok else '❌ 失败'}")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
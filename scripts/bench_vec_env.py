@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+BatchedVecEnv 一致性校验 + 吞吐基准
+
+对照组（与 RLAgentImpl 旧的 _make_vec_env 相同的逐环境推进方式）：
+- SB3 已安装：DummyVecEnv（N 个独立 SimEnv）
+- 未安装：LoopVecEnv，按 DummyVecEnv.step_wait 的逻辑逐个 env.step / env.reset，
+  再把观察拷进缓冲区，infos 整体 deepcopy 后返回（与 DummyVecEnv 相同）
+
+1. 同种子、同动作序列下，BatchedVecEnv 与对照组的观察 / 奖励 / done / 掩码逐位一致
+2. N = 1, 8, 32 时两者的 env-steps/s
+
+用法: python scripts/bench_vec_env.py [--steps 4000] [--sizes 1 8 32]
+"""
+import sys
+import time
+import argparse
+import logging
+from copy import deepcopy
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.env.sim_env import SimEnv
+from src.env.vec_env import BatchedVecEnv
+
+
+class LoopVecEnv:
+    """DummyVecEnv 的逐环境推进逻辑（SB3 未安装时的对照组）"""
+
+    def __init__(self, env_fns):
+        self.envs = [fn() for fn in env_fns]
+        self.num_envs = len(self.envs)
+        self.buf_obs = np.zeros((self.num_envs,) + self.envs[0].observation_space.shape, dtype=np.float32)
+        self.buf_rews = np.zeros(self.num_envs, dtype=np.float32)
+        self.buf_dones = np.zeros(self.num_envs, dtype=bool)
+        self._masks = [None] * self.num_envs
+
+    def reset(self):
+        for i, env in enumerate(self.envs):
+            obs, info = env.reset()
+            self.buf_obs[i] = obs
+            self._masks[i] = info["action_mask"]
+        return self.buf_obs.copy()
+
+    def step(self, actions):
+        infos = []
+        for i, env in enumerate(self.envs):
+            obs, rew, terminated, truncated, info = env.step(int(actions[i]))
+            self.buf_dones[i] = terminated or truncated
+            self.buf_rews[i] = rew
+            if self.buf_dones[i]:
+                info["terminal_observation"] = obs
+                obs, reset_info = env.reset()
+                info["action_mask"] = reset_info["action_mask"]
+            self.buf_obs[i] = obs
+            self._masks[i] = info["action_mask"]
+            infos.append(info)
+        return self.buf_obs.copy(), self.buf_rews.copy(), self.buf_dones.copy(), deepcopy(infos)
+
+    def action_masks(self):
+        return np.stack(self._masks)
+
+
+def make_baseline(n: int):
+    fns = [lambda i=i: SimEnv(seed=i) for i in range(n)]
+    try:
+        from stable_baselines3.common.vec_env import DummyVecEnv
+    except ImportError:
+        return LoopVecEnv(fns), "LoopVecEnv"
+    vec = DummyVecEnv(fns)
+    vec.action_masks = lambda: np.stack(vec.env_method("action_masks"))
+    return vec, "DummyVecEnv"
+
+
+def make_batched(n: int, copy_obs: bool = True) -> BatchedVecEnv:
+    return BatchedVecEnv([lambda i=i: SimEnv(seed=i) for i in range(n)], copy_obs=copy_obs)
+
+
+def sample_actions(masks: np.ndarray, rng: np.random.Generator) -> np.ndarray:
+    """每行在合法动作中均匀采样"""
+    noise = rng.random(masks.shape)
+    return np.argmax(np.where(masks, noise, -1.0), axis=1)
+
+
+def check_equivalence(n: int, steps: int) -> bool:
+    base, _ = make_baseline(n)
+    vec = make_batched(n)
+    ok = np.array_equal(base.reset(), vec.reset()) and np.array_equal(base.action_masks(), vec.action_masks())
+    rng = np.random.default_rng(0)
+    for _ in range(steps):
+        actions = sample_actions(vec.action_masks(), rng)
+        o1, r1, d1, i1 = base.step(actions)
+        o2, r2, d2, i2 = vec.step(actions)
+        ok &= np.array_equal(o1, o2) and np.allclose(r1, r2) and np.array_equal(d1, d2)
+        ok &= np.array_equal(base.action_masks(), vec.action_masks())
+        for a, b, d in zip(i1, i2, d1):
+            if d:
+                ok &= np.array_equal(a["terminal_observation"], b["terminal_observation"])
+        if not ok:
+            break
+    return bool(ok)
+
+
+def bench(vec, steps: int) -> float:
+    """返回 env-steps/s（steps 次 vec.step × N）"""
+    rng = np.random.default_rng(1)
+    vec.reset()
+    t0 = time.perf_counter()
+    for _ in range(steps):
+        vec.step(sample_actions(vec.action_masks(), rng))
+    return steps * vec.num_envs / (time.perf_counter() - t0)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--steps", type=int, default=4000, help="每个配置的总 env-steps")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--check-steps", type=int, default=300)
+    args = parser.parse_args()
+    logging.disable(logging.WARNING)
+
+    same = check_equivalence(8, args.check_steps)
+    print(f"BatchedVecEnv 与逐环境推进逐位一致（N=8, {args.check_steps} 步）: {same}")
+
+    _, baseline_name = make_baseline(1)
+    print(f"\n{'N':>4}{baseline_name:>16}{'Batched':>12}{'Batched(no copy)':>18}{'加速':>8}")
+    for n in args.sizes:
+        steps = max(1, args.steps // n)
+        base_sps = bench(make_baseline(n)[0], steps)
+        vec_sps = bench(make_batched(n), steps)
+        nocopy_sps = bench(make_batched(n, copy_obs=False), steps)
+        print(f"{n:>4}{base_sps:>16.0f}{vec_sps:>12.0f}{nocopy_sps:>18.0f}{vec_sps / base_sps:>7.2f}x")
+    print("（单位: env-steps/s）")
+    return 0 if same else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,32 @@
+#!/usr/bin/env python3
+"""
+生成编码器 ID 查表缓存 configs/encoder_ids.cache.json
+
+encoder_utils 启动时优先读取该缓存（JSON，无需导入 yaml、无需逐条归一化），
+缓存记录 encoder_ids.yaml 的 sha1，yaml 修改后缓存自动失效并回退解析 yaml，重新运行本脚本即可。
+
+用法: python scripts/build_encoder_id_cache.py [--output PATH]
+"""
+import sys
+import argparse
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from src.training import encoder_utils
+
+
+def main():
+    parser = argparse.ArgumentParser(description="生成编码器 ID 查表缓存")
+    parser.add_argument("--output", type=str, default=None, help="输出路径（默认 configs/encoder_ids.cache.json）")
+    args = parser.parse_args()
+
+    path = encoder_utils.write_id_cache(args.output)
+    tables = encoder_utils.build_id_tables()
+    sizes = ", ".join(f"{k}={len(v)}" for k, v in tables.items())
+    print(f"已写入 {path}（{sizes}）")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
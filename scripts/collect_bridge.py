@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Mod ↔ 采集服务 桥接脚本
+
+作为 CommunicationMod 的启动命令：立即回复 "ready"，然后把 Mod 的 stdin 按行转发给
+采集服务（src/env/collection_server.py），再把服务返回的命令逐行写回 stdout。
+只用标准库、不导入项目模块，启动耗时与模型大小无关。
+
+用法（Mod 配置，每局游戏一个）:
+  python scripts/collect_bridge.py --address 127.0.0.1:8765
+  python scripts/collect_bridge.py --address /tmp/sts_collect.sock
+"""
+import sys
+
+# 必须在其他工作之前发送 ready，否则 Mod 超时（约 10 秒）会终止进程
+sys.stdout.write("ready\n")
+sys.stdout.flush()
+
+import time
+import socket
+import argparse
+import threading
+
+
+def _connect(address: str, timeout: float) -> socket.socket:
+    """连接采集服务（"host:port" 或 Unix 域 socket 路径），服务未就绪时在 timeout 内重试"""
+    host, sep, port = address.rpartition(":")
+    if sep and port.isdigit() and "/" not in address:
+        family, addr = socket.AF_INET, (host or "127.0.0.1", int(port))
+    else:
+        family, addr = socket.AF_UNIX, address
+    deadline = time.monotonic() + timeout
+    while True:
+        sock = socket.socket(family, socket.SOCK_STREAM)
+        try:
+            sock.connect(addr)
+            if family == socket.AF_INET:
+                sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            return sock
+        except OSError:
+            sock.close()
+            if time.monotonic() >= deadline:
+                raise
+            time.sleep(0.2)
+
+
+def _pump_stdin(sock: socket.socket):
+    """Mod → 服务：逐行转发 stdin，EOF 时半关闭连接"""
+    stdin = sys.stdin.buffer
+    try:
+        for line in iter(stdin.readline, b""):
+            sock.sendall(line if line.endswith(b"\n") else line + b"\n")
+    except OSError:
+        pass
+    finally:
+        try:
+            sock.shutdown(socket.SHUT_WR)
+        except OSError:
+            pass
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Mod ↔ 采集服务桥接")
+    parser.add_argument("--address", type=str, default="127.0.0.1:8765", help="采集服务地址")
+    parser.add_argument("--connect-timeout", type=float, default=30.0, help="连接服务的重试时长（秒）")
+    args = parser.parse_args()
+
+    sock = _connect(args.address, args.connect_timeout)
+    threading.Thread(target=_pump_stdin, args=(sock,), daemon=True).start()
+
+    # 服务 → Mod：逐行写回命令
+    stdout = sys.stdout.buffer
+    reader = sock.makefile("rb")
+    for line in reader:
+        stdout.write(line)
+        stdout.flush()
+    sock.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
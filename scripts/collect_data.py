@@ -10,13 +10,14 @@ import sys
 # 项目根目录（用于绝对路径，避免 Mod 从游戏目录启动时路径错误）
 _SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
 _PROJECT_ROOT = os.path.normpath(os.path.join(_SCRIPT_DIR, ".."))
+# collect_data.log 所在目录；STS_COLLECT_LOG_DIR 可覆盖（mock_mod / profile_startup 指向临时目录）
+_LOG_DIR = os.environ.get("STS_COLLECT_LOG_DIR") or os.path.join(_PROJECT_ROOT, "data", "A20_Silent")
 
 def _early_log(msg: str):
     """尽早写入日志（不依赖 logging 模块）"""
     try:
-        _log_dir = os.path.join(_PROJECT_ROOT, "data", "A20_Silent")
-        os.makedirs(_log_dir, exist_ok=True)
-        with open(os.path.join(_log_dir, "collect_data.log"), "a", encoding="utf-8") as _f:
+        os.makedirs(_LOG_DIR, exist_ok=True)
+        with open(os.path.join(_LOG_DIR, "collect_data.log"), "a", encoding="utf-8") as _f:
             import time
             _f.write(f"{time.strftime('%Y-%m-%d %H:%M:%S', time.localtime())} - {msg}\n")
     except Exception:
@@ -33,13 +34,13 @@ if "--real-game" in sys.argv:
 
 _early_log("开始 import")
 import argparse
-import json
 import logging
 from pathlib import Path
 from datetime import datetime
 
 # 添加项目根目录到路径
 sys.path.insert(0, _PROJECT_ROOT)
+from src.core import json_codec
 _early_log("import 完成")
 
 # 延迟 import：在收到首帧并立即回复后再加载，避免 Mod 在 import 期间超时
@@ -56,7 +57,7 @@ def parse_args():
     """解析命令行参数"""
     parser = argparse.ArgumentParser(description="收集训练数据")
 
-    parser.add_argument("--agent-type", type=str, choices=["rule", "supervised", "rl"], default="rule")
+    parser.add_argument("--agent-type", type=str, choices=["rule", "supervised", "rl", "mcts"], default="rule")
     parser.add_argument("--model", type=str, default=None)
     parser.add_argument("--character", type=str, default="silent")
     parser.add_argument("--ascension", type=int, default=0)
@@ -66,6 +67,8 @@ def parse_args():
     parser.add_argument("--only-wins", action="store_true")
     parser.add_argument("--real-game", action="store_true", help="真实游戏模式：stdin/stdout 连接 CommunicationMod")
     parser.add_argument("--session-name", type=str, default=None, help="会话名称（预留参数，当前未使用）")
+    parser.add_argument("--planner-budget-ms", type=float, default=0.0,
+                        help="规则 Agent 回合规划器的单次时间预算（毫秒，0=不启用，逐张贪心出牌）")
 
     return parser.parse_args()
 
@@ -77,12 +80,11 @@ def _make_raw_filename() -> str:
 
 
 def _flush_frames(frames: list, filepath: Path) -> None:
-    """将帧数据写入 JSON 文件"""
+    """将帧数据写入 JSON 文件（紧凑格式，仅供程序读取）"""
     if not frames:
         return
     try:
-        with open(filepath, "w", encoding="utf-8") as f:
-            json.dump(frames, f, ensure_ascii=False, indent=2)
+        json_codec.dump(frames, filepath)
     except OSError as e:
         logger.warning(f"写入失败: {e}")
 
@@ -97,7 +99,7 @@ def _run_real_game_loop(args):
     output_dir = Path(args.output_dir) if args.output_dir else base / "data" / "A20_Silent" / "Raw_Data_json_FORSL"
     output_dir.mkdir(parents=True, exist_ok=True)
 
-    log_file = base / "data" / "A20_Silent" / "collect_data.log"
+    log_file = Path(_LOG_DIR) / "collect_data.log"
     log_file.parent.mkdir(parents=True, exist_ok=True)
     fh = logging.FileHandler(str(log_file), encoding="utf-8")
     fh.setFormatter(logging.Formatter('%(asctime)s - %(levelname)s - %(message)s'))
@@ -124,7 +126,10 @@ def _run_real_game_loop(args):
         sys.stdout.flush()
         return
 
-    agent = create_agent(args.agent_type, "DataCollector")
+    kwargs = {}
+    if args.agent_type == "rule" and args.planner_budget_ms > 0:
+        kwargs["config"] = {"planner": True, "planner_budget_ms": args.planner_budget_ms}
+    agent = create_agent(args.agent_type, "DataCollector", **kwargs)
     if args.model:
         agent.load(args.model)
         agent.set_training_mode(False)
@@ -142,7 +147,7 @@ def _run_real_game_loop(args):
             return True
         step += 1
         try:
-            data = json.loads(line)
+            data = json_codec.loads(line)
             gs = data.get("game_state") or {}
             if gs.get("screen_type") == "GAME_OVER":
                 last_game_ended = True
@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+多局实时采集服务
+
+一个进程、一份模型服务 N 局游戏：每局游戏的 Mod 启动 scripts/collect_bridge.py，
+桥接脚本把 Mod 的 stdin/stdout 转发到本服务；本服务把各局的待处理帧合成一次推理再把命令分发回去。
+
+用法:
+  python scripts/collect_server.py --agent-type supervised --model models/sl_model.pkl
+  python scripts/collect_server.py --address /tmp/sts_collect.sock --latency-budget-ms 30
+
+  # Mod 启动命令（每局一个）:
+  python scripts/collect_bridge.py --address 127.0.0.1:8765
+"""
+import sys
+import argparse
+import logging
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from src.env.collection_server import CollectionServer, DEFAULT_ADDRESS
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+
+def make_agent_factory(agent_type: str, model: str = None):
+    """返回创建（并加载模型的）Agent 的函数"""
+    from src.agents import create_agent
+
+    def factory():
+        agent = create_agent(agent_type, "DataCollector")
+        if model:
+            agent.load(model)
+            agent.set_training_mode(False)
+        return agent
+    return factory
+
+
+def main():
+    parser = argparse.ArgumentParser(description="多局实时采集服务")
+    parser.add_argument("--agent-type", type=str, choices=["rule", "supervised", "rl", "mcts"], default="rule")
+    parser.add_argument("--model", type=str, default=None)
+    parser.add_argument("--address", type=str, default=DEFAULT_ADDRESS, help="监听地址：host:port 或 Unix socket 路径")
+    parser.add_argument("--output-dir", type=str, default=None, help="数据目录，默认 data/A20_Silent/Raw_Data_json_FORSL")
+    parser.add_argument("--latency-budget-ms", type=float, default=50.0, help="单帧到达 → 命令写回 的目标上限")
+    parser.add_argument("--max-batch", type=int, default=64)
+    parser.add_argument("--flush-every", type=int, default=50, help="每局每多少帧落盘一次")
+    parser.add_argument("--no-record", action="store_true", help="不记录帧")
+    parser.add_argument("--max-games", type=int, default=None, help="累计断开多少局后退出")
+    args = parser.parse_args()
+
+    server = CollectionServer(
+        make_agent_factory(args.agent_type, args.model),
+        address=args.address,
+        output_dir=args.output_dir,
+        latency_budget_ms=args.latency_budget_ms,
+        max_batch=args.max_batch,
+        record=not args.no_record,
+        flush_every=args.flush_every,
+    )
+    try:
+        server.serve_forever(max_games=args.max_games)
+    except KeyboardInterrupt:
+        logger.info("用户中断")
+    finally:
+        logger.info(f"采集统计: {server.get_stats()}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+策略蒸馏：教师 Agent → 小学生 MLP（SupervisedAgentImpl 可直接加载的 .npz / .flat）
+
+1. 教师（create_agent 的 rule / supervised / rl / mcts，--teacher-model 加载权重）在状态流上给出动作分布，
+   写入带软标签的分片（--shard-dir 已存在且不加 --rerecord 时直接复用）
+   - --source corpus：采集语料（--data-dir，默认配置中的 training.data_dir）
+   - --source sim：SimEnv 战斗，教师自己行动
+2. 每个 --students 规格训练一个学生（软交叉熵 = KL + 常数，早停）
+3. 报告：与教师的 argmax 一致率、KL(教师 || 学生)、单次决策延迟（SupervisedAgentImpl.select_action 的
+   p50 / p99，对照教师 select_action）
+4. 选出一致率不低于 --min-agreement 的最小学生（都不达标则取一致率最高者）写到 --output
+
+用法:
+  python scripts/distill_policy.py --teacher mcts --source sim --states 20000 --output models/student.npz
+  python scripts/distill_policy.py --teacher supervised --teacher-model models/big.npz --source corpus \\
+      --students 32 64,32 128,64 --output models/student.flat
+"""
+import os
+import sys
+import time
+import argparse
+import itertools
+import logging
+import tempfile
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from src.agents import create_agent, SupervisedAgentImpl
+from src.core.config import get_config
+from src.training.distill import record_teacher, train_student, iter_corpus_states, iter_sim_states
+from src.training.shard_dataset import INDEX_FILE
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="策略蒸馏")
+    parser.add_argument("--teacher", type=str, choices=["rule", "supervised", "rl", "mcts"], default="mcts",
+                        help="教师 Agent 类型（create_agent）")
+    parser.add_argument("--teacher-model", type=str, default=None, help="教师模型路径（agent.load）")
+    parser.add_argument("--teacher-budget-ms", type=float, default=None, help="MCTS 教师单次决策预算")
+    parser.add_argument("--source", type=str, choices=["corpus", "sim"], default="sim", help="状态来源")
+    parser.add_argument("--data-dir", type=str, default=None, help="--source corpus 的数据目录")
+    parser.add_argument("--states", type=int, default=20000, help="记录的教师决策数上限")
+    parser.add_argument("--encoder", type=str, choices=["encoder_mvp", "encoder"], default="encoder_mvp",
+                        help="学生观察编码器（encoder_mvp：31 维紧凑；encoder：2945 维稀疏）")
+    parser.add_argument("--shard-dir", type=str, default=None, help="教师分布分片目录（默认 data/shards/distill_<teacher>）")
+    parser.add_argument("--rerecord", action="store_true", help="分片已存在时也重新记录")
+    parser.add_argument("--students", type=str, nargs="+", default=["32", "64,32", "128,64"],
+                        help="学生隐藏层规格（逗号分隔），逐个训练对比")
+    parser.add_argument("--epochs", type=int, default=100)
+    parser.add_argument("--batch-size", type=int, default=256)
+    parser.add_argument("--learning-rate", type=float, default=0.001)
+    parser.add_argument("--patience", type=int, default=10, help="早停容忍轮数")
+    parser.add_argument("--latency-states", type=int, default=200, help="测延迟用的状态数")
+    parser.add_argument("--min-agreement", type=float, default=0.95, help="选学生的一致率门槛")
+    parser.add_argument("--output", type=str, default=None, help="学生输出（.npz / .flat；默认不保存）")
+    parser.add_argument("--seed", type=int, default=0)
+    return parser.parse_args()
+
+
+def make_teacher(args):
+    kwargs = {}
+    if args.teacher == "mcts" and args.teacher_budget_ms is not None:
+        kwargs["config"] = {"mcts_budget_ms": args.teacher_budget_ms, "seed": args.seed}
+    teacher = create_agent(args.teacher, "Teacher", **kwargs)
+    if args.teacher_model:
+        teacher.load(args.teacher_model)
+    teacher.set_training_mode(False)
+    return teacher
+
+
+def latency_ms(agent, states) -> np.ndarray:
+    out = np.empty(len(states))
+    for i, state in enumerate(states):
+        t0 = time.perf_counter()
+        agent.select_action(state)
+        out[i] = (time.perf_counter() - t0) * 1e3
+    return out
+
+
+def main():
+    args = parse_args()
+    teacher = make_teacher(args)
+    shard_dir = Path(args.shard_dir or f"data/shards/distill_{args.teacher}")
+
+    # 测延迟的状态：语料的前 N 个，或另一段独立种子的 SimEnv 战斗（教师行动）
+    if args.source == "corpus":
+        data_dir = args.data_dir or get_config().training.data_dir
+        states = iter_corpus_states(data_dir)
+        latency_states = list(itertools.islice(iter_corpus_states(data_dir), args.latency_states))
+    else:
+        states = iter_sim_states(teacher, args.states, seed=args.seed)
+        latency_states = [s for s, _ in iter_sim_states(teacher, args.latency_states, seed=args.seed + 10_000)]
+
+    if args.rerecord or not (shard_dir / INDEX_FILE).exists():
+        logger.info(f"记录教师分布: {args.teacher} / {args.source} → {shard_dir}")
+        record_teacher(teacher, states, shard_dir, encoder=args.encoder, limit=args.states)
+    else:
+        logger.info(f"复用已有分片: {shard_dir}")
+
+    teacher_lat = latency_ms(teacher, latency_states)
+    rows = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for spec in args.students:
+            hidden = tuple(int(h) for h in spec.split(","))
+            result = train_student(shard_dir, hidden, epochs=args.epochs, batch_size=args.batch_size,
+                                   learning_rate=args.learning_rate, n_iter_no_change=args.patience)
+            # 走与部署相同的加载路径测延迟
+            path = os.path.join(tmp, f"student_{spec.replace(',', '_')}.npz")
+            result["model"].save(path)
+            student = SupervisedAgentImpl(f"Student{list(hidden)}")
+            student.load(path)
+            student.set_training_mode(False)
+            lat = latency_ms(student, latency_states)
+            n_params = sum(w.size + b.size for w, b in zip(result["model"].weights, result["model"].biases))
+            rows.append((spec, n_params, result, lat))
+
+    print(f"\n教师 {args.teacher}（{args.source}），学生编码器 {args.encoder}，延迟取 {len(latency_states)} 个状态\n")
+    print(f"{'模型':<14}{'参数':>9}{'一致率':>9}{'KL':>9}{'p50(ms)':>10}{'p99(ms)':>10}")
+    print(f"{'teacher':<14}{'':>9}{'':>9}{'':>9}{np.percentile(teacher_lat, 50):>10.3f}"
+          f"{np.percentile(teacher_lat, 99):>10.3f}")
+    for spec, n_params, result, lat in rows:
+        print(f"{spec:<14}{n_params:>9,}{result['agreement']:>9.4f}{result['kl']:>9.4f}"
+              f"{np.percentile(lat, 50):>10.3f}{np.percentile(lat, 99):>10.3f}")
+
+    if args.output:
+        passing = [r for r in rows if r[2]["agreement"] >= args.min_agreement]
+        spec, _, result, _ = min(passing, key=lambda r: r[1]) if passing else max(rows, key=lambda r: r[2]["agreement"])
+        agent = SupervisedAgentImpl("Student", {"model_type": "numpy"})
+        agent._model = result["model"]
+        agent.save(args.output)
+        logger.info(f"学生 {spec}（一致率 {result['agreement']:.4f}）已保存: {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -16,7 +16,7 @@ from datetime import datetime
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
 
 from src.agents import create_agent
-from src.env import StsEnvWrapper
+from src.env import StsEnvWrapper, ReplayEnv, ReplayStore
 from src.core.config import get_config
 
 logging.basicConfig(
@@ -40,9 +40,9 @@ def parse_args():
     parser.add_argument(
         "--agent-type",
         type=str,
-        choices=["rule", "supervised", "rl"],
+        choices=["rule", "supervised", "rl", "mcts", "ensemble"],
         required=True,
-        help="Agent 类型"
+        help="Agent 类型（ensemble：--model 为 .json 清单或逗号分隔的成员路径）"
     )
 
     # 评估参数
@@ -65,6 +65,20 @@ def parse_args():
         help="Ascension 等级（默认: 0）"
     )
 
+    parser.add_argument(
+        "--replay-dir",
+        type=str,
+        default=None,
+        help="离线回放：原始对局目录（Raw_Data_json_FORSL，不需要游戏进程）"
+    )
+    parser.add_argument(
+        "--replay-unit",
+        type=str,
+        choices=["combat", "episode"],
+        default="combat",
+        help="回放单元（默认: combat）"
+    )
+
     # 输出参数
     parser.add_argument(
         "--output",
@@ -174,6 +188,68 @@ def evaluate_agent(agent, env, n_episodes: int, verbose: bool = False):
     return results
 
 
+def evaluate_agent_replay(agent, env: ReplayEnv, n_episodes: int, verbose: bool = False):
+    """
+    在回放环境上评估 Agent
+
+    按记录的帧逐步喂给 Agent，统计回放奖励与动作一致率（开环，不影响后续帧）。
+
+    Returns:
+        评估结果字典
+    """
+    n_episodes = min(n_episodes, env.get_replay_stats()["segments"])
+    results = {
+        "episodes": [],
+        "total_episodes": n_episodes,
+        "total_reward": 0.0,
+        "total_steps": 0,
+    }
+
+    env.reset_stats()
+    for episode in range(n_episodes):
+        _, info = env.reset(options={"index": episode})
+        agent.on_episode_start(episode + 1)
+        episode_reward, steps, hits, logged = 0.0, 0, 0, 0
+
+        done = truncated = False
+        while not done and not truncated:
+            action = agent.select_action(info["state"])
+            _, reward, done, truncated, info = env.step(action.to_id())
+            episode_reward += reward
+            steps += 1
+            if info["action_agrees"] is not None:
+                logged += 1
+                hits += int(info["action_agrees"])
+            agent.on_step(action, reward, info["state"], done or truncated)
+
+        agent.on_episode_end(episode_reward, info)
+        results["episodes"].append({
+            "episode": episode + 1,
+            "reward": episode_reward,
+            "steps": steps,
+            "agreement": hits / logged if logged else None,
+        })
+        results["total_reward"] += episode_reward
+        results["total_steps"] += steps
+
+        if verbose:
+            logger.info(
+                f"回放 {episode + 1}/{n_episodes}: 奖励={episode_reward:.2f}, 步数={steps}, "
+                f"一致={hits}/{logged}"
+            )
+
+    results["avg_reward"] = results["total_reward"] / n_episodes if n_episodes else 0.0
+    results["avg_steps"] = results["total_steps"] / n_episodes if n_episodes else 0.0
+    results["agreement_rate"] = env.agreement_rate
+    return results
+
+
+def _make_replay_env(replay_dir: str, unit: str) -> ReplayEnv:
+    """从原始对局目录构建回放环境（Agent 需要 GameState，因此保留原始帧）"""
+    store = ReplayStore.from_directory(replay_dir, keep_frames=True)
+    return ReplayEnv(store, unit=unit, return_states=True)
+
+
 def main():
     """主函数"""
     args = parse_args()
@@ -187,6 +263,10 @@ def main():
     logger.info(f"评估回合数: {args.episodes}")
     logger.info("=" * 60)
 
+    if args.replay_dir:
+        _main_replay(args)
+        return
+
     # 创建环境
     logger.info("创建环境...")
     env = StsEnvWrapper(
@@ -230,5 +310,35 @@ def main():
     env.close()
 
 
+def _main_replay(args):
+    """离线回放评估"""
+    logger.info(f"离线回放: {args.replay_dir}（单元: {args.replay_unit}）")
+    env = _make_replay_env(args.replay_dir, args.replay_unit)
+
+    agent = create_agent(args.agent_type, "EvalAgent")
+    agent.load(args.model)
+    agent.set_training_mode(False)
+
+    results = evaluate_agent_replay(agent, env, args.episodes, args.verbose)
+
+    logger.info("=" * 60)
+    logger.info("回放评估结果")
+    logger.info("=" * 60)
+    logger.info(f"回放单元数: {results['total_episodes']}")
+    logger.info(f"平均奖励: {results['avg_reward']:.2f}")
+    logger.info(f"平均步数: {results['avg_steps']:.2f}")
+    logger.info(f"动作一致率: {results['agreement_rate']:.2%}")
+    logger.info("=" * 60)
+
+    if args.output:
+        output_path = Path(args.output)
+        output_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(output_path, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2, ensure_ascii=False)
+        logger.info(f"结果已保存到: {args.output}")
+
+    env.close()
+
+
 if __name__ == "__main__":
     main()
@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+把训练好的策略导出为纯 NumPy 扁平权重（.npz 或内存映射的 .flat），并校验导出前后输出一致
+
+- 监督学习 .pkl（sklearn MLPClassifier / PyTorch _create_policy_net）
+- 强化学习 SB3 .zip（PPO / A2C / DQN）
+- 已导出的 .npz / .flat 互转
+
+导出后 collect_data.py / collect_server.py 的 --model 直接指向 .npz / .flat 即可，
+实时决策路径不再导入 torch / sklearn / SB3；.flat 在多个本机进程间共享一份页缓存。
+
+用法:
+  python scripts/export_numpy_policy.py --model data/A20_Silent/models/sklearn_agent_xxx.pkl
+  python scripts/export_numpy_policy.py --model models/ppo_agent.zip --algorithm ppo --output models/ppo_agent.npz
+  python scripts/export_numpy_policy.py --model models/ppo_agent.npz --format flat
+"""
+import sys
+import argparse
+import logging
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from src.agents.flat_checkpoint import load_any_policy, load_flat, save_flat
+from src.agents.numpy_policy import SB3_ALGORITHMS
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+
+def _reference_proba(args, x: np.ndarray) -> np.ndarray:
+    """用原框架计算 (N, 179) 概率作为对照"""
+    from src.core.action import ACTION_SPACE_SIZE
+
+    if args.model.endswith((".npz", ".flat")):
+        return load_any_policy(args.model).predict_proba(x)
+
+    if args.model.endswith(".zip"):
+        import torch
+        from src.agents.numpy_policy import load_sb3_model
+        model = load_sb3_model(args.model, args.algorithm, device="cpu")
+        obs = model.policy.obs_to_tensor(x)[0]
+        with torch.no_grad():
+            if hasattr(model.policy, "q_net"):
+                q = model.policy.q_net(obs).numpy()
+                p = np.zeros_like(q)
+                p[np.arange(len(q)), q.argmax(axis=1)] = 1.0
+                return p
+            return model.policy.get_distribution(obs).distribution.probs.numpy()
+
+    from src.agents.supervised import SupervisedAgentImpl
+    agent = SupervisedAgentImpl("Reference")
+    agent.load(args.model)
+    if agent.model_type == "sklearn":
+        cols = agent._model.predict_proba(x)
+        full = np.zeros((len(x), ACTION_SPACE_SIZE), dtype=np.float32)
+        full[:, agent._model.classes_.astype(int)] = cols
+        return full
+    import torch
+    with torch.no_grad():
+        return torch.softmax(agent._model(torch.FloatTensor(x)), dim=1).numpy()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="导出 NumPy 推理权重")
+    parser.add_argument("--model", type=str, required=True, help="监督学习 .pkl、SB3 .zip 或已导出的 .npz / .flat")
+    parser.add_argument("--format", type=str, default="npz", choices=["npz", "flat"],
+                        help="输出格式（flat：JSON 头 + float32 权重块，np.memmap 读取）")
+    parser.add_argument("--output", type=str, default=None, help="输出路径（默认与输入同名，扩展名取 --format）")
+    parser.add_argument("--algorithm", type=str, default="ppo", choices=list(SB3_ALGORITHMS),
+                        help="SB3 算法（ppo 在装了 sb3-contrib 时按 MaskablePPO 读取，同 RLAgentImpl 训练的默认模型）")
+    parser.add_argument("--check-samples", type=int, default=256, help="随机输入校验样本数（0=不校验）")
+    args = parser.parse_args()
+
+    output = args.output or str(Path(args.model).with_suffix(f".{args.format}"))
+    if Path(output).resolve() == Path(args.model).resolve():
+        logger.error("输出路径与输入相同")
+        return 1
+    policy = load_any_policy(args.model, args.algorithm)
+    if args.format == "flat":
+        save_flat(policy, output)
+        policy = load_flat(output, verify=True)
+    else:
+        policy.save(output)
+        policy = load_any_policy(output)
+    logger.info(f"已导出: {output}（{len(policy.weights)} 层，输入 {policy.input_dim} 维，编码器 {policy.encoder}）")
+
+    if args.check_samples:
+        rng = np.random.default_rng(0)
+        x = rng.random((args.check_samples, policy.input_dim), dtype=np.float32)
+        ref = _reference_proba(args, x)
+        ours = policy.predict_proba(x)
+        max_diff = float(np.abs(ref - ours).max())
+        agree = float((ref.argmax(axis=1) == ours.argmax(axis=1)).mean())
+        logger.info(f"校验: 概率最大误差 {max_diff:.2e}，argmax 一致 {agree:.1%}")
+        if max_diff > 1e-4:
+            logger.error("导出结果与原模型不一致")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
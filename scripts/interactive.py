@@ -31,7 +31,7 @@ def parse_args():
     parser.add_argument(
         "--agent-type",
         type=str,
-        choices=["rule", "supervised", "rl"],
+        choices=["rule", "supervised", "rl", "mcts"],
         default="rule",
         help="Agent 类型（默认: rule）"
     )
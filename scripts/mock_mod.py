@@ -0,0 +1,211 @@
+#!/usr/bin/env python3
+"""
+本地 CommunicationMod 替身：不开游戏即可端到端测试采集循环的延迟与吞吐
+
+像 Mod 一样把采集脚本作为子进程启动，通过 stdin/stdout 通信：
+1. 等待子进程输出 "ready"（超过 --ready-timeout 秒视为失败，与 Mod 约 10 秒的限制一致）
+2. 逐帧发送记录中的 Mod 帧（去掉 action 字段，一行一个紧凑 JSON），等待一行命令回复
+3. 校验命令：动词须在该帧 available_commands 中，且动作 ID 落在该帧动作掩码内（"state" 总是允许）
+4. 报告启动到 ready 的时间、首帧延迟、逐帧往返延迟分位数、吞吐、非法命令数、与记录动作一致率
+
+用法:
+  python scripts/mock_mod.py --log data/A20_Silent/Raw_Data_json_FORSL/Silent_A20_HUMAN_xxx.json
+  python scripts/mock_mod.py --synthetic 5                          # 无记录时用合成对局
+  python scripts/mock_mod.py --log DIR --cmd "python scripts/read_state.py"
+
+默认子进程：python scripts/collect_data.py --real-game --output-dir <临时目录>（日志经 STS_COLLECT_LOG_DIR 也写到临时目录）
+"""
+import os
+import sys
+import time
+import shlex
+import queue
+import argparse
+import tempfile
+import threading
+import subprocess
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+
+_PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(_PROJECT_ROOT))
+
+from src.core import json_codec
+from src.core.action import Action
+from src.core.game_state import GameState
+from src.env.action_mask import build_action_mask
+
+MOD_READY_TIMEOUT = 10.0
+
+
+def load_frames(log: Path, limit: int = None) -> list:
+    """读取记录：单个 .json 文件或目录（按文件名顺序拼接）"""
+    files = sorted(log.glob("*.json")) if log.is_dir() else [log]
+    frames = []
+    for f in files:
+        arr = json_codec.load(f)
+        if isinstance(arr, list):
+            frames.extend(r for r in arr if isinstance(r, dict))
+        if limit and len(frames) >= limit:
+            break
+    return frames[:limit] if limit else frames
+
+
+def _reader(stream, out: queue.Queue):
+    """后台线程：逐行读取子进程 stdout"""
+    for line in iter(stream.readline, b""):
+        out.put(line)
+    out.put(None)
+
+
+def check_command(command: str, frame: dict) -> bool:
+    """命令是否在该帧合法（动词在 available_commands 中且动作 ID 在掩码内）"""
+    parts = command.split()
+    if not parts:
+        return False
+    verb = parts[0]
+    if verb == "state":
+        return True
+    if verb not in frame.get("available_commands", []):
+        return False
+    action_id = Action.from_command(command).to_id()
+    if not isinstance(action_id, int) or action_id < 0:
+        return True  # 不在策略空间内的合法命令（如 key/click）只校验动词
+    return bool(build_action_mask(GameState.from_mod_response(frame))[action_id])
+
+
+def run(cmd: list, frames: list, ready_timeout: float, frame_timeout: float, check: bool,
+        env: Optional[dict] = None) -> dict:
+    """启动子进程并回放帧，返回统计"""
+    t_spawn = time.perf_counter()
+    proc = subprocess.Popen(
+        cmd,
+        cwd=str(_PROJECT_ROOT),
+        env=env,
+        stdin=subprocess.PIPE,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.DEVNULL,
+        bufsize=0,
+    )
+    lines: queue.Queue = queue.Queue()
+    threading.Thread(target=_reader, args=(proc.stdout, lines), daemon=True).start()
+
+    result = {"ok": False, "frames_sent": 0, "invalid": 0, "agree": 0, "logged": 0, "latencies_ms": []}
+    try:
+        # 1. 握手
+        try:
+            line = lines.get(timeout=ready_timeout)
+        except queue.Empty:
+            result["error"] = f"未在 {ready_timeout:.0f}s 内收到 ready（Mod 会在此时终止进程）"
+            return result
+        if line is None or line.strip() != b"ready":
+            result["error"] = f"首行不是 ready: {line!r}"
+            return result
+        result["startup_ms"] = (time.perf_counter() - t_spawn) * 1e3
+
+        # 2. 逐帧往返
+        t_loop = time.perf_counter()
+        for i, record in enumerate(frames):
+            logged = record.get("action")
+            frame = {k: v for k, v in record.items() if k != "action"}
+            payload = json_codec.dumps_bytes(frame) + b"\n"
+
+            t0 = time.perf_counter()
+            proc.stdin.write(payload)
+            proc.stdin.flush()
+            try:
+                line = lines.get(timeout=frame_timeout)
+            except queue.Empty:
+                result["error"] = f"第 {i} 帧 {frame_timeout:.0f}s 内无回复"
+                return result
+            if line is None:
+                result["error"] = f"子进程在第 {i} 帧退出（返回码 {proc.poll()}）"
+                return result
+            result["latencies_ms"].append((time.perf_counter() - t0) * 1e3)
+            result["frames_sent"] += 1
+
+            command = line.decode("utf-8", errors="replace").strip()
+            if check and not check_command(command, frame):
+                result["invalid"] += 1
+                if result["invalid"] <= 5:
+                    print(f"  ⚠️ 第 {i} 帧非法命令: {command!r} (available={frame.get('available_commands')})")
+            if logged and logged not in ("state", "wait"):
+                result["logged"] += 1
+                result["agree"] += int(command == logged)
+        result["loop_s"] = time.perf_counter() - t_loop
+        result["ok"] = True
+        return result
+    finally:
+        try:
+            proc.stdin.close()
+        except OSError:
+            pass
+        try:
+            proc.wait(timeout=5)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+
+
+def report(result: dict):
+    print("=" * 60)
+    if "startup_ms" in result:
+        print(f"启动 → ready: {result['startup_ms']:.0f} ms（上限 {MOD_READY_TIMEOUT * 1e3:.0f} ms）")
+    lat = np.asarray(result["latencies_ms"])
+    if len(lat):
+        print(f"首帧往返（含 Agent 导入）: {lat[0]:.1f} ms")
+        steady = lat[1:] if len(lat) > 1 else lat
+        print(f"逐帧往返 ({len(steady)} 帧): p50={np.percentile(steady, 50):.2f} ms  "
+              f"p90={np.percentile(steady, 90):.2f} ms  p99={np.percentile(steady, 99):.2f} ms  "
+              f"max={steady.max():.2f} ms")
+    if result.get("loop_s"):
+        print(f"吞吐: {result['frames_sent'] / result['loop_s']:.0f} 帧/s（{result['frames_sent']} 帧）")
+    print(f"非法命令: {result['invalid']}")
+    if result["logged"]:
+        print(f"与记录动作一致: {result['agree']}/{result['logged']} ({result['agree'] / result['logged']:.1%})")
+    if not result["ok"]:
+        print(f"❌ 失败: {result.get('error')}")
+    print("=" * 60)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="本地 CommunicationMod 替身")
+    parser.add_argument("--log", type=str, default=None, help="记录的对局 .json 文件或目录")
+    parser.add_argument("--synthetic", type=int, default=0, help="无记录时生成 N 局合成对局")
+    parser.add_argument("--frames", type=int, default=None, help="最多发送的帧数")
+    parser.add_argument("--cmd", type=str, default=None, help="子进程命令（默认 collect_data.py --real-game）")
+    parser.add_argument("--ready-timeout", type=float, default=MOD_READY_TIMEOUT)
+    parser.add_argument("--frame-timeout", type=float, default=30.0, help="单帧回复超时（秒）")
+    parser.add_argument("--no-check", action="store_true", help="不校验回复命令")
+    args = parser.parse_args()
+
+    if args.log:
+        frames = load_frames(Path(args.log), args.frames)
+    elif args.synthetic:
+        import random
+        from bench_replay_env import synthetic_game
+        rng = random.Random(0)
+        frames = [f for _ in range(args.synthetic) for f in synthetic_game(rng)][:args.frames]
+    else:
+        parser.error("需要 --log 或 --synthetic")
+    if not frames:
+        print("没有可发送的帧")
+        return 1
+
+    with tempfile.TemporaryDirectory() as tmp:
+        if args.cmd:
+            cmd = shlex.split(args.cmd)
+        else:
+            cmd = [sys.executable, "scripts/collect_data.py", "--real-game", "--output-dir", tmp]
+        print(f"子进程: {' '.join(cmd)}")
+        print(f"帧数: {len(frames)}")
+        # collect_data.log 也写到临时目录，不在仓库里留下 data/
+        env = dict(os.environ, STS_COLLECT_LOG_DIR=tmp)
+        result = run(cmd, frames, args.ready_timeout, args.frame_timeout, not args.no_check, env)
+    report(result)
+    return 0 if result["ok"] and result["invalid"] == 0 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -10,7 +10,6 @@
 - actual_action: 实际执行的动作 (如果有)
 """
 
-import json
 import sys
 import os
 from pathlib import Path
@@ -21,6 +20,7 @@ from datetime import datetime
 PROJECT_ROOT = Path(__file__).resolve().parent.parent
 sys.path.insert(0, str(PROJECT_ROOT))
 
+from src.core import json_codec
 from src.training.encoder import encode, get_output_dim
 import numpy as np
 
@@ -156,8 +156,7 @@ def process_mod_log_file(
     print(f"处理文件: {input_path}")
 
     # 读取 Mod Log
-    with open(input_path, 'r', encoding='utf-8') as f:
-        records = json.load(f)
+    records = json_codec.load(input_path)
 
     total_records = len(records)
     if max_records:
@@ -238,8 +237,8 @@ def process_mod_log_file(
         'samples': training_data,
     }
 
-    with open(output_path, 'w', encoding='utf-8') as f:
-        json.dump(output_data, f, indent=2)
+    # 机器读取文件：紧凑格式（2945 维向量缩进后体积约翻倍）
+    json_codec.dump(output_data, output_path)
 
     print(f"\n处理完成!")
     print(f"  输出文件: {output_path}")
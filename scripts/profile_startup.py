@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""
+collect_data.py 启动剖析：按阶段与按模块拆分「启动 → 首个决策」的耗时
+
+像 Mod 一样启动 collect_data.py --real-game，发送一帧并等待第一条命令：
+1. 阶段耗时（取 --repeats 次中的最小值）：
+   spawn → ready、ready → 首条命令（导入 Agent + 创建/加载 + 编码 + 决策）、合计与目标对比
+2. 按模块导入耗时：再以 -X importtime 运行一次，解析 stderr，
+   列出累计 / 自身耗时最高的模块，以及按顶层包汇总的自身耗时
+3. 编码器 ID 查表缓存（configs/encoder_ids.cache.json）是否存在且有效
+
+用法:
+  python scripts/profile_startup.py
+  python scripts/profile_startup.py --agent-type rl --model models/ppo.npz --target-ms 800
+  python scripts/profile_startup.py --log data/A20_Silent/Raw_Data_json_FORSL/xxx.json --top 30
+"""
+import os
+import sys
+import time
+import random
+import argparse
+import tempfile
+import subprocess
+from collections import defaultdict
+from pathlib import Path
+
+_SCRIPTS = Path(__file__).resolve().parent
+_PROJECT_ROOT = _SCRIPTS.parent
+sys.path.insert(0, str(_SCRIPTS))
+sys.path.insert(0, str(_PROJECT_ROOT))
+
+from src.core import json_codec
+
+DEFAULT_TARGET_MS = 1000.0
+
+
+def first_combat_frame(log: str = None) -> dict:
+    """取第一帧战斗帧（无记录时用合成对局）"""
+    if log:
+        from mock_mod import load_frames
+        frames = load_frames(Path(log), 500)
+    else:
+        from bench_replay_env import synthetic_game
+        frames = synthetic_game(random.Random(0))
+    for f in frames:
+        if (f.get("game_state") or {}).get("combat_state"):
+            return {k: v for k, v in f.items() if k != "action"}
+    return {k: v for k, v in frames[0].items() if k != "action"}
+
+
+def run_once(cmd: list, frame: dict, importtime: bool, log_dir: str) -> dict:
+    """启动一次采集脚本并发送一帧，返回阶段耗时（毫秒）与 stderr；collect_data.log 写到 log_dir"""
+    env = dict(os.environ, STS_COLLECT_LOG_DIR=log_dir)
+    if importtime:
+        env["PYTHONPROFILEIMPORTTIME"] = "1"
+    t0 = time.perf_counter()
+    proc = subprocess.Popen(cmd, cwd=str(_PROJECT_ROOT), stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                            stderr=subprocess.PIPE, env=env, bufsize=0)
+    ready = proc.stdout.readline()
+    t_ready = time.perf_counter()
+    proc.stdin.write(json_codec.dumps_bytes(frame) + b"\n")
+    proc.stdin.flush()
+    command = proc.stdout.readline()
+    t_cmd = time.perf_counter()
+    proc.stdin.close()
+    err = proc.stderr.read()
+    proc.wait(timeout=30)
+    return {
+        "ok": ready.strip() == b"ready" and bool(command.strip()),
+        "command": command.decode("utf-8", errors="replace").strip(),
+        "ready_ms": (t_ready - t0) * 1e3,
+        "decision_ms": (t_cmd - t_ready) * 1e3,
+        "total_ms": (t_cmd - t0) * 1e3,
+        "stderr": err.decode("utf-8", errors="replace"),
+    }
+
+
+def parse_importtime(stderr: str) -> list:
+    """解析 -X importtime 输出 → [(模块, 自身 μs, 累计 μs)]"""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        parts = line[len("import time:"):].split("|")
+        if len(parts) != 3 or not parts[0].strip().isdigit():
+            continue  # 表头
+        rows.append((parts[2].strip(), int(parts[0]), int(parts[1])))
+    return rows
+
+
+def id_cache_status() -> str:
+    from src.training import encoder_utils
+    if not encoder_utils._IDS_CACHE_PATH.exists():
+        return "不存在（首次编码会解析 encoder_ids.yaml；运行 scripts/build_encoder_id_cache.py 生成）"
+    return "有效" if encoder_utils._read_id_cache() is not None else "已过期（yaml 已修改，重新生成）"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="collect_data.py 启动剖析")
+    parser.add_argument("--agent-type", type=str, choices=["rule", "supervised", "rl", "mcts"], default="rule")
+    parser.add_argument("--model", type=str, default=None)
+    parser.add_argument("--log", type=str, default=None, help="从记录中取首帧（默认合成战斗帧）")
+    parser.add_argument("--repeats", type=int, default=5, help="阶段计时重复次数（取最小值）")
+    parser.add_argument("--top", type=int, default=20, help="列出耗时最高的模块数")
+    parser.add_argument("--target-ms", type=float, default=DEFAULT_TARGET_MS, help="启动 → 首个决策 的目标上限")
+    args = parser.parse_args()
+
+    frame = first_combat_frame(args.log)
+    with tempfile.TemporaryDirectory() as tmp:
+        cmd = [sys.executable, "scripts/collect_data.py", "--real-game", "--output-dir", tmp,
+               "--agent-type", args.agent_type]
+        if args.model:
+            cmd += ["--model", args.model]
+
+        runs = [run_once(cmd, frame, importtime=False, log_dir=tmp) for _ in range(args.repeats)]
+        if not all(r["ok"] for r in runs):
+            bad = next(r for r in runs if not r["ok"])
+            print(f"❌ 采集脚本未正常回复\n{bad['stderr'][-2000:]}")
+            return 1
+        profiled = run_once(cmd, frame, importtime=True, log_dir=tmp)
+
+    print(f"Agent: {args.agent_type}  模型: {args.model or '-'}  首帧命令: {runs[0]['command']!r}")
+    print(f"编码器 ID 缓存: {id_cache_status()}")
+    print("\n阶段耗时（ms，{} 次取最小）".format(args.repeats))
+    ready = min(r["ready_ms"] for r in runs)
+    decision = min(r["decision_ms"] for r in runs)
+    total = min(r["total_ms"] for r in runs)
+    print(f"  spawn → ready:        {ready:8.1f}")
+    print(f"  ready → 首条命令:     {decision:8.1f}  （导入 Agent + 创建/加载模型 + 编码 + 决策）")
+    print(f"  启动 → 首个决策:      {total:8.1f}  目标 {args.target_ms:.0f} → "
+          f"{'✅ 达标' if total <= args.target_ms else '❌ 超出'}")
+
+    rows = parse_importtime(profiled["stderr"])
+    if rows:
+        print(f"\n累计导入耗时最高的 {args.top} 个模块（ms，-X importtime 单次）")
+        print(f"  {'累计':>8} {'自身':>8}  模块")
+        for name, self_us, cum_us in sorted(rows, key=lambda r: -r[2])[:args.top]:
+            print(f"  {cum_us / 1e3:8.1f} {self_us / 1e3:8.1f}  {name}")
+
+        by_pkg = defaultdict(int)
+        for name, self_us, _ in rows:
+            top = name.split(".")[0]
+            by_pkg[".".join(name.split(".")[:2]) if top == "src" else top] += self_us
+        total_self = sum(by_pkg.values())
+        print(f"\n按包汇总的自身导入耗时（ms，合计 {total_self / 1e3:.1f}）")
+        for pkg, us in sorted(by_pkg.items(), key=lambda kv: -kv[1])[:args.top]:
+            print(f"  {us / 1e3:8.1f}  {us / total_self:6.1%}  {pkg}")
+    return 0 if total <= args.target_ms else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
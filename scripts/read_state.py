@@ -1,10 +1,12 @@
 #!/usr/bin/env python3
 import sys
-import json
 import os
 import hashlib
 from datetime import datetime
 
+sys.path.insert(0, os.path.normpath(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")))
+from src.core import json_codec
+
 # 一局一文件：每次开新局（Neow Event）新建一个 JSON 文件
 # 局结束判定：仅基于 GAME_OVER（死亡/胜利），主动放弃不纳入
 DATA_DIR = "/Volumes/T7/AI_THE_SPIRE/data/A20_Silent/Raw_Data_json_FORSL"
@@ -28,8 +30,7 @@ def _canonical_state(msg: dict) -> dict:
 def _state_hash(msg: dict) -> str:
     """对 canonical_state 生成稳定哈希，用于去重"""
     canonical = _canonical_state(msg)
-    dumped = json.dumps(canonical, sort_keys=True, ensure_ascii=False)
-    return hashlib.sha256(dumped.encode("utf-8")).hexdigest()
+    return hashlib.sha256(json_codec.dumps_bytes(canonical, sort_keys=True)).hexdigest()
 
 
 def _make_filename() -> str:
@@ -48,8 +49,7 @@ def _flush_states(states: list, filename: str) -> None:
     if not states:
         return
     try:
-        with open(filename, "w", encoding="utf-8") as f:
-            json.dump(states, f, ensure_ascii=False, indent=2)
+        json_codec.dump(states, filename)
     except OSError:
         pass
 
@@ -75,8 +75,8 @@ def main():
                 continue
 
             try:
-                msg = json.loads(line)
-            except json.JSONDecodeError:
+                msg = json_codec.loads(line)
+            except json_codec.JSONDecodeError:
                 # 解析失败时跳过，但仍保持通信
                 print("state")
                 sys.stdout.flush()
@@ -146,8 +146,7 @@ def main():
     finally:
         if states:
             try:
-                with open(filename, "w", encoding="utf-8") as f:
-                    json.dump(states, f, ensure_ascii=False, indent=2)
+                json_codec.dump(states, filename)
             except OSError:
                 # 写盘失败时不干扰游戏/通信
                 pass
@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+离线奖励重标注：对整个回放语料一次向量化算出奖励、折扣回报与 GAE 优势，写在 ReplayStore 目录旁
+
+1. 语料：--store 指向 ReplayStore.save 的目录；不存在且给了 --data-dir 时先从采集日志构建并保存；
+   --sim-steps N 时用 SimEnv 随机对局构建（无采集数据时的自检 / 基准）
+2. 重标注：奖励权重默认取配置文件 training.reward，可用 --damage-dealt 等逐项覆盖；
+   --values 可给逐帧 V(s_t) 的 .npy（长度 = 帧数）算 GAE，否则优势为 gamma·lambda 折扣回报
+3. 写出：<store>/<name>/ 下的 rewards / dones / valid / returns / advantages .npy 与 labels.json
+4. --verify：逐单元用 ReplayEnv 逐步回放，对比奖励 / 终止 / 回报，并报告两者耗时
+
+用法:
+  python scripts/relabel_rewards.py --store data/replay_store --data-dir data/A20_Slient/Raw_Data_json_FORSL
+  python scripts/relabel_rewards.py --store data/replay_store --damage-taken 0.5 --name labels_dt05 --verify
+  python scripts/relabel_rewards.py --store /tmp/sim_store --sim-steps 20000 --verify
+"""
+import sys
+import time
+import argparse
+import logging
+from dataclasses import asdict, replace
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from src.core.config import get_config
+from src.env.replay_env import ReplayStore, ReplayEnv
+from src.training.reward_relabel import relabel_store, write_labels
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+_WEIGHT_ARGS = ("damage_dealt", "kill_bonus", "damage_taken", "death_penalty", "length_threshold", "length_penalty")
+
+
+def build_store(args) -> ReplayStore:
+    store_dir = Path(args.store)
+    if (store_dir / "index.json").exists() and not args.rebuild:
+        return ReplayStore.load(store_dir, mmap=True)
+    if args.sim_steps:
+        sys.path.insert(0, str(Path(__file__).resolve().parent))
+        from bench_replay_buffer import simulated_games
+        games, _ = simulated_games(args.sim_steps)
+        store = ReplayStore.from_games(games, keep_frames=False)
+    else:
+        data_dir = args.data_dir or get_config().training.data_dir
+        store = ReplayStore.from_directory(data_dir, max_files=args.max_files, keep_frames=False)
+    store.save(store_dir)
+    return ReplayStore.load(store_dir, mmap=True)
+
+
+def verify(store: ReplayStore, labels, unit: str, reward, gamma: float) -> bool:
+    """ReplayEnv 逐步回放（动作不影响日志回放，取 0）作参照"""
+    config = get_config()
+    env = ReplayEnv(store, unit=unit)
+    env.config = replace(config, training=replace(config.training, reward=reward))
+    n = store.num_frames
+    rewards = np.zeros(n, dtype=np.float32)
+    dones = np.zeros(n, dtype=bool)
+    valid = np.zeros(n, dtype=bool)
+    t0 = time.perf_counter()
+    for k in range(len(store.segments(unit))):
+        env.reset(options={"index": k})
+        while env._t is not None and env._t < env._end - 1:
+            t = env._t
+            _, r, terminated, _, _ = env.step(0)
+            rewards[t], dones[t], valid[t] = r, terminated, True
+            if terminated:
+                break
+    elapsed = time.perf_counter() - t0
+
+    returns = np.zeros(n, dtype=np.float64)
+    g = 0.0
+    for t in range(n - 1, -1, -1):
+        g = rewards[t] + gamma * (0.0 if dones[t] else g) if valid[t] else 0.0
+        returns[t] = g
+    ok_valid = np.array_equal(labels["valid"], valid)
+    ok_done = np.array_equal(labels["dones"], dones)
+    r_err = float(np.abs(labels["rewards"] - rewards).max())
+    g_err = float(np.abs(labels["returns"] - returns).max() / max(1.0, np.abs(returns).max()))
+    print(f"  ReplayEnv 逐步回放: {elapsed:.2f}s（{valid.sum() / elapsed:,.0f} 条/秒）")
+    print(f"  转移集合一致: {ok_valid}，终止一致: {ok_done}，奖励最大误差: {r_err:.2e}，回报最大相对误差: {g_err:.2e}")
+    return ok_valid and ok_done and r_err < 1e-4 and g_err < 1e-5
+
+
+def main():
+    parser = argparse.ArgumentParser(description="离线奖励重标注（奖励 / 回报 / GAE）")
+    parser.add_argument("--store", type=str, required=True, help="ReplayStore 目录（不存在时构建）")
+    parser.add_argument("--data-dir", type=str, default=None, help="采集日志目录（默认 training.data_dir）")
+    parser.add_argument("--max-files", type=int, default=None)
+    parser.add_argument("--sim-steps", type=int, default=0, help="用 SimEnv 随机对局构建语料")
+    parser.add_argument("--rebuild", action="store_true", help="--store 已存在时也重新构建")
+    parser.add_argument("--unit", type=str, choices=["combat", "episode"], default="combat")
+    parser.add_argument("--gamma", type=float, default=None, help="默认 training.gamma")
+    parser.add_argument("--gae-lambda", type=float, default=0.95)
+    parser.add_argument("--values", type=str, default=None, help="逐帧 V(s_t) 的 .npy")
+    parser.add_argument("--name", type=str, default="labels", help="输出子目录名")
+    for field in _WEIGHT_ARGS:
+        parser.add_argument(f"--{field.replace('_', '-')}", type=float, default=None)
+    parser.add_argument("--verify", action="store_true", help="与 ReplayEnv 逐步回放对比")
+    args = parser.parse_args()
+
+    config = get_config().training
+    overrides = {f: getattr(args, f) for f in _WEIGHT_ARGS if getattr(args, f) is not None}
+    if "length_threshold" in overrides:
+        overrides["length_threshold"] = int(overrides["length_threshold"])
+    reward = replace(config.reward, **overrides)
+    gamma = config.gamma if args.gamma is None else args.gamma
+
+    store = build_store(args)
+    values = None if args.values is None else np.load(args.values, mmap_mode="r")
+    if values is not None and len(values) != store.num_frames:
+        parser.error(f"--values has {len(values)} rows, store has {store.num_frames} frames")
+
+    t0 = time.perf_counter()
+    labels = relabel_store(store, unit=args.unit, reward=reward, gamma=gamma,
+                           gae_lambda=args.gae_lambda, values=values)
+    elapsed = time.perf_counter() - t0
+    out_dir = write_labels(args.store, labels, args.name)
+
+    n = int(labels["valid"].sum())
+    r = labels["rewards"][labels["valid"]]
+    print(f"\n语料: {store.num_episodes} 局 / {store.num_combats} 场战斗 / {store.num_frames} 帧 → {n} 条转移（{args.unit}）")
+    print(f"权重: {asdict(reward)}，gamma={gamma}，lambda={args.gae_lambda}")
+    print(f"向量化重标注: {elapsed:.3f}s（{store.num_frames / max(elapsed, 1e-9):,.0f} 帧/秒）→ {out_dir}")
+    if n:
+        print(f"奖励: 均值 {r.mean():.3f}，最小 {r.min():.2f}，最大 {r.max():.2f}；"
+              f"终止 {int(labels['dones'].sum())} 次")
+
+    ok = True
+    if args.verify:
+        print("\n=== 与 ReplayEnv 对比 ===")
+        ok = verify(store, labels, args.unit, reward, gamma)
+        print(f"\n{'✅ 通过' if ok else '❌ 失败'}")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
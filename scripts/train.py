@@ -54,7 +54,7 @@ def parse_args():
     # collect 命令
     collect_parser = subparsers.add_parser('collect', help='收集训练数据')
     collect_parser.add_argument('--games', type=int, default=10, help='收集游戏局数')
-    collect_parser.add_argument('--agent-type', type=str, default='rule', choices=['rule', 'supervised', 'rl'])
+    collect_parser.add_argument('--agent-type', type=str, default='rule', choices=['rule', 'supervised', 'rl', 'mcts'])
     collect_parser.add_argument('--model', type=str, default=None, help='模型路径（supervised/rl）')
     collect_parser.add_argument('--character', type=str, default='silent', help='角色')
     collect_parser.add_argument('--ascension', type=int, default=0, help='Ascension 等级')
@@ -73,7 +73,7 @@ def parse_args():
 
     # rl 命令
     rl_parser = subparsers.add_parser('rl', help='训练强化学习模型')
-    rl_parser.add_argument('--algorithm', type=str, default='ppo', choices=['ppo', 'a2c', 'dqn'])
+    rl_parser.add_argument('--algorithm', type=str, default='ppo', choices=['ppo', 'maskable_ppo', 'a2c', 'dqn'])
     rl_parser.add_argument('--sl-model', type=str, default=None, help='SL 模型路径（Warm Start）')
     rl_parser.add_argument('--timesteps', type=int, default=100000, help='训练步数')
     rl_parser.add_argument('--n-envs', type=int, default=1, help='并行环境数')
@@ -99,7 +99,7 @@ def parse_args():
 
     # eval 命令
     eval_parser = subparsers.add_parser('eval', help='评估模型')
-    eval_parser.add_argument('--agent-type', type=str, required=True, choices=['rule', 'supervised', 'rl'])
+    eval_parser.add_argument('--agent-type', type=str, required=True, choices=['rule', 'supervised', 'rl', 'mcts'])
     eval_parser.add_argument('--model', type=str, required=True, help='模型路径')
     eval_parser.add_argument('--episodes', type=int, default=10, help='评估回合数')
     eval_parser.add_argument('--character', type=str, default='silent', help='角色')
@@ -108,7 +108,7 @@ def parse_args():
 
     # interactive 命令
     interactive_parser = subparsers.add_parser('interactive', help='交互式测试')
-    interactive_parser.add_argument('--agent-type', type=str, default='rule', choices=['rule', 'supervised', 'rl'])
+    interactive_parser.add_argument('--agent-type', type=str, default='rule', choices=['rule', 'supervised', 'rl', 'mcts'])
     interactive_parser.add_argument('--model', type=str, default=None, help='模型路径')
     interactive_parser.add_argument('--character', type=str, default='silent', help='角色')
     interactive_parser.add_argument('--ascension', type=int, default=0, help='Ascension 等级')
@@ -33,7 +33,7 @@ def parse_args():
     parser.add_argument(
         "--algorithm",
         type=str,
-        choices=["ppo", "a2c", "dqn"],
+        choices=["ppo", "maskable_ppo", "a2c", "dqn"],
         default="ppo",
         help="RL 算法（默认: ppo）"
     )
@@ -104,6 +104,11 @@ def parse_args():
         default=[128, 128],
         help="策略网络隐藏层（默认: 128 128）"
     )
+    parser.add_argument(
+        "--no-mask",
+        action="store_true",
+        help="PPO 不用 MaskablePPO（rollout 会采样非法动作并吃 -1 惩罚）"
+    )
 
     # 输出参数
     parser.add_argument(
@@ -160,6 +165,7 @@ def main():
         args.name,
         config={
             "algorithm": args.algorithm,
+            "mask_actions": not args.no_mask,
         }
     )
 
@@ -34,14 +34,32 @@ def parse_args():
         default=None,
         help="训练数据目录（默认使用配置文件中的值）"
     )
+    parser.add_argument(
+        "--shard-dir",
+        type=str,
+        default=None,
+        help="预编码分片目录：不存在时先从 --data-dir 流式编码写入，再从分片流式训练（pytorch / numpy）"
+    )
+    parser.add_argument(
+        "--num-workers",
+        type=int,
+        default=2,
+        help="分片训练的 DataLoader worker 数（默认: 2）"
+    )
+    parser.add_argument(
+        "--world-size",
+        type=int,
+        default=1,
+        help="分片训练的数据并行进程数（gloo，>1 时 --batch-size 为每进程批大小，学习率按全局批线性缩放）"
+    )
 
     # 模型参数
     parser.add_argument(
         "--model-type",
         type=str,
-        choices=["sklearn", "pytorch"],
+        choices=["sklearn", "pytorch", "numpy"],
         default="sklearn",
-        help="模型类型（默认: sklearn）"
+        help="模型类型（默认: sklearn；numpy 为可流式、可续训的 NumPy MLP，输出 .npz）"
     )
     parser.add_argument(
         "--hidden-layers",
@@ -77,6 +95,43 @@ def parse_args():
         help="学习率（默认: 0.001）"
     )
 
+    # 训练引擎参数（仅 pytorch）
+    parser.add_argument(
+        "--patience",
+        type=int,
+        default=None,
+        help="早停：验证损失未下降的容忍轮数（默认使用配置 training.early_stopping_patience）"
+    )
+    parser.add_argument(
+        "--lr-schedule",
+        type=str,
+        choices=["plateau", "cosine", "none"],
+        default="plateau",
+        help="学习率调度（默认: plateau）"
+    )
+    parser.add_argument(
+        "--checkpoint-dir",
+        type=str,
+        default=None,
+        help="检查点目录（last.pt / best.pt）；目录中已有 last.pt 时自动续训"
+    )
+    parser.add_argument(
+        "--no-resume",
+        action="store_true",
+        help="忽略已有检查点，从头训练"
+    )
+    parser.add_argument(
+        "--target-accuracy",
+        type=float,
+        default=None,
+        help="记录首次达到该验证准确率的轮数与耗时"
+    )
+    parser.add_argument(
+        "--stop-at-target",
+        action="store_true",
+        help="达到 --target-accuracy 后立即停止"
+    )
+
     # 输出参数
     parser.add_argument(
         "--output",
@@ -94,6 +149,69 @@ def parse_args():
     return parser.parse_args()
 
 
+def trainer_kwargs(args) -> dict:
+    """训练引擎参数（sklearn 后端忽略；numpy 后端使用 patience / checkpoint_dir / resume）"""
+    return {
+        "patience": args.patience,
+        "lr_schedule": args.lr_schedule,
+        "checkpoint_dir": args.checkpoint_dir,
+        "resume": not args.no_resume,
+        "target_accuracy": args.target_accuracy,
+        "stop_at_target": args.stop_at_target,
+    }
+
+
+def train_in_memory(agent, data_dir, args):
+    """整表加载 GameState 列表后训练"""
+    # 加载数据
+    logger.info("正在加载数据...")
+    states, actions = load_data_from_sessions(data_dir)
+
+    if len(states) == 0:
+        logger.error(f"未找到训练数据: {data_dir}")
+        sys.exit(1)
+
+    logger.info(f"加载了 {len(states)} 条样本")
+
+    # 训练
+    logger.info("开始训练...")
+    return agent.train(
+        states,
+        actions,
+        val_split=args.val_split,
+        epochs=args.epochs,
+        batch_size=args.batch_size,
+        learning_rate=args.learning_rate,
+        hidden_layers=tuple(args.hidden_layers),
+        **trainer_kwargs(args),
+    )
+
+
+def train_from_shards(agent, data_dir, args):
+    """从预编码分片流式训练；分片目录不存在时先从数据目录流式编码写入"""
+    from src.training.shard_dataset import INDEX_FILE, write_shards_from_sessions
+
+    if args.model_type not in ("pytorch", "numpy"):
+        logger.error("--shard-dir 仅支持 --model-type pytorch / numpy")
+        sys.exit(1)
+    if not (Path(args.shard_dir) / INDEX_FILE).exists():
+        logger.info(f"正在编码分片: {data_dir} → {args.shard_dir}")
+        write_shards_from_sessions(data_dir, args.shard_dir)
+
+    logger.info("开始训练...")
+    return agent.train_from_shards(
+        args.shard_dir,
+        val_split=args.val_split,
+        epochs=args.epochs,
+        batch_size=args.batch_size,
+        learning_rate=args.learning_rate,
+        hidden_layers=tuple(args.hidden_layers),
+        num_workers=args.num_workers,
+        world_size=args.world_size,
+        **trainer_kwargs(args),
+    )
+
+
 def main():
     """主函数"""
     args = parse_args()
@@ -125,27 +243,10 @@ def main():
         }
     )
 
-    # 加载数据
-    logger.info("正在加载数据...")
-    states, actions = load_data_from_sessions(data_dir)
-
-    if len(states) == 0:
-        logger.error(f"未找到训练数据: {data_dir}")
-        sys.exit(1)
-
-    logger.info(f"加载了 {len(states)} 条样本")
-
-    # 训练
-    logger.info("开始训练...")
-    result = agent.train(
-        states,
-        actions,
-        val_split=args.val_split,
-        epochs=args.epochs,
-        batch_size=args.batch_size,
-        learning_rate=args.learning_rate,
-        hidden_layers=tuple(args.hidden_layers),
-    )
+    if args.shard_dir:
+        result = train_from_shards(agent, data_dir, args)
+    else:
+        result = train_in_memory(agent, data_dir, args)
 
     # 输出结果
     logger.info("=" * 60)
@@ -157,6 +258,11 @@ def main():
     logger.info(f"训练集准确率: {train_acc:.4f}" if train_acc is not None else "训练集准确率: N/A")
     logger.info(f"模型类型: {result.get('model_type')}")
     logger.info(f"隐藏层: {result.get('hidden_layers')}")
+    if result.get("stop_reason"):
+        logger.info(f"训练轮数: {result['epochs_run']}（{result['stop_reason']}，最优第 {result['best_epoch']} 轮），"
+                    f"耗时 {result['elapsed_s']:.1f}s")
+    if result.get("time_to_target_s") is not None:
+        logger.info(f"达到目标准确率: 第 {result['target_epoch']} 轮，{result['time_to_target_s']:.1f}s")
     logger.info("=" * 60)
 
     # 保存模型
@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+验证向量化动作掩码与列表版逻辑逐位一致，并对比耗时
+
+- 参考：StsEnvironment._get_action_mask(StsEnvironment._get_valid_actions())
+- 单个：build_action_mask(state)
+- 批量：build_action_masks(states)
+
+用法: python scripts/verify_action_mask.py [--states 5000] [--seed 0]
+"""
+import sys
+import time
+import random
+import argparse
+import logging
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.core.game_state import (
+    GameState, CombatState, Player, Monster, Card, CardType, IntentType, RoomPhase,
+)
+from src.env.sts_env import StsEnvironment
+from src.env.action_mask import build_action_mask, build_action_masks
+
+COMMANDS = ["play", "end", "choose", "proceed", "cancel", "potion", "confirm"]
+
+
+def random_state(rng: random.Random):
+    """随机状态：覆盖非战斗、战斗、空手牌、无怪物、药水槽数、choice 超长等情况"""
+    if rng.random() < 0.03:
+        return None
+    phase = rng.choice(list(RoomPhase))
+    combat = None
+    if rng.random() < 0.8:
+        hand = [
+            Card(
+                id=f"Card_{j}", name="", cost=rng.randint(-2, 4),
+                card_type=rng.choice(list(CardType)),
+                is_playable=rng.random() < 0.7, has_target=rng.random() < 0.5,
+            )
+            for j in range(rng.randint(0, 12))
+        ]
+        monsters = [
+            Monster(
+                id=f"M_{j}", name="", current_hp=rng.randint(0, 50), max_hp=50,
+                intent=rng.choice(list(IntentType)), is_gone=rng.random() < 0.1,
+            )
+            for j in range(rng.randint(0, 8))
+        ]
+        combat = CombatState(
+            hand=hand,
+            player=Player(energy=rng.randint(0, 4), max_energy=3, current_hp=50, max_hp=70),
+            monsters=monsters,
+            turn=1,
+            potions=[f"P_{j}" for j in range(rng.randint(0, 6))],
+        )
+    return GameState(
+        room_phase=phase,
+        floor=1,
+        act=1,
+        combat=combat,
+        available_commands=rng.sample(COMMANDS, rng.randint(0, len(COMMANDS))),
+        choice_list=["x"] * rng.choice([0, 1, 3, 10, 70]),
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--states", type=int, default=5000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    logging.disable(logging.WARNING)
+
+    rng = random.Random(args.seed)
+    states = [random_state(rng) for _ in range(args.states)]
+    env = StsEnvironment(observation_dim=1)
+
+    def reference(state):
+        env._current_state = state
+        return env._get_action_mask(env._get_valid_actions()).astype(bool)
+
+    t0 = time.perf_counter()
+    ref = np.stack([reference(s) for s in states])
+    t_ref = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    single = np.stack([build_action_mask(s) for s in states])
+    t_single = time.perf_counter() - t0
+
+    out = np.zeros_like(ref)
+    t0 = time.perf_counter()
+    batch = build_action_masks(states, out=out)
+    t_batch = time.perf_counter() - t0
+
+    bad_single = np.flatnonzero((single != ref).any(axis=1))
+    bad_batch = np.flatnonzero((batch != ref).any(axis=1))
+    print(f"状态数: {len(states)}")
+    print(f"  单个 vs 列表版 不一致: {len(bad_single)}")
+    print(f"  批量 vs 列表版 不一致: {len(bad_batch)}")
+    for i in list(bad_single[:3]) + list(bad_batch[:3]):
+        print(f"    状态 {i}: 差异动作 {np.flatnonzero(single[i] != ref[i]).tolist()} / "
+              f"{np.flatnonzero(batch[i] != ref[i]).tolist()}")
+
+    n = len(states)
+    print("\n耗时（每状态）")
+    print(f"  列表版 valid_actions + mask: {t_ref / n * 1e6:7.2f} us")
+    print(f"  build_action_mask:            {t_single / n * 1e6:7.2f} us")
+    print(f"  build_action_masks (N={n}):  {t_batch / n * 1e6:7.2f} us")
+
+    return 1 if len(bad_single) or len(bad_batch) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
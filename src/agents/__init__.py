@@ -3,34 +3,69 @@
 AI Agent 模块
 
 提供统一的 Agent 接口，支持规则、监督学习、强化学习。
+
+子模块在首次访问对应属性时才导入（PEP 562 模块级 __getattr__）：
+`from src.agents import create_agent` 只加载 base，不会拉起 supervised / rl_agent 等，
+缩短 collect_data.py 从启动到首个决策的时间。
 """
-from .base import (
-    Agent,
-    RuleBasedAgent,
-    SupervisedAgent,
-    RLAgent,
-    create_agent,
-)
-from .rule_based import RuleBasedAgentImpl, decide_combat_action, decide_choice
-from .supervised import SupervisedAgentImpl, load_training_data, load_data_from_sessions
-from .rl_agent import RLAgentImpl
-
-__all__ = [
+import importlib
+from typing import TYPE_CHECKING
+
+# 导出名 → 所在子模块
+_LAZY_ATTRS = {
     # 基类
-    "Agent",
-    "RuleBasedAgent",
-    "SupervisedAgent",
-    "RLAgent",
+    "Agent": ".base",
+    "RuleBasedAgent": ".base",
+    "SupervisedAgent": ".base",
+    "RLAgent": ".base",
     # 实现
-    "RuleBasedAgentImpl",
-    "SupervisedAgentImpl",
-    "RLAgentImpl",
+    "RuleBasedAgentImpl": ".rule_based",
+    "SupervisedAgentImpl": ".supervised",
+    "RLAgentImpl": ".rl_agent",
+    "MCTSAgentImpl": ".mcts_agent",
+    "EnsembleAgentImpl": ".ensemble",
+    "StackedPolicy": ".ensemble",
+    "NumpyPolicy": ".numpy_policy",
+    "save_flat": ".flat_checkpoint",
+    "load_flat": ".flat_checkpoint",
+    "TurnPlanner": ".turn_planner",
+    "InferenceServer": ".inference_server",
+    "InferenceClient": ".inference_server",
     # 工厂
-    "create_agent",
+    "create_agent": ".base",
     # 数据加载
-    "load_training_data",
-    "load_data_from_sessions",
+    "load_training_data": ".supervised",
+    "load_data_from_sessions": ".supervised",
+    "iter_training_records": ".supervised",
     # 兼容旧版
-    "decide_combat_action",
-    "decide_choice",
-]
+    "decide_combat_action": ".rule_based",
+    "decide_choice": ".rule_based",
+}
+
+__all__ = list(_LAZY_ATTRS)
+
+
+def __getattr__(name: str):
+    module = _LAZY_ATTRS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module, __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
+
+
+if TYPE_CHECKING:
+    from .base import Agent, RuleBasedAgent, SupervisedAgent, RLAgent, create_agent
+    from .rule_based import RuleBasedAgentImpl, decide_combat_action, decide_choice
+    from .supervised import SupervisedAgentImpl, load_training_data, load_data_from_sessions, iter_training_records
+    from .rl_agent import RLAgentImpl
+    from .mcts_agent import MCTSAgentImpl
+    from .ensemble import EnsembleAgentImpl, StackedPolicy
+    from .numpy_policy import NumpyPolicy
+    from .flat_checkpoint import save_flat, load_flat
+    from .turn_planner import TurnPlanner
+    from .inference_server import InferenceServer, InferenceClient
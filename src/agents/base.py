@@ -280,6 +280,22 @@ class SupervisedAgent(Agent):
         """
         pass
 
+    def predict_proba_batch(self, states: List[GameState]) -> np.ndarray:
+        """
+        批量预测动作概率分布（默认逐个调用 predict_proba，子类可改为单次前向）
+
+        Args:
+            states: N 个游戏状态
+
+        Returns:
+            (N, 179) 动作概率
+        """
+        from src.core.action import ACTION_SPACE_SIZE
+
+        if not states:
+            return np.zeros((0, ACTION_SPACE_SIZE), dtype=np.float32)
+        return np.stack([self.predict_proba(s) for s in states]).astype(np.float32)
+
     def predict(self, state: GameState) -> Action:
         """
         预测最佳动作
@@ -408,7 +424,7 @@ def create_agent(agent_type: str, name: str = None, **kwargs) -> Agent:
     创建 Agent 工厂函数
 
     Args:
-        agent_type: Agent 类型 ("rule", "supervised", "rl")
+        agent_type: Agent 类型 ("rule", "supervised", "rl", "mcts", "ensemble")
         name: Agent 名称
         **kwargs: 其他参数
 
@@ -428,5 +444,11 @@ def create_agent(agent_type: str, name: str = None, **kwargs) -> Agent:
     elif agent_type == "rl":
         from src.agents.rl_agent import RLAgentImpl
         return RLAgentImpl(name, **kwargs)
+    elif agent_type == "mcts":
+        from src.agents.mcts_agent import MCTSAgentImpl
+        return MCTSAgentImpl(name, **kwargs)
+    elif agent_type == "ensemble":
+        from src.agents.ensemble import EnsembleAgentImpl
+        return EnsembleAgentImpl(name, **kwargs)
     else:
         raise ValueError(f"Unknown agent type: {agent_type}")
@@ -0,0 +1,226 @@
+#!/usr/bin/env python3
+"""
+集成 Agent：K 个同结构 MLP 的权重堆叠成三维张量，一次批量前向算出全部 K 个模型的输出
+
+逐个调用 K 个 SupervisedAgentImpl.predict_proba 要做 K 次编码、K 次前向，K 份 Python 调用开销。
+StackedPolicy 把 K 个 NumpyPolicy（.npz / .flat / .pkl / SB3 .zip，经 load_any_policy 读取）合并：
+- 第一层输入相同：K 个 (D, H) 权重按列拼成 (D, K·H)，一次 GEMM
+- 之后各层为 (K, in, out) 权重，np.matmul 在 K 维上批量相乘（每层一次调用）
+- 最后一层统一散射到 179 列：sklearn 成员只输出训练中出现过的类别，未覆盖的列偏置为 -inf（概率 0），
+  不同类别集合的成员也能堆叠
+要求各成员编码器、隐藏层形状与激活相同，输出同为 softmax 或同为 q。
+
+合并方式（combine）：
+- mean：各成员概率取平均
+- vote：各成员 argmax 计票，输出票数占比（平票时 argmax 取编号较小的动作）
+- max：每个样本取最自信（最大概率最高）的成员的分布
+
+用法：
+    agent = create_agent("ensemble", "Ens", config={"models": ["a.npz", "b.flat", "c.pkl"], "combine": "mean"})
+    agent.load("models/ensemble.json")        # 或成员路径列表 / 逗号分隔的路径
+"""
+import os
+import json
+import logging
+from typing import Dict, List, Optional, Sequence, Union
+
+import numpy as np
+
+from src.core.action import ACTION_SPACE_SIZE
+from src.agents.numpy_policy import NumpyPolicy, masked_proba, _apply_activation
+from src.agents.supervised import SupervisedAgentImpl
+
+logger = logging.getLogger(__name__)
+
+COMBINE_MODES = ("mean", "vote", "max")
+
+# softmax / 合并阶段每块处理的成员·样本行数
+_COMBINE_ROWS = 512
+
+
+def _output_layer(policy: NumpyPolicy):
+    """最后一层散射到 179 列：(H, 179) 权重与 (179,) 偏置，未覆盖的动作偏置为 -inf"""
+    w, b = policy.weights[-1], policy.biases[-1]
+    if policy.classes is None and w.shape[1] == ACTION_SPACE_SIZE:
+        return w, b
+    if policy.output == "logistic":
+        raise ValueError("Binary (logistic) policies cannot be stacked")
+    cols = policy.classes if policy.classes is not None else np.arange(w.shape[1])
+    full_w = np.zeros((w.shape[0], ACTION_SPACE_SIZE), dtype=np.float32)
+    full_b = np.full(ACTION_SPACE_SIZE, -np.inf, dtype=np.float32)
+    full_w[:, cols] = w
+    full_b[cols] = b
+    return full_w, full_b
+
+
+class StackedPolicy:
+    """K 个同结构 NumpyPolicy 的堆叠前向"""
+
+    def __init__(self, members: Sequence[NumpyPolicy], combine: str = "mean"):
+        if not members:
+            raise ValueError("Ensemble needs at least one member")
+        if combine not in COMBINE_MODES:
+            raise ValueError(f"Unknown combine mode: {combine} (expected one of {COMBINE_MODES})")
+        ref = members[0]
+        for m in members[1:]:
+            if (m.encoder != ref.encoder or m.activations != ref.activations or m.output != ref.output
+                    or [w.shape for w in m.weights[:-1]] != [w.shape for w in ref.weights[:-1]]
+                    or m.weights[-1].shape[0] != ref.weights[-1].shape[0]):
+                raise ValueError(f"Incompatible ensemble member ({m.source or 'unknown'}): encoder, hidden "
+                                 f"shapes, activations and output must match {ref.source or 'member 0'}")
+        self.k = len(members)
+        self.combine = combine
+        self.encoder = ref.encoder
+        self.activations = list(ref.activations)
+        self.q_values = ref.output == "q"
+        self.sources = [m.source for m in members]
+        self._members = list(members)
+
+        layers = [[(m.weights[i], m.biases[i]) for m in members] for i in range(len(ref.weights) - 1)]
+        layers.append([_output_layer(m) for m in members])
+        # 第一层：(D, K·H) 一次 GEMM；其余层：(K, in, out) 批量相乘，偏置 (K, 1, out) 广播
+        self._w0 = np.ascontiguousarray(np.concatenate([w for w, _ in layers[0]], axis=1))
+        self._b0 = np.concatenate([b for _, b in layers[0]])
+        self._h0 = layers[0][0][0].shape[1]
+        self._weights = [np.ascontiguousarray(np.stack([w for w, _ in layer])) for layer in layers[1:]]
+        self._biases = [np.stack([b for _, b in layer])[:, None, :] for layer in layers[1:]]
+
+    @classmethod
+    def from_files(cls, paths: Sequence[str], combine: str = "mean", algorithm: str = "ppo") -> "StackedPolicy":
+        from src.agents.flat_checkpoint import load_any_policy
+        return cls([load_any_policy(p, algorithm) for p in paths], combine)
+
+    @property
+    def input_dim(self) -> int:
+        return self._w0.shape[0]
+
+    def encode(self, mod_response: Dict) -> np.ndarray:
+        return self._members[0].encode(mod_response)
+
+    # ==================== 前向 ====================
+
+    def member_logits(self, x: np.ndarray) -> np.ndarray:
+        """全部成员的 179 维 logits / Q 值 (K, N, 179)"""
+        h = np.asarray(x, dtype=np.float32)
+        if h.ndim == 1:
+            h = h.reshape(1, -1)
+        n = len(h)
+        h = h @ self._w0
+        h += self._b0
+        _apply_activation(h, self.activations[0])
+        # 转成 (K, N, H) 连续布局：np.matmul 对非连续的批量输入不走 BLAS
+        h = np.ascontiguousarray(h.reshape(n, self.k, self._h0).transpose(1, 0, 2))
+        for w, b, act in zip(self._weights, self._biases, self.activations[1:]):
+            h = np.matmul(h, w)
+            h += b
+            _apply_activation(h, act)
+        return h
+
+    def member_proba(self, x: np.ndarray, mask: Optional[np.ndarray] = None) -> np.ndarray:
+        """全部成员的（掩码后）动作概率 (K, N, 179)"""
+        z = self.member_logits(x)
+        return np.stack([self._proba(zk, mask) for zk in z])
+
+    def _proba(self, z: np.ndarray, mask: Optional[np.ndarray]) -> np.ndarray:
+        """(K, n, 179) logits → (K, n, 179) 概率"""
+        k, n, a = z.shape
+        if mask is not None:
+            mask = np.broadcast_to(np.broadcast_to(np.asarray(mask, dtype=bool), (n, a)), (k, n, a)).reshape(k * n, a)
+        return masked_proba(z.reshape(k * n, a), mask, q_values=self.q_values).reshape(k, n, a)
+
+    def predict_proba(self, x: np.ndarray, mask: Optional[np.ndarray] = None,
+                      combine: Optional[str] = None) -> np.ndarray:
+        """
+        合并后的动作概率 (N, 179)
+
+        Args:
+            x: (N, D) 或 (D,) 观察
+            mask: 可选 (N, 179) 或 (179,) bool 掩码，先对每个成员掩码再合并
+            combine: 覆盖构造时的合并方式
+        """
+        combine = combine or self.combine
+        if combine not in COMBINE_MODES:
+            raise ValueError(f"Unknown combine mode: {combine}")
+        z = self.member_logits(x)
+        n = z.shape[1]
+        if mask is not None:
+            mask = np.broadcast_to(np.asarray(mask, dtype=bool), (n, ACTION_SPACE_SIZE))
+        out = np.empty((n, ACTION_SPACE_SIZE), dtype=np.float32)
+        # 前向整批做（大矩阵乘法效率高）；softmax 与合并按行分块，K·rows 行的中间结果留在缓存里
+        rows = max(1, _COMBINE_ROWS // self.k)
+        for start in range(0, n, rows):
+            sl = slice(start, start + rows)
+            p = self._proba(z[:, sl], None if mask is None else mask[sl])
+            if combine == "mean":
+                out[sl] = p.mean(axis=0)
+            elif combine == "vote":
+                m = p.shape[1]
+                votes = np.zeros((m, ACTION_SPACE_SIZE), dtype=np.float32)
+                np.add.at(votes, (np.tile(np.arange(m), self.k), p.argmax(axis=2).reshape(-1)), 1.0)
+                out[sl] = votes / self.k
+            else:
+                out[sl] = p[p.max(axis=2).argmax(axis=0), np.arange(p.shape[1])]
+        return out
+
+
+class EnsembleAgentImpl(SupervisedAgentImpl):
+    """
+    集成 Agent：SupervisedAgentImpl 的推理接口（predict_proba / predict_proba_batch / predict_proba_obs /
+    encode_obs），底层为 StackedPolicy；可直接挂到 InferenceServer 或 evaluate.py
+
+    config:
+        models: 成员模型路径列表（给出时构造后立即加载）
+        combine: mean / vote / max（默认 mean）
+        algorithm: SB3 .zip 成员的算法（默认 ppo）
+    """
+
+    def __init__(self, name: str = "Ensemble", config: Optional[Dict] = None):
+        super().__init__(name, config)
+        self.model_type = "ensemble"
+        self.combine = self.config.get("combine", "mean")
+        self.model_paths: List[str] = []
+        if self.config.get("models"):
+            self.load(self.config["models"])
+
+    def train(self, states: List, actions: List, **kwargs):
+        raise NotImplementedError("Ensemble members are trained separately; load them with load()")
+
+    def predict_proba_obs(self, obs: np.ndarray) -> np.ndarray:
+        n = len(obs)
+        if self._model is None or n == 0:
+            return np.ones((n, ACTION_SPACE_SIZE), dtype=np.float32) / ACTION_SPACE_SIZE
+        return self._model.predict_proba(obs, combine=self.combine).astype(np.float32)
+
+    def save(self, path: str):
+        """写成员清单（.json：models、combine），权重仍在各成员文件中；成员路径写成相对清单所在目录"""
+        base = os.path.dirname(path) or "."
+        os.makedirs(base, exist_ok=True)
+        models = [os.path.relpath(os.path.abspath(p), os.path.abspath(base)) for p in self.model_paths]
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"models": models, "combine": self.combine}, f, ensure_ascii=False, indent=2)
+        logger.info(f"[{self.name}] Ensemble manifest ({len(self.model_paths)} models) saved to {path}")
+
+    def load(self, path: Union[str, Sequence[str]]):
+        """
+        加载成员：.json 清单、路径列表，或逗号分隔的路径字符串（evaluate.py --model a.npz,b.flat）
+        """
+        if isinstance(path, str) and path.endswith(".json"):
+            with open(path, "r", encoding="utf-8") as f:
+                manifest = json.load(f)
+            base = os.path.dirname(path)
+            paths = [p if os.path.isabs(p) else os.path.join(base, p) for p in manifest["models"]]
+            self.combine = manifest.get("combine", self.combine)
+        elif isinstance(path, str):
+            paths = [p for p in path.split(",") if p]
+        else:
+            paths = list(path)
+
+        self._model = StackedPolicy.from_files(paths, self.combine, self.config.get("algorithm", "ppo"))
+        self.model_paths = paths
+        self._encoder_encode_fn = self._model.encode
+        self._encoder_output_dim = self._model.input_dim
+        logger.info(f"[{self.name}] Loaded {self._model.k} models (combine: {self.combine}, "
+                    f"encoder: {self._model.encoder})")
+
+    def get_model_path(self) -> str:
+        return os.path.splitext(super().get_model_path())[0] + ".json"
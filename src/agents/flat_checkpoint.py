@@ -0,0 +1,216 @@
+#!/usr/bin/env python3
+"""
+扁平检查点格式（.flat）：JSON 头 + float32 权重块，读取时 np.memmap
+
+SupervisedAgentImpl.save 把整个模型对象连同编码器函数 pickle 下来，RLAgentImpl.save 是 SB3 zip：
+加载要反序列化任意对象，每个评估进程各持一份权重拷贝。.flat 只有数据：
+- 读取用 np.memmap 映射权重块，NumpyPolicy 的各层权重是映射上的只读视图，不复制；
+  同机多个进程加载同一文件时共享一份页缓存，加载耗时与模型大小基本无关
+- 头部记录网络结构、编码器布局哈希与动作空间大小，加载时与当前代码比对，
+  编码器维度 / 区块布局改动后旧模型会直接报错，而不是静默地输出错位的概率
+- 写入先写临时文件再 os.replace：正在映射旧文件的进程不受影响
+
+文件布局（小端）：
+    [0:8)    魔数 b"STSFLAT\\0"
+    [8:16)   uint64 头部 JSON 字节数 H
+    [16:16+H) 头部 JSON（utf-8）
+    填充到 64 字节对齐
+    权重块   float32，各张量起点同样 64 字节对齐（偏移以元素计，见头部 tensors）
+
+头部 JSON：
+    format_version, action_space_size, input_dim,
+    encoder, encoder_layout_hash,
+    architecture: {activations, output, classes}
+    tensors: [{name: "W0" / "b0" / ..., shape, offset}],
+    blob_offset（字节）, blob_size（元素数）, crc32（权重块校验，load_flat(verify=True) 时检查）, source
+
+用法：
+    from src.agents.flat_checkpoint import save_flat, load_flat, convert_to_flat
+    convert_to_flat("models/sl_model.pkl", "models/sl_model.flat")
+    policy = load_flat("models/sl_model.flat")     # NumpyPolicy，权重为 memmap 视图
+"""
+import os
+import json
+import zlib
+import struct
+import hashlib
+import logging
+from typing import Any, Dict
+
+import numpy as np
+
+from src.core.action import ACTION_SPACE_SIZE
+from src.agents.numpy_policy import NumpyPolicy
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"STSFLAT\0"
+FORMAT_VERSION = 1
+FLAT_SUFFIX = ".flat"
+ALIGN_BYTES = 64
+
+_ALIGN_ELEMS = ALIGN_BYTES // 4
+_PREFIX = struct.Struct("<8sQ")
+
+
+def _align(n: int, a: int) -> int:
+    return (n + a - 1) // a * a
+
+
+def is_flat_checkpoint(path: str) -> bool:
+    """按扩展名判断（不打开文件）"""
+    return str(path).endswith(FLAT_SUFFIX)
+
+
+def encoder_layout_hash(encoder: str) -> str:
+    """
+    编码器布局哈希（16 位十六进制）
+
+    encoder：输出维度、各区块范围、卡牌池划分、实体维度与归一化上限（encoder_dims 中的常量）；
+    encoder_mvp：输出维度。任何一项改动都会使旧检查点的哈希对不上。
+    """
+    if encoder == "encoder_mvp":
+        from src.training import encoder_mvp
+        layout: Dict[str, Any] = {"output_dim": encoder_mvp.OUTPUT_DIM}
+    elif encoder == "encoder":
+        from src.training import encoder_dims as d
+        layout = {
+            "output_dim": d.OUTPUT_DIM,
+            "blocks": [[start, end] for start, end, _ in d.BLOCK_RANGES],
+            "card_pool": d.CARD_POOL,
+            "dims": {k: getattr(d, k) for k in sorted(dir(d)) if k.endswith("_DIM") and not k.startswith("BLOCK")},
+            "caps": {k: getattr(d, k) for k in sorted(dir(d)) if k.startswith("MAX_")},
+        }
+    else:
+        raise ValueError(f"Unknown encoder: {encoder}")
+    payload = json.dumps({"encoder": encoder, **layout}, sort_keys=True, ensure_ascii=True)
+    return hashlib.sha256(payload.encode()).hexdigest()[:16]
+
+
+def save_flat(policy: NumpyPolicy, path: str):
+    """把 NumpyPolicy 写成 .flat（原子替换）"""
+    tensors = []
+    arrays = []
+    offset = 0
+    for i, (w, b) in enumerate(zip(policy.weights, policy.biases)):
+        for name, arr in ((f"W{i}", w), (f"b{i}", b)):
+            offset = _align(offset, _ALIGN_ELEMS)
+            tensors.append({"name": name, "shape": list(arr.shape), "offset": offset})
+            arrays.append((offset, arr))
+            offset += arr.size
+    blob = np.zeros(_align(offset, _ALIGN_ELEMS), dtype="<f4")
+    for start, arr in arrays:
+        blob[start:start + arr.size] = arr.reshape(-1)
+
+    header = {
+        "format_version": FORMAT_VERSION,
+        "action_space_size": ACTION_SPACE_SIZE,
+        "input_dim": policy.input_dim,
+        "encoder": policy.encoder,
+        "encoder_layout_hash": encoder_layout_hash(policy.encoder),
+        "architecture": {
+            "activations": policy.activations,
+            "output": policy.output,
+            "classes": None if policy.classes is None else policy.classes.tolist(),
+        },
+        "tensors": tensors,
+        "blob_size": int(blob.size),
+        "crc32": zlib.crc32(blob.tobytes()),
+        "source": policy.source,
+    }
+    # blob_offset 依赖头部长度：先按占位算一次，再写入真实值（数字位数变化时重算）
+    blob_offset = 0
+    while True:
+        header["blob_offset"] = blob_offset
+        raw = json.dumps(header, ensure_ascii=False).encode("utf-8")
+        needed = _align(_PREFIX.size + len(raw), ALIGN_BYTES)
+        if needed == blob_offset:
+            break
+        blob_offset = needed
+
+    tmp = f"{path}.tmp{os.getpid()}"
+    with open(tmp, "wb") as f:
+        f.write(_PREFIX.pack(MAGIC, len(raw)))
+        f.write(raw)
+        f.write(b"\0" * (blob_offset - _PREFIX.size - len(raw)))
+        f.write(blob.tobytes())
+    os.replace(tmp, path)
+    logger.info(f"[FlatCheckpoint] Saved {len(policy.weights)} layers ({blob.nbytes / 2 ** 20:.1f} MB) to {path}")
+
+
+def read_header(path: str) -> Dict[str, Any]:
+    """只读头部 JSON（不映射权重）"""
+    with open(path, "rb") as f:
+        prefix = f.read(_PREFIX.size)
+        if len(prefix) < _PREFIX.size:
+            raise ValueError(f"Not a flat checkpoint: {path}")
+        magic, length = _PREFIX.unpack(prefix)
+        if magic != MAGIC:
+            raise ValueError(f"Not a flat checkpoint: {path}")
+        header = json.loads(f.read(length).decode("utf-8"))
+    if header.get("format_version", 1) > FORMAT_VERSION:
+        raise ValueError(f"Unsupported flat checkpoint version: {header['format_version']}")
+    return header
+
+
+def load_flat(path: str, check_layout: bool = True, verify: bool = False) -> NumpyPolicy:
+    """
+    映射 .flat 为 NumpyPolicy（权重为只读 memmap 视图）
+
+    Args:
+        check_layout: 比对动作空间大小与编码器布局哈希，不一致时报 ValueError
+        verify: 校验权重块 CRC32（会读入整个文件）
+    """
+    header = read_header(path)
+    if check_layout:
+        if header["action_space_size"] != ACTION_SPACE_SIZE:
+            raise ValueError(f"{path}: action space {header['action_space_size']} != {ACTION_SPACE_SIZE}")
+        expected = encoder_layout_hash(header["encoder"])
+        if header["encoder_layout_hash"] != expected:
+            raise ValueError(f"{path}: encoder layout hash {header['encoder_layout_hash']} does not match "
+                             f"current {header['encoder']} ({expected}); re-export the checkpoint")
+
+    blob = np.memmap(path, dtype="<f4", mode="r", offset=header["blob_offset"], shape=(header["blob_size"],))
+    if verify and zlib.crc32(blob) != header["crc32"]:
+        raise ValueError(f"{path}: weight blob checksum mismatch")
+    views = {}
+    for t in header["tensors"]:
+        size = int(np.prod(t["shape"]))
+        views[t["name"]] = blob[t["offset"]:t["offset"] + size].reshape(t["shape"])
+    arch = header["architecture"]
+    n = len(arch["activations"])
+    return NumpyPolicy([views[f"W{i}"] for i in range(n)], [views[f"b{i}"] for i in range(n)],
+                       arch["activations"], output=arch["output"], classes=arch["classes"],
+                       encoder=header["encoder"], source=header.get("source", ""))
+
+
+# ==================== 转换 ====================
+
+def load_any_policy(path: str, algorithm: str = "ppo") -> NumpyPolicy:
+    """
+    把已有格式读成 NumpyPolicy：.flat / .npz 直接读取，SupervisedAgentImpl 的 .pkl（sklearn / pytorch /
+    numpy）与 SB3 .zip 走 numpy_policy 中的导出逻辑
+    """
+    from src.agents import numpy_policy
+
+    path = str(path)
+    if is_flat_checkpoint(path):
+        return load_flat(path, check_layout=False)
+    if path.endswith(".npz"):
+        return NumpyPolicy.load(path)
+    if path.endswith(".zip"):
+        return numpy_policy.policy_from_sb3_file(path, algorithm)
+    return numpy_policy.policy_from_supervised_file(path)
+
+
+def convert_to_flat(src_path: str, dst_path: str, algorithm: str = "ppo") -> NumpyPolicy:
+    """.pkl / .zip / .npz → .flat；返回转换后（映射读取）的策略"""
+    save_flat(load_any_policy(src_path, algorithm), dst_path)
+    return load_flat(dst_path)
+
+
+def convert_from_flat(src_path: str, dst_path: str) -> NumpyPolicy:
+    """.flat → .npz（给只认 .npz 的旧工具）"""
+    policy = load_flat(src_path, check_layout=False)
+    policy.save(dst_path)
+    return policy
@@ -0,0 +1,270 @@
+#!/usr/bin/env python3
+"""
+进程内微批推理服务：多个 Agent / 评估器共享一份模型
+
+评估与多局采集里每个 Agent 各持一份模型、每次 batch=1 前向。InferenceServer 持有一个
+SupervisedAgentImpl / RLAgentImpl（或任何提供 predict_proba_obs 的 Agent），后台线程从队列取
+(obs, mask) 请求，凑成微批后做一次前向：
+- 攒满 max_batch、所有在线 InferenceClient 都已提交，或最早的请求已等待 max_wait_ms，即刻执行
+- 结果（掩码后 argmax 的动作 ID，可选附带概率）通过 concurrent.futures.Future 返回
+- 编码在调用方线程完成（InferenceClient.select_action），服务线程只做前向与掩码
+
+用法：
+    agent = create_agent("rl", "Shared"); agent.load("models/ppo.npz")
+    with InferenceServer(agent, max_batch=32, max_wait_ms=2) as server:
+        clients = [server.client(f"Eval-{i}") for i in range(8)]   # 各线程一个
+        action = clients[0].select_action(state)
+    print(server.get_stats())   # 批大小分布、排队 / 总延迟分位数
+"""
+import time
+import queue
+import logging
+import threading
+from collections import Counter, deque
+from concurrent.futures import Future
+from typing import Dict, Any, Optional
+
+import numpy as np
+
+from src.agents.base import Agent
+from src.core.action import Action, ACTION_SPACE_SIZE
+from src.core.game_state import GameState
+
+logger = logging.getLogger(__name__)
+
+_STOP = object()
+
+
+class _Request:
+    __slots__ = ("obs", "mask", "future", "with_proba", "t_submit")
+
+    def __init__(self, obs, mask, with_proba):
+        self.obs = obs
+        self.mask = mask
+        self.future = Future()
+        self.with_proba = with_proba
+        self.t_submit = time.perf_counter()
+
+
+class InferenceServer:
+    """
+    动态微批推理服务
+
+    Args:
+        agent: 提供 encode_obs / predict_proba_obs 的 Agent（SupervisedAgentImpl / RLAgentImpl）
+        max_batch: 单批最大请求数
+        max_wait_ms: 批中最早请求的最长等待（毫秒），到期即前向
+        latency_window: 延迟统计保留的最近请求数
+    """
+
+    def __init__(self, agent: Agent, max_batch: int = 32, max_wait_ms: float = 2.0,
+                 latency_window: int = 100_000, name: str = "InferenceServer"):
+        if not hasattr(agent, "predict_proba_obs"):
+            raise TypeError(f"{type(agent).__name__} has no predict_proba_obs; "
+                            f"use SupervisedAgentImpl / RLAgentImpl")
+        self.agent = agent
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1e3
+        self.name = name
+        self._queue: "queue.SimpleQueue" = queue.SimpleQueue()
+        self._thread: Optional[threading.Thread] = None
+        self._running = False
+        self._clients = 0
+        self._clients_lock = threading.Lock()
+
+        self._batch_sizes: Counter = Counter()
+        self._queue_ms: deque = deque(maxlen=latency_window)
+        self._total_ms: deque = deque(maxlen=latency_window)
+        self._forward_ms = 0.0
+        self._flush_reasons: Counter = Counter()
+
+    # ==================== 生命周期 ====================
+
+    def start(self) -> "InferenceServer":
+        if self._running:
+            return self
+        self._running = True
+        self._thread = threading.Thread(target=self._loop, name=self.name, daemon=True)
+        self._thread.start()
+        logger.info(f"[{self.name}] 启动：max_batch={self.max_batch} max_wait={self.max_wait * 1e3:.1f} ms")
+        return self
+
+    def stop(self, timeout: float = 5.0):
+        """停止服务线程；队列中剩余的请求仍会被处理完"""
+        if not self._running:
+            return
+        self._running = False
+        self._queue.put(_STOP)
+        self._thread.join(timeout)
+        self._thread = None
+
+    def __enter__(self) -> "InferenceServer":
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    # ==================== 请求 ====================
+
+    def submit(self, obs: np.ndarray, mask: Optional[np.ndarray] = None, with_proba: bool = False) -> Future:
+        """
+        提交一条推理请求
+
+        Args:
+            obs: (D,) 已编码的观察
+            mask: (179,) 合法动作掩码（None=不掩码）
+            with_proba: 结果是否附带 (179,) 概率
+
+        Returns:
+            Future：结果为动作 ID（with_proba 时为 (动作 ID, 概率)）
+        """
+        if not self._running:
+            raise RuntimeError(f"[{self.name}] not started")
+        req = _Request(np.asarray(obs, dtype=np.float32), mask, with_proba)
+        self._queue.put(req)
+        return req.future
+
+    def client(self, name: str = "InferenceClient") -> "InferenceClient":
+        """创建共享本服务模型的 Agent（在线 client 数用于提前凑满批；不再使用时调用 close()）"""
+        with self._clients_lock:
+            self._clients += 1
+        return InferenceClient(self, name)
+
+    def _release_client(self):
+        with self._clients_lock:
+            self._clients -= 1
+
+    # ==================== 服务线程 ====================
+
+    def _collect(self, first: _Request) -> list:
+        """以 first 开批，直到攒满、所有在线 client 都已提交，或 first 等待到期"""
+        batch = [first]
+        deadline = first.t_submit + self.max_wait
+        while len(batch) < self.max_batch:
+            # 每个 client 同一时刻至多一个请求在等待：都到齐了就不必再等
+            if 0 < self._clients <= len(batch):
+                self._flush_reasons["all_clients"] += 1
+                return batch
+            remaining = deadline - time.perf_counter()
+            try:
+                req = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                self._flush_reasons["max_wait"] += 1
+                return batch
+            if req is _STOP:
+                self._queue.put(_STOP)
+                self._flush_reasons["stop"] += 1
+                return batch
+            batch.append(req)
+        self._flush_reasons["max_batch"] += 1
+        return batch
+
+    def _loop(self):
+        while True:
+            first = self._queue.get()
+            if first is _STOP:
+                if not self._running:
+                    # 处理完 STOP 之后才到达的请求
+                    while True:
+                        try:
+                            req = self._queue.get_nowait()
+                        except queue.Empty:
+                            return
+                        if req is not _STOP:
+                            self._run([req])
+                continue
+            self._run(self._collect(first))
+
+    def _run(self, batch: list):
+        t_start = time.perf_counter()
+        try:
+            x = np.stack([r.obs for r in batch])
+            proba = self.agent.predict_proba_obs(x)
+            masked = np.where(self._stack_masks(batch), proba, -np.inf)
+            actions = masked.argmax(axis=1)
+            # 掩码全部为 False（或概率为 0）的行退回未掩码 argmax
+            bad = ~np.isfinite(masked.max(axis=1))
+            actions[bad] = proba[bad].argmax(axis=1)
+        except Exception as e:
+            logger.exception(f"[{self.name}] batch inference failed: {e}")
+            for r in batch:
+                r.future.set_exception(e)
+            return
+        t_done = time.perf_counter()
+
+        for i, r in enumerate(batch):
+            a = int(actions[i])
+            r.future.set_result((a, proba[i]) if r.with_proba else a)
+            self._queue_ms.append((t_start - r.t_submit) * 1e3)
+            self._total_ms.append((t_done - r.t_submit) * 1e3)
+        self._batch_sizes[len(batch)] += 1
+        self._forward_ms += (t_done - t_start) * 1e3
+
+    @staticmethod
+    def _stack_masks(batch: list) -> np.ndarray:
+        masks = np.ones((len(batch), ACTION_SPACE_SIZE), dtype=bool)
+        for i, r in enumerate(batch):
+            if r.mask is not None:
+                masks[i] = r.mask
+        return masks
+
+    # ==================== 统计 ====================
+
+    def get_stats(self) -> Dict[str, Any]:
+        """批大小分布、排队延迟（提交 → 开始前向）与总延迟（提交 → 结果）分位数"""
+        batches = sum(self._batch_sizes.values())
+        requests = sum(k * v for k, v in self._batch_sizes.items())
+        stats = {
+            "requests": requests,
+            "batches": batches,
+            "mean_batch": requests / batches if batches else 0.0,
+            "batch_sizes": dict(sorted(self._batch_sizes.items())),
+            "flush_reasons": dict(self._flush_reasons),
+            "forward_ms_per_batch": self._forward_ms / batches if batches else 0.0,
+        }
+        for key, values in (("queue_ms", self._queue_ms), ("total_ms", self._total_ms)):
+            if values:
+                arr = np.fromiter(values, dtype=np.float64, count=len(values))
+                stats[key] = {f"p{q}": float(np.percentile(arr, q)) for q in (50, 90, 99)}
+                stats[key]["max"] = float(arr.max())
+        return stats
+
+    def reset_stats(self):
+        self._batch_sizes.clear()
+        self._queue_ms.clear()
+        self._total_ms.clear()
+        self._forward_ms = 0.0
+        self._flush_reasons.clear()
+
+
+class InferenceClient(Agent):
+    """
+    经 InferenceServer 决策的轻量 Agent（不持有模型）
+
+    select_action 在调用方线程编码状态与构建动作掩码，阻塞等待服务返回掩码后的 argmax。
+    """
+
+    def __init__(self, server: InferenceServer, name: str = "InferenceClient"):
+        super().__init__(name)
+        self.server = server
+
+    def select_action(self, state: GameState) -> Action:
+        from src.env.action_mask import build_action_mask
+
+        obs = self.server.agent.encode_obs(state)
+        action_id = self.server.submit(obs, build_action_mask(state)).result()
+        return Action.from_id(action_id)
+
+    def get_action_probabilities(self, state: GameState) -> np.ndarray:
+        _, proba = self.server.submit(self.server.agent.encode_obs(state), None, with_proba=True).result()
+        return proba
+
+    def set_training_mode(self, training: bool):
+        """共享模型只做推理"""
+        self._training_mode = False
+
+    def close(self):
+        """退出服务的在线 client 计数（不影响其他 client）"""
+        if self.server is not None:
+            self.server._release_client()
+            self.server = None
@@ -0,0 +1,325 @@
+#!/usr/bin/env python3
+"""
+MCTS Agent：在严格的时间预算内对本回合出牌做蒙特卡洛树搜索
+
+- 前向模型：SilentCombatSim.from_frame 由 Mod 帧重建战斗，每次迭代 clone 并重洗抽牌堆（确定化）
+- 树：PUCT 选择；叶子价值 = 结束回合（怪物行动）后的局面评估，可选再随机推演若干回合
+- 先验：load() 加载监督学习模型（.pkl / .npz）后用其动作概率作为 PUCT 先验，否则均匀
+- 置换表：以结构化状态哈希（手牌多重集、能量、双方数值、怪物招式）为键，
+  不同出牌顺序到达同一局面共用一个节点；同一回合的后续决策直接复用已有子树
+- 时间预算：从收到状态开始计时（含重建前向模型），到期即停止迭代并按访问次数出牌
+
+非战斗出牌（选牌、奖励、商店等）与模拟器不支持的战斗（未实现的怪物）沿用 RuleBasedAgentImpl。
+"""
+import math
+import time
+import random
+import logging
+from typing import Dict, Any, Optional, Tuple
+
+import numpy as np
+
+from src.agents.rule_based import RuleBasedAgentImpl
+from src.core.action import Action, ACTION_END_ID, MAX_HAND_SIZE, MAX_MONSTERS
+from src.core.game_state import GameState
+
+logger = logging.getLogger(__name__)
+
+END = None  # 结束回合的边
+
+
+class _Node:
+    """树节点：边为 (卡牌键, 目标) 或 END"""
+    __slots__ = ("actions", "priors", "n", "edge_n", "edge_w")
+
+    def __init__(self, actions: list, priors: np.ndarray):
+        self.actions = actions
+        self.priors = priors
+        self.n = 0
+        self.edge_n = [0] * len(actions)
+        self.edge_w = [0.0] * len(actions)
+
+
+def _card_key(c) -> tuple:
+    return c.spec.id, c.cost, c.free
+
+
+def state_key(sim) -> int:
+    """结构化状态哈希：与手牌顺序、抽牌堆顺序无关"""
+    return hash((
+        sim.turn, sim.energy, sim.player_hp, sim.player_block,
+        tuple(sorted(sim.player_powers.items())),
+        tuple(sorted(_card_key(c) for c in sim.hand)),
+        len(sim.draw_pile), len(sim.discard_pile), len(sim.exhaust_pile), sim.discarded_this_turn,
+        tuple((m.id, m.hp, m.block, m.move, m.is_gone, tuple(sorted(m.powers.items()))) for m in sim.monsters),
+    ))
+
+
+class MCTS:
+    """
+    带置换表的 anytime 蒙特卡洛树搜索
+
+    Args:
+        budget_ms: 单次决策的墙钟预算（毫秒）
+        c_puct: PUCT 探索系数
+        rollout_turns: 叶子结束回合后再随机推演的回合数（0=只评估怪物行动后的局面）
+        max_nodes: 置换表上限（超过时清空）
+        prior_fn: frame → (179,) 动作概率；None 时均匀先验
+        prior_depth: 只在前 N 层节点上调用 prior_fn（每次调用需生成帧并编码）
+    """
+
+    def __init__(self, budget_ms: float = 30.0, c_puct: float = 1.5, rollout_turns: int = 0,
+                 max_nodes: int = 200_000, prior_fn=None, prior_depth: int = 2, seed: int = 0):
+        self.budget_ms = budget_ms
+        self.c_puct = c_puct
+        self.rollout_turns = rollout_turns
+        self.max_nodes = max_nodes
+        self.prior_fn = prior_fn
+        self.prior_depth = prior_depth
+        self.rng = random.Random(seed)
+        self.table: Dict[int, _Node] = {}
+        self._table_tag = None
+        self._stats = {"decisions": 0, "iterations": 0, "nodes": 0, "lookups": 0, "hits": 0,
+                       "reused_root_visits": 0, "search_ms": 0.0, "max_decision_ms": 0.0}
+
+    # ==================== 对外接口 ====================
+
+    def search(self, frame: Dict[str, Any], t0: Optional[float] = None) -> Optional[Tuple[int, int]]:
+        """
+        对当前战斗帧搜索，返回 (手牌下标, 目标怪物下标 / -1)，结束回合返回 (-1, -1)
+
+        Args:
+            frame: Mod 战斗帧
+            t0: 计时起点（perf_counter，默认现在）
+
+        Returns:
+            None 表示模拟器无法重建该战斗
+        """
+        from src.env.silent_sim import SilentCombatSim
+
+        t0 = time.perf_counter() if t0 is None else t0
+        deadline = t0 + self.budget_ms / 1e3
+        try:
+            root_sim = SilentCombatSim.from_frame(frame, seed=self.rng.getrandbits(32))
+        except (ValueError, KeyError) as e:
+            logger.debug(f"[MCTS] 无法重建战斗，回退规则: {e}")
+            return None
+        if root_sim.done:
+            return None
+
+        # 回合或战斗变了，旧节点不会再被访问
+        tag = (root_sim.turn, tuple(m.id for m in root_sim.monsters))
+        if tag != self._table_tag or len(self.table) > self.max_nodes:
+            self.table.clear()
+            self._table_tag = tag
+        max_hp_total = sum(m.max_hp for m in root_sim.monsters) or 1
+
+        key = state_key(root_sim)
+        root = self.table.get(key)
+        self._stats["lookups"] += 1
+        if root is not None:
+            self._stats["hits"] += 1
+            self._stats["reused_root_visits"] += root.n
+        else:
+            root = self._expand(root_sim, key, depth=0)
+
+        iterations = 0
+        t_search = time.perf_counter()
+        while True:
+            self._iterate(root_sim, root, max_hp_total)
+            iterations += 1
+            if time.perf_counter() >= deadline:
+                break
+        elapsed = time.perf_counter() - t0
+
+        s = self._stats
+        s["decisions"] += 1
+        s["iterations"] += iterations
+        s["search_ms"] += (time.perf_counter() - t_search) * 1e3
+        s["max_decision_ms"] = max(s["max_decision_ms"], elapsed * 1e3)
+
+        best = max(range(len(root.actions)), key=lambda i: (root.edge_n[i], root.priors[i]))
+        action = root.actions[best]
+        if action is END:
+            return -1, -1
+        ckey, target = action
+        index = next(i for i, c in enumerate(root_sim.hand) if _card_key(c) == ckey)
+        return index, target
+
+    def get_stats(self) -> Dict[str, Any]:
+        s = dict(self._stats)
+        secs = s["search_ms"] / 1e3
+        s["nodes_per_sec"] = s["nodes"] / secs if secs else 0.0
+        s["iterations_per_sec"] = s["iterations"] / secs if secs else 0.0
+        s["table_hit_rate"] = s["hits"] / s["lookups"] if s["lookups"] else 0.0
+        s["table_size"] = len(self.table)
+        return s
+
+    def reset(self):
+        """清空置换表（新战斗）"""
+        self.table.clear()
+        self._table_tag = None
+
+    # ==================== 搜索 ====================
+
+    def _legal_actions(self, sim) -> list:
+        actions = []
+        seen = set()
+        targets = [i for i, m in enumerate(sim.monsters[:MAX_MONSTERS]) if m.alive]
+        for c in sim.hand[:MAX_HAND_SIZE]:
+            k = _card_key(c)
+            if k in seen or not sim.card_playable(c):
+                continue
+            seen.add(k)
+            if c.spec.target:
+                actions.extend((k, t) for t in targets)
+            else:
+                actions.append((k, -1))
+        actions.append(END)
+        return actions
+
+    def _expand(self, sim, key: int, depth: int) -> _Node:
+        actions = self._legal_actions(sim)
+        priors = np.full(len(actions), 1.0 / len(actions))
+        if self.prior_fn is not None and depth < self.prior_depth:
+            proba = self.prior_fn(sim.frame())
+            first = {}
+            for i, c in enumerate(sim.hand):
+                first.setdefault(_card_key(c), i)
+            ids = [ACTION_END_ID if a is END else first[a[0]] + (a[1] + 1) * 10 for a in actions]
+            p = np.asarray(proba, dtype=np.float64)[ids] + 1e-3
+            priors = p / p.sum()
+        node = _Node(actions, priors)
+        self.table[key] = node
+        self._stats["nodes"] += 1
+        return node
+
+    def _select(self, node: _Node) -> int:
+        sqrt_n = math.sqrt(node.n + 1)
+        fpu = sum(node.edge_w) / node.n if node.n else 0.5
+        best, best_score = 0, -math.inf
+        c = self.c_puct
+        for i, p in enumerate(node.priors):
+            n = node.edge_n[i]
+            q = node.edge_w[i] / n if n else fpu
+            score = q + c * p * sqrt_n / (1 + n)
+            if score > best_score:
+                best, best_score = i, score
+        return best
+
+    def _iterate(self, root_sim, root: _Node, max_hp_total: int):
+        sim = root_sim.clone(seed=self.rng.getrandbits(32))
+        sim.rng.shuffle(sim.draw_pile)
+        path = []
+        node = root
+        depth = 0
+        while True:
+            i = self._select(node)
+            path.append((node, i))
+            action = node.actions[i]
+            if action is END:
+                sim.end_turn()
+                value = self._rollout(sim, max_hp_total)
+                break
+            ckey, target = action
+            index = next(j for j, c in enumerate(sim.hand) if _card_key(c) == ckey)
+            sim.play_card(index, target)
+            depth += 1
+            if sim.done:
+                value = self._value(sim, max_hp_total)
+                break
+            key = state_key(sim)
+            child = self.table.get(key)
+            self._stats["lookups"] += 1
+            if child is None:
+                self._expand(sim, key, depth)
+                end = sim.clone()
+                end.end_turn()
+                value = self._rollout(end, max_hp_total)
+                break
+            self._stats["hits"] += 1
+            node = child
+
+        for n, i in path:
+            n.n += 1
+            n.edge_n[i] += 1
+            n.edge_w[i] += value
+
+    def _rollout(self, sim, max_hp_total: int) -> float:
+        """随机推演 rollout_turns 回合（70% 出一张随机可出的牌，否则结束回合）后评估"""
+        rng = sim.rng
+        for _ in range(self.rollout_turns):
+            if sim.done:
+                break
+            for _ in range(MAX_HAND_SIZE):
+                playable = [i for i, c in enumerate(sim.hand) if sim.card_playable(c)]
+                if not playable or rng.random() >= 0.7:
+                    break
+                sim.play_card(rng.choice(playable), -1)
+                if sim.done:
+                    break
+            sim.end_turn()
+        return self._value(sim, max_hp_total)
+
+    @staticmethod
+    def _value(sim, max_hp_total: int) -> float:
+        """局面价值 ∈ [0, 1]：胜 0.9 + 剩余血量；负 0；否则血量与怪物剩余（中毒按未来总伤害折半）"""
+        hp_frac = max(sim.player_hp, 0) / sim.max_hp
+        if sim.player_hp <= 0:
+            return 0.0
+        if not any(m.alive for m in sim.monsters):
+            return 0.9 + 0.1 * hp_frac
+        left = 0.0
+        for m in sim.monsters:
+            if m.alive:
+                p = m.powers.get("Poison", 0)
+                left += max(0.0, m.hp + 0.5 * m.block - 0.25 * p * (p + 1))
+        return 0.55 * hp_frac + 0.35 * (1.0 - min(left / max_hp_total, 1.0))
+
+
+class MCTSAgentImpl(RuleBasedAgentImpl):
+    """
+    MCTS Agent：战斗出牌用 MCTS，其余决策沿用规则 Agent
+
+    config:
+        mcts_budget_ms: 单次决策墙钟预算（默认 30）
+        mcts_c_puct / mcts_rollout_turns / mcts_max_nodes / mcts_prior_depth / seed
+    """
+
+    def __init__(self, name: str = "MCTS", config: Optional[Dict] = None):
+        super().__init__(name, config)
+        self._prior_agent = None
+        self.mcts = MCTS(
+            budget_ms=self.config.get("mcts_budget_ms", 30.0),
+            c_puct=self.config.get("mcts_c_puct", 1.5),
+            rollout_turns=self.config.get("mcts_rollout_turns", 0),
+            max_nodes=self.config.get("mcts_max_nodes", 200_000),
+            prior_depth=self.config.get("mcts_prior_depth", 2),
+            seed=self.config.get("seed", 0),
+        )
+
+    def load(self, path: str):
+        """加载监督学习模型（.pkl / .npz）作为 PUCT 先验"""
+        from src.agents.supervised import SupervisedAgentImpl
+
+        logger.info(f"[{self.name}] Loading prior model from {path}")
+        agent = SupervisedAgentImpl(f"{self.name}.prior")
+        agent.load(path)
+        agent.set_training_mode(False)
+        self._prior_agent = agent
+        self.mcts.prior_fn = agent.predict_proba
+
+    def _decide_combat_action(self, state: GameState) -> Action:
+        t0 = time.perf_counter()
+        frame = state.raw_response if state.raw_response is not None else state.to_mod_response()
+        result = self.mcts.search(frame, t0=t0)
+        if result is None:
+            return super()._decide_combat_action(state)
+        index, target = result
+        if index < 0:
+            return Action.end_turn()
+        return Action.play_card(index, target + 1 if target >= 0 else 0)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """搜索统计：nodes/sec、置换表命中率、复用的根节点访问数等"""
+        return self.mcts.get_stats()
@@ -0,0 +1,381 @@
+#!/usr/bin/env python3
+"""
+纯 NumPy 策略推理
+
+把训练好的 MLP 策略网络导出为扁平权重文件（.npz，无 pickle），实时决策时只用 NumPy 前向，
+不导入 torch / sklearn / SB3（Mod 要求约 10 秒内 ready，且逐帧调用框架有固定开销）。
+
+支持的来源：
+- PyTorch: _create_policy_net 生成的 nn.Sequential（Linear / ReLU / Tanh）
+- sklearn: MLPClassifier（coefs_ / intercepts_，类别列映射回 179 维动作空间）
+- SB3: PPO / A2C 的 mlp_extractor.policy_net + action_net，DQN 的 q_net
+
+文件格式（np.savez，allow_pickle=False）：
+    W0, b0, W1, b1, ...  每层 x @ W + b（W 形状为 (in, out)，float32）
+    meta                 JSON 字符串：activations（每层激活）、output（softmax / logistic / q）、
+                         classes（输出列对应的动作 ID，None 表示恒等）、encoder（encoder / encoder_mvp）、source
+
+用法：
+    from src.agents.numpy_policy import NumpyPolicy, export_supervised_model
+    export_supervised_model("models/sl_model.pkl", "models/sl_model.npz")
+    policy = NumpyPolicy.load("models/sl_model.npz")
+    probs = policy.predict_proba(x, mask)       # x: (N, D) 或 (D,)
+
+同一网络也可写成内存映射的 .flat（见 flat_checkpoint.py），多进程共享一份页缓存。
+"""
+import json
+import logging
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+
+from src.core.action import ACTION_SPACE_SIZE
+
+logger = logging.getLogger(__name__)
+
+FORMAT_VERSION = 1
+
+_ACTIVATIONS = ("identity", "relu", "tanh", "logistic")
+
+
+def _apply_activation(x: np.ndarray, name: str) -> np.ndarray:
+    """原地应用激活函数"""
+    if name == "relu":
+        np.maximum(x, 0.0, out=x)
+    elif name == "tanh":
+        np.tanh(x, out=x)
+    elif name == "logistic":
+        np.negative(x, out=x)
+        np.exp(x, out=x)
+        x += 1.0
+        np.reciprocal(x, out=x)
+    return x
+
+
+def mask_logits(z: np.ndarray, mask: Optional[np.ndarray]) -> np.ndarray:
+    """
+    非法动作的 logit 置为 -inf
+
+    Args:
+        z: (N, 179) logits / Q 值
+        mask: (N, 179) 或 (179,) bool 掩码（None=不掩码）；全部不合法的行退回未掩码
+    """
+    if mask is None:
+        return z
+    mask = np.broadcast_to(np.asarray(mask, dtype=bool), z.shape)
+    keep = mask & np.isfinite(z)
+    rows = keep.any(axis=1)
+    return np.where(keep | ~rows[:, None], z, -np.inf)
+
+
+def masked_proba(z: np.ndarray, mask: Optional[np.ndarray] = None, q_values: bool = False) -> np.ndarray:
+    """掩码后的 softmax 概率 (N, 179)；q_values=True 时概率集中在合法动作的 argmax 上"""
+    z = mask_logits(z, mask)
+    if q_values:
+        p = np.zeros_like(z)
+        p[np.arange(len(z)), z.argmax(axis=1)] = 1.0
+        return p
+    z = z - z.max(axis=1, keepdims=True)
+    p = np.exp(z)
+    p /= p.sum(axis=1, keepdims=True)
+    return p
+
+
+def sample_proba(probs: np.ndarray, rng: Optional[np.random.Generator] = None) -> np.ndarray:
+    """
+    按行从概率分布采样动作 (N,)
+
+    float64 累加并按行总和重新归一化；只会落在概率 > 0 的列上（掩码后的非法动作不会被采到），
+    舍入误差时退回该行最后一个概率 > 0 的列
+    """
+    p = np.asarray(probs, dtype=np.float64)
+    c = p.cumsum(axis=1)
+    u = (np.random.random(len(p)) if rng is None else rng.random(len(p)))[:, None] * c[:, -1:]
+    idx = (c <= u).sum(axis=1)
+    last = p.shape[1] - 1 - (p[:, ::-1] > 0).argmax(axis=1)
+    return np.minimum(idx, last)
+
+
+class NumpyPolicy:
+    """
+    纯 NumPy MLP 策略
+
+    输出统一为 179 维动作空间：classes 不为 None 时把网络输出列散射到对应动作 ID，
+    未覆盖的动作 logit 为 -inf（概率 0）。
+    """
+
+    def __init__(
+        self,
+        weights: Sequence[np.ndarray],
+        biases: Sequence[np.ndarray],
+        activations: Sequence[str],
+        output: str = "softmax",
+        classes: Optional[Sequence[int]] = None,
+        encoder: str = "encoder",
+        source: str = "",
+    ):
+        """
+        Args:
+            weights: 每层 (in, out) 权重
+            biases: 每层 (out,) 偏置
+            activations: 每层输出后的激活（最后一层一般为 identity）
+            output: softmax（logits → 概率）/ logistic（sklearn 二分类单列输出）/ q（Q 值，取 argmax）
+            classes: 输出列对应的动作 ID（sklearn 只包含训练中出现过的类别）
+            encoder: 观察编码器模块名（encoder = 2945 维，encoder_mvp = 31 维）
+            source: 来源说明
+        """
+        if not (len(weights) == len(biases) == len(activations)):
+            raise ValueError("weights, biases and activations must have the same length")
+        for a in activations:
+            if a not in _ACTIVATIONS:
+                raise ValueError(f"Unsupported activation: {a}")
+        if output not in ("softmax", "logistic", "q"):
+            raise ValueError(f"Unsupported output: {output}")
+        self.weights = [np.ascontiguousarray(w, dtype=np.float32) for w in weights]
+        self.biases = [np.ascontiguousarray(b, dtype=np.float32).reshape(-1) for b in biases]
+        self.activations = list(activations)
+        self.output = output
+        self.classes = None if classes is None else np.asarray(classes, dtype=np.int64)
+        self.encoder = encoder
+        self.source = source
+        self._encode_fn = None
+
+    @property
+    def input_dim(self) -> int:
+        return self.weights[0].shape[0]
+
+    # ==================== 前向 ====================
+
+    def forward(self, x: np.ndarray) -> np.ndarray:
+        """网络原始输出 (N, out)"""
+        h = np.asarray(x, dtype=np.float32)
+        if h.ndim == 1:
+            h = h.reshape(1, -1)
+        for w, b, act in zip(self.weights, self.biases, self.activations):
+            h = h @ w
+            h += b
+            _apply_activation(h, act)
+        return h
+
+    def logits(self, x: np.ndarray) -> np.ndarray:
+        """179 维动作 logits / Q 值 (N, 179)；网络未覆盖的动作为 -inf"""
+        out = self.forward(x)
+        if self.output == "logistic" and out.shape[1] == 1:
+            # sklearn 二分类：P(class1) = sigmoid(z)，等价于 logits [0, z] 的 softmax
+            out = np.concatenate([np.zeros_like(out), out], axis=1)
+        if self.classes is None and out.shape[1] == ACTION_SPACE_SIZE:
+            return out
+        full = np.full((out.shape[0], ACTION_SPACE_SIZE), -np.inf, dtype=np.float32)
+        cols = self.classes if self.classes is not None else np.arange(out.shape[1])
+        full[:, cols] = out
+        return full
+
+    def predict_proba(self, x: np.ndarray, mask: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        动作概率 (N, 179)
+
+        Args:
+            x: (N, D) 或 (D,) 观察
+            mask: 可选 (N, 179) 或 (179,) bool 掩码；非法动作概率为 0，
+                  全部不合法的行退回未掩码分布
+        """
+        return masked_proba(self.logits(x), mask, q_values=self.output == "q")
+
+    def predict(
+        self,
+        observation: np.ndarray,
+        state: Any = None,
+        episode_start: Any = None,
+        deterministic: bool = False,
+        action_masks: Optional[np.ndarray] = None,
+    ):
+        """与 SB3 model.predict 相同的签名：返回 (动作, None)；单个观察返回标量动作"""
+        single = np.ndim(observation) == 1
+        probs = self.predict_proba(observation, action_masks)
+        if deterministic or self.output == "q":
+            actions = probs.argmax(axis=1)
+        else:
+            actions = sample_proba(probs)
+        return (int(actions[0]) if single else actions), None
+
+    def set_training_mode(self, training: bool):
+        """与 SB3 模型接口一致；NumPy 策略无 dropout / BN，训练与推理前向相同"""
+
+    # ==================== 编码 ====================
+
+    def encode(self, mod_response: Dict[str, Any]) -> np.ndarray:
+        """用训练时的编码器编码一帧"""
+        if self._encode_fn is None:
+            if self.encoder == "encoder_mvp":
+                from src.training.encoder_mvp import encode
+            else:
+                from src.training.encoder import encode
+            self._encode_fn = encode
+        return self._encode_fn(mod_response)
+
+    # ==================== 读写 ====================
+
+    def save(self, path: str):
+        """写出扁平权重文件（.npz）"""
+        meta = {
+            "format_version": FORMAT_VERSION,
+            "activations": self.activations,
+            "output": self.output,
+            "classes": None if self.classes is None else self.classes.tolist(),
+            "encoder": self.encoder,
+            "source": self.source,
+        }
+        arrays = {"meta": np.array(json.dumps(meta))}
+        for i, (w, b) in enumerate(zip(self.weights, self.biases)):
+            arrays[f"W{i}"] = w
+            arrays[f"b{i}"] = b
+        with open(path, "wb") as f:
+            np.savez(f, **arrays)
+        logger.info(f"[NumpyPolicy] Saved {len(self.weights)} layers to {path}")
+
+    @classmethod
+    def load(cls, path: str) -> "NumpyPolicy":
+        """读取扁平权重文件"""
+        with np.load(path, allow_pickle=False) as data:
+            meta = json.loads(str(data["meta"]))
+            if meta.get("format_version", 1) > FORMAT_VERSION:
+                raise ValueError(f"Unsupported policy file version: {meta['format_version']}")
+            n = len(meta["activations"])
+            weights = [data[f"W{i}"] for i in range(n)]
+            biases = [data[f"b{i}"] for i in range(n)]
+        return cls(weights, biases, meta["activations"], output=meta["output"], classes=meta.get("classes"),
+                   encoder=meta.get("encoder", "encoder"), source=meta.get("source", ""))
+
+
+# ==================== 导出 ====================
+
+def from_torch_sequential(modules, encoder: str = "encoder", source: str = "pytorch") -> NumpyPolicy:
+    """
+    从 PyTorch 模块序列（Linear / ReLU / Tanh / Flatten / Identity）提取权重
+
+    Args:
+        modules: nn.Sequential 或模块列表
+    """
+    weights: List[np.ndarray] = []
+    biases: List[np.ndarray] = []
+    activations: List[str] = []
+    for m in modules:
+        kind = type(m).__name__
+        if kind == "Linear":
+            weights.append(m.weight.detach().cpu().numpy().T)
+            bias = m.bias.detach().cpu().numpy() if m.bias is not None else np.zeros(m.out_features)
+            biases.append(bias)
+            activations.append("identity")
+        elif kind in ("ReLU", "Tanh", "Sigmoid"):
+            if not activations or activations[-1] != "identity":
+                raise ValueError(f"Activation {kind} must follow a Linear layer")
+            activations[-1] = {"ReLU": "relu", "Tanh": "tanh", "Sigmoid": "logistic"}[kind]
+        elif kind in ("Flatten", "Identity", "Dropout", "Sequential"):
+            if kind == "Sequential":
+                sub = from_torch_sequential(m, encoder, source)
+                weights += sub.weights
+                biases += sub.biases
+                activations += sub.activations
+        else:
+            raise ValueError(f"Unsupported module for NumPy export: {kind}")
+    if not weights:
+        raise ValueError("No Linear layers found")
+    return NumpyPolicy(weights, biases, activations, output="softmax", encoder=encoder, source=source)
+
+
+def from_sklearn_mlp(model, encoder: str = "encoder_mvp") -> NumpyPolicy:
+    """从 sklearn MLPClassifier 提取权重（hidden 激活取 model.activation，输出层 softmax / logistic）"""
+    hidden_act = {"relu": "relu", "tanh": "tanh", "logistic": "logistic", "identity": "identity"}[model.activation]
+    n = len(model.coefs_)
+    activations = [hidden_act] * (n - 1) + ["identity"]
+    output = "logistic" if model.out_activation_ == "logistic" else "softmax"
+    if model.out_activation_ == "logistic" and model.coefs_[-1].shape[1] > 1:
+        raise ValueError("Multi-label MLPClassifier is not supported")
+    return NumpyPolicy(model.coefs_, model.intercepts_, activations, output=output,
+                       classes=[int(c) for c in model.classes_], encoder=encoder, source="sklearn")
+
+
+def from_sb3_model(model) -> NumpyPolicy:
+    """
+    从 SB3 模型提取策略网络
+
+    PPO / MaskablePPO / A2C：features_extractor（Flatten）→ mlp_extractor.policy_net → action_net，输出 softmax
+    DQN：q_net.q_net，输出 Q 值
+    """
+    policy = model.policy
+    if hasattr(policy, "q_net"):
+        np_policy = from_torch_sequential(policy.q_net.q_net, source=f"sb3:{type(model).__name__}")
+        np_policy.output = "q"
+        return np_policy
+    modules = list(policy.mlp_extractor.policy_net) + [policy.action_net]
+    return from_torch_sequential(modules, source=f"sb3:{type(model).__name__}")
+
+
+def policy_from_supervised_file(model_path: str) -> NumpyPolicy:
+    """读取 SupervisedAgentImpl 保存的 .pkl（sklearn / pytorch / numpy）为 NumpyPolicy"""
+    from src.agents.supervised import SupervisedAgentImpl
+
+    agent = SupervisedAgentImpl("Exporter")
+    agent.load(model_path)
+    if agent.model_type == "sklearn":
+        return from_sklearn_mlp(agent._model)
+    if agent.model_type == "pytorch":
+        return from_torch_sequential(agent._model, encoder="encoder_mvp")
+    if agent.model_type == "numpy":
+        return agent._model
+    raise ValueError(f"Cannot export model_type={agent.model_type}")
+
+
+SB3_ALGORITHMS = ("ppo", "maskable_ppo", "a2c", "dqn")
+
+
+def sb3_algorithm_class(algorithm: str = "ppo", mask_actions: bool = True):
+    """
+    算法名 → SB3 算法类（RLAgentImpl 训练 / 加载与导出共用）
+
+    ppo 且 mask_actions 时为 sb3-contrib 的 MaskablePPO（未安装时退回 PPO）；maskable_ppo 必须是 MaskablePPO
+    """
+    algorithm = algorithm.lower()
+    if algorithm not in SB3_ALGORITHMS:
+        raise ValueError(f"Unknown algorithm: {algorithm} (expected one of {SB3_ALGORITHMS})")
+    if algorithm == "maskable_ppo" or (algorithm == "ppo" and mask_actions):
+        try:
+            from sb3_contrib import MaskablePPO
+            return MaskablePPO
+        except ImportError:
+            if algorithm == "maskable_ppo":
+                raise ImportError("maskable_ppo requires sb3-contrib (pip install sb3-contrib)")
+            logger.warning("sb3-contrib not installed; using PPO")
+    import stable_baselines3
+    return getattr(stable_baselines3, algorithm.upper())
+
+
+def load_sb3_model(model_path: str, algorithm: str = "ppo", **kwargs):
+    """按 sb3_algorithm_class 加载 SB3 .zip；ppo 解析为 MaskablePPO 但文件是掩码前的 PPO 模型时退回 PPO"""
+    algo_cls = sb3_algorithm_class(algorithm)
+    try:
+        return algo_cls.load(model_path, **kwargs)
+    except Exception:
+        if algorithm.lower() != "ppo" or algo_cls.__name__ != "MaskablePPO":
+            raise
+        from stable_baselines3 import PPO
+        return PPO.load(model_path, **kwargs)
+
+
+def policy_from_sb3_file(model_path: str, algorithm: str = "ppo") -> NumpyPolicy:
+    """读取 RLAgentImpl 保存的 SB3 .zip（PPO / MaskablePPO / A2C / DQN）为 NumpyPolicy"""
+    return from_sb3_model(load_sb3_model(model_path, algorithm, device="cpu"))
+
+
+def export_supervised_model(model_path: str, output_path: str) -> NumpyPolicy:
+    """把 SupervisedAgentImpl 保存的 .pkl（sklearn / pytorch）导出为 .npz"""
+    np_policy = policy_from_supervised_file(model_path)
+    np_policy.save(output_path)
+    return np_policy
+
+
+def export_sb3_model(model_path: str, output_path: str, algorithm: str = "ppo") -> NumpyPolicy:
+    """把 RLAgentImpl 保存的 SB3 .zip 导出为 .npz"""
+    np_policy = policy_from_sb3_file(model_path, algorithm)
+    np_policy.save(output_path)
+    return np_policy
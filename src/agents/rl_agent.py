@@ -15,6 +15,7 @@ from abc import abstractmethod
 import numpy as np
 
 from src.agents.base import RLAgent
+from src.agents.numpy_policy import NumpyPolicy, sample_proba, sb3_algorithm_class, load_sb3_model
 from src.core.game_state import GameState
 from src.core.action import Action
 from src.core.config import get_config
@@ -33,14 +34,15 @@ class RLAgentImpl(RLAgent):
 
     特性：
     - Warm Start: 从 SL 模型初始化策略网络
-    - Action Masking: 只选择合法动作
+    - Action Masking: 推理在前向中掩码非法动作（select_action / select_actions / predict_proba_obs）；
+      PPO 训练用 MaskablePPO（config["mask_actions"]，默认开启），rollout 不在非法动作上浪费步数
     - 多环境并行训练
     """
 
     def __init__(self, name: str = "RL", config: Optional[Dict] = None):
         super().__init__(name, config)
         self.config = config or {}
-        self.algorithm = self.config.get("algorithm", "ppo")  # ppo, a2c, dqn
+        self.algorithm = self.config.get("algorithm", "ppo")  # ppo, maskable_ppo, a2c, dqn
 
         # RL 模型
         self._model = None
@@ -49,6 +51,9 @@ class RLAgentImpl(RLAgent):
         # 编码器（用于 Warm Start）
         self._encoder = None
 
+        # 动作采样（训练模式）
+        self._rng = np.random.default_rng(self.config.get("seed"))
+
         # 训练统计
         self._episode_rewards = []
         self._episode_lengths = []
@@ -57,6 +62,13 @@ class RLAgentImpl(RLAgent):
         # 加载编码器
         self._load_encoder()
 
+        # 离策略经验回放（learn_from_experience 写入）
+        self.replay_buffer = None
+        if self.config.get("replay_buffer"):
+            from src.training.replay_buffer import PrioritizedReplayBuffer
+            self.replay_buffer = PrioritizedReplayBuffer(obs_dim=self._encoder.get_output_dim(),
+                                                         **self.config["replay_buffer"])
+
     def _load_encoder(self):
         """加载状态编码器"""
         from src.training.encoder import StateEncoder
@@ -138,14 +150,31 @@ class RLAgentImpl(RLAgent):
         return result
 
     def _make_vec_env(self, n_envs: int):
-        """创建向量环境"""
+        """
+        创建向量环境
+
+        环境支持 clone(seed)（如 SimEnv）时创建 N 个独立实例并用 BatchedVecEnv 批量推进
+        （config["vec_env"]="shm" 时改用多进程 ShmVecEnv，子进程数由 config["n_workers"] 指定）；
+        否则（外部驱动的 StsEnvironment）只有一份状态，退回 DummyVecEnv 包装同一实例。
+        """
         try:
             from stable_baselines3.common.vec_env import DummyVecEnv, SubprocVecEnv
             from stable_baselines3.common.vec_env import VecCheckNan
 
-            # 创建多个环境实例
-            envs = [lambda: self._env for _ in range(n_envs)]
-            vec_env = DummyVecEnv(envs)
+            if hasattr(self._env, "clone"):
+                seed = self.config.get("seed", 0)
+                env_fns = [lambda i=i: self._env.clone(seed=seed + i) for i in range(n_envs)]
+                if self.config.get("vec_env") == "shm":
+                    from src.env.shm_vec_env import ShmVecEnv
+                    vec_env = ShmVecEnv(env_fns, n_workers=self.config.get("n_workers"))
+                else:
+                    from src.env.vec_env import BatchedVecEnv
+                    vec_env = BatchedVecEnv(env_fns)
+            else:
+                logger.warning(f"[{self.name}] {type(self._env).__name__} has no clone(); "
+                               f"{n_envs} vec envs will share one state")
+                envs = [lambda: self._env for _ in range(n_envs)]
+                vec_env = DummyVecEnv(envs)
 
             # 添加 NaN 检查
             vec_env = VecCheckNan(vec_env)
@@ -173,8 +202,8 @@ class RLAgentImpl(RLAgent):
         n_steps = kwargs.get("n_steps", 2048)
         batch_size = kwargs.get("batch_size", 64)
 
-        if self.algorithm == "ppo":
-            model = PPO(
+        if self.algorithm in ("ppo", "maskable_ppo"):
+            model = self._algorithm_class()(
                 "MlpPolicy",
                 env,
                 learning_rate=learning_rate,
@@ -211,9 +240,22 @@ class RLAgentImpl(RLAgent):
         else:
             raise ValueError(f"Unknown algorithm: {self.algorithm}")
 
-        logger.info(f"[{self.name}] Created {self.algorithm.upper()} model")
+        if self.algorithm in ("a2c", "dqn") and self.config.get("mask_actions", True):
+            logger.warning(f"[{self.name}] {self.algorithm.upper()} rollouts are unmasked "
+                           f"(only PPO has a maskable variant); illegal actions cost a step")
+        logger.info(f"[{self.name}] Created {type(model).__name__} model")
         return model
 
+    def _algorithm_class(self):
+        """
+        SB3 算法类
+
+        PPO 且 config["mask_actions"]（默认 True）时用 sb3-contrib 的 MaskablePPO：rollout 与更新都在
+        策略分布里按环境的 action_masks() 掩码，不采样非法动作；未安装 sb3-contrib 时退回 PPO。
+        解析规则与导出（numpy_policy.sb3_algorithm_class）相同。
+        """
+        return sb3_algorithm_class(self.algorithm, self.config.get("mask_actions", True))
+
     def _get_tensorboard_log_dir(self) -> str:
         """获取 TensorBoard 日志目录"""
         config = get_config()
@@ -284,9 +326,12 @@ class RLAgentImpl(RLAgent):
         """
         选择动作
 
+        非法动作在前向中掩码（logit 置 -inf）后再采样 / argmax，选出的动作总是合法的，
+        不会交给环境去吃 -1 惩罚、白白消耗一步。
+
         Args:
             state: 游戏状态
-            valid_actions: 合法动作索引列表（用于 action masking）
+            valid_actions: 合法动作索引列表（None 时按 build_action_mask(state) 计算）
 
         Returns:
             选择的动作
@@ -296,27 +341,50 @@ class RLAgentImpl(RLAgent):
             return Action.end_turn()
 
         # 编码状态
-        state_vec = self._encoder.encode_state(state)
-        state_vec = state_vec.reshape(1, -1)
+        state_vec = self._encoder.encode_state(state).reshape(1, -1)
+        mask = self._action_mask(state, valid_actions)
+        action_id = int(self.select_actions(state_vec, mask[None])[0])
+        return Action.from_id(action_id)
 
-        # 使用模型预测
-        if self._training_mode:
-            # 训练模式：采样（探索）
-            action_id, _ = self._model.predict(state_vec, deterministic=False)
-        else:
-            # 推理模式：确定性（利用）
-            action_id, _ = self._model.predict(state_vec, deterministic=True)
+    def select_actions(
+        self,
+        obs: np.ndarray,
+        masks: Optional[np.ndarray] = None,
+        deterministic: Optional[bool] = None,
+    ) -> np.ndarray:
+        """
+        批量选择动作：一次前向，掩码后训练模式按概率采样、推理模式取 argmax
 
-        # 应用 action masking
-        if valid_actions is not None and action_id not in valid_actions:
-            # 选择合法动作中概率最高的
-            action_id = valid_actions[0]
+        Args:
+            obs: (N, D) 观察矩阵
+            masks: (N, 179) bool 动作掩码（向量环境的 action_masks()；None=不掩码）
+            deterministic: 是否取 argmax（None=推理模式取 argmax，训练模式采样）
 
-        return Action.from_id(action_id)
+        Returns:
+            (N,) 动作 ID
+        """
+        if deterministic is None:
+            deterministic = not self._training_mode
+        probs = self.predict_proba_obs(obs, masks)
+        if deterministic:
+            return probs.argmax(axis=1)
+        return sample_proba(probs, self._rng)
+
+    @staticmethod
+    def _action_mask(state: GameState, valid_actions: Optional[List[int]] = None) -> np.ndarray:
+        """(179,) bool 掩码：给了 valid_actions 时按列表构建，否则与环境同一套 build_action_mask"""
+        from src.core.action import ACTION_SPACE_SIZE
+        from src.env.action_mask import build_action_mask
+
+        if valid_actions is None:
+            return build_action_mask(state)
+        mask = np.zeros(ACTION_SPACE_SIZE, dtype=bool)
+        mask[valid_actions] = True
+        return mask
 
     def get_action_probabilities(self, state: GameState) -> np.ndarray:
         """
-        获取动作概率分布
+        获取动作概率分布（非法动作概率为 0）
 
         Args:
             state: 游戏状态
@@ -329,23 +397,74 @@ class RLAgentImpl(RLAgent):
         if self._model is None:
             return np.ones(ACTION_SPACE_SIZE, dtype=np.float32) / ACTION_SPACE_SIZE
 
-        # 编码状态
-        state_vec = self._encoder.encode_state(state)
-        state_vec = state_vec.reshape(1, -1)
+        state_vec = self._encoder.encode_state(state).reshape(1, -1)
+        return self.predict_proba_obs(state_vec, self._action_mask(state)[None])[0]
+
+    def predict_proba_batch(self, states: List[GameState]) -> np.ndarray:
+        """
+        批量获取动作概率分布：encode_batch 编成 (N, D) 矩阵后只做一次策略网络前向，
+        build_action_masks 掩码非法动作
+
+        Args:
+            states: N 个游戏状态
+
+        Returns:
+            动作概率数组，shape=(N, ACTION_SPACE_SIZE)
+        """
+        from src.core.action import ACTION_SPACE_SIZE
+        from src.env.action_mask import build_action_masks
+
+        n = len(states)
+        if self._model is None or n == 0:
+            return np.ones((n, ACTION_SPACE_SIZE), dtype=np.float32) / ACTION_SPACE_SIZE
+        return self.predict_proba_obs(self._encoder.encode_states(states), build_action_masks(states))
+
+    def encode_obs(self, state: GameState) -> np.ndarray:
+        """编码单个状态为观察向量（与 predict_proba_obs 的输入一致）"""
+        return self._encoder.encode_state(state)
+
+    def predict_proba_obs(self, obs: np.ndarray, masks: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        对已编码的观察矩阵做一次策略网络前向（推理服务按微批调用）
+
+        Args:
+            obs: (N, D) 观察矩阵
+            masks: 可选 (N, 179) bool 动作掩码；非法动作 logit 置 -inf 后再 softmax，
+                   全部不合法的行退回未掩码分布
+
+        Returns:
+            动作概率数组，shape=(N, ACTION_SPACE_SIZE)；DQN 为合法动作中 Q 值 argmax 的 one-hot
+        """
+        from src.core.action import ACTION_SPACE_SIZE
+        from src.agents.numpy_policy import masked_proba
+
+        n = len(obs)
+        if self._model is None or n == 0:
+            return np.ones((n, ACTION_SPACE_SIZE), dtype=np.float32) / ACTION_SPACE_SIZE
+
+        if isinstance(self._model, NumpyPolicy):
+            return self._model.predict_proba(obs, masks).astype(np.float32)
 
-        # 获取概率（需要根据具体算法实现）
         try:
-            # 对于 PPO/A2C，可以从策略网络获取
-            if hasattr(self._model, 'policy'):
-                obs_tensor = self._model.policy.obs_to_tensor(state_vec)[0]
-                distribution = self._model.policy.get_distribution(obs_tensor)
-                probs = distribution.distribution.probs.detach().numpy()[0]
-                return probs.astype(np.float32)
+            logits, q_values = self._sb3_logits(obs)
+            return masked_proba(logits, masks, q_values=q_values).astype(np.float32)
         except Exception as e:
-            logger.warning(f"[{self.name}] Failed to get action probabilities: {e}")
+            logger.warning(f"[{self.name}] Failed to get batch action probabilities: {e}")
 
-        from src.core.action import ACTION_SPACE_SIZE
-        return np.ones(ACTION_SPACE_SIZE, dtype=np.float32) / ACTION_SPACE_SIZE
+        return np.ones((n, ACTION_SPACE_SIZE), dtype=np.float32) / ACTION_SPACE_SIZE
+
+    def _sb3_logits(self, obs: np.ndarray) -> Tuple[np.ndarray, bool]:
+        """SB3 策略网络的原始输出 (N, 179)：PPO / A2C 为动作 logits，DQN 为 Q 值（第二项为 True）"""
+        import torch
+
+        policy = self._model.policy
+        obs_tensor = policy.obs_to_tensor(obs)[0]
+        with torch.no_grad():
+            if hasattr(policy, "q_net"):
+                return policy.q_net(obs_tensor).cpu().numpy(), True
+            # 不给 MaskablePPO 传掩码：取未掩码的（归一化）logits，统一在 masked_proba 中掩码
+            logits = policy.get_distribution(obs_tensor).distribution.logits
+            return logits.cpu().numpy(), False
 
     def get_action_value(self, state: GameState, action: Action) -> float:
         """
@@ -365,6 +484,10 @@ class RLAgentImpl(RLAgent):
         state_vec = self._encoder.encode_state(state)
         state_vec = state_vec.reshape(1, -1)
 
+        if isinstance(self._model, NumpyPolicy):
+            # 导出的 DQN 为 Q 值；策略网络为 logits
+            return float(self._model.logits(state_vec)[0, action.to_id()])
+
         try:
             # 对于支持 Q 值的算法（如 DQN）
             if hasattr(self._model, 'q_net'):
@@ -410,7 +533,15 @@ class RLAgentImpl(RLAgent):
 
         logger.info(f"[{self.name}] Saving model to {path}")
 
-        os.makedirs(os.path.dirname(path), exist_ok=True)
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+
+        if str(path).endswith(".flat"):
+            # 内存映射检查点：只含策略网络，推理用
+            from src.agents.flat_checkpoint import save_flat
+            from src.agents.numpy_policy import from_sb3_model
+            save_flat(self._model if isinstance(self._model, NumpyPolicy) else from_sb3_model(self._model), path)
+            logger.info(f"[{self.name}] Model saved")
+            return
 
         # 保存 SB3 模型（使用 zip 格式）
         self._model.save(path)
@@ -421,20 +552,21 @@ class RLAgentImpl(RLAgent):
         """加载模型"""
         logger.info(f"[{self.name}] Loading model from {path}")
 
-        try:
-            from stable_baselines3 import PPO, A2C, DQN
+        if str(path).endswith((".npz", ".flat")):
+            # NumPy 导出的策略网络：推理不导入 torch / SB3；.flat 为内存映射，多进程共享页缓存
+            from src.agents.flat_checkpoint import load_flat
+            self._model = load_flat(path) if str(path).endswith(".flat") else NumpyPolicy.load(path)
+            logger.info(f"[{self.name}] Model loaded (numpy, source: {self._model.source})")
+            return
 
-            # 根据算法加载
-            if self.algorithm == "ppo":
-                self._model = PPO.load(path)
-            elif self.algorithm == "a2c":
-                self._model = A2C.load(path)
-            elif self.algorithm == "dqn":
-                self._model = DQN.load(path)
+        try:
+            if self.config.get("mask_actions", True):
+                # MaskablePPO 加载失败时退回 PPO（掩码前训练的模型）
+                self._model = load_sb3_model(path, self.algorithm)
             else:
-                raise ValueError(f"Unknown algorithm: {self.algorithm}")
+                self._model = self._algorithm_class().load(path)
 
-            logger.info(f"[{self.name}] Model loaded")
+            logger.info(f"[{self.name}] Model loaded ({type(self._model).__name__})")
         except Exception as e:
             logger.error(f"[{self.name}] Failed to load model: {e}")
             raise
@@ -459,21 +591,27 @@ class RLAgentImpl(RLAgent):
 
     def learn_from_experience(self, experience):
         """
-        从经验中学习
+        记录一条经验到回放缓冲区
 
         Args:
             experience: 经验元组 (state, action, reward, next_state, done)
 
         Note:
-            对于使用 Stable-Baselines3 的算法，经验学习由算法内部处理。
-            此方法主要用于在线学习场景。
+            PPO / A2C 在 SB3 内部的 rollout 中学习，不经过这里。这里把在线经验编码后写入
+            self.replay_buffer（config["replay_buffer"] 给出 PrioritizedReplayBuffer 参数时创建，
+            也可直接赋值），离策略更新从中与日志语料（add_replay_store）一起按优先级采样。
         """
-        # SB3 算法内部处理经验回放和训练
-        # 此方法可用于自定义在线学习逻辑
-        if self._model is None:
-            logger.warning(f"[{self.name}] Model not trained, cannot learn from experience")
+        if self.replay_buffer is None:
+            logger.warning(f"[{self.name}] No replay buffer configured, experience dropped")
             return
 
-        # 可以在这里添加自定义的在线学习逻辑
-        # 例如：单步更新
-        pass
+        from src.core.action import ACTION_SPACE_SIZE
+        from src.env.action_mask import build_action_masks
+
+        state, action, reward, next_state, done = experience
+        action_id = action.to_id() if isinstance(action, Action) else int(action)
+        if not 0 <= action_id < ACTION_SPACE_SIZE:
+            return
+        obs = self._encoder.encode_states([state, next_state])
+        masks = build_action_masks([state, next_state])
+        self.replay_buffer.add(obs[0], action_id, reward, obs[1], done, masks[0], masks[1])
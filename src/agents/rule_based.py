@@ -61,6 +61,7 @@ class RuleBasedAgentImpl(RuleBasedAgent):
 
     策略要点：
     - 战斗：优先 0 费牌，敌人攻击时优先防御，能秒则攻击
+      （config["planner"]=True 时改用 TurnPlanner 在时间预算内搜索整回合出牌序列）
     - 选择：简单随机选择
     - 商店：优先买最贵
     """
@@ -87,6 +88,16 @@ class RuleBasedAgentImpl(RuleBasedAgent):
         self.STUCK_STATE_THRESHOLD = 10   # 连续 10 次相同状态判定为卡住
         self.BLACKLIST_DURATION = 10      # 命令被禁用 10 步
 
+        # 回合规划器（config["planner"]=True 启用）：战斗出牌改为在时间预算内搜索整回合序列
+        self._planner = None
+        if self.config.get("planner", False):
+            from src.agents.turn_planner import TurnPlanner
+            self._planner = TurnPlanner(
+                budget_ms=self.config.get("planner_budget_ms", 20.0),
+                beam_width=self.config.get("planner_beam_width", 32),
+                name=f"{name}.planner",
+            )
+
     def select_action(self, state: GameState) -> Action:
         """
         选择动作
@@ -371,6 +382,21 @@ class RuleBasedAgentImpl(RuleBasedAgent):
         logger.info("[防卡住] 使用兜底命令: state")
         return Action.state()
 
+    def reset_stuck_tracking(self):
+        """
+        清空防卡住的计数器与黑名单
+
+        防卡住检测假设连续调用 select_action 对应与游戏的实时交互；把 Agent 当作逐状态查询的
+        教师（如策略蒸馏）时，每次查询前调用，避免长战斗中同屏幕计数触发强制结束回合。
+        """
+        self._last_screen_type = None
+        self._same_screen_count = 0
+        self._last_command = None
+        self._same_command_count = 0
+        self._last_state_hash = None
+        self._same_state_count = 0
+        self._blacklisted_commands.clear()
+
     def _update_blacklist(self):
         """更新黑名单（减少禁用计时）"""
         # 简化实现：每次决策后清空黑名单
@@ -396,6 +422,12 @@ class RuleBasedAgentImpl(RuleBasedAgent):
         if combat is None:
             return Action.state()
 
+        # 启用规划器时按本回合计划出牌；无法解析或目标已失效时回退到下面的贪心规则
+        if self._planner is not None:
+            action = self._planner.next_action(state)
+            if action is not None:
+                return action
+
         hand = combat.hand
         energy = combat.player.energy
         valid_indices = combat.get_valid_card_indices()
@@ -3,7 +3,7 @@
 监督学习 Agent
 
 从标记数据中学习策略的 Agent。
-支持 sklearn 和 PyTorch 后端。
+支持 sklearn 和 PyTorch 后端；推理可加载导出的 NumPy 扁平权重（.npz）。
 """
 import os
 import pickle
@@ -42,6 +42,8 @@ class SupervisedAgentImpl(SupervisedAgent):
     支持多种后端：
     - sklearn: 用于快速原型和小规模训练
     - pytorch: 用于大规模训练和生产部署
+    - numpy: 加载 sklearn / pytorch 导出的 .npz 推理（见 numpy_policy.py）；也可用 NumPy MLP 小批量训练
+      （可流式读取分片、可续训，见 src/training/numpy_mlp.py）
     """
 
     def __init__(self, name: str = "Supervised", config: Optional[Dict] = None):
@@ -67,9 +69,17 @@ class SupervisedAgentImpl(SupervisedAgent):
         self._encoder_output_dim = get_output_dim()
 
     def _encoder_encode(self, state_or_dict: Union[GameState, Dict]) -> np.ndarray:
-        """编码状态为向量，支持 GameState 或 Mod 格式 dict。"""
+        """
+        编码状态为向量，支持 GameState 或 Mod 格式 dict。
+
+        带原始帧的 GameState（实时推理）直接编码原始帧，与离线预处理的特征相同；否则编码 to_mod_response()。
+        encoder_mvp 两者结果相同；完整 encoder 的遗物 / 药水 / 卡组 / 地图维度只有原始帧才有
+        """
         if isinstance(state_or_dict, dict):
             return self._encoder_encode_fn(state_or_dict)
+        raw = getattr(state_or_dict, "raw_response", None)
+        if raw is not None:
+            return self._encoder_encode_fn(raw)
         return self._encoder_encode_fn(state_or_dict.to_mod_response())
 
     def train(
@@ -106,6 +116,8 @@ class SupervisedAgentImpl(SupervisedAgent):
             result = self._train_sklearn(X, y, **kwargs)
         elif self.model_type == "pytorch":
             result = self._train_pytorch(X, y, **kwargs)
+        elif self.model_type == "numpy":
+            result = self._train_numpy(X, y, **kwargs)
         else:
             raise ValueError(f"Unknown model type: {self.model_type}")
 
@@ -116,12 +128,11 @@ class SupervisedAgentImpl(SupervisedAgent):
         return result
 
     def _encode_states(self, states) -> np.ndarray:
-        """编码状态为向量"""
-        encoded = []
-        for state in states:
-            vec = self._encoder_encode(state)
-            encoded.append(vec)
-        return np.array(encoded)
+        """编码状态为向量（直接写入预分配的 float32 矩阵，不经中间列表）"""
+        X = np.empty((len(states), self._encoder_output_dim), dtype=np.float32)
+        for i, state in enumerate(states):
+            X[i] = self._encoder_encode(state)
+        return X
 
     def _encode_actions(self, actions: List[Action]) -> np.ndarray:
         """编码动作为标签"""
@@ -198,6 +209,71 @@ class SupervisedAgentImpl(SupervisedAgent):
             "hidden_layers": hidden_layers,
         }
 
+    def _train_numpy(
+        self,
+        X: np.ndarray,
+        y: np.ndarray,
+        val_split: float = 0.2,
+        epochs: int = 100,
+        batch_size: int = 32,
+        learning_rate: float = 0.001,
+        hidden_layers: tuple = (64, 32),
+        **kwargs
+    ) -> Dict[str, Any]:
+        """
+        使用 NumPy MLP 训练（sklearn MLPClassifier 的小批量替代，见 src.training.numpy_mlp）
+
+        Args:
+            X: 状态向量
+            y: 动作标签
+            其余同 _train_sklearn；另支持 n_iter_no_change、checkpoint_dir、resume
+
+        Returns:
+            训练结果（model 为 NumpyPolicy）
+        """
+        from src.training.numpy_mlp import NumpyMLPTrainer
+
+        n = len(X)
+        indices = np.random.RandomState(42).permutation(n)
+        n_val = int(n * val_split)
+        val_idx, train_idx = indices[:n_val], indices[n_val:]
+        X = np.asarray(X, dtype=np.float32)
+        y = np.asarray(y, dtype=np.int64)
+
+        trainer = NumpyMLPTrainer(X.shape[1], hidden_layers, learning_rate=learning_rate, name=self.name)
+
+        def train_batches(epoch: int):
+            perm = train_idx[trainer.rng.permutation(len(train_idx))]
+            for start in range(0, len(perm), batch_size):
+                b = perm[start:start + batch_size]
+                yield X[b], y[b]
+
+        def val_batches():
+            for start in range(0, len(val_idx), 4096):
+                b = val_idx[start:start + 4096]
+                yield X[b], y[b]
+
+        return self._fit_numpy(trainer, train_batches, val_batches if n_val else None, epochs, **kwargs)
+
+    def _fit_numpy(self, trainer, train_batches, val_batches, epochs: int, n_iter_no_change: Optional[int] = None,
+                   checkpoint_dir: Optional[str] = None, resume: bool = True, **kwargs) -> Dict[str, Any]:
+        """NumpyMLPTrainer.fit_stream，早停容忍轮数默认 training.early_stopping_patience"""
+        if n_iter_no_change is None:
+            n_iter_no_change = kwargs.get("patience") or get_config().training.early_stopping_patience
+        logger.info(f"[{self.name}] Training NumPy MLP...")
+        result = trainer.fit_stream(train_batches, val_batches, epochs=epochs, n_iter_no_change=n_iter_no_change,
+                                    checkpoint_dir=checkpoint_dir, resume=resume)
+        logger.info(f"[{self.name}] Val accuracy: {result['best_val_acc']:.4f} "
+                    f"({result['epochs_run']} epochs, {result['samples_per_sec']:,.0f} samples/s)")
+        result.update({
+            "model": trainer.to_policy(encoder="encoder_mvp"),
+            "accuracy": result["best_val_acc"],
+            "val_loss": result["best_val_loss"],
+            "model_type": "numpy",
+            "hidden_layers": tuple(trainer.hidden_layers),
+        })
+        return result
+
     def _train_pytorch(
         self,
         X: np.ndarray,
@@ -220,15 +296,13 @@ class SupervisedAgentImpl(SupervisedAgent):
             batch_size: 批次大小
             learning_rate: 学习率
             hidden_layers: 隐藏层大小
+            **kwargs: 训练引擎参数（见 _fit_pytorch）
 
         Returns:
             训练结果
         """
         try:
             import torch
-            import torch.nn as nn
-            import torch.optim as optim
-            from torch.utils.data import DataLoader, TensorDataset
         except ImportError:
             logger.error(f"[{self.name}] PyTorch not installed")
             raise ImportError("PyTorch is required for model_type='pytorch'")
@@ -240,62 +314,172 @@ class SupervisedAgentImpl(SupervisedAgent):
         n_val = int(n * val_split)
         val_idx = indices[:n_val]
         train_idx = indices[n_val:]
-        X_train, X_val = X[train_idx], X[val_idx]
-        y_train, y_val = y[train_idx], y[val_idx]
+        X = np.asarray(X, dtype=np.float32)
+        y = np.asarray(y, dtype=np.int64)
 
-        # 转换为 Tensor
-        X_train_t = torch.FloatTensor(X_train)
-        y_train_t = torch.LongTensor(y_train)
-        X_val_t = torch.FloatTensor(X_val)
-        y_val_t = torch.LongTensor(y_val)
+        # 按批从 X 取行（torch.from_numpy 不复制），不再整表转 Tensor
+        def train_batches(epoch: int):
+            perm = train_idx[np.random.permutation(len(train_idx))]
+            for start in range(0, len(perm), batch_size):
+                b = perm[start:start + batch_size]
+                yield torch.from_numpy(X[b]), torch.from_numpy(y[b])
 
-        # 创建 DataLoader
-        train_dataset = TensorDataset(X_train_t, y_train_t)
-        train_loader = DataLoader(train_dataset, batch_size=batch_size, shuffle=True)
+        def val_batches():
+            for start in range(0, len(val_idx), max(batch_size, 1024)):
+                b = val_idx[start:start + max(batch_size, 1024)]
+                yield torch.from_numpy(X[b]), torch.from_numpy(y[b])
 
-        # 定义模型（使用模块级函数，便于 pickle）
+        return self._fit_pytorch(X.shape[1], train_batches, val_batches, epochs, learning_rate, hidden_layers,
+                                 **kwargs)
+
+    def train_from_shards(
+        self,
+        shard_dir: str,
+        val_split: float = 0.2,
+        epochs: int = 100,
+        batch_size: int = 256,
+        learning_rate: float = 0.001,
+        hidden_layers: tuple = (64, 32),
+        num_workers: int = 2,
+        prefetch_factor: int = 2,
+        block_size: Optional[int] = None,
+        world_size: int = 1,
+        **kwargs
+    ) -> Dict[str, Any]:
+        """
+        从预编码分片流式训练（PyTorch），峰值内存 O(batch)
+
+        分片由 src.training.shard_dataset.write_shards_from_sessions 生成，编码器须与本 Agent 一致。
+
+        Args:
+            shard_dir: 分片目录（含 index.json）
+            num_workers: DataLoader worker 进程数
+            prefetch_factor: 每个 worker 预取的批数
+            block_size: 块打乱的块大小（默认 8 × batch_size）
+            world_size: > 1 时多进程数据并行（gloo，见 src.training.distributed；batch_size 为每进程批大小，
+                学习率按全局批缩放，可传 base_batch_size / lr_scaling / threads_per_worker）
+            其余同 _train_pytorch
+
+        Returns:
+            训练结果
+        """
+        if self.model_type not in ("pytorch", "numpy"):
+            raise ValueError(f"train_from_shards requires model_type='pytorch' or 'numpy', got {self.model_type!r}")
+        from src.training.shard_dataset import ShardDataset, make_dataloader
+
+        dataset = ShardDataset(shard_dir)
+        if dataset.dim != self._encoder_output_dim:
+            raise ValueError(f"Shard dim {dataset.dim} ({dataset.encoder}) does not match "
+                             f"encoder dim {self._encoder_output_dim}")
+        if self.model_type == "numpy":
+            result = self._train_numpy_shards(dataset, val_split, epochs, batch_size, learning_rate, hidden_layers,
+                                              block_size, **kwargs)
+            self._model = result["model"]
+            self._training_history.append(result)
+            return result
+        if world_size > 1:
+            from src.training.distributed import train_data_parallel
+            if kwargs.get("patience") is None:
+                kwargs["patience"] = get_config().training.early_stopping_patience
+            result = train_data_parallel(
+                shard_dir, world_size=world_size, epochs=epochs, batch_size=batch_size,
+                learning_rate=learning_rate, hidden_layers=hidden_layers, val_split=val_split,
+                block_size=block_size, **kwargs)
+            result.update({"accuracy": result["best_val_acc"], "val_loss": result["best_val_loss"],
+                           "model_type": "pytorch", "hidden_layers": hidden_layers})
+            self._model = result["model"]
+            self._training_history.append(result)
+            return result
+        train_idx, val_idx = dataset.split(val_split)
+        logger.info(f"[{self.name}] Streaming {len(train_idx)} train / {len(val_idx)} val samples from {shard_dir}")
+
+        train_loader = make_dataloader(dataset, train_idx, batch_size, shuffle=True, num_workers=num_workers,
+                                       prefetch_factor=prefetch_factor, block_size=block_size)
+        val_loader = make_dataloader(dataset, val_idx, max(batch_size, 1024), shuffle=False,
+                                     num_workers=num_workers, prefetch_factor=prefetch_factor)
+
+        def train_batches(epoch: int):
+            train_loader.sampler.set_epoch(epoch)
+            return train_loader
+
+        result = self._fit_pytorch(dataset.dim, train_batches, lambda: val_loader, epochs, learning_rate,
+                                   hidden_layers, **kwargs)
+        self._model = result["model"]
+        self._training_history.append(result)
+        return result
+
+    def _train_numpy_shards(self, dataset, val_split: float, epochs: int, batch_size: int, learning_rate: float,
+                            hidden_layers: tuple, block_size: Optional[int] = None, **kwargs) -> Dict[str, Any]:
+        """NumPy MLP 单进程流式训练（不依赖 torch）"""
+        from src.training.numpy_mlp import NumpyMLPTrainer
+        from src.training.shard_dataset import BlockShuffleSampler, iter_batches
+
+        train_idx, val_idx = dataset.split(val_split)
+        logger.info(f"[{self.name}] Streaming {len(train_idx)} train / {len(val_idx)} val samples "
+                    f"from {dataset.shard_dir}")
+        trainer = NumpyMLPTrainer(dataset.dim, hidden_layers, learning_rate=learning_rate, name=self.name)
+        sampler = BlockShuffleSampler(train_idx, batch_size, block_size)
+
+        def train_batches(epoch: int):
+            sampler.set_epoch(epoch)
+            return iter_batches(dataset, sampler)
+
+        def val_batches():
+            return iter_batches(dataset, BlockShuffleSampler(val_idx, 4096, shuffle=False))
+
+        return self._fit_numpy(trainer, train_batches, val_batches if len(val_idx) else None, epochs, **kwargs)
+
+    def _fit_pytorch(self, input_dim: int, train_batches, val_batches, epochs: int, learning_rate: float,
+                     hidden_layers: tuple, patience: Optional[int] = None, checkpoint_dir: Optional[str] = None,
+                     resume: bool = True, target_accuracy: Optional[float] = None, stop_at_target: bool = False,
+                     lr_schedule: str = "plateau", **kwargs) -> Dict[str, Any]:
+        """
+        PyTorch 训练（src.training.trainer.Trainer：早停、检查点续训、学习率调度）
+
+        Args:
+            train_batches: epoch → 可迭代的 (X, y) Tensor 批
+            val_batches: () → 可迭代的验证批
+            patience: 验证损失未下降的容忍 epoch 数（默认 training.early_stopping_patience）
+            checkpoint_dir: 检查点目录（None 不保存）；resume=True 时从其中的 last.pt 续训
+            target_accuracy: 记录首次达到该验证准确率的 epoch 与耗时；stop_at_target=True 时达标即停
+            lr_schedule: plateau / cosine / none
+        """
         from src.core.action import ACTION_SPACE_SIZE
+        from src.training.trainer import Trainer, TrainerConfig
 
+        # 定义模型（使用模块级函数，便于 pickle）
         model = _create_policy_net(
-            input_dim=X.shape[1],
+            input_dim=input_dim,
             hidden_layers=hidden_layers,
             output_dim=ACTION_SPACE_SIZE,
         )
 
-        criterion = nn.CrossEntropyLoss()
-        optimizer = optim.Adam(model.parameters(), lr=learning_rate)
+        config = TrainerConfig(
+            epochs=epochs,
+            learning_rate=learning_rate,
+            patience=patience if patience is not None else get_config().training.early_stopping_patience,
+            lr_schedule=lr_schedule,
+            target_accuracy=target_accuracy,
+            stop_at_target=stop_at_target,
+            checkpoint_dir=checkpoint_dir,
+            resume=resume,
+            log_every=kwargs.get("log_every", 20),
+        )
+        meta = {"input_dim": int(input_dim), "hidden_layers": list(hidden_layers)}
 
-        # 训练循环
         logger.info(f"[{self.name}] Training PyTorch model...")
-        for epoch in range(epochs):
-            model.train()
-            epoch_loss = 0.0
-            for batch_X, batch_y in train_loader:
-                optimizer.zero_grad()
-                outputs = model(batch_X)
-                loss = criterion(outputs, batch_y)
-                loss.backward()
-                optimizer.step()
-                epoch_loss += loss.item()
-
-            # 验证（避免 .numpy() 在 NumPy 2.x 下的兼容性问题）
-            model.eval()
-            with torch.no_grad():
-                val_outputs = model(X_val_t)
-                val_pred = val_outputs.argmax(dim=1).tolist()
-                val_acc = sum(1 for p, t in zip(val_pred, y_val) if p == t) / len(y_val) if len(y_val) > 0 else 0.0
-
-            if (epoch + 1) % 20 == 0:
-                logger.info(
-                    f"[{self.name}] Epoch {epoch+1}/{epochs}, "
-                    f"Loss: {epoch_loss/len(train_loader):.4f}, "
-                    f"Val Acc: {val_acc:.4f}"
-                )
-
-        logger.info(f"[{self.name}] Training completed")
+        result = Trainer(model, train_batches, val_batches, config, meta, name=self.name).fit()
         return {
-            "model": model,
-            "accuracy": val_acc,
+            "model": result.model,
+            "accuracy": result.best_val_acc,
+            "val_loss": result.best_val_loss,
+            "best_epoch": result.best_epoch,
+            "epochs_run": result.epochs_run,
+            "stop_reason": result.stop_reason,
+            "elapsed_s": result.elapsed_s,
+            "time_to_target_s": result.time_to_target_s,
+            "target_epoch": result.target_epoch,
+            "history": result.history,
             "model_type": "pytorch",
             "hidden_layers": hidden_layers,
         }
@@ -314,29 +498,82 @@ class SupervisedAgentImpl(SupervisedAgent):
 
         if self._model is None:
             return np.ones(ACTION_SPACE_SIZE, dtype=np.float32) / ACTION_SPACE_SIZE
+        return self.predict_proba_obs(self._encoder_encode(state).reshape(1, -1))[0]
 
-        state_vec = self._encoder_encode(state)
-        state_vec = state_vec.reshape(1, -1)
+    def predict_proba_batch(self, states: List) -> np.ndarray:
+        """
+        批量预测动作概率分布：N 个状态编码成一个矩阵，只做一次模型前向
 
-        if self.model_type == "sklearn":
-            proba = self._model.predict_proba(state_vec)[0]
+        Args:
+            states: N 个游戏状态（GameState 或 Mod 格式 dict）
+
+        Returns:
+            动作概率数组，shape=(N, 179)
+        """
+        from src.core.action import ACTION_SPACE_SIZE
+
+        n = len(states)
+        if self._model is None or n == 0:
+            return np.ones((n, ACTION_SPACE_SIZE), dtype=np.float32) / ACTION_SPACE_SIZE
+        return self.predict_proba_obs(np.stack([self._encoder_encode(s) for s in states]))
+
+    def encode_obs(self, state) -> np.ndarray:
+        """编码单个状态为观察向量（与 predict_proba_obs 的输入一致）"""
+        return self._encoder_encode(state)
+
+    def predict_proba_obs(self, obs: np.ndarray) -> np.ndarray:
+        """
+        对已编码的观察矩阵做一次模型前向（推理服务按微批调用）
+
+        sklearn 模型只输出训练时出现过的类别，这里按 classes_ 散回 179 维。
+
+        Args:
+            obs: (N, D) 观察矩阵
+
+        Returns:
+            动作概率数组，shape=(N, 179)
+        """
+        from src.core.action import ACTION_SPACE_SIZE
+
+        n = len(obs)
+        if self._model is None or n == 0:
+            return np.ones((n, ACTION_SPACE_SIZE), dtype=np.float32) / ACTION_SPACE_SIZE
+
+        if self.model_type == "numpy":
+            proba = self._model.predict_proba(obs)
+        elif self.model_type == "sklearn":
+            cols = self._model.predict_proba(obs)
+            proba = np.zeros((n, ACTION_SPACE_SIZE), dtype=np.float32)
+            proba[:, np.asarray(self._model.classes_, dtype=np.int64)] = cols
         else:
             try:
                 import torch
                 with torch.no_grad():
-                    output = self._model(torch.FloatTensor(state_vec))
-                    proba = torch.softmax(output, dim=1).numpy()[0]
+                    output = self._model(torch.FloatTensor(obs))
+                    proba = torch.softmax(output, dim=1).numpy()
             except Exception as e:
                 logger.error(f"[{self.name}] PyTorch prediction error: {e}")
-                return np.ones(ACTION_SPACE_SIZE, dtype=np.float32) / ACTION_SPACE_SIZE
+                return np.ones((n, ACTION_SPACE_SIZE), dtype=np.float32) / ACTION_SPACE_SIZE
 
         return proba.astype(np.float32)
 
     def save(self, path: str):
-        """保存模型"""
+        """
+        保存模型
+
+        numpy 后端且路径为 .npz 时写扁平权重；路径为 .flat 时写内存映射检查点（任意后端，
+        见 flat_checkpoint.py），两者都可直接用于实时推理
+        """
         logger.info(f"[{self.name}] Saving model to {path}")
 
-        os.makedirs(os.path.dirname(path), exist_ok=True)
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        if str(path).endswith(".flat"):
+            from src.agents.flat_checkpoint import save_flat
+            save_flat(self._as_numpy_policy(), path)
+            return
+        if self.model_type == "numpy" and str(path).endswith(".npz"):
+            self._model.save(path)
+            return
 
         from src.training.encoder_mvp import encode
         save_data = {
@@ -353,10 +590,30 @@ class SupervisedAgentImpl(SupervisedAgent):
 
         logger.info(f"[{self.name}] Model saved")
 
+    def _as_numpy_policy(self):
+        """当前模型转为 NumpyPolicy（写 .flat 用）"""
+        from src.agents import numpy_policy
+
+        if self.model_type == "numpy":
+            return self._model
+        if self.model_type == "sklearn":
+            return numpy_policy.from_sklearn_mlp(self._model)
+        return numpy_policy.from_torch_sequential(self._model, encoder="encoder_mvp")
+
     def load(self, path: str):
-        """加载模型"""
+        """加载模型（.npz / .flat 为 NumPy 扁平权重，推理不导入 torch / sklearn；.flat 为内存映射）"""
         logger.info(f"[{self.name}] Loading model from {path}")
 
+        if str(path).endswith((".npz", ".flat")):
+            from src.agents.numpy_policy import NumpyPolicy
+            from src.agents.flat_checkpoint import load_flat
+            self._model = load_flat(path) if str(path).endswith(".flat") else NumpyPolicy.load(path)
+            self.model_type = "numpy"
+            self._encoder_encode_fn = self._model.encode
+            self._encoder_output_dim = self._model.input_dim
+            logger.info(f"[{self.name}] Model loaded (type: numpy, source: {self._model.source})")
+            return
+
         with open(path, 'rb') as f:
             save_data = pickle.load(f)
 
@@ -382,27 +639,28 @@ class SupervisedAgentImpl(SupervisedAgent):
         os.makedirs(models_dir, exist_ok=True)
 
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        return os.path.join(models_dir, f"{self.model_type}_agent_{timestamp}.pkl")
+        ext = "npz" if self.model_type == "numpy" else "pkl"
+        return os.path.join(models_dir, f"{self.model_type}_agent_{timestamp}.{ext}")
 
 
 # ==================== 数据加载辅助函数 ====================
 
-def load_training_data(data_dir: str) -> tuple:
+def iter_training_records(data_dir: str, keep_raw: bool = False):
     """
-    加载训练数据
+    逐条产出 (GameState, Action)，不把整个数据目录读进内存
 
     Args:
         data_dir: 数据目录路径
+        keep_raw: 是否保留原始 Mod 帧（GameState.raw_response）。默认丢弃：整帧约为解析后状态的数倍内存，
+            批量加载时不应常驻；此时编码走 to_mod_response()（encoder_mvp 结果相同，完整 encoder 的
+            遗物 / 药水 / 卡组 / 地图维度为 0）。逐条消费并直接编码原始帧时（如写分片）传 True
 
-    Returns:
-        (states, actions) 元组
+    Yields:
+        (state, action)
     """
-    import json
+    from src.core import json_codec
     from src.core.game_state import GameState
 
-    states = []
-    actions = []
-
     # 扫描数据文件：支持 Raw_Data_json_FORSL 的 .json（JSON 数组）和 session.jsonl
     data_path = Path(data_dir)
     json_files = sorted(data_path.glob("**/*.json"))
@@ -417,42 +675,62 @@ def load_training_data(data_dir: str) -> tuple:
         if not action_str or action_str in ("state", "wait"):
             return None, None  # 跳过无决策帧
         state = GameState.from_mod_response(mod_data)
+        if not keep_raw:
+            state.raw_response = None
         action = Action.from_command(action_str)
         return state, action
 
     for f in json_files:
         logger.info(f"[load_training_data] Loading {f.name}")
         try:
-            with open(f, 'r', encoding='utf-8') as fp:
-                arr = json.load(fp)
-            if not isinstance(arr, list):
-                continue
-            for record in arr:
-                try:
-                    s, a = _parse_record(record)
-                    if s is not None and a is not None:
-                        states.append(s)
-                        actions.append(a)
-                except Exception as e:
-                    logger.warning(f"Failed to parse record: {e}")
+            arr = json_codec.load(f)
         except Exception as e:
             logger.warning(f"Failed to load {f}: {e}")
+            continue
+        if not isinstance(arr, list):
+            continue
+        for record in arr:
+            try:
+                s, a = _parse_record(record)
+            except Exception as e:
+                logger.warning(f"Failed to parse record: {e}")
+                continue
+            if s is not None and a is not None:
+                yield s, a
 
     for jsonl_file in jsonl_files:
         logger.info(f"[load_training_data] Loading {jsonl_file.name}")
-        with open(jsonl_file, 'r', encoding='utf-8') as f:
+        with open(jsonl_file, 'rb') as f:
             for line in f:
                 line = line.strip()
                 if not line:
                     continue
                 try:
-                    record = json.loads(line)
+                    record = json_codec.loads(line)
                     s, a = _parse_record(record)
-                    if s is not None and a is not None:
-                        states.append(s)
-                        actions.append(a)
                 except Exception as e:
                     logger.warning(f"Failed to parse record: {e}")
+                    continue
+                if s is not None and a is not None:
+                    yield s, a
+
+
+def load_training_data(data_dir: str, keep_raw: bool = False) -> tuple:
+    """
+    加载训练数据
+
+    Args:
+        data_dir: 数据目录路径
+        keep_raw: 是否保留原始 Mod 帧（见 iter_training_records；全部常驻内存，默认不保留）
+
+    Returns:
+        (states, actions) 元组
+    """
+    states = []
+    actions = []
+    for s, a in iter_training_records(data_dir, keep_raw=keep_raw):
+        states.append(s)
+        actions.append(a)
 
     logger.info(f"[load_training_data] Loaded {len(states)} samples")
     return states, actions
@@ -0,0 +1,415 @@
+#!/usr/bin/env python3
+"""
+回合规划器：在时间预算内搜索本回合的出牌序列
+
+规则 Agent 默认逐张贪心出牌；启用规划器后，每回合开始时对「出哪些牌、按什么顺序、打谁」
+做一次束搜索（beam search），返回整条最优序列并缓存，同一回合后续决策直接按计划出牌。
+
+- 卡牌数值：get_card_stats_table()，由 silent_sim.CARDS 生成，行号 = 编码器的卡牌编号（card_id_to_index）
+- 战斗模型：伤害（力量 / 虚弱 / 易伤 / 格挡）、格挡（敏捷 / 脆弱）、能量、多段、群攻、X 费、
+  小刀生成、施加虚弱 / 易伤 / 中毒；special 字段的特殊效果不建模，按基础数值估算
+- 评估：回合结束时的伤害、击杀、被打掉的血量（意图伤害 - 格挡）、中毒、减益、能力牌、抽牌
+- 记忆化：以「剩余手牌多重集 + 能量 + 双方数值」为键，不同出牌顺序到达同一局面只保留最优
+- 计划缓存：按 (回合, 预期手牌, 预期能量) 校验；抽到新牌、出现选牌界面等偏离计划时重新规划
+"""
+import time
+import heapq
+import logging
+from typing import Dict, Any, List, Optional, Tuple
+
+import numpy as np
+
+from src.core.action import Action, MAX_HAND_SIZE, MAX_MONSTERS
+from src.core.game_state import GameState
+from src.training.encoder_utils import card_id_to_index
+
+logger = logging.getLogger(__name__)
+
+
+# ==================== 卡牌数值表 ====================
+
+# 卡牌数值表的列
+STAT_COST = 0       # 费用（-1=X 费，-2=不可打出）
+STAT_DMG = 1        # 单段伤害
+STAT_HITS = 2       # 段数
+STAT_AOE = 3        # 是否群攻
+STAT_BLOCK = 4      # 格挡
+STAT_WEAK = 5       # 施加虚弱
+STAT_VULN = 6       # 施加易伤
+STAT_POISON = 7     # 施加中毒
+STAT_DRAW = 8       # 抽牌
+STAT_DISCARD = 9    # 弃牌
+STAT_ENERGY = 10    # 获得能量
+STAT_SHIVS = 11     # 生成小刀
+STAT_TARGET = 12    # 是否需要目标
+STAT_POWER = 13     # 能力牌 / 带持续效果
+STAT_X_HITS = 14    # X 费多段（Skewer）
+STAT_KNOWN = 15     # 表中有定义
+NUM_STATS = 16
+
+_card_stats_table: Optional[np.ndarray] = None
+
+
+def build_card_stats_table() -> np.ndarray:
+    """
+    由模拟器卡牌定义生成 (CARD_DIM, NUM_STATS) 数值表，行号为编码器的卡牌编号
+
+    Returns:
+        float32 数组；未收录的卡牌行全 0（STAT_KNOWN=0），规划时按卡牌类型估算
+    """
+    from src.env.silent_sim import CARDS
+    from src.training.encoder_utils import CARD_DIM
+
+    table = np.zeros((CARD_DIM, NUM_STATS), dtype=np.float32)
+    for spec in CARDS.values():
+        row = card_id_to_index(spec.id)
+        if row == 0:
+            continue
+        t = table[row]
+        t[STAT_COST] = -2 if spec.unplayable else spec.cost
+        t[STAT_DMG] = spec.dmg
+        t[STAT_HITS] = spec.hits
+        t[STAT_AOE] = spec.aoe
+        t[STAT_BLOCK] = spec.block
+        t[STAT_WEAK] = spec.weak
+        t[STAT_VULN] = spec.vuln
+        t[STAT_POISON] = spec.poison
+        t[STAT_DRAW] = spec.draw
+        t[STAT_DISCARD] = spec.discard
+        t[STAT_ENERGY] = spec.energy
+        t[STAT_SHIVS] = spec.shivs
+        t[STAT_TARGET] = spec.target
+        t[STAT_POWER] = spec.type == "POWER" or spec.power is not None
+        t[STAT_X_HITS] = spec.special == "x_hits"
+        t[STAT_KNOWN] = 1
+    return table
+
+
+def get_card_stats_table() -> np.ndarray:
+    """卡牌数值表（首次调用时生成）"""
+    global _card_stats_table
+    if _card_stats_table is None:
+        _card_stats_table = build_card_stats_table()
+    return _card_stats_table
+
+
+# ==================== 评估权重 ====================
+
+W_DAMAGE = 1.0      # 每点伤害
+W_KILL = 8.0        # 每个击杀（其意图伤害另在 hp_loss 中消失）
+W_WIN = 1000.0      # 本回合清场
+W_HP_LOSS = 1.5     # 每点预计掉血
+W_POISON = 0.7      # 每层中毒
+W_VULN = 3.0        # 存活怪物身上的易伤
+W_WEAK = 2.0        # 本回合新施加虚弱的存活怪物（本回合减伤另算）
+W_POWER = 6.0       # 每张能力 / 持续效果牌
+W_DRAW = 2.0        # 每张抽牌
+W_DISCARD = 1.0     # 每张被迫弃牌
+
+DEFAULT_ATTACK_DMG = 6
+
+
+def _powers(d: Dict[str, Any]) -> Dict[str, int]:
+    return {p.get("id"): p.get("amount", 0) for p in (d.get("powers") or []) if isinstance(p, dict)}
+
+
+class _Node:
+    """搜索节点：一个出牌前缀之后的局面"""
+    __slots__ = ("hand", "energy", "hp", "block", "vuln", "weak", "poison", "p_block",
+                 "dealt", "powers", "draws", "discards", "seq", "trace", "score")
+
+    def key(self) -> tuple:
+        """记忆化键：与出牌顺序无关"""
+        return (tuple(sorted(c[:3] for c in self.hand)), self.energy, self.hp, self.block,
+                self.vuln, self.weak, self.poison, self.p_block)
+
+
+class TurnPlan:
+    """一次规划的结果"""
+
+    def __init__(self, turn: int, steps: List[Tuple[int, str, int]], expected: List[tuple],
+                 score: float, elapsed_ms: float, expanded: int, complete: bool):
+        self.turn = turn
+        self.steps = steps            # [(手牌位置, 卡牌 id, 目标怪物索引 / -1)]，用完后结束回合
+        self.expected = expected      # 每一步执行前预期的 (手牌 id 元组, 能量)
+        self.score = score
+        self.elapsed_ms = elapsed_ms
+        self.expanded = expanded
+        self.complete = complete      # False=预算耗尽时提前返回
+        self.cursor = 0
+
+
+class TurnPlanner:
+    """
+    时间预算内的出牌序列束搜索 + 回合内计划缓存
+
+    用法：
+        planner = TurnPlanner(budget_ms=20)
+        action = planner.next_action(state)   # 出牌 / end；非战斗出牌状态返回 None
+    """
+
+    def __init__(self, budget_ms: float = 20.0, beam_width: int = 32, max_depth: int = 12,
+                 name: str = "TurnPlanner"):
+        """
+        Args:
+            budget_ms: 单次规划的时间预算（毫秒），超时返回当前最优序列
+            beam_width: 每层保留的节点数
+            max_depth: 最多规划的出牌数
+        """
+        self.name = name
+        self.budget_ms = budget_ms
+        self.beam_width = beam_width
+        self.max_depth = max_depth
+        self.table = get_card_stats_table()
+        self._shiv = ("Shiv", card_id_to_index("Shiv"), 0, True)
+        self._plan: Optional[TurnPlan] = None
+        self._stats = {"plans": 0, "cache_hits": 0, "replans": 0, "timeouts": 0,
+                       "memo_hits": 0, "expanded": 0, "plan_ms": 0.0, "max_plan_ms": 0.0}
+
+    # ==================== 对外接口 ====================
+
+    def next_action(self, state: GameState) -> Optional[Action]:
+        """
+        本回合计划中的下一步
+
+        Returns:
+            Action.play_card / Action.end_turn；无法解析战斗状态时返回 None（由调用方回退）
+        """
+        cs = self._combat_dict(state)
+        if not cs or not cs.get("monsters"):
+            return None
+        turn = cs.get("turn", 0)
+        sig = (tuple(c.get("id", "") for c in cs.get("hand", [])), cs.get("player", {}).get("energy", 0))
+
+        plan = self._plan
+        if plan is not None and plan.turn == turn and plan.cursor < len(plan.expected) \
+                and plan.expected[plan.cursor] == sig:
+            self._stats["cache_hits"] += 1
+        else:
+            if plan is not None and plan.turn == turn:
+                self._stats["replans"] += 1
+            plan = self._plan = self.plan(cs)
+
+        step = plan.cursor
+        plan.cursor += 1
+        if step >= len(plan.steps):
+            return Action.end_turn()
+        pos, _, target = plan.steps[step]
+        monsters = cs.get("monsters", [])
+        if target >= 0 and not (target < len(monsters) and self._alive(monsters[target])):
+            self._plan = None
+            return None
+        return Action.play_card(pos, target + 1 if target >= 0 else 0)
+
+    def plan(self, cs: Dict[str, Any], budget_ms: Optional[float] = None) -> TurnPlan:
+        """
+        对 combat_state 搜索本回合最优出牌序列
+
+        Args:
+            cs: Mod 帧中的 combat_state
+            budget_ms: 时间预算（None 用构造参数）
+        """
+        t0 = time.perf_counter()
+        deadline = t0 + (self.budget_ms if budget_ms is None else budget_ms) / 1e3
+        monsters = cs.get("monsters", [])
+        player = cs.get("player", {})
+        pp = _powers(player)
+        strength, dex = pp.get("Strength", 0), pp.get("Dexterity", 0)
+        p_weak, frail = pp.get("Weakened", 0) > 0, pp.get("Frail", 0) > 0
+        incoming = tuple(self._incoming(m) for m in monsters)
+
+        root = self._root(cs, monsters, player)
+        alive0 = tuple(hp > 0 for hp in root.hp)
+        weak0 = root.weak
+        self._evaluate(root, incoming, alive0, weak0)
+        best = root
+        memo = {root.key(): root.score}
+        frontier = [root]
+        expanded = 0
+        complete = True
+        for _ in range(self.max_depth):
+            children = {}
+            for node in frontier:
+                for child in self._expand(node, strength, dex, p_weak, frail):
+                    expanded += 1
+                    self._evaluate(child, incoming, alive0, weak0)
+                    k = child.key()
+                    prev = memo.get(k)
+                    if prev is not None and prev >= child.score:
+                        self._stats["memo_hits"] += 1
+                        continue
+                    memo[k] = child.score
+                    children[k] = child
+                    if child.score > best.score:
+                        best = child
+                if time.perf_counter() > deadline:
+                    complete = False
+                    break
+            if not complete or not children:
+                break
+            frontier = heapq.nlargest(self.beam_width, children.values(), key=lambda n: n.score)
+
+        # 每一步（含最后的结束回合）执行前预期的 (手牌 id, 能量)，用于校验缓存的计划
+        expected = list(best.trace) + [(tuple(c[0] for c in best.hand), best.energy)]
+        elapsed = (time.perf_counter() - t0) * 1e3
+        s = self._stats
+        s["plans"] += 1
+        s["timeouts"] += not complete
+        s["expanded"] += expanded
+        s["plan_ms"] += elapsed
+        s["max_plan_ms"] = max(s["max_plan_ms"], elapsed)
+        return TurnPlan(cs.get("turn", 0), list(best.seq), expected, best.score, elapsed, expanded, complete)
+
+    def reset(self):
+        """丢弃缓存的计划（新对局 / 新战斗）"""
+        self._plan = None
+
+    def get_stats(self) -> Dict[str, Any]:
+        s = dict(self._stats)
+        s["mean_plan_ms"] = s["plan_ms"] / s["plans"] if s["plans"] else 0.0
+        return s
+
+    # ==================== 搜索 ====================
+
+    @staticmethod
+    def _combat_dict(state: GameState) -> Optional[Dict[str, Any]]:
+        resp = state.raw_response if state.raw_response is not None else state.to_mod_response()
+        return (resp.get("game_state") or {}).get("combat_state")
+
+    @staticmethod
+    def _alive(m: Dict[str, Any]) -> bool:
+        return not m.get("is_gone", False) and not m.get("half_dead", False) and m.get("current_hp", 0) > 0
+
+    @staticmethod
+    def _incoming(m: Dict[str, Any]) -> Tuple[int, int]:
+        """怪物意图伤害 (单段, 段数)"""
+        dmg = m.get("move_adjusted_damage")
+        if dmg is None:
+            return max(m.get("intent_damage", 0) or 0, 0), 1
+        return max(dmg, 0), max(m.get("move_hits", 1) or 0, 0)
+
+    def _card_entry(self, c: Dict[str, Any], energy: int) -> tuple:
+        """手牌 → (id, 数值表行, 费用, 需要目标)；本回合不可能打出时费用记为 -2"""
+        cid = c.get("id", "")
+        row = card_id_to_index(cid)
+        known = self.table[row, STAT_KNOWN] > 0
+        cost = c.get("cost", 0)
+        if (known and self.table[row, STAT_COST] == -2) or c.get("type") in ("STATUS", "CURSE") \
+                or (not c.get("is_playable", True) and cost <= energy):  # 能量够却不可打出（如大结局）
+            cost = -2
+        target = bool(c.get("has_target", known and self.table[row, STAT_TARGET] > 0))
+        return cid, row, cost, target
+
+    def _root(self, cs: Dict[str, Any], monsters: list, player: Dict[str, Any]) -> _Node:
+        n = _Node()
+        energy = player.get("energy", 0)
+        n.hand = tuple(self._card_entry(c, energy) for c in cs.get("hand", []))
+        n.energy = energy
+        n.hp = tuple(m.get("current_hp", 0) if self._alive(m) else 0 for m in monsters)
+        n.block = tuple(m.get("block", 0) for m in monsters)
+        mp = [_powers(m) for m in monsters]
+        n.vuln = tuple(p.get("Vulnerable", 0) for p in mp)
+        n.weak = tuple(p.get("Weakened", 0) for p in mp)
+        n.poison = tuple(0 for _ in monsters)
+        n.p_block = player.get("block", 0)
+        n.dealt = n.powers = n.draws = n.discards = 0
+        n.seq = n.trace = ()
+        return n
+
+    def _expand(self, node: _Node, strength: int, dex: int, p_weak: bool, frail: bool):
+        """枚举 (手牌, 目标) 后继；同一局面下相同的牌只展开一次"""
+        # 动作空间只能表达前 MAX_HAND_SIZE 张手牌、前 MAX_MONSTERS 个目标
+        living = [i for i, hp in enumerate(node.hp) if hp > 0 and i < MAX_MONSTERS]
+        if not living:
+            return
+        seen = set()
+        for pos, (cid, row, cost, target) in enumerate(node.hand[:MAX_HAND_SIZE]):
+            if cost == -2 or (cost > node.energy) or (cid, cost) in seen:
+                continue
+            seen.add((cid, cost))
+            for t in (living if target else (-1,)):
+                yield self._apply(node, pos, t, strength, dex, p_weak, frail)
+
+    def _apply(self, node: _Node, pos: int, t: int, strength: int, dex: int, p_weak: bool, frail: bool) -> _Node:
+        cid, row, cost, _ = node.hand[pos]
+        s = self.table[row]
+        known = s[STAT_KNOWN] > 0
+        n = _Node()
+        x = node.energy if cost == -1 else 0
+        n.energy = node.energy - (x if cost == -1 else cost) + int(s[STAT_ENERGY])
+        hp, block, vuln, weak, poison = (list(node.hp), list(node.block), list(node.vuln),
+                                         list(node.weak), list(node.poison))
+        dealt = 0
+
+        base = int(s[STAT_DMG]) if known else (DEFAULT_ATTACK_DMG if t >= 0 else 0)
+        hits = x if s[STAT_X_HITS] else int(s[STAT_HITS]) or 1
+        targets = [i for i, h in enumerate(hp) if h > 0] if s[STAT_AOE] else ([t] if t >= 0 else [])
+        if base > 0:
+            for i in targets:
+                per_hit = base + strength
+                if p_weak:
+                    per_hit = int(per_hit * 0.75)
+                if vuln[i]:
+                    per_hit = int(per_hit * 1.5)
+                per_hit = max(per_hit, 0)
+                for _ in range(hits):
+                    if hp[i] <= 0:
+                        break
+                    absorbed = min(block[i], per_hit)
+                    block[i] -= absorbed
+                    lost = min(hp[i], per_hit - absorbed)
+                    hp[i] -= lost
+                    dealt += lost
+        for i in (targets if s[STAT_AOE] else ([t] if t >= 0 else [])):
+            if hp[i] > 0:
+                vuln[i] += int(s[STAT_VULN])
+                weak[i] += int(s[STAT_WEAK])
+                poison[i] += int(s[STAT_POISON])
+
+        gained = int(s[STAT_BLOCK])
+        if gained:
+            gained += dex
+            if frail:
+                gained = int(gained * 0.75)
+        n.p_block = node.p_block + max(gained, 0)
+
+        hand = node.hand[:pos] + node.hand[pos + 1:]
+        shivs = int(s[STAT_SHIVS])
+        if shivs:
+            hand = hand + (self._shiv,) * max(0, min(shivs, MAX_HAND_SIZE - len(hand)))
+        n.hand = hand
+        n.hp, n.block, n.vuln, n.weak, n.poison = tuple(hp), tuple(block), tuple(vuln), tuple(weak), tuple(poison)
+        n.dealt = node.dealt + dealt
+        n.powers = node.powers + int(s[STAT_POWER] > 0)
+        n.draws = node.draws + int(s[STAT_DRAW])
+        n.discards = node.discards + int(s[STAT_DISCARD])
+        n.seq = node.seq + ((pos, cid, t),)
+        n.trace = node.trace + ((tuple(c[0] for c in node.hand), node.energy),)
+        return n
+
+    @staticmethod
+    def _evaluate(n: _Node, incoming: Tuple[Tuple[int, int], ...], alive0: Tuple[bool, ...],
+                  weak0: Tuple[int, ...]):
+        """
+        回合结束时的局面评估（此时结束回合的价值）
+
+        Mod 的 move_adjusted_damage 已含怪物回合开始时已有的虚弱，只对本回合新施加虚弱（weak0 时为 0）的怪物
+        打 0.75 折，也只有它们计入 W_WEAK
+        """
+        living = [i for i, h in enumerate(n.hp) if h > 0]
+        if not living:
+            n.score = W_WIN + W_DAMAGE * n.dealt
+            return
+        total_in = 0
+        for i in living:
+            per_hit, hits = incoming[i]
+            if n.weak[i] and not weak0[i]:
+                per_hit = int(per_hit * 0.75)
+            total_in += per_hit * hits
+        hp_loss = max(0, total_in - n.p_block)
+        kills = sum(1 for i, h in enumerate(n.hp) if h <= 0 and alive0[i])
+        n.score = (W_DAMAGE * n.dealt + W_KILL * kills - W_HP_LOSS * hp_loss
+                   + W_POISON * sum(n.poison[i] for i in living)
+                   + W_VULN * sum(1 for i in living if n.vuln[i])
+                   + W_WEAK * sum(1 for i in living if n.weak[i] and not weak0[i])
+                   + W_POWER * n.powers + W_DRAW * n.draws - W_DISCARD * n.discards)
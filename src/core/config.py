@@ -6,7 +6,6 @@
 所有可配置的参数都集中在这里。
 """
 import os
-import yaml
 from dataclasses import dataclass, field
 from typing import Optional, List, Dict, Any
 from pathlib import Path
@@ -23,6 +22,17 @@ class ModelConfig:
     max_iter: int = 500
 
 
+@dataclass
+class RewardConfig:
+    """奖励塑形权重（StsEnvironment._compute_reward 与离线重标注 reward_relabel 共用）"""
+    damage_dealt: float = 0.1       # 每点怪物伤害
+    kill_bonus: float = 5.0         # 怪物总血量归零
+    damage_taken: float = 0.2       # 每点玩家受伤（扣分）
+    death_penalty: float = 50.0     # 玩家死亡（扣分）
+    length_threshold: int = 20      # 超过该步数后
+    length_penalty: float = 0.01    # 每步扣 length_penalty × (步数 - length_threshold)
+
+
 @dataclass
 class TrainingConfig:
     """训练配置"""
@@ -46,6 +56,9 @@ class TrainingConfig:
     # 模型配置
     model: ModelConfig = field(default_factory=ModelConfig)
 
+    # 奖励塑形
+    reward: RewardConfig = field(default_factory=RewardConfig)
+
 
 @dataclass
 class GameConfig:
@@ -106,6 +119,8 @@ class Config:
         if not os.path.exists(path):
             return cls()
 
+        import yaml  # 延迟导入：只有读写配置文件时才需要
+
         with open(path, 'r', encoding='utf-8') as f:
             data = yaml.safe_load(f) or {}
 
@@ -121,8 +136,9 @@ class Config:
 
         return cls(
             training=TrainingConfig(
-                **{k: v for k, v in training_data.items() if k != "model"},
-                model=ModelConfig(**training_data.get("model", {}))
+                **{k: v for k, v in training_data.items() if k not in ("model", "reward")},
+                model=ModelConfig(**training_data.get("model", {})),
+                reward=RewardConfig(**training_data.get("reward", {})),
             ),
             game=GameConfig(**game_data),
             log=LogConfig(**log_data),
@@ -140,13 +156,16 @@ class Config:
         """
         data = {
             "training": {
-                **{k: v for k, v in self.training.__dict__.items() if k != "model"},
+                **{k: v for k, v in self.training.__dict__.items() if k not in ("model", "reward")},
                 "model": self.training.model.__dict__,
+                "reward": self.training.reward.__dict__,
             },
             "game": self.game.__dict__,
             "log": self.log.__dict__,
             "protocol": self.protocol.__dict__,
         }
+        import yaml
+
         Path(path).parent.mkdir(parents=True, exist_ok=True)
         with open(path, 'w', encoding='utf-8') as f:
             yaml.dump(data, f, allow_unicode=True, default_flow_style=False)
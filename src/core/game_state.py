@@ -359,6 +359,10 @@ class GameState:
     discard: int = 0  # 弃牌数
     exhaust: int = 0  # 消耗数
 
+    # 原始 Mod 帧（from_mod_response 时保留，encoder 直接读取，避免 to_mod_response 往返）
+    # 批量加载训练数据时默认丢弃（iter_training_records(keep_raw=False)），避免整帧常驻内存
+    raw_response: Optional[Dict[str, Any]] = field(default=None, repr=False, compare=False)
+
     @property
     def is_combat(self) -> bool:
         """是否在战斗中"""
@@ -428,6 +432,7 @@ class GameState:
             gold=gs.get("gold", 0),
             current_hp=cur_hp,
             max_hp=mx_hp,
+            raw_response=response,
         )
 
     def to_dict(self) -> Dict[str, Any]:
@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+JSON 编解码层
+
+所有采集/加载路径统一经由本模块读写 JSON：
+- 安装了 orjson 时使用 orjson（解析/序列化均快数倍），否则回退标准库 json
+- 默认紧凑分隔符（机器读写的文件不需要缩进）；pretty=True 时输出 2 空格缩进
+- 提供 bytes 进 / bytes 出接口，避免多余的 str 解码/编码
+- 设置环境变量 STS_JSON_BACKEND=json 可强制使用标准库
+
+两种后端的约定（UTF-8，不转义中文，与 json.dumps(..., ensure_ascii=False) 的紧凑 / 缩进格式相同）：
+- numpy 标量 / 数组：两种后端都序列化为对应的 Python 数值 / 列表
+- 超出 64 位的整数：序列化时 orjson 不支持，回退标准库，输出精确整数
+- NaN / Infinity：loads 两种后端都接受（orjson 解析失败时回退标准库）；
+  dumps 时标准库写为 NaN / Infinity（非标准 JSON），orjson 写为 null
+- 解析超出 64 位的整数：标准库得到精确 int；orjson 得到 float（超出 uint64 时丢失精度）
+"""
+import os
+import json
+from pathlib import Path
+from typing import Any, Union
+
+try:
+    if os.environ.get("STS_JSON_BACKEND", "").lower() in ("json", "stdlib"):
+        raise ImportError
+    import orjson
+    BACKEND = "orjson"
+except ImportError:
+    orjson = None
+    BACKEND = "json"
+
+# orjson.JSONDecodeError 是 json.JSONDecodeError 的子类，两种后端统一捕获此异常
+JSONDecodeError = json.JSONDecodeError
+
+_COMPACT_SEPARATORS = (",", ":")
+
+
+def _numpy_default(obj: Any) -> Any:
+    """numpy 标量 / 数组 → Python 数值 / 列表（orjson 不直接支持的 dtype、非连续数组，以及标准库）"""
+    # 延迟导入：本模块在采集脚本发送 ready 之后、首帧之前导入，不把 numpy 的导入时间放进启动路径
+    import numpy as np
+    if isinstance(obj, (np.generic, np.ndarray)):
+        return obj.tolist()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def _orjson_option(pretty: bool, sort_keys: bool) -> int:
+    option = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+    if pretty:
+        option |= orjson.OPT_INDENT_2
+    if sort_keys:
+        option |= orjson.OPT_SORT_KEYS
+    return option
+
+
+def _stdlib_dumps(obj: Any, pretty: bool, sort_keys: bool) -> str:
+    if pretty:
+        return json.dumps(obj, ensure_ascii=False, indent=2, sort_keys=sort_keys, default=_numpy_default)
+    return json.dumps(obj, ensure_ascii=False, separators=_COMPACT_SEPARATORS, sort_keys=sort_keys,
+                      default=_numpy_default)
+
+
+def loads(data: Union[bytes, bytearray, memoryview, str]) -> Any:
+    """
+    解析 JSON（bytes 或 str 均可，bytes 无需先解码）
+
+    Raises:
+        JSONDecodeError: 非法 JSON
+    """
+    if orjson is not None:
+        try:
+            return orjson.loads(data)
+        except orjson.JSONDecodeError:
+            # orjson 拒绝 NaN / Infinity 等标准库接受的写法；真正非法的 JSON 由标准库再抛出
+            pass
+    if isinstance(data, memoryview):
+        data = bytes(data)
+    return json.loads(data)
+
+
+def dumps_bytes(obj: Any, pretty: bool = False, sort_keys: bool = False) -> bytes:
+    """
+    序列化为 UTF-8 bytes
+
+    Args:
+        obj: 待序列化对象
+        pretty: True 时 2 空格缩进，否则紧凑分隔符
+        sort_keys: 是否按 key 排序（用于稳定哈希）
+    """
+    if orjson is not None:
+        try:
+            return orjson.dumps(obj, default=_numpy_default, option=_orjson_option(pretty, sort_keys))
+        except TypeError:
+            # orjson 不支持的类型（如超出 64 位的整数），交给标准库
+            pass
+    return _stdlib_dumps(obj, pretty, sort_keys).encode("utf-8")
+
+
+def dumps(obj: Any, pretty: bool = False, sort_keys: bool = False) -> str:
+    """序列化为 str（参数同 dumps_bytes）"""
+    if orjson is None:
+        return _stdlib_dumps(obj, pretty, sort_keys)
+    return dumps_bytes(obj, pretty=pretty, sort_keys=sort_keys).decode("utf-8")
+
+
+def load(path: Union[str, Path]) -> Any:
+    """读取并解析 JSON 文件（按 bytes 读取，不经 str 解码）"""
+    with open(path, "rb") as f:
+        return loads(f.read())
+
+
+def dump(obj: Any, path: Union[str, Path], pretty: bool = False, sort_keys: bool = False) -> None:
+    """序列化并写入 JSON 文件（UTF-8）"""
+    data = dumps_bytes(obj, pretty=pretty, sort_keys=sort_keys)
+    with open(path, "wb") as f:
+        f.write(data)
@@ -3,10 +3,53 @@
 Gymnasium 环境模块
 
 提供标准的 RL 环境接口。
+
+子模块在首次访问对应属性时才导入（PEP 562 模块级 __getattr__）：
+只用 ReplayEnv 或 build_action_mask 时不会加载模拟器、共享内存向量环境与采集服务。
 """
-from .sts_env import StsEnvironment, StsEnvWrapper
+import importlib
+from typing import TYPE_CHECKING
+
+# 导出名 → 所在子模块
+_LAZY_ATTRS = {
+    "StsEnvironment": ".sts_env",
+    "StsEnvWrapper": ".sts_env",
+    "build_action_mask": ".action_mask",
+    "build_action_masks": ".action_mask",
+    "mask_to_valid_actions": ".action_mask",
+    "ReplayEnv": ".replay_env",
+    "ReplayStore": ".replay_env",
+    "SilentCombatSim": ".silent_sim",
+    "SimEnv": ".sim_env",
+    "BatchedVecEnv": ".vec_env",
+    "ShmVecEnv": ".shm_vec_env",
+    "AsyncEnvPool": ".async_pool",
+    "CollectionServer": ".collection_server",
+}
+
+__all__ = list(_LAZY_ATTRS)
+
+
+def __getattr__(name: str):
+    module = _LAZY_ATTRS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module, __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
+
 
-__all__ = [
-    "StsEnvironment",
-    "StsEnvWrapper",
-]
+if TYPE_CHECKING:
+    from .sts_env import StsEnvironment, StsEnvWrapper
+    from .action_mask import build_action_mask, build_action_masks, mask_to_valid_actions
+    from .replay_env import ReplayEnv, ReplayStore
+    from .silent_sim import SilentCombatSim
+    from .sim_env import SimEnv
+    from .vec_env import BatchedVecEnv
+    from .shm_vec_env import ShmVecEnv
+    from .async_pool import AsyncEnvPool
+    from .collection_server import CollectionServer
@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+"""
+动作掩码构建（向量化）
+
+直接把 179 维布尔掩码写进 NumPy 缓冲区，不经过「合法动作列表 → 掩码」两步：
+- build_action_mask(state, out=None)      单个状态 → (179,) bool
+- build_action_masks(states, out=None)    N 个状态 → (N, 179) bool（向量环境、离线建数据集用）
+
+规则与 StsEnvironment._get_valid_actions（列表版）逐位一致：
+┌──────────────────────────────────────────────────────────────────────┐
+│ 0-9     出牌（无目标）：is_playable 且 energy >= cost，需 "play"       │
+│ 10-69   出牌（目标=第 k 个活着的怪物，k<=6）：另需 has_target         │
+│ 70-72   药水使用（前 3 个槽位，战斗中有药水即可）                     │
+│ 73-81   药水指定目标：70 + p + (t+1)*3，t < min(活着的怪物数, 3)      │
+│         （未收到 "play" 时 t 只取 0）                                  │
+│ 105-109 丢弃药水（前 5 个槽位）                                       │
+│ 110-169 choose（choice_list 前 60 项）                                │
+│ 170/171/173 end（仅战斗）/ proceed / cancel                           │
+│ 无任何合法动作时 fallback 到 end                                      │
+└──────────────────────────────────────────────────────────────────────┘
+"""
+from typing import List, Optional, Sequence
+
+import numpy as np
+
+from src.core.game_state import GameState
+from src.core.action import ACTION_SPACE_SIZE, ACTION_END_ID, ACTION_PROCEED_ID, ACTION_CANCEL_ID
+
+MAX_HAND = 10
+MAX_TARGETS = 6
+MAX_POTION_USE = 3
+MAX_POTION_TARGETS = 3
+MAX_POTION_DISCARD = 5
+MAX_CHOICE = 60
+
+_CARD_END = MAX_HAND * (MAX_TARGETS + 1)                        # 70
+_POTION_USE = 70
+_POTION_TARGET = _POTION_USE + MAX_POTION_USE                   # 73
+_POTION_TARGET_END = _POTION_TARGET + MAX_POTION_TARGETS * MAX_POTION_USE  # 82
+_POTION_DISCARD = 105
+_CHOOSE = 110
+
+# 批量构建时的列索引
+_HAND_COLS = np.arange(MAX_HAND)
+_TARGET_ROWS = np.arange(1, MAX_TARGETS + 1)
+_POTION_COLS = np.arange(MAX_POTION_USE)
+_POTION_TARGET_ROWS = np.arange(MAX_POTION_TARGETS)
+_DISCARD_COLS = np.arange(MAX_POTION_DISCARD)
+_CHOICE_COLS = np.arange(MAX_CHOICE)
+
+
+def build_action_mask(state: Optional[GameState], out: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    单个状态的动作掩码
+
+    Args:
+        state: 游戏状态（None 时全 False）
+        out: 可选的 (179,) bool 缓冲区，复用时会先清零
+
+    Returns:
+        (179,) bool 掩码（传入 out 时即 out 本身）
+    """
+    if out is None:
+        mask = np.zeros(ACTION_SPACE_SIZE, dtype=bool)
+    else:
+        mask = out
+        mask[:] = False
+    if state is None:
+        return mask
+
+    commands = state.available_commands
+    if "choose" in commands:
+        mask[_CHOOSE:_CHOOSE + min(len(state.choice_list), MAX_CHOICE)] = True
+    if "proceed" in commands:
+        mask[ACTION_PROCEED_ID] = True
+    if "cancel" in commands:
+        mask[ACTION_CANCEL_ID] = True
+
+    if state.is_combat:
+        combat = state.combat
+        num_targets = 1
+        if "play" in commands:
+            num_monsters = min(len(combat.get_living_monsters()), MAX_TARGETS)
+            num_targets = min(num_monsters, MAX_POTION_TARGETS)
+            hand = combat.hand[:MAX_HAND]
+            h = len(hand)
+            if h:
+                energy = combat.player.energy
+                ok = np.fromiter((c.is_playable and energy >= c.cost for c in hand), dtype=bool, count=h)
+                targeted = ok & np.fromiter((c.has_target for c in hand), dtype=bool, count=h)
+                cards = mask[:_CARD_END].reshape(MAX_TARGETS + 1, MAX_HAND)
+                cards[0, :h] = ok
+                cards[1:1 + num_monsters, :h] = targeted
+
+        num_potions = len(combat.potions)
+        if num_potions:
+            p = min(num_potions, MAX_POTION_USE)
+            mask[_POTION_USE:_POTION_USE + p] = True
+            mask[_POTION_TARGET:_POTION_TARGET_END].reshape(MAX_POTION_TARGETS, MAX_POTION_USE)[:num_targets, :p] = True
+            mask[_POTION_DISCARD:_POTION_DISCARD + min(num_potions, MAX_POTION_DISCARD)] = True
+
+        if "end" in commands:
+            mask[ACTION_END_ID] = True
+
+    if not mask.any():
+        mask[ACTION_END_ID] = True
+    return mask
+
+
+def build_action_masks(states: Sequence[Optional[GameState]], out: Optional[np.ndarray] = None,
+                       fallback: bool = True) -> np.ndarray:
+    """
+    批量构建动作掩码
+
+    先一次遍历把每个状态的手牌 playable/cost/has_target、能量、怪物数、药水数、
+    命令标志收集成定长数组，再用 NumPy 广播一次性写出 (N, 179) 掩码。
+
+    Args:
+        states: N 个游戏状态（元素可为 None）
+        out: 可选的 (N, 179) bool 缓冲区
+        fallback: 无任何合法动作的状态是否允许 end（False 时该行全 False，用于判断是否在策略空间内）
+
+    Returns:
+        (N, 179) bool 掩码
+    """
+    n = len(states)
+    if out is None:
+        masks = np.zeros((n, ACTION_SPACE_SIZE), dtype=bool)
+    else:
+        masks = out
+        masks[:] = False
+    if n == 0:
+        return masks
+
+    playable = np.zeros((n, MAX_HAND), dtype=bool)
+    has_target = np.zeros((n, MAX_HAND), dtype=bool)
+    cost = np.zeros((n, MAX_HAND), dtype=np.int64)
+    hand_len = np.zeros(n, dtype=np.int64)
+    energy = np.zeros(n, dtype=np.int64)
+    num_monsters = np.zeros(n, dtype=np.int64)
+    num_potions = np.zeros(n, dtype=np.int64)
+    num_choices = np.zeros(n, dtype=np.int64)
+    # 列：play / end / proceed / cancel / 状态非 None
+    flags = np.zeros((n, 5), dtype=bool)
+
+    for i, state in enumerate(states):
+        if state is None:
+            continue
+        commands = state.available_commands
+        flags[i, 4] = True
+        flags[i, 2] = "proceed" in commands
+        flags[i, 3] = "cancel" in commands
+        if "choose" in commands:
+            num_choices[i] = len(state.choice_list)
+        if not state.is_combat:
+            continue
+        combat = state.combat
+        flags[i, 1] = "end" in commands
+        num_potions[i] = len(combat.potions)
+        if "play" in commands:
+            flags[i, 0] = True
+            num_monsters[i] = len(combat.get_living_monsters())
+            hand = combat.hand[:MAX_HAND]
+            h = len(hand)
+            hand_len[i] = h
+            energy[i] = combat.player.energy
+            playable[i, :h] = [c.is_playable for c in hand]
+            has_target[i, :h] = [c.has_target for c in hand]
+            cost[i, :h] = [c.cost for c in hand]
+
+    # 出牌：0-9 无目标，10-69 按活着的怪物展开
+    card_ok = playable & (cost <= energy[:, None]) & (_HAND_COLS[None, :] < hand_len[:, None])
+    masks[:, :MAX_HAND] = card_ok
+    target_ok = _TARGET_ROWS[None, :] <= np.minimum(num_monsters, MAX_TARGETS)[:, None]
+    masks[:, MAX_HAND:_CARD_END] = (
+        (card_ok & has_target)[:, None, :] & target_ok[:, :, None]
+    ).reshape(n, MAX_TARGETS * MAX_HAND)
+
+    # 药水：目标数在未收到 "play" 时固定为 1
+    num_potion_targets = np.where(flags[:, 0], np.minimum(num_monsters, MAX_POTION_TARGETS), 1)
+    potion_ok = _POTION_COLS[None, :] < num_potions[:, None]
+    masks[:, _POTION_USE:_POTION_TARGET] = potion_ok
+    potion_target_ok = _POTION_TARGET_ROWS[None, :] < num_potion_targets[:, None]
+    masks[:, _POTION_TARGET:_POTION_TARGET_END] = (
+        potion_target_ok[:, :, None] & potion_ok[:, None, :]
+    ).reshape(n, MAX_POTION_TARGETS * MAX_POTION_USE)
+    masks[:, _POTION_DISCARD:_CHOOSE] = _DISCARD_COLS[None, :] < num_potions[:, None]
+
+    masks[:, _CHOOSE:ACTION_END_ID] = _CHOICE_COLS[None, :] < num_choices[:, None]
+    masks[:, ACTION_END_ID] = flags[:, 1]
+    masks[:, ACTION_PROCEED_ID] = flags[:, 2]
+    masks[:, ACTION_CANCEL_ID] = flags[:, 3]
+
+    # fallback：有状态但无任何合法动作时允许 end
+    if fallback:
+        empty = flags[:, 4] & ~masks.any(axis=1)
+        masks[empty, ACTION_END_ID] = True
+    return masks
+
+
+def mask_to_valid_actions(mask: np.ndarray) -> List[int]:
+    """掩码 → 合法动作 ID 列表（升序）"""
+    return np.flatnonzero(mask).tolist()
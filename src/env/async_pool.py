@@ -0,0 +1,416 @@
+#!/usr/bin/env python3
+"""
+异步环境池
+
+各环境单步耗时不均（Mod 协议后的真实游戏实例、读盘的回放环境）时，同步向量环境每步都要等最慢的一个。
+AsyncEnvPool 让每个环境独立推进，recv() 返回最先完成的 K 个：
+
+    pool = AsyncEnvPool(env_fns, batch_size=4, backend="thread")
+    pool.async_reset()
+    while training:
+        obs, reward, done, info, env_ids = pool.recv()      # 最先完成的 4 个环境
+        actions = policy(obs, [i["action_mask"] for i in info])
+        pool.send(actions, env_ids)
+
+- backend="thread"：每个环境一个线程，适合单步阻塞在 I/O 上的环境（真实游戏、磁盘）
+- backend="process"：每个环境一个子进程，观察写入共享内存行，管道只传奖励 / done / 小 info；
+  子进程退出时自动重启，该环境记为 done（info["worker_restarted"]=True）
+- 环境 done 后自动 reset，终局观察放在 info["terminal_observation"]（SB3 约定）
+- get_latency_stats() 给出单步（send → 完成）与 recv 等待时间的分位数
+"""
+import time
+import queue
+import logging
+import threading
+import traceback
+import multiprocessing as mp
+from multiprocessing import shared_memory
+from multiprocessing.connection import wait as mp_wait
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# info 中不跨进程传递的字段（GameState 体积大；掩码另有 action_mask）
+_HEAVY_INFO_KEYS = ("state",)
+
+
+def _run_command(env, cmd: str, data) -> Tuple[np.ndarray, float, bool, bool, Dict[str, Any]]:
+    """在环境上执行 reset / step（done 时自动 reset），返回 (obs, reward, terminated, truncated, info)"""
+    if cmd == "reset":
+        obs, info = env.reset(seed=data)
+        return obs, 0.0, False, False, info
+    obs, reward, terminated, truncated, info = env.step(data)
+    if terminated or truncated:
+        info = dict(info)
+        info["terminal_observation"] = obs
+        info["TimeLimit.truncated"] = bool(truncated and not terminated)
+        info["episode"] = {"r": info.get("episode_reward"), "l": info.get("episode_length")}
+        obs, reset_info = env.reset()
+        info["action_mask"] = reset_info.get("action_mask")
+    return obs, float(reward), bool(terminated), bool(truncated), info
+
+
+# ==================== 线程后端 ====================
+
+
+class _ThreadBackend:
+    """每个环境一个线程；结果进同一个队列"""
+
+    def __init__(self, env_fns: Sequence[Callable[[], Any]]):
+        self.envs = [fn() for fn in env_fns]
+        self._results: "queue.Queue" = queue.Queue()
+        self._inboxes = [queue.Queue() for _ in self.envs]
+        self._threads = []
+        for i in range(len(self.envs)):
+            t = threading.Thread(target=self._loop, args=(i,), daemon=True, name=f"env-{i}")
+            t.start()
+            self._threads.append(t)
+
+    def _loop(self, i: int):
+        env, inbox = self.envs[i], self._inboxes[i]
+        while True:
+            item = inbox.get()
+            if item is None:
+                break
+            cmd, data = item
+            try:
+                result = _run_command(env, cmd, data)
+            except Exception:
+                logger.error(f"[AsyncEnvPool] env {i} failed:\n{traceback.format_exc()}")
+                result = None
+            self._results.put((i, result, time.perf_counter()))
+
+    def submit(self, env_id: int, cmd: str, data):
+        self._inboxes[env_id].put((cmd, data))
+
+    def poll(self, timeout: Optional[float]) -> List[Tuple[int, Any, float]]:
+        """至少取到一个结果（超时返回空），并顺带取走已就绪的其余结果"""
+        try:
+            out = [self._results.get(timeout=timeout)]
+        except queue.Empty:
+            return []
+        while True:
+            try:
+                out.append(self._results.get_nowait())
+            except queue.Empty:
+                return out
+
+    def close(self):
+        for inbox in self._inboxes:
+            inbox.put(None)
+        for t in self._threads:
+            t.join(timeout=5)
+        for env in self.envs:
+            env.close()
+
+
+# ==================== 进程后端 ====================
+
+
+def _process_worker(remote, parent_remote, env_fn, shm_name: str, obs_dim: int, n_envs: int, env_id: int):
+    """子进程：推进一个环境，观察写进共享内存第 env_id 行"""
+    parent_remote.close()
+    shm = shared_memory.SharedMemory(name=shm_name)
+    buf = np.ndarray((2, n_envs, obs_dim), dtype=np.float32, buffer=shm.buf)
+    obs_row, terminal_row = buf[0, env_id], buf[1, env_id]
+    env = None
+    try:
+        env = env_fn()
+        while True:
+            try:
+                item = remote.recv()
+            except EOFError:
+                break
+            if item is None:
+                break
+            cmd, data = item
+            obs, reward, terminated, truncated, info = _run_command(env, cmd, data)
+            obs_row[:] = obs
+            info = {k: v for k, v in info.items() if k not in _HEAVY_INFO_KEYS}
+            if "terminal_observation" in info:
+                terminal_row[:] = info.pop("terminal_observation")
+                info["terminal_observation"] = None  # 主进程从共享内存取
+            remote.send((reward, terminated, truncated, info))
+    except KeyboardInterrupt:
+        pass
+    except Exception:
+        traceback.print_exc()
+    finally:
+        if env is not None:
+            try:
+                env.close()
+            except Exception:
+                pass
+        del buf, obs_row, terminal_row
+        try:
+            shm.close()
+        except BufferError:
+            pass
+
+
+class _ProcessBackend:
+    """每个环境一个子进程；观察走共享内存，结果消息走管道"""
+
+    def __init__(self, env_fns: Sequence[Callable[[], Any]], obs_dim: int, start_method: Optional[str] = None):
+        self.env_fns = list(env_fns)
+        n = len(self.env_fns)
+        self.obs_dim = obs_dim
+        self._shm = shared_memory.SharedMemory(create=True, size=max(2 * n * obs_dim * 4, 1))
+        self._buf = np.ndarray((2, n, obs_dim), dtype=np.float32, buffer=self._shm.buf)
+        if start_method is None:
+            start_method = "fork" if "fork" in mp.get_all_start_methods() else "spawn"
+        self._ctx = mp.get_context(start_method)
+        self._procs: List[Any] = [None] * n
+        self._remotes: List[Any] = [None] * n
+        self._last_cmd: List[Any] = [None] * n
+        self._pending = [False] * n
+        self._early: List[Tuple[int, Any, float]] = []  # 提交时就已得出的结果（空闲时退出的子进程）
+        self.restarts = 0
+        for i in range(n):
+            self._start(i)
+
+    def _start(self, i: int):
+        remote, work_remote = self._ctx.Pipe()
+        proc = self._ctx.Process(
+            target=_process_worker,
+            args=(work_remote, remote, self.env_fns[i], self._shm.name, self.obs_dim, len(self.env_fns), i),
+            daemon=True,
+        )
+        proc.start()
+        work_remote.close()
+        self._procs[i], self._remotes[i] = proc, remote
+
+    def submit(self, env_id: int, cmd: str, data):
+        self._last_cmd[env_id] = cmd
+        self._pending[env_id] = True
+        if not self._procs[env_id].is_alive():
+            # 空闲时退出：reset 直接发给新进程；step 无从执行，本次结果即重启后的截断结束
+            if cmd == "step":
+                self._early.append((env_id, self._restart(env_id), time.perf_counter()))
+                return
+            self._respawn(env_id)
+        try:
+            self._remotes[env_id].send((cmd, data))
+        except (BrokenPipeError, OSError):
+            pass  # 子进程已退出，poll 时重启
+
+    def poll(self, timeout: Optional[float]) -> List[Tuple[int, Any, float]]:
+        if self._early:
+            out, self._early = self._early, []
+            for i, _, _ in out:
+                self._pending[i] = False
+            return out
+        # 只等待有未完成命令的子进程；空闲子进程退出留到下次 submit 处理
+        waiting = {id(self._remotes[i]): i for i in range(len(self._remotes)) if self._pending[i]}
+        if not waiting:
+            return []
+        out = []
+        for remote in mp_wait([self._remotes[i] for i in waiting.values()], timeout=timeout):
+            i = waiting[id(remote)]
+            self._pending[i] = False
+            try:
+                reward, terminated, truncated, info = remote.recv()
+            except (EOFError, OSError):
+                out.append((i, self._restart(i), time.perf_counter()))
+                continue
+            if info.get("terminal_observation", 0) is None:
+                info["terminal_observation"] = self._buf[1, i].copy()
+            out.append((i, (self._buf[0, i].copy(), reward, terminated, truncated, info), time.perf_counter()))
+        return out
+
+    def _respawn(self, i: int):
+        self.restarts += 1
+        logger.warning(f"[AsyncEnvPool] env {i} worker exited (code {self._procs[i].exitcode}), restarting")
+        self._procs[i].join(timeout=1)
+        self._remotes[i].close()
+        self._start(i)
+
+    def _restart(self, i: int):
+        """子进程退出：重启并 reset，本次结果记为截断结束"""
+        terminal = self._buf[0, i].copy()
+        self._respawn(i)
+        self._remotes[i].send(("reset", None))
+        _, _, _, info = self._remotes[i].recv()
+        info.update(terminal_observation=terminal, worker_restarted=True)
+        info["TimeLimit.truncated"] = self._last_cmd[i] == "step"
+        return self._buf[0, i].copy(), 0.0, False, self._last_cmd[i] == "step", info
+
+    def close(self):
+        for remote in self._remotes:
+            try:
+                remote.send(None)
+            except (BrokenPipeError, OSError):
+                pass
+        for proc, remote in zip(self._procs, self._remotes):
+            proc.join(timeout=5)
+            if proc.is_alive():
+                proc.terminate()
+            remote.close()
+        del self._buf
+        try:
+            self._shm.close()
+        except BufferError:
+            pass
+        self._shm.unlink()
+
+
+# ==================== 环境池 ====================
+
+
+class AsyncEnvPool:
+    """
+    异步环境池：send(actions, env_ids) / recv() -> 最先完成的 K 个环境
+
+    recv 返回 (obs (K, D), reward (K,), done (K,), info list, env_ids (K,))；
+    结果按完成顺序返回，多出的已完成结果留到下次 recv。
+    """
+
+    def __init__(
+        self,
+        env_fns: Sequence[Callable[[], Any]],
+        batch_size: Optional[int] = None,
+        backend: str = "thread",
+        start_method: Optional[str] = None,
+    ):
+        """
+        Args:
+            env_fns: N 个环境构造函数
+            batch_size: 每次 recv 返回的环境数 K（默认 N，即同步）
+            backend: "thread" 或 "process"
+            start_method: 进程后端的 multiprocessing 启动方式（默认 fork）
+        """
+        if not env_fns:
+            raise ValueError("AsyncEnvPool needs at least one env")
+        self.num_envs = len(env_fns)
+        self.batch_size = min(batch_size or self.num_envs, self.num_envs)
+        self.backend_name = backend
+
+        if backend == "thread":
+            self._backend = _ThreadBackend(env_fns)
+            probe = self._backend.envs[0]
+        elif backend == "process":
+            probe = env_fns[0]()
+        else:
+            raise ValueError(f"Unknown backend: {backend} (expected 'thread' or 'process')")
+        self.observation_space = probe.observation_space
+        self.action_space = probe.action_space
+        self.obs_dim = int(np.prod(self.observation_space.shape))
+        if backend == "process":
+            probe.close()
+            self._backend = _ProcessBackend(env_fns, self.obs_dim, start_method)
+
+        self._pending = np.zeros(self.num_envs, dtype=bool)
+        self._t_send = np.zeros(self.num_envs, dtype=np.float64)
+        self._ready: List[Tuple[int, Any, float]] = []
+        self._step_latency: List[float] = []
+        self._recv_wait: List[float] = []
+        logger.info(f"[AsyncEnvPool] {self.num_envs} envs, batch_size={self.batch_size}, backend={backend}")
+
+    # ==================== 接口 ====================
+
+    def async_reset(self, seed: Optional[int] = None):
+        """向全部环境发出 reset（结果经 recv 取回，reward=0 / done=False）"""
+        for i in range(self.num_envs):
+            self._submit(i, "reset", None if seed is None else seed + i)
+
+    def send(self, actions: Sequence[int], env_ids: Sequence[int]):
+        """向 env_ids 发出动作；这些环境必须已经 recv 过（不在执行中）"""
+        env_ids = np.asarray(env_ids, dtype=np.int64).reshape(-1)
+        actions = np.asarray(actions).reshape(-1)
+        if len(actions) != len(env_ids):
+            raise ValueError(f"actions ({len(actions)}) and env_ids ({len(env_ids)}) length mismatch")
+        busy = env_ids[self._pending[env_ids]]
+        if len(busy):
+            raise ValueError(f"envs {busy.tolist()} are still running; recv() them first")
+        for a, i in zip(actions, env_ids):
+            self._submit(int(i), "step", int(a))
+
+    def recv(self, batch_size: Optional[int] = None, timeout: Optional[float] = None):
+        """
+        取回最先完成的 K 个环境
+
+        Args:
+            batch_size: 本次返回数 K（默认构造时的 batch_size；不超过已发出的环境数）
+            timeout: 最长等待秒数（超时返回已完成的部分，可能少于 K）
+
+        Returns:
+            (obs, reward, done, info, env_ids)
+        """
+        k = min(batch_size or self.batch_size, len(self._ready) + int(self._pending.sum()))
+        if k == 0:
+            raise RuntimeError("recv() with no envs running; call async_reset() or send() first")
+        t0 = time.perf_counter()
+        deadline = None if timeout is None else t0 + timeout
+        while len(self._ready) < k:
+            remaining = None if deadline is None else max(0.0, deadline - time.perf_counter())
+            got = self._backend.poll(remaining)
+            for i, result, t_done in got:
+                self._pending[i] = False
+                self._step_latency.append(t_done - self._t_send[i])
+            self._ready.extend(got)
+            if deadline is not None and time.perf_counter() >= deadline:
+                break
+        self._recv_wait.append(time.perf_counter() - t0)
+
+        batch, self._ready = self._ready[:k], self._ready[k:]
+        n = len(batch)
+        obs = np.zeros((n, self.obs_dim), dtype=np.float32)
+        reward = np.zeros(n, dtype=np.float32)
+        done = np.zeros(n, dtype=bool)
+        env_ids = np.zeros(n, dtype=np.int64)
+        infos: List[Dict[str, Any]] = []
+        for j, (i, result, _) in enumerate(batch):
+            env_ids[j] = i
+            if result is None:
+                # 线程后端环境抛异常：视为截断结束，需调用方 async_reset
+                done[j] = True
+                infos.append({"error": "env_exception", "TimeLimit.truncated": True})
+                continue
+            o, r, terminated, truncated, info = result
+            obs[j] = o
+            reward[j] = r
+            done[j] = terminated or truncated
+            infos.append(info)
+        return obs, reward, done, infos, env_ids
+
+    def get_latency_stats(self) -> Dict[str, Any]:
+        """单步延迟（send → 环境完成）与 recv 等待时间的分位数（毫秒）"""
+        def pct(values: List[float]) -> Dict[str, float]:
+            if not values:
+                return {}
+            arr = np.asarray(values) * 1e3
+            return {
+                "count": int(len(arr)),
+                "mean": float(arr.mean()),
+                "p50": float(np.percentile(arr, 50)),
+                "p90": float(np.percentile(arr, 90)),
+                "p99": float(np.percentile(arr, 99)),
+                "max": float(arr.max()),
+            }
+        return {"step_ms": pct(self._step_latency), "recv_wait_ms": pct(self._recv_wait)}
+
+    def reset_latency_stats(self):
+        self._step_latency = []
+        self._recv_wait = []
+
+    @property
+    def num_running(self) -> int:
+        """已发出、尚未完成的环境数"""
+        return int(self._pending.sum())
+
+    @property
+    def restarts(self) -> int:
+        """进程后端的子进程重启次数"""
+        return getattr(self._backend, "restarts", 0)
+
+    def close(self):
+        self._backend.close()
+
+    # ==================== 内部 ====================
+
+    def _submit(self, i: int, cmd: str, data):
+        self._pending[i] = True
+        self._t_send[i] = time.perf_counter()
+        self._backend.submit(i, cmd, data)
@@ -0,0 +1,394 @@
+#!/usr/bin/env python3
+"""
+多局实时采集服务
+
+一个进程同时服务 N 局真实游戏：每局游戏由 CommunicationMod 启动一个轻量桥接脚本
+（scripts/collect_bridge.py），桥接脚本立即回复 "ready"，再把 Mod 的 stdin/stdout
+转发到本服务的本地 socket（TCP 127.0.0.1:端口 或 Unix 域 socket 路径）。
+
+服务端单线程 selectors 循环：
+- 收集各连接的待处理帧；所有活跃连接都有待处理帧、攒满 max_batch，
+  或最早一帧的剩余预算只够一次推理时，立即把这一批帧合成一次推理
+- Agent 提供 predict_proba_batch（监督 / RL）时：一次 encode_batch + 一次策略前向，
+  再用 build_action_masks 批量掩码后取合法动作中概率最高者；
+  否则（规则 Agent）每局使用独立的 Agent 实例逐帧 select_action（规则 Agent 有按局的卡死检测状态）
+- 命令按连接写回；每局单独记录帧（与 collect_data.py 格式一致：Mod 原始帧 + action），
+  遇到 Neow 事件轮换文件，每 flush_every 帧 / 对局结束 / 断开时落盘
+
+用法：
+    server = CollectionServer(lambda: create_agent("supervised", "Collector"), address="127.0.0.1:8765")
+    server.serve_forever()
+
+    # Mod 配置的启动命令（每局一个）：
+    python scripts/collect_bridge.py --address 127.0.0.1:8765
+"""
+import os
+import time
+import socket
+import logging
+import selectors
+import threading
+from collections import deque
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from src.core import json_codec
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_ADDRESS = "127.0.0.1:8765"
+_PROJECT_ROOT = Path(__file__).resolve().parent.parent.parent
+
+
+def parse_address(address: str) -> Tuple[int, Any]:
+    """
+    解析监听/连接地址
+
+    "host:port" → (AF_INET, (host, port))；其余视为 Unix 域 socket 路径
+    """
+    host, sep, port = address.rpartition(":")
+    if sep and port.isdigit() and "/" not in address:
+        return socket.AF_INET, (host or "127.0.0.1", int(port))
+    if not hasattr(socket, "AF_UNIX"):
+        raise ValueError(f"Unix sockets are not supported on this platform: {address}")
+    return socket.AF_UNIX, address
+
+
+class _Connection:
+    """单局游戏连接：读缓冲、待处理帧、记录与延迟统计"""
+
+    def __init__(self, sock: socket.socket, game_id: int):
+        self.sock = sock
+        self.game_id = game_id
+        self.rbuf = bytearray()
+        self.pending: deque = deque()  # (接收时刻, 帧 dict)
+        self.agent = None
+        self.frames: List[Dict[str, Any]] = []
+        self.current_file: Optional[Path] = None
+        self.last_game_ended = True
+        self.unflushed = 0
+        self.latencies_ms: List[float] = []
+        self.n_frames = 0
+
+
+class CollectionServer:
+    """
+    多局实时采集服务
+
+    统计（get_stats）：
+        games: 累计连接数；active: 当前连接数
+        frames / batches / mean_batch: 处理帧数、推理批次数、平均批大小
+        latency_ms: 帧到达 → 命令写回 的 p50 / p90 / p99 / max
+        over_budget: 超过 latency_budget_ms 的帧数
+    """
+
+    def __init__(
+        self,
+        agent_factory: Callable[[], Any],
+        address: str = DEFAULT_ADDRESS,
+        output_dir: Optional[str] = None,
+        latency_budget_ms: float = 50.0,
+        max_batch: int = 64,
+        record: bool = True,
+        flush_every: int = 50,
+        name: str = "CollectionServer",
+    ):
+        """
+        Args:
+            agent_factory: 创建 Agent 的函数（已加载模型）；批量推理时整个服务共用一个实例
+            address: 监听地址，"host:port"（port=0 自动分配）或 Unix 域 socket 路径
+            output_dir: 记录目录（默认 data/A20_Silent/Raw_Data_json_FORSL）
+            latency_budget_ms: 单帧从到达到命令写回的目标上限；凑批等待不会超过 预算 - 预计推理耗时
+            max_batch: 单批最多帧数
+            record: 是否记录帧
+            flush_every: 每局每多少帧落盘一次（对局结束与断开时总会落盘）
+        """
+        self.name = name
+        self.agent_factory = agent_factory
+        self.latency_budget_ms = float(latency_budget_ms)
+        self.max_batch = max_batch
+        self.record = record
+        self.flush_every = max(1, flush_every)
+        if output_dir is None:
+            output_dir = _PROJECT_ROOT / "data" / "A20_Silent" / "Raw_Data_json_FORSL"
+        self.output_dir = Path(output_dir)
+
+        self.agent = agent_factory()
+        self._batched = hasattr(self.agent, "predict_proba_batch")
+
+        family, addr = parse_address(address)
+        if family != socket.AF_INET and os.path.exists(addr):
+            os.unlink(addr)
+        self._listener = socket.socket(family, socket.SOCK_STREAM)
+        if family == socket.AF_INET:
+            self._listener.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self._listener.bind(addr)
+        self._listener.listen()
+        self._listener.setblocking(False)
+        bound = self._listener.getsockname()
+        self.address = f"{bound[0]}:{bound[1]}" if family == socket.AF_INET else addr
+        self._unix_path = addr if family != socket.AF_INET else None
+
+        self._sel = selectors.DefaultSelector()
+        self._sel.register(self._listener, selectors.EVENT_READ, None)
+        self._conns: Dict[int, _Connection] = {}
+        self._next_game_id = 0
+        self._closed_games = 0
+        self._stop = threading.Event()
+
+        # 推理耗时的指数滑动平均（秒），用于计算凑批的等待截止时刻
+        self._infer_ema = 0.0
+        self._batches = 0
+        self._frames = 0
+        self._over_budget = 0
+        self._latencies_ms: List[float] = []
+
+        logger.info(f"[{self.name}] Listening on {self.address} "
+                    f"(batched={self._batched}, budget={self.latency_budget_ms:.0f} ms)")
+
+    # ==================== 主循环 ====================
+
+    def serve_forever(self, max_games: Optional[int] = None):
+        """
+        运行事件循环，直到 stop() 被调用；max_games 非 None 时在累计 max_games 局断开后返回
+        """
+        budget = self.latency_budget_ms / 1e3
+        try:
+            while not self._stop.is_set():
+                if max_games is not None and self._closed_games >= max_games:
+                    break
+                timeout = self._poll_timeout(budget)
+                for key, _ in self._sel.select(timeout):
+                    if key.data is None:
+                        self._accept()
+                    else:
+                        self._read(key.data)
+                while self._should_flush(budget):
+                    self._process_batch()
+        finally:
+            self._shutdown()
+
+    def stop(self):
+        """请求事件循环退出（可从其他线程调用）"""
+        self._stop.set()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """服务统计"""
+        lat = np.asarray(self._latencies_ms)
+        stats = {
+            "games": self._next_game_id,
+            "active": len(self._conns),
+            "frames": self._frames,
+            "batches": self._batches,
+            "mean_batch": self._frames / self._batches if self._batches else 0.0,
+            "over_budget": self._over_budget,
+            "infer_ms_ema": self._infer_ema * 1e3,
+        }
+        if len(lat):
+            stats["latency_ms"] = {
+                "p50": float(np.percentile(lat, 50)),
+                "p90": float(np.percentile(lat, 90)),
+                "p99": float(np.percentile(lat, 99)),
+                "max": float(lat.max()),
+            }
+        return stats
+
+    # ==================== 连接 ====================
+
+    def _accept(self):
+        try:
+            sock, _ = self._listener.accept()
+        except (BlockingIOError, InterruptedError):
+            return
+        sock.setblocking(True)
+        if sock.family == socket.AF_INET:
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        conn = _Connection(sock, self._next_game_id)
+        self._next_game_id += 1
+        if not self._batched:
+            conn.agent = self.agent_factory()
+        self._conns[conn.game_id] = conn
+        self._sel.register(sock, selectors.EVENT_READ, conn)
+        logger.info(f"[{self.name}] Game {conn.game_id} connected ({len(self._conns)} active)")
+
+    def _read(self, conn: _Connection):
+        """读取可读连接上的数据，按行切分为待处理帧"""
+        try:
+            data = conn.sock.recv(1 << 16)
+        except OSError:
+            data = b""
+        if not data:
+            self._close(conn)
+            return
+        conn.rbuf += data
+        now = time.perf_counter()
+        while True:
+            nl = conn.rbuf.find(b"\n")
+            if nl < 0:
+                break
+            line = bytes(conn.rbuf[:nl]).strip()
+            del conn.rbuf[:nl + 1]
+            if not line:
+                continue
+            try:
+                conn.pending.append((now, json_codec.loads(line)))
+            except Exception as e:
+                logger.warning(f"[{self.name}] Game {conn.game_id} bad frame: {e}")
+                self._send(conn, "state", now)
+
+    def _close(self, conn: _Connection):
+        self._sel.unregister(conn.sock)
+        conn.sock.close()
+        self._conns.pop(conn.game_id, None)
+        self._closed_games += 1
+        self._flush_record(conn)
+        logger.info(f"[{self.name}] Game {conn.game_id} disconnected after {conn.n_frames} frames")
+
+    def _send(self, conn: _Connection, command: str, t_recv: float):
+        try:
+            conn.sock.sendall(command.encode("utf-8") + b"\n")
+        except OSError as e:
+            logger.warning(f"[{self.name}] Game {conn.game_id} send failed: {e}")
+            return
+        latency_ms = (time.perf_counter() - t_recv) * 1e3
+        conn.latencies_ms.append(latency_ms)
+        self._latencies_ms.append(latency_ms)
+        self._over_budget += int(latency_ms > self.latency_budget_ms)
+
+    def _shutdown(self):
+        for conn in list(self._conns.values()):
+            self._close(conn)
+        self._sel.unregister(self._listener)
+        self._listener.close()
+        self._sel.close()
+        if self._unix_path and os.path.exists(self._unix_path):
+            os.unlink(self._unix_path)
+
+    # ==================== 凑批 ====================
+
+    def _oldest_pending(self) -> Optional[float]:
+        times = [c.pending[0][0] for c in self._conns.values() if c.pending]
+        return min(times) if times else None
+
+    def _deadline(self, budget: float) -> Optional[float]:
+        """最早一帧必须开始推理的时刻：到达 + 预算 - 预计推理耗时"""
+        oldest = self._oldest_pending()
+        if oldest is None:
+            return None
+        return oldest + max(budget - self._infer_ema, 0.0)
+
+    def _poll_timeout(self, budget: float) -> Optional[float]:
+        deadline = self._deadline(budget)
+        if deadline is None:
+            return 0.1  # 空闲时定期醒来检查 stop()
+        return max(deadline - time.perf_counter(), 0.0)
+
+    def _should_flush(self, budget: float) -> bool:
+        ready = sum(1 for c in self._conns.values() if c.pending)
+        if ready == 0:
+            return False
+        if ready == len(self._conns) or ready >= self.max_batch:
+            return True
+        return time.perf_counter() >= self._deadline(budget)
+
+    # ==================== 推理 ====================
+
+    def _process_batch(self):
+        """每个有待处理帧的连接取一帧，合成一次推理并写回命令"""
+        from src.core.game_state import GameState
+
+        batch = [c for c in self._conns.values() if c.pending][:self.max_batch]
+        items = [c.pending.popleft() for c in batch]
+        t0 = time.perf_counter()
+
+        states = []
+        for conn, (_, data) in zip(batch, items):
+            self._track_game(conn, data)
+            states.append(GameState.from_mod_response(data))
+        commands = self._select_commands(batch, states)
+
+        elapsed = time.perf_counter() - t0
+        self._infer_ema = elapsed if self._batches == 0 else 0.8 * self._infer_ema + 0.2 * elapsed
+        self._batches += 1
+        self._frames += len(batch)
+
+        for conn, (t_recv, data), command in zip(batch, items, commands):
+            self._send(conn, command, t_recv)
+            conn.n_frames += 1
+            if self.record:
+                record = dict(data)
+                record["action"] = command
+                conn.frames.append(record)
+                conn.unflushed += 1
+                if conn.unflushed >= self.flush_every:
+                    self._flush_record(conn)
+
+    def _select_commands(self, batch: List[_Connection], states: List[Any]) -> List[str]:
+        """批量推理；单帧出错时回复 "state"（与 collect_data.py 一致）"""
+        if not self._batched:
+            commands = []
+            for conn, state in zip(batch, states):
+                try:
+                    commands.append(conn.agent.select_action(state).to_command())
+                except Exception as e:
+                    logger.exception(f"[{self.name}] Game {conn.game_id} agent error: {e}")
+                    commands.append("state")
+            return commands
+
+        from src.core.action import Action
+        from src.env.action_mask import build_action_masks
+
+        # 先按不带 end 回退的掩码分流：战斗中有策略动作的帧走批量前向，
+        # 其余（事件 / 奖励 / 地图 / 商店，或战斗中无合法动作）交给 Agent 自身的 select_action
+        masks = build_action_masks(states, fallback=False)
+        policy = np.array([s is not None and s.is_combat for s in states]) & masks.any(axis=1)
+        commands: List[Optional[str]] = [None] * len(states)
+        idx = np.flatnonzero(policy)
+        if len(idx):
+            try:
+                probs = self.agent.predict_proba_batch([states[i] for i in idx])
+                best = np.where(masks[idx], probs, -np.inf).argmax(axis=1)
+                for i, a in zip(idx, best):
+                    commands[i] = Action.from_id(int(a)).to_command()
+            except Exception as e:
+                logger.exception(f"[{self.name}] Batch inference error: {e}")
+                for i in idx:
+                    commands[i] = "state"
+
+        for i in np.flatnonzero(~policy):
+            try:
+                commands[i] = self.agent.select_action(states[i]).to_command()
+            except Exception as e:
+                logger.exception(f"[{self.name}] Game {batch[i].game_id} command error: {e}")
+                commands[i] = "state"
+        return commands
+
+    # ==================== 记录 ====================
+
+    def _track_game(self, conn: _Connection, data: Dict[str, Any]):
+        """与 collect_data.py 相同的分局规则：GAME_OVER 之后的 Neow 事件开启新文件"""
+        if not self.record:
+            return
+        gs = data.get("game_state") or {}
+        if gs.get("screen_type") == "GAME_OVER":
+            conn.last_game_ended = True
+        ss = gs.get("screen_state") or {}
+        if conn.current_file is None or (ss.get("event_id") == "Neow Event" and conn.last_game_ended):
+            self._flush_record(conn)
+            self.output_dir.mkdir(parents=True, exist_ok=True)
+            ts = datetime.now().strftime("%Y%m%d_%H%M%S")
+            conn.current_file = self.output_dir / f"Silent_A20_HUMAN_{ts}_g{conn.game_id}.json"
+            conn.frames = []
+            conn.last_game_ended = ss.get("event_id") != "Neow Event"
+
+    def _flush_record(self, conn: _Connection):
+        if not (self.record and conn.frames and conn.current_file):
+            return
+        try:
+            json_codec.dump(conn.frames, conn.current_file)
+        except OSError as e:
+            logger.warning(f"[{self.name}] Write failed: {e}")
+        conn.unflushed = 0
@@ -0,0 +1,472 @@
+#!/usr/bin/env python3
+"""
+离线回放环境
+
+用已记录的对局（Raw_Data_json_FORSL 下每个 .json = 一局的帧数组）驱动 StsEnvironment，
+不需要游戏进程即可跑策略评估和流水线冒烟测试。
+
+- ReplayStore：把所有帧预先编码成紧凑数组（观察 / 掩码 / 记录动作 / 血量 / 标志位），
+  可保存为 .npy 目录并以 mmap 方式加载
+- ReplayEnv：StsEnvironment 子类，reset 到某一局或某场战斗的起点，step 沿记录的帧前进；
+  奖励走 _compute_reward，同时统计策略动作与记录动作的一致率
+
+回放是开环的：无论传入什么动作，下一帧都是记录中的下一帧。
+"""
+import logging
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from src.core import json_codec
+from src.core.action import Action, ACTION_SPACE_SIZE
+from src.core.game_state import GameState
+from src.env.action_mask import build_action_masks, mask_to_valid_actions
+from src.env.sts_env import StsEnvironment
+
+logger = logging.getLogger(__name__)
+
+# flags 位
+FLAG_IN_GAME = 1
+FLAG_IS_COMBAT = 2      # room_phase == COMBAT 且有 combat_state
+FLAG_HAS_COMBAT = 4     # 有 combat_state（观察编码 / 奖励的前提）
+
+_STORE_VERSION = 1
+_ARRAY_NAMES = ("obs", "masks", "actions", "player_hp", "monster_hp", "flags", "episodes")
+
+
+def _record_to_frame(record: Dict[str, Any]) -> Tuple[Dict[str, Any], Optional[str]]:
+    """记录 → (Mod 帧, 动作命令)。兼容 {state, action} 与 {mod_fields..., action} 两种格式"""
+    return record.get("state", record), record.get("action")
+
+
+def _command_to_id(command: Optional[str]) -> int:
+    """动作命令 → 动作 ID；无动作 / 系统命令 / 解析失败返回 -1"""
+    if not command or command in ("state", "wait"):
+        return -1
+    try:
+        action_id = Action.from_command(command).to_id()
+    except Exception:
+        return -1
+    return action_id if isinstance(action_id, int) and 0 <= action_id < ACTION_SPACE_SIZE else -1
+
+
+class ReplayStore:
+    """
+    日志轨迹的紧凑存储
+
+    数组（T = 总帧数，E = 局数）：
+        obs:        (T, D) float32  与 StsEnvironment._encode_observation 一致
+        masks:      (T, 179) bool   build_action_masks
+        actions:    (T,) int16      记录的动作 ID，-1 表示无
+        player_hp:  (T,) int32
+        monster_hp: (T,) int32      活着的怪物总血量
+        flags:      (T,) uint8      FLAG_*
+        episodes:   (E, 2) int64    每局 [start, end)
+    """
+
+    def __init__(
+        self,
+        obs: np.ndarray,
+        masks: np.ndarray,
+        actions: np.ndarray,
+        player_hp: np.ndarray,
+        monster_hp: np.ndarray,
+        flags: np.ndarray,
+        episodes: np.ndarray,
+        sources: Optional[List[str]] = None,
+        frames: Optional[List[Dict[str, Any]]] = None,
+    ):
+        self.obs = obs
+        self.masks = masks
+        self.actions = actions
+        self.player_hp = player_hp
+        self.monster_hp = monster_hp
+        self.flags = flags
+        self.episodes = episodes
+        self.sources = sources or [""] * len(episodes)
+        # 原始帧（仅内存构建时保留，用于按需还原 GameState）
+        self.frames = frames
+        self.combats = self._index_combats()
+
+    # ==================== 构建 ====================
+
+    @classmethod
+    def from_games(
+        cls,
+        games: Sequence[Sequence[Dict[str, Any]]],
+        sources: Optional[List[str]] = None,
+        mode: str = "extended",
+        keep_frames: bool = True,
+    ) -> "ReplayStore":
+        """
+        从内存中的对局构建
+
+        Args:
+            games: 每局一个记录列表（Mod 帧，可带 action 字段）
+            sources: 每局的来源名（文件名）
+            mode: 编码模式（同 StsEnvironment）
+            keep_frames: 是否保留原始帧以便 get_state()
+        """
+        env = StsEnvironment(mode=mode)
+        obs_list, mask_list, action_list = [], [], []
+        player_hp, monster_hp, flags = [], [], []
+        episodes, kept_sources, frames = [], [], []
+        sources = sources or [f"game_{i}" for i in range(len(games))]
+
+        start = 0
+        for records, source in zip(games, sources):
+            states, commands, raw = [], [], []
+            for record in records:
+                if not isinstance(record, dict):
+                    continue
+                frame, command = _record_to_frame(record)
+                try:
+                    state = GameState.from_mod_response(frame)
+                except Exception as e:
+                    logger.warning(f"[ReplayStore] {source}: 跳过无法解析的帧: {e}")
+                    continue
+                states.append(state)
+                commands.append(command)
+                raw.append(frame)
+            if not states:
+                continue
+
+            for state in states:
+                env._current_state = state
+                obs_list.append(env._encode_observation())
+                combat = state.combat
+                if combat is not None:
+                    player_hp.append(combat.player.current_hp)
+                    monster_hp.append(combat.total_monster_hp)
+                else:
+                    player_hp.append(state.current_hp)
+                    monster_hp.append(0)
+                flags.append(
+                    (FLAG_IN_GAME if state.in_game else 0)
+                    | (FLAG_IS_COMBAT if state.is_combat else 0)
+                    | (FLAG_HAS_COMBAT if combat is not None else 0)
+                )
+            mask_list.append(build_action_masks(states))
+            action_list.extend(_command_to_id(c) for c in commands)
+            if keep_frames:
+                frames.extend(raw)
+
+            episodes.append((start, start + len(states)))
+            kept_sources.append(source)
+            start += len(states)
+
+        obs_dim = env.observation_dim
+        return cls(
+            obs=np.stack(obs_list).astype(np.float32) if obs_list else np.zeros((0, obs_dim), np.float32),
+            masks=np.concatenate(mask_list) if mask_list else np.zeros((0, ACTION_SPACE_SIZE), bool),
+            actions=np.asarray(action_list, dtype=np.int16),
+            player_hp=np.asarray(player_hp, dtype=np.int32),
+            monster_hp=np.asarray(monster_hp, dtype=np.int32),
+            flags=np.asarray(flags, dtype=np.uint8),
+            episodes=np.asarray(episodes, dtype=np.int64).reshape(-1, 2),
+            sources=kept_sources,
+            frames=frames if keep_frames else None,
+        )
+
+    @classmethod
+    def from_directory(
+        cls,
+        data_dir: Union[str, Path],
+        pattern: str = "*.json",
+        max_files: Optional[int] = None,
+        mode: str = "extended",
+        keep_frames: bool = True,
+    ) -> "ReplayStore":
+        """扫描数据目录（每个 .json 文件 = 一局）构建"""
+        files = sorted(Path(data_dir).glob(pattern))
+        if max_files is not None:
+            files = files[:max_files]
+        games, sources = [], []
+        for f in files:
+            try:
+                arr = json_codec.load(f)
+            except Exception as e:
+                logger.warning(f"[ReplayStore] 读取失败 {f}: {e}")
+                continue
+            if isinstance(arr, list):
+                games.append(arr)
+                sources.append(f.name)
+        store = cls.from_games(games, sources, mode=mode, keep_frames=keep_frames)
+        logger.info(
+            f"[ReplayStore] {data_dir}: {store.num_episodes} 局, "
+            f"{store.num_combats} 场战斗, {store.num_frames} 帧"
+        )
+        return store
+
+    # ==================== 持久化 ====================
+
+    def save(self, out_dir: Union[str, Path]):
+        """保存为 .npy 目录（index.json + 每个数组一个 .npy）"""
+        out_dir = Path(out_dir)
+        out_dir.mkdir(parents=True, exist_ok=True)
+        for name in _ARRAY_NAMES:
+            np.save(out_dir / f"{name}.npy", np.ascontiguousarray(getattr(self, name)))
+        json_codec.dump(
+            {
+                "version": _STORE_VERSION,
+                "num_frames": self.num_frames,
+                "obs_dim": int(self.obs.shape[1]),
+                "sources": self.sources,
+            },
+            out_dir / "index.json",
+            pretty=True,
+        )
+        logger.info(f"[ReplayStore] 已保存 {self.num_frames} 帧到 {out_dir}")
+
+    @classmethod
+    def load(cls, store_dir: Union[str, Path], mmap: bool = True) -> "ReplayStore":
+        """加载 save() 的目录；mmap=True 时数组按需从磁盘映射"""
+        store_dir = Path(store_dir)
+        index = json_codec.load(store_dir / "index.json")
+        if index.get("version") != _STORE_VERSION:
+            raise ValueError(f"Unsupported replay store version: {index.get('version')}")
+        mmap_mode = "r" if mmap else None
+        arrays = {name: np.load(store_dir / f"{name}.npy", mmap_mode=mmap_mode) for name in _ARRAY_NAMES}
+        return cls(sources=index.get("sources"), **arrays)
+
+    # ==================== 查询 ====================
+
+    @property
+    def num_frames(self) -> int:
+        return int(len(self.actions))
+
+    @property
+    def num_episodes(self) -> int:
+        return int(len(self.episodes))
+
+    @property
+    def num_combats(self) -> int:
+        return int(len(self.combats))
+
+    def segments(self, unit: str = "combat") -> np.ndarray:
+        """回放单元：'episode'（整局）或 'combat'（单场战斗），(K, 2) [start, end)"""
+        if unit == "episode":
+            return self.episodes
+        if unit == "combat":
+            return self.combats
+        raise ValueError(f"Unknown replay unit: {unit}")
+
+    def get_state(self, t: int) -> Optional[GameState]:
+        """还原第 t 帧的 GameState（仅 keep_frames 构建时可用）"""
+        if self.frames is None:
+            return None
+        return GameState.from_mod_response(self.frames[t])
+
+    def _index_combats(self) -> np.ndarray:
+        """每局内连续的战斗帧段（至少 2 帧，即至少一次转移）"""
+        in_combat = (np.asarray(self.flags) & FLAG_IS_COMBAT) != 0
+        combats = []
+        for start, end in np.asarray(self.episodes):
+            seg = in_combat[start:end].astype(np.int8)
+            edges = np.diff(np.concatenate(([0], seg, [0])))
+            for s, e in zip(np.flatnonzero(edges == 1), np.flatnonzero(edges == -1)):
+                if e - s >= 2:
+                    combats.append((start + s, start + e))
+        return np.asarray(combats, dtype=np.int64).reshape(-1, 2)
+
+
+class ReplayEnv(StsEnvironment):
+    """
+    回放环境
+
+    用法：
+        store = ReplayStore.from_directory("data/A20_Silent/Raw_Data_json_FORSL")
+        env = ReplayEnv(store, unit="combat")
+        obs, info = env.reset()
+        obs, reward, terminated, truncated, info = env.step(action)
+
+    info 额外字段：
+        logged_action: 该帧记录的动作 ID（-1 表示无）
+        action_agrees: 传入动作是否与记录一致（无记录时为 None）
+        frame_index / segment_index: 当前帧与回放单元索引
+    """
+
+    def __init__(
+        self,
+        store: ReplayStore,
+        unit: str = "combat",
+        shuffle: bool = False,
+        return_states: bool = False,
+        max_episode_steps: Optional[int] = None,
+        render_mode: str = "none",
+        mode: str = "extended",
+    ):
+        """
+        Args:
+            store: 回放数据
+            unit: 'combat'（每场战斗一个 episode）或 'episode'（整局）
+            shuffle: reset 时随机抽取回放单元（否则按顺序轮转）
+            return_states: info["state"] 中返回还原的 GameState（需 store 保留原始帧）
+            max_episode_steps: 截断步数（None=不截断）
+        """
+        super().__init__(
+            render_mode=render_mode,
+            observation_dim=int(store.obs.shape[1]),
+            mode=mode,
+        )
+        self.store = store
+        self.unit = unit
+        self.shuffle = shuffle
+        self.return_states = return_states
+        self.max_episode_steps = max_episode_steps
+        self._segments = store.segments(unit)
+        if len(self._segments) == 0:
+            logger.warning(f"[ReplayEnv] 回放数据中没有可用的 {unit} 单元")
+
+        self._segment_idx = -1
+        self._t: Optional[int] = None
+        self._end = 0
+
+        # 统计
+        self._agree_hits = 0
+        self._agree_total = 0
+        self._total_steps = 0
+
+    # ==================== Gym 接口 ====================
+
+    def reset(
+        self,
+        seed: Optional[int] = None,
+        options: Optional[Dict] = None
+    ) -> Tuple[np.ndarray, Dict]:
+        """
+        重置到某个回放单元的起点
+
+        Args:
+            seed: 随机种子
+            options: {"index": k} 指定回放单元
+        """
+        super().reset(seed=seed)
+        if len(self._segments) == 0:
+            self._t = None
+            return np.zeros(self.observation_dim, dtype=np.float32), {"action_mask": np.zeros(ACTION_SPACE_SIZE, dtype=bool)}
+
+        if options and "index" in options:
+            self._segment_idx = int(options["index"]) % len(self._segments)
+        elif self.shuffle:
+            self._segment_idx = int(self.np_random.integers(len(self._segments)))
+        else:
+            self._segment_idx = (self._segment_idx + 1) % len(self._segments)
+
+        start, end = self._segments[self._segment_idx]
+        self._t, self._end = int(start), int(end)
+
+        # 与 set_state 一致：以起始帧血量作为奖励基准
+        if self.store.flags[self._t] & FLAG_HAS_COMBAT:
+            self._last_combat_hp = (int(self.store.player_hp[self._t]), int(self.store.monster_hp[self._t]))
+
+        return np.array(self.store.obs[self._t]), self._make_info()
+
+    def step(
+        self,
+        action: int
+    ) -> Tuple[np.ndarray, float, bool, bool, Dict]:
+        """沿记录前进一帧（开环），返回该转移的奖励与动作一致性"""
+        if self._t is None or self._t >= self._end - 1:
+            return self._get_empty_step_result()
+
+        t = self._t
+        logged = int(self.store.actions[t])
+        agrees = None
+        if logged >= 0:
+            agrees = int(action) == logged
+            self._agree_total += 1
+            self._agree_hits += int(agrees)
+        invalid = not (0 <= int(action) < ACTION_SPACE_SIZE and self.store.masks[t, int(action)])
+
+        self._t = t + 1
+        self._episode_length += 1
+        self._total_steps += 1
+
+        reward = self._compute_reward()
+        self._episode_reward += reward
+
+        terminated = self._t >= self._end - 1 or self._is_terminal()
+        truncated = (
+            self.max_episode_steps is not None
+            and self._episode_length >= self.max_episode_steps
+            and not terminated
+        )
+
+        info = self._make_info()
+        info["action_agrees"] = agrees
+        info["invalid_action"] = invalid
+
+        if self.render_mode == "human":
+            self.render()
+
+        return np.array(self.store.obs[self._t]), reward, terminated, truncated, info
+
+    def action_masks(self) -> np.ndarray:
+        """当前帧的动作掩码"""
+        if self._t is None:
+            return np.zeros(ACTION_SPACE_SIZE, dtype=bool)
+        return np.array(self.store.masks[self._t])
+
+    def set_state(self, state: GameState):
+        """回放环境由记录驱动，不接受外部状态"""
+        raise NotImplementedError("ReplayEnv is driven by logged frames; use reset()/step()")
+
+    # ==================== 奖励 / 终止 ====================
+
+    def _compute_reward(self) -> float:
+        """按当前帧血量计算奖励（与 StsEnvironment 同一套 shaping）"""
+        t = self._t
+        if t is None or not (self.store.flags[t] & FLAG_HAS_COMBAT):
+            return 0.0
+        return self._reward_from_hp(int(self.store.player_hp[t]), int(self.store.monster_hp[t]))
+
+    def _is_terminal(self) -> bool:
+        """combat 单元按 StsEnvironment._is_terminal 的规则判断；episode 单元只在局末结束"""
+        if self.unit != "combat":
+            return False
+        t = self._t
+        flags = int(self.store.flags[t])
+        if not flags & FLAG_IN_GAME or not flags & FLAG_IS_COMBAT:
+            return True
+        return bool(self.store.player_hp[t] <= 0 or self.store.monster_hp[t] <= 0)
+
+    # ==================== 统计 ====================
+
+    @property
+    def agreement_rate(self) -> float:
+        """策略动作与记录动作的一致率（仅统计有记录动作的帧）"""
+        return self._agree_hits / self._agree_total if self._agree_total else 0.0
+
+    def get_replay_stats(self) -> Dict[str, Any]:
+        """回放统计"""
+        return {
+            "unit": self.unit,
+            "segments": int(len(self._segments)),
+            "total_steps": self._total_steps,
+            "logged_steps": self._agree_total,
+            "agreement_rate": self.agreement_rate,
+        }
+
+    def reset_stats(self):
+        """清零一致率统计"""
+        self._agree_hits = 0
+        self._agree_total = 0
+        self._total_steps = 0
+
+    def _make_info(self) -> Dict[str, Any]:
+        t = self._t
+        mask = np.array(self.store.masks[t])
+        info = {
+            "action_mask": mask,
+            "valid_actions": mask_to_valid_actions(mask),
+            "logged_action": int(self.store.actions[t]),
+            "frame_index": t,
+            "segment_index": self._segment_idx,
+            "episode_reward": self._episode_reward,
+            "episode_length": self._episode_length,
+        }
+        if self.return_states:
+            info["state"] = self.store.get_state(t)
+        return info
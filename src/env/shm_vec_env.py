@@ -0,0 +1,508 @@
+#!/usr/bin/env python3
+"""
+多进程共享内存向量环境
+
+N 个环境分给 W 个子进程，每个子进程在本地用 BatchedVecEnv 推进自己那一段环境，
+把观察 / 掩码 / 奖励 / done 写进 multiprocessing.shared_memory；管道上只传很小的控制消息
+（命令 + 槽位号，回复只含结束的环境下标与 episode 统计）。
+
+共享内存布局：动作数组 (N,) + n_slots 个结果槽位（环形），第 k 次 step 写槽位 k % n_slots：
+    obs (N, D) f32 | terminal_obs (N, D) f32 | masks (N, 179) bool | rewards (N,) f32 |
+    dones / truncated / invalid (N,) u1 | episode_reward (N,) f32 | episode_length (N,) i32
+copy_obs=False 时返回的观察是槽位视图，在之后 n_slots - 1 次 step 内保持有效。
+
+容错：子进程退出、抛异常或单步超时时，终止并重启该子进程（环境重新构造并 reset），
+它负责的环境在本步记为 done（TimeLimit.truncated=True，terminal_observation 取上一步观察，
+info["worker_restarted"]=True）。get_attr / set_attr / env_method 遇到子进程失败时同样重启并把该段
+reset 到当前槽位，然后重试一次；仍失败则抛出 RuntimeError。
+
+用法：
+    from src.env import ShmVecEnv, SimEnv
+    vec = ShmVecEnv([lambda i=i: SimEnv(seed=i) for i in range(32)], n_workers=4)
+    obs = vec.reset()
+    obs, rewards, dones, infos = vec.step(actions)
+    vec.close()
+
+env_fns 在 fork 启动方式下无需可 pickle；spawn / forkserver 下需可 pickle（不能是 lambda）。
+"""
+import os
+import time
+import logging
+import traceback
+import multiprocessing as mp
+from multiprocessing import shared_memory
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from src.core.action import ACTION_SPACE_SIZE
+from src.env.vec_env import BatchedVecEnv, _register_sb3_vec_env
+
+logger = logging.getLogger(__name__)
+
+_ALIGN = 64
+
+
+class _ShmLayout:
+    """共享内存字段布局：动作数组 + n_slots 个结果槽位"""
+
+    def __init__(self, n_envs: int, obs_dim: int, n_slots: int):
+        self.n_envs = n_envs
+        self.obs_dim = obs_dim
+        self.n_slots = n_slots
+        slot_fields = [
+            ("obs", (n_envs, obs_dim), np.float32),
+            ("terminal_obs", (n_envs, obs_dim), np.float32),
+            ("masks", (n_envs, ACTION_SPACE_SIZE), np.bool_),
+            ("rewards", (n_envs,), np.float32),
+            ("dones", (n_envs,), np.uint8),
+            ("truncated", (n_envs,), np.uint8),
+            ("invalid", (n_envs,), np.uint8),
+            ("episode_reward", (n_envs,), np.float32),
+            ("episode_length", (n_envs,), np.int32),
+        ]
+        self.fields: Dict[Tuple[int, str], Tuple[int, tuple, Any]] = {}
+        offset = 0
+        self.actions = (offset, (n_envs,), np.int64)
+        offset = self._next(offset, self.actions)
+        for slot in range(n_slots):
+            for name, shape, dtype in slot_fields:
+                entry = (offset, shape, dtype)
+                self.fields[(slot, name)] = entry
+                offset = self._next(offset, entry)
+        self.size = max(offset, 1)
+
+    @staticmethod
+    def _next(offset: int, entry) -> int:
+        _, shape, dtype = entry
+        end = offset + int(np.prod(shape)) * np.dtype(dtype).itemsize
+        return (end + _ALIGN - 1) // _ALIGN * _ALIGN
+
+    def views(self, buf) -> Tuple[np.ndarray, List[Dict[str, np.ndarray]]]:
+        """在共享内存上建立 (actions, [每个槽位的字段视图])"""
+        def view(entry):
+            offset, shape, dtype = entry
+            return np.ndarray(shape, dtype=dtype, buffer=buf, offset=offset)
+        slots = []
+        for slot in range(self.n_slots):
+            slots.append({name: view(entry) for (s, name), entry in self.fields.items() if s == slot})
+        return view(self.actions), slots
+
+
+def _worker(
+    remote,
+    parent_remote,
+    env_fns: Sequence[Callable[[], Any]],
+    shm_name: str,
+    layout: _ShmLayout,
+    start: int,
+    end: int,
+):
+    """子进程：推进 [start, end) 段环境，结果写入共享内存槽位"""
+    parent_remote.close()
+    # 子进程与主进程共用同一个 resource_tracker，附着时的重复登记由主进程 unlink 一并注销
+    shm = shared_memory.SharedMemory(name=shm_name)
+    actions, slots = layout.views(shm.buf)
+    vec = None
+    try:
+        vec = BatchedVecEnv(env_fns, copy_obs=False)
+        while True:
+            try:
+                cmd, data = remote.recv()
+            except EOFError:
+                break
+            if cmd == "step":
+                out = slots[data]
+                _, rewards, dones, infos = vec.step(actions[start:end])
+                done_info = []
+                for j, info in enumerate(infos):
+                    out["invalid"][start + j] = info.get("error") == "invalid_action"
+                    out["truncated"][start + j] = info.get("TimeLimit.truncated", False)
+                    if dones[j]:
+                        out["terminal_obs"][start + j] = info["terminal_observation"]
+                        done_info.append((j, info["episode"]["r"], info["episode"]["l"]))
+                    out["episode_reward"][start + j] = info["episode_reward"]
+                    out["episode_length"][start + j] = info["episode_length"]
+                out["obs"][start:end] = vec.obs_buf
+                out["masks"][start:end] = vec.mask_buf
+                out["rewards"][start:end] = rewards
+                out["dones"][start:end] = dones
+                remote.send(("ok", done_info))
+            elif cmd == "reset":
+                slot, seeds, options = data
+                if seeds is not None:
+                    vec._seeds = list(seeds)
+                if options is not None:
+                    vec.set_options(options)
+                vec.reset()
+                out = slots[slot]
+                out["obs"][start:end] = vec.obs_buf
+                out["masks"][start:end] = vec.mask_buf
+                out["rewards"][start:end] = 0.0
+                out["dones"][start:end] = 0
+                out["truncated"][start:end] = 0
+                out["invalid"][start:end] = 0
+                out["episode_reward"][start:end] = 0.0
+                out["episode_length"][start:end] = 0
+                remote.send(("ok", None))
+            elif cmd == "get_attr":
+                name, local = data
+                remote.send(("ok", vec.get_attr(name, local)))
+            elif cmd == "set_attr":
+                name, value, local = data
+                vec.set_attr(name, value, local)
+                remote.send(("ok", None))
+            elif cmd == "env_method":
+                name, args, kwargs, local = data
+                remote.send(("ok", vec.env_method(name, *args, indices=local, **kwargs)))
+            elif cmd == "close":
+                remote.send(("ok", None))
+                break
+            else:
+                remote.send(("error", f"unknown command {cmd!r}"))
+    except KeyboardInterrupt:
+        pass
+    except Exception:
+        try:
+            remote.send(("error", traceback.format_exc()))
+        except Exception:
+            pass
+    finally:
+        if vec is not None:
+            try:
+                vec.close()
+            except Exception:
+                pass
+        del actions, slots
+        try:
+            shm.close()
+        except BufferError:
+            pass
+
+
+class _WorkerFailure(Exception):
+    """子进程退出 / 报错 / 超时"""
+
+
+class ShmVecEnv:
+    """
+    多进程共享内存向量环境（SB3 VecEnv 接口）
+
+    info 字段与 BatchedVecEnv 相同；另有 worker_restarted（该环境因子进程重启而结束）。
+    """
+
+    def __init__(
+        self,
+        env_fns: Sequence[Callable[[], Any]],
+        n_workers: Optional[int] = None,
+        n_slots: int = 2,
+        copy_obs: bool = True,
+        start_method: Optional[str] = None,
+        step_timeout: float = 60.0,
+        max_restarts: int = 10,
+    ):
+        """
+        Args:
+            env_fns: N 个环境构造函数
+            n_workers: 子进程数（默认 min(N, CPU 核数)）
+            n_slots: 环形结果槽位数（>= 2：重启时需要上一步观察）
+            copy_obs: 返回观察的拷贝（SB3 训练须为 True）
+            start_method: multiprocessing 启动方式（默认 fork，不可用时 spawn）
+            step_timeout: 单次命令等待上限（秒），超时视为子进程卡死
+            max_restarts: 累计重启上限，超过后抛出 RuntimeError
+        """
+        if not env_fns:
+            raise ValueError("ShmVecEnv needs at least one env")
+        if n_slots < 2:
+            raise ValueError("n_slots must be >= 2")
+        self.env_fns = list(env_fns)
+        self.num_envs = len(self.env_fns)
+        self.n_workers = max(1, min(n_workers or os.cpu_count() or 1, self.num_envs))
+        self.copy_obs = copy_obs
+        self.step_timeout = step_timeout
+        self.max_restarts = max_restarts
+        self.restarts = 0
+
+        # 观察 / 动作空间从一个临时实例读取
+        probe = self.env_fns[0]()
+        self.observation_space = probe.observation_space
+        self.action_space = probe.action_space
+        self.metadata = getattr(probe, "metadata", {})
+        probe.close()
+        self.render_mode = None
+
+        obs_dim = int(np.prod(self.observation_space.shape))
+        self._layout = _ShmLayout(self.num_envs, obs_dim, n_slots)
+        self._shm = shared_memory.SharedMemory(create=True, size=self._layout.size)
+        self._actions, self._slots = self._layout.views(self._shm.buf)
+        self._slot = 0
+        self._last_slot = 0
+
+        if start_method is None:
+            start_method = "fork" if "fork" in mp.get_all_start_methods() else "spawn"
+        self._ctx = mp.get_context(start_method)
+
+        # 连续切分：worker w 负责 [bounds[w], bounds[w+1])
+        self._bounds = np.linspace(0, self.num_envs, self.n_workers + 1).astype(int).tolist()
+        self._procs: List[Any] = [None] * self.n_workers
+        self._remotes: List[Any] = [None] * self.n_workers
+        for w in range(self.n_workers):
+            self._start_worker(w)
+
+        self.reset_infos: List[Dict[str, Any]] = [{} for _ in range(self.num_envs)]
+        self._seeds: List[Optional[int]] = [None] * self.num_envs
+        self._options: Optional[List[Dict[str, Any]]] = None
+        self._closed = False
+        _register_sb3_vec_env(ShmVecEnv)
+        logger.info(f"[ShmVecEnv] {self.num_envs} envs / {self.n_workers} workers ({start_method}), "
+                    f"shm {self._layout.size / 1e6:.1f} MB")
+
+    # ==================== VecEnv 接口 ====================
+
+    def reset(self) -> np.ndarray:
+        """重置全部环境，返回 (N, D) 观察"""
+        slot = self._advance_slot()
+        for w in range(self.n_workers):
+            self._send(w, "reset", (slot, self._worker_slice(self._seeds, w), self._worker_slice(self._options, w)))
+        for w in range(self.n_workers):
+            try:
+                self._recv(w)
+            except _WorkerFailure as e:
+                self._restart_worker(w, str(e))
+                self._send(w, "reset", (slot, None, None))
+                self._recv(w)
+        self._seeds = [None] * self.num_envs
+        self._options = None
+        self._last_slot = slot
+        obs = self._slots[slot]["obs"]
+        return obs.copy() if self.copy_obs else obs
+
+    def step_async(self, actions: np.ndarray):
+        self._actions[:] = np.asarray(actions).reshape(self.num_envs)
+        self._pending_slot = self._advance_slot()
+        for w in range(self.n_workers):
+            self._send(w, "step", self._pending_slot)
+
+    def step_wait(self):
+        """等待全部子进程；返回 (obs, rewards, dones, infos)"""
+        slot = self._pending_slot
+        out = self._slots[slot]
+        prev = self._slots[self._last_slot]
+        done_infos: Dict[int, Tuple[float, int]] = {}
+        restarted: List[int] = []
+        for w in range(self.n_workers):
+            start = self._bounds[w]
+            try:
+                for j, ep_r, ep_l in self._recv(w):
+                    done_infos[start + j] = (ep_r, ep_l)
+            except _WorkerFailure as e:
+                self._restart_worker(w, str(e))
+                end = self._bounds[w + 1]
+                # 以上一步观察作为终局观察，然后 reset 该段
+                out["terminal_obs"][start:end] = prev["obs"][start:end]
+                self._send(w, "reset", (slot, None, None))
+                self._recv(w)
+                out["dones"][start:end] = 1
+                out["truncated"][start:end] = 1
+                restarted.extend(range(start, end))
+
+        infos: List[Dict[str, Any]] = []
+        ep_rew, ep_len = out["episode_reward"], out["episode_length"]
+        for i in range(self.num_envs):
+            info = {"episode_reward": float(ep_rew[i]), "episode_length": int(ep_len[i])}
+            if out["invalid"][i]:
+                info["error"] = "invalid_action"
+            if out["dones"][i]:
+                info["terminal_observation"] = out["terminal_obs"][i].copy()
+                info["TimeLimit.truncated"] = bool(out["truncated"][i])
+                if i in done_infos:
+                    r, l = done_infos[i]
+                    info["episode"] = {"r": r, "l": l}
+            infos.append(info)
+        for i in restarted:
+            infos[i]["worker_restarted"] = True
+
+        self._last_slot = slot
+        obs = out["obs"].copy() if self.copy_obs else out["obs"]
+        return obs, out["rewards"].copy(), out["dones"].astype(bool), infos
+
+    def step(self, actions: np.ndarray):
+        self.step_async(actions)
+        return self.step_wait()
+
+    def action_masks(self) -> np.ndarray:
+        """当前 (N, 179) 动作掩码（拷贝）"""
+        return self._slots[self._last_slot]["masks"].copy()
+
+    def close(self):
+        if self._closed:
+            return
+        self._closed = True
+        for w in range(self.n_workers):
+            try:
+                self._send(w, "close", None)
+            except Exception:
+                pass
+        for w, proc in enumerate(self._procs):
+            if proc is None:
+                continue
+            proc.join(timeout=5)
+            if proc.is_alive():
+                proc.terminate()
+                proc.join(timeout=1)
+            self._remotes[w].close()
+        del self._actions, self._slots
+        try:
+            self._shm.close()
+        except BufferError:
+            pass  # copy_obs=False 时调用方可能仍持有槽位视图
+        self._shm.unlink()
+
+    def seed(self, seed: Optional[int] = None) -> List[Optional[int]]:
+        """设置下次 reset 的种子（第 i 个环境用 seed + i）"""
+        self._seeds = [None if seed is None else seed + i for i in range(self.num_envs)]
+        return list(self._seeds)
+
+    def set_options(self, options=None):
+        if options is None:
+            options = {}
+        if isinstance(options, dict):
+            self._options = [dict(options) for _ in range(self.num_envs)]
+        else:
+            self._options = [dict(o) for o in options]
+
+    def get_attr(self, attr_name: str, indices=None) -> List[Any]:
+        return self._call_envs("get_attr", indices, lambda local: (attr_name, local))
+
+    def set_attr(self, attr_name: str, value: Any, indices=None):
+        self._call_envs("set_attr", indices, lambda local: (attr_name, value, local))
+
+    def env_method(self, method_name: str, *method_args, indices=None, **method_kwargs) -> List[Any]:
+        if method_name == "action_masks":
+            masks = self._slots[self._last_slot]["masks"]
+            return [masks[i].copy() for i in self._indices(indices)]
+        return self._call_envs("env_method", indices,
+                               lambda local: (method_name, method_args, method_kwargs, local))
+
+    def env_is_wrapped(self, wrapper_class, indices=None) -> List[bool]:
+        return [False for _ in self._indices(indices)]
+
+    def render(self, mode: Optional[str] = None):
+        return None
+
+    def get_images(self) -> List[None]:
+        return [None for _ in range(self.num_envs)]
+
+    def getattr_depth_check(self, name: str, already_found: bool):
+        return None
+
+    @property
+    def unwrapped(self) -> "ShmVecEnv":
+        return self
+
+    def __del__(self):
+        try:
+            self.close()
+        except Exception:
+            pass
+
+    # ==================== 子进程管理 ====================
+
+    def _start_worker(self, w: int):
+        start, end = self._bounds[w], self._bounds[w + 1]
+        remote, work_remote = self._ctx.Pipe()
+        proc = self._ctx.Process(
+            target=_worker,
+            args=(work_remote, remote, self.env_fns[start:end], self._shm.name, self._layout, start, end),
+            daemon=True,
+        )
+        proc.start()
+        work_remote.close()
+        self._procs[w] = proc
+        self._remotes[w] = remote
+
+    def _restart_worker(self, w: int, reason: str):
+        self.restarts += 1
+        logger.warning(f"[ShmVecEnv] Worker {w} failed ({reason.strip().splitlines()[-1] if reason else '?'}), "
+                       f"restarting ({self.restarts}/{self.max_restarts})")
+        if self.restarts > self.max_restarts:
+            raise RuntimeError(f"ShmVecEnv worker {w} failed too many times: {reason}")
+        proc = self._procs[w]
+        if proc.is_alive():
+            proc.terminate()
+        proc.join(timeout=1)
+        self._remotes[w].close()
+        self._start_worker(w)
+
+    def _send(self, w: int, cmd: str, data):
+        try:
+            self._remotes[w].send((cmd, data))
+        except (BrokenPipeError, OSError):
+            pass  # 子进程已退出，_recv 时处理
+
+    def _recv(self, w: int):
+        """等待子进程回复；退出 / 报错 / 超时抛 _WorkerFailure"""
+        remote, proc = self._remotes[w], self._procs[w]
+        deadline = time.monotonic() + self.step_timeout
+        while not remote.poll(0.05):
+            if not proc.is_alive():
+                raise _WorkerFailure(f"exited with code {proc.exitcode}")
+            if time.monotonic() > deadline:
+                raise _WorkerFailure(f"no reply within {self.step_timeout:.0f}s")
+        try:
+            status, payload = remote.recv()
+        except (EOFError, OSError) as e:
+            raise _WorkerFailure(f"pipe closed: {e}")
+        if status != "ok":
+            raise _WorkerFailure(payload)
+        return payload
+
+    def _advance_slot(self) -> int:
+        slot = self._slot
+        self._slot = (self._slot + 1) % self._layout.n_slots
+        return slot
+
+    def _worker_slice(self, values: Optional[List[Any]], w: int) -> Optional[List[Any]]:
+        if values is None:
+            return None
+        return values[self._bounds[w]:self._bounds[w + 1]]
+
+    def _indices(self, indices) -> List[int]:
+        if indices is None:
+            return list(range(self.num_envs))
+        if isinstance(indices, int):
+            return [indices]
+        return list(indices)
+
+    def _call_envs(self, cmd: str, indices, make_data) -> List[Any]:
+        """按子进程分组转发 get_attr / set_attr / env_method，结果按 indices 顺序返回"""
+        targets = self._indices(indices)
+        by_worker: Dict[int, List[int]] = {}
+        for i in targets:
+            w = int(np.searchsorted(self._bounds, i, side="right")) - 1
+            by_worker.setdefault(w, []).append(i)
+        results: Dict[int, Any] = {}
+        for w, envs in by_worker.items():
+            local = [i - self._bounds[w] for i in envs]
+            values = self._call_worker(w, cmd, make_data(local))
+            if values is not None:
+                results.update(zip(envs, values))
+        return [results.get(i) for i in targets]
+
+    def _call_worker(self, w: int, cmd: str, data) -> Any:
+        """转发一次调用；子进程失败时重启并把该段 reset 到当前槽位，再重试一次"""
+        self._send(w, cmd, data)
+        try:
+            return self._recv(w)
+        except _WorkerFailure as e:
+            self._restart_worker(w, str(e))
+            self._send(w, "reset", (self._last_slot, None, None))
+            self._recv(w)
+        self._send(w, cmd, data)
+        try:
+            return self._recv(w)
+        except _WorkerFailure as e:
+            self._restart_worker(w, str(e))
+            self._send(w, "reset", (self._last_slot, None, None))
+            self._recv(w)
+            raise RuntimeError(f"ShmVecEnv {cmd} failed on worker {w} after restart: {e}") from None
@@ -0,0 +1,1469 @@
+#!/usr/bin/env python3
+"""
+无界面静默猎手（Silent）战斗模拟器
+
+纯 Python 实现的单场战斗引擎，用作 StsEnvironment 的高吞吐后端：
+- 卡牌：encoder_ids.yaml 中的 Silent 卡池（含 Shiv）+ 常见状态/诅咒牌，数值为未升级版本
+- 机制：能量、格挡、伤害、Weak/Vulnerable/Frail/Poison/Strength/Dexterity、
+  抽牌/弃牌/消耗堆、Shiv、常见能力（Noxious Fumes / After Image / Envenom ...）
+- 怪物：Act 1 普通怪、精英、Boss（按 A0 数值与出招规律，部分 Boss 机制简化）
+- frame() 输出与 CommunicationMod 相同结构的帧，encode() 与动作掩码可直接使用
+
+简化约定：
+- 需要玩家选牌的效果（Survivor / Acrobatics / Prepared 等的弃牌、Setup、Nightmare）
+  自动选择：优先状态/诅咒牌，其次费用最高的牌
+- 出牌目标按 Mod 语义为怪物列表下标；目标已死亡或未给目标时自动改为第一个存活怪物
+- 不含药水、遗物（仅 Ring of the Snake 首回合多抽 2 张）
+- 终局帧保留 combat_state，便于 _compute_reward 计算最后一步的奖励
+
+用法：
+    sim = SilentCombatSim(seed=0)
+    frame = sim.reset("Jaw Worm")
+    frame = sim.step_command("play 1 0")   # 或 sim.step_action(action_id)
+"""
+import random
+from typing import Any, Dict, List, Optional, Tuple
+
+# ==================== 卡牌表 ====================
+
+
+class CardSpec:
+    """卡牌定义（未升级数值）"""
+    __slots__ = (
+        "id", "cost", "type", "rarity", "target", "dmg", "hits", "aoe", "block",
+        "draw", "discard", "weak", "vuln", "poison", "energy", "shivs",
+        "exhaust", "ethereal", "innate", "unplayable", "power", "special",
+    )
+
+    def __init__(self, id, cost, type, rarity, target=False, dmg=0, hits=1, aoe=False, block=0,
+                 draw=0, discard=0, weak=0, vuln=0, poison=0, energy=0, shivs=0,
+                 exhaust=False, ethereal=False, innate=False, unplayable=False,
+                 power=None, special=None):
+        self.id = id
+        self.cost = cost
+        self.type = type
+        self.rarity = rarity
+        self.target = target
+        self.dmg = dmg
+        self.hits = hits
+        self.aoe = aoe
+        self.block = block
+        self.draw = draw
+        self.discard = discard
+        self.weak = weak
+        self.vuln = vuln
+        self.poison = poison
+        self.energy = energy
+        self.shivs = shivs
+        self.exhaust = exhaust
+        self.ethereal = ethereal
+        self.innate = innate
+        self.unplayable = unplayable
+        self.power = power
+        self.special = special
+
+
+_A, _S, _P, _ST, _CU = "ATTACK", "SKILL", "POWER", "STATUS", "CURSE"
+_X = -1  # X 费用
+
+CARDS: Dict[str, CardSpec] = {c.id: c for c in [
+    # 基础
+    CardSpec("Strike_G", 1, _A, "BASIC", target=True, dmg=6),
+    CardSpec("Defend_G", 1, _S, "BASIC", block=5),
+    CardSpec("Neutralize", 0, _A, "BASIC", target=True, dmg=3, weak=1),
+    CardSpec("Survivor", 1, _S, "BASIC", block=8, discard=1),
+    # 普通
+    CardSpec("Acrobatics", 1, _S, "COMMON", draw=3, discard=1),
+    CardSpec("Backflip", 1, _S, "COMMON", block=5, draw=2),
+    CardSpec("Bane", 1, _A, "COMMON", target=True, dmg=7, special="bane"),
+    CardSpec("Blade Dance", 1, _S, "COMMON", shivs=3),
+    CardSpec("Cloak And Dagger", 1, _S, "COMMON", block=6, shivs=1),
+    CardSpec("Dagger Spray", 1, _A, "COMMON", dmg=4, hits=2, aoe=True),
+    CardSpec("Deadly Poison", 1, _S, "COMMON", target=True, poison=5),
+    CardSpec("Deflect", 0, _S, "COMMON", block=4),
+    CardSpec("Dodge and Roll", 1, _S, "COMMON", block=4, power=("Next Turn Block", 4)),
+    CardSpec("Flying Knee", 1, _A, "COMMON", target=True, dmg=8, power=("Energized", 1)),
+    CardSpec("Outmaneuver", 1, _S, "COMMON", power=("Energized", 2)),
+    CardSpec("Piercing Wail", 1, _S, "COMMON", aoe=True, exhaust=True, special="piercing_wail"),
+    CardSpec("Poisoned Stab", 1, _A, "COMMON", target=True, dmg=6, poison=3),
+    CardSpec("Prepared", 0, _S, "COMMON", draw=1, discard=1),
+    CardSpec("Quick Slash", 1, _A, "COMMON", target=True, dmg=8, draw=1),
+    CardSpec("Slice", 0, _A, "COMMON", target=True, dmg=6),
+    CardSpec("Sneaky Strike", 2, _A, "COMMON", target=True, dmg=12, special="sneaky"),
+    CardSpec("Underhanded Strike", 2, _A, "COMMON", target=True, dmg=12, special="sneaky"),
+    CardSpec("Sucker Punch", 1, _A, "COMMON", target=True, dmg=7, weak=1),
+    # 罕见
+    CardSpec("All Out Attack", 1, _A, "UNCOMMON", dmg=10, aoe=True, special="discard_random"),
+    CardSpec("Backstab", 0, _A, "UNCOMMON", target=True, dmg=11, innate=True, exhaust=True),
+    CardSpec("Blur", 1, _S, "UNCOMMON", block=5, power=("Blur", 1)),
+    CardSpec("Bouncing Flask", 2, _S, "UNCOMMON", special="bouncing_flask"),
+    CardSpec("Calculated Gamble", 0, _S, "UNCOMMON", exhaust=True, special="gamble"),
+    CardSpec("Caltrops", 1, _P, "UNCOMMON", power=("Thorns", 3)),
+    CardSpec("Catalyst", 1, _S, "UNCOMMON", target=True, exhaust=True, special="catalyst"),
+    CardSpec("Choke", 2, _A, "UNCOMMON", target=True, dmg=12, special="choke"),
+    CardSpec("Concentrate", 0, _S, "UNCOMMON", discard=3, energy=2),
+    CardSpec("Crippling Cloud", 2, _S, "UNCOMMON", aoe=True, poison=4, weak=2, exhaust=True),
+    CardSpec("Dash", 2, _A, "UNCOMMON", target=True, dmg=10, block=10),
+    CardSpec("Distraction", 1, _S, "UNCOMMON", exhaust=True, special="distraction"),
+    CardSpec("Endless Agony", 0, _A, "UNCOMMON", target=True, dmg=4, exhaust=True),
+    CardSpec("Escape Plan", 0, _S, "UNCOMMON", special="escape_plan"),
+    CardSpec("Eviscerate", 3, _A, "UNCOMMON", target=True, dmg=7, hits=3, special="eviscerate"),
+    CardSpec("Expertise", 1, _S, "UNCOMMON", special="expertise"),
+    CardSpec("Finisher", 1, _A, "UNCOMMON", target=True, dmg=6, special="finisher"),
+    CardSpec("Flechettes", 1, _A, "UNCOMMON", target=True, dmg=4, special="flechettes"),
+    CardSpec("Footwork", 1, _P, "UNCOMMON", power=("Dexterity", 2)),
+    CardSpec("Heel Hook", 1, _A, "UNCOMMON", target=True, dmg=5, special="heel_hook"),
+    CardSpec("Infinite Blades", 1, _P, "UNCOMMON", power=("Infinite Blades", 1)),
+    CardSpec("Leg Sweep", 2, _S, "UNCOMMON", target=True, weak=2, block=11),
+    CardSpec("Masterful Stab", 0, _A, "UNCOMMON", target=True, dmg=12),
+    CardSpec("Noxious Fumes", 1, _P, "UNCOMMON", power=("Noxious Fumes", 2)),
+    CardSpec("Predator", 2, _A, "UNCOMMON", target=True, dmg=15, power=("Draw Card", 2)),
+    CardSpec("Reflex", 0, _S, "UNCOMMON", unplayable=True, special="reflex"),
+    CardSpec("Riddle With Holes", 2, _A, "UNCOMMON", target=True, dmg=3, hits=5),
+    CardSpec("Setup", 1, _S, "UNCOMMON", special="setup"),
+    CardSpec("Skewer", _X, _A, "UNCOMMON", target=True, dmg=7, special="x_hits"),
+    CardSpec("Tactician", 0, _S, "UNCOMMON", unplayable=True, special="tactician"),
+    CardSpec("Terror", 1, _S, "UNCOMMON", target=True, vuln=99, exhaust=True),
+    CardSpec("Well Laid Plans", 1, _P, "UNCOMMON", power=("Well Laid Plans", 1)),
+    # 稀有
+    CardSpec("Adrenaline", 0, _S, "RARE", energy=1, draw=2, exhaust=True),
+    CardSpec("After Image", 1, _P, "RARE", power=("After Image", 1)),
+    CardSpec("Bullet Time", 3, _S, "RARE", special="bullet_time"),
+    CardSpec("Burst", 1, _S, "RARE", power=("Burst", 1)),
+    CardSpec("Corpse Explosion", 2, _S, "RARE", target=True, poison=6, special="corpse_explosion"),
+    CardSpec("Die Die Die", 1, _A, "RARE", dmg=13, aoe=True, exhaust=True),
+    CardSpec("Doppelganger", _X, _S, "RARE", exhaust=True, special="doppelganger"),
+    CardSpec("Envenom", 2, _P, "RARE", power=("Envenom", 1)),
+    CardSpec("Glass Knife", 1, _A, "RARE", target=True, dmg=8, hits=2, special="glass_knife"),
+    CardSpec("Grand Finale", 0, _A, "RARE", dmg=50, aoe=True, special="grand_finale"),
+    CardSpec("Malaise", _X, _S, "RARE", target=True, exhaust=True, special="malaise"),
+    CardSpec("Nightmare", 3, _S, "RARE", exhaust=True, special="nightmare"),
+    CardSpec("Phantasmal Killer", 1, _S, "RARE", power=("Phantasmal", 1)),
+    CardSpec("Storm of Steel", 1, _S, "RARE", special="storm_of_steel"),
+    CardSpec("Thousand Cuts", 2, _P, "RARE", power=("Thousand Cuts", 1)),
+    CardSpec("Tools of the Trade", 1, _P, "RARE", power=("Tools Of The Trade", 1)),
+    CardSpec("Unload", 1, _A, "RARE", target=True, dmg=14, special="unload"),
+    CardSpec("Wraith Form", 3, _P, "RARE", special="wraith_form"),
+    # 特殊
+    CardSpec("Shiv", 0, _A, "SPECIAL", target=True, dmg=4, exhaust=True, special="shiv"),
+    # 状态 / 诅咒
+    CardSpec("Dazed", -2, _ST, "SPECIAL", unplayable=True, ethereal=True),
+    CardSpec("Slimed", 1, _ST, "SPECIAL", exhaust=True),
+    CardSpec("Wound", -2, _ST, "SPECIAL", unplayable=True),
+    CardSpec("Burn", -2, _ST, "SPECIAL", unplayable=True, special="burn"),
+    CardSpec("Void", -2, _ST, "SPECIAL", unplayable=True, ethereal=True, special="void"),
+    CardSpec("AscendersBane", -2, _CU, "CURSE", unplayable=True, ethereal=True),
+]}
+
+STARTER_DECK = ["Strike_G"] * 5 + ["Defend_G"] * 5 + ["Neutralize", "Survivor"]
+
+# 可加入随机牌组的玩家卡（不含基础、特殊、状态、诅咒）
+PLAYER_CARD_POOL = [c.id for c in CARDS.values() if c.rarity in ("COMMON", "UNCOMMON", "RARE")]
+_SKILL_POOL = [c.id for c in CARDS.values() if c.type == _S and c.rarity in ("COMMON", "UNCOMMON", "RARE")
+               and not c.unplayable]
+
+
+class CardInst:
+    """牌实例"""
+    __slots__ = ("spec", "uuid", "cost", "free", "dmg_penalty")
+
+    def __init__(self, spec: CardSpec, uuid: int):
+        self.spec = spec
+        self.uuid = uuid
+        self.cost = spec.cost
+        self.free = False          # 本回合 0 费（Setup / Bullet Time / Distraction）
+        self.dmg_penalty = 0       # Glass Knife 逐次减伤
+
+    def copy(self) -> "CardInst":
+        c = CardInst.__new__(CardInst)
+        c.spec, c.uuid, c.cost, c.free, c.dmg_penalty = self.spec, self.uuid, self.cost, self.free, self.dmg_penalty
+        return c
+
+    def to_frame(self, playable: bool, cost: Optional[int] = None) -> Dict[str, Any]:
+        """cost: 手牌的当前费用（SilentCombatSim._cost，含 Eviscerate 弃牌减费）；None 时按 free 标记"""
+        s = self.spec
+        if cost is None:
+            cost = 0 if self.free and self.cost > 0 else self.cost
+        return {
+            "id": s.id,
+            "name": s.id,
+            "uuid": f"sim-{self.uuid}",
+            "cost": cost,
+            "type": s.type,
+            "rarity": s.rarity,
+            "upgrades": 0,
+            "exhausts": s.exhaust,
+            "ethereal": s.ethereal,
+            "is_playable": playable,
+            "has_target": s.target,
+        }
+
+
+# ==================== 怪物 ====================
+
+# 招式：(intent, 伤害, 段数, 格挡, 其他效果)
+# 效果键：str（自身力量）、weak/vuln/frail（对玩家）、slimed/dazed/burn（塞牌，张数）、
+#        ritual、enrage、metallicize、str_down/dex_down（对玩家）、escape、split、steal
+Move = Tuple[str, int, int, int, Dict[str, int]]
+
+MONSTERS: Dict[str, Dict[str, Any]] = {
+    "Cultist": {"hp": (48, 54), "moves": {
+        1: ("ATTACK", 6, 1, 0, {}),                     # Dark Strike
+        3: ("BUFF", 0, 0, 0, {"ritual": 3}),            # Incantation
+    }},
+    "JawWorm": {"hp": (40, 44), "moves": {
+        1: ("ATTACK", 11, 1, 0, {}),                    # Chomp
+        2: ("BUFF", 0, 0, 6, {"str": 3}),               # Bellow
+        3: ("ATTACK_DEFEND", 7, 1, 5, {}),              # Thrash
+    }},
+    "FuzzyLouseNormal": {"hp": (10, 15), "powers": {"Curl Up": (3, 7)}, "moves": {
+        3: ("ATTACK", -1, 1, 0, {}),                    # Bite（伤害 5-7 出生时决定）
+        4: ("BUFF", 0, 0, 0, {"str": 3}),               # Grow
+    }},
+    "FuzzyLouseDefensive": {"hp": (11, 17), "powers": {"Curl Up": (3, 7)}, "moves": {
+        3: ("ATTACK", -1, 1, 0, {}),                    # Bite
+        4: ("DEBUFF", 0, 0, 0, {"weak": 2}),            # Spit Web
+    }},
+    "AcidSlime_S": {"hp": (8, 12), "moves": {
+        1: ("ATTACK", 3, 1, 0, {}),                     # Tackle
+        2: ("DEBUFF", 0, 0, 0, {"weak": 1}),            # Lick
+    }},
+    "AcidSlime_M": {"hp": (28, 32), "moves": {
+        1: ("ATTACK_DEBUFF", 7, 1, 0, {"slimed": 1}),   # Corrosive Spit
+        2: ("ATTACK", 10, 1, 0, {}),                    # Tackle
+        4: ("DEBUFF", 0, 0, 0, {"weak": 1}),            # Lick
+    }},
+    "AcidSlime_L": {"hp": (65, 69), "powers": {"Split": 1}, "moves": {
+        1: ("ATTACK_DEBUFF", 11, 1, 0, {"slimed": 2}),
+        2: ("ATTACK", 16, 1, 0, {}),
+        3: ("UNKNOWN", 0, 0, 0, {"split": 1}),
+        4: ("DEBUFF", 0, 0, 0, {"weak": 2}),
+    }},
+    "SpikeSlime_S": {"hp": (10, 14), "moves": {
+        1: ("ATTACK", 5, 1, 0, {}),
+    }},
+    "SpikeSlime_M": {"hp": (28, 32), "moves": {
+        1: ("ATTACK_DEBUFF", 8, 1, 0, {"slimed": 1}),   # Flame Tackle
+        4: ("DEBUFF", 0, 0, 0, {"frail": 1}),           # Lick
+    }},
+    "SpikeSlime_L": {"hp": (64, 70), "powers": {"Split": 1}, "moves": {
+        1: ("ATTACK_DEBUFF", 16, 1, 0, {"slimed": 2}),
+        3: ("UNKNOWN", 0, 0, 0, {"split": 1}),
+        4: ("DEBUFF", 0, 0, 0, {"frail": 2}),
+    }},
+    "FungiBeast": {"hp": (22, 28), "powers": {"Spore Cloud": 2}, "moves": {
+        1: ("ATTACK", 6, 1, 0, {}),                     # Bite
+        2: ("BUFF", 0, 0, 0, {"str": 3}),               # Grow
+    }},
+    "Looter": {"hp": (44, 48), "moves": {
+        1: ("ATTACK", 10, 1, 0, {"steal": 15}),         # Mug
+        2: ("DEFEND", 0, 0, 6, {}),                     # Smoke Bomb
+        3: ("ESCAPE", 0, 0, 0, {"escape": 1}),
+        4: ("ATTACK", 12, 1, 0, {"steal": 15}),         # Lunge
+    }},
+    "SlaverBlue": {"hp": (46, 50), "moves": {
+        1: ("ATTACK", 12, 1, 0, {}),                    # Stab
+        4: ("ATTACK_DEBUFF", 7, 1, 0, {"weak": 1}),     # Rake
+    }},
+    "SlaverRed": {"hp": (46, 50), "moves": {
+        1: ("ATTACK", 13, 1, 0, {}),                    # Stab
+        2: ("STRONG_DEBUFF", 0, 0, 0, {"entangle": 1}), # Entangle
+        3: ("ATTACK_DEBUFF", 8, 1, 0, {"vuln": 1}),     # Scrape
+    }},
+    "GremlinFat": {"hp": (13, 17), "moves": {
+        2: ("ATTACK_DEBUFF", 4, 1, 0, {"weak": 1}),     # Smash
+    }},
+    "GremlinThief": {"hp": (10, 14), "moves": {
+        1: ("ATTACK", 9, 1, 0, {}),                     # Puncture
+    }},
+    "GremlinTsundere": {"hp": (12, 15), "moves": {
+        1: ("DEFEND", 0, 0, 0, {"protect": 7}),         # Protect（给随机友方格挡）
+        2: ("ATTACK", 6, 1, 0, {}),                     # Shield Bash
+    }},
+    "GremlinWarrior": {"hp": (20, 24), "powers": {"Angry": 1}, "moves": {
+        1: ("ATTACK", 4, 1, 0, {}),                     # Scratch
+    }},
+    "GremlinWizard": {"hp": (21, 25), "moves": {
+        1: ("ATTACK", 25, 1, 0, {}),                    # Ultimate Blast
+        2: ("UNKNOWN", 0, 0, 0, {}),                    # Charging
+    }},
+    "GremlinNob": {"hp": (82, 86), "moves": {
+        1: ("ATTACK", 14, 1, 0, {}),                    # Rush
+        2: ("ATTACK_DEBUFF", 6, 1, 0, {"vuln": 2}),     # Skull Bash
+        3: ("BUFF", 0, 0, 0, {"enrage": 2}),            # Bellow
+    }},
+    "Lagavulin": {"hp": (109, 111), "powers": {"Metallicize": 8}, "moves": {
+        1: ("STRONG_DEBUFF", 0, 0, 0, {"str_down": 1, "dex_down": 1}),  # Siphon Soul
+        3: ("ATTACK", 18, 1, 0, {}),                    # Attack
+        4: ("SLEEP", 0, 0, 0, {}),                      # Sleep
+        5: ("STUN", 0, 0, 0, {}),                       # 被打醒后的眩晕
+    }},
+    "Sentry": {"hp": (38, 42), "powers": {"Artifact": 1}, "moves": {
+        3: ("DEBUFF", 0, 0, 0, {"dazed": 2}),           # Bolt
+        4: ("ATTACK", 9, 1, 0, {}),                     # Beam
+    }},
+    "SlimeBoss": {"hp": (140, 140), "powers": {"Split": 1}, "moves": {
+        1: ("ATTACK", 35, 1, 0, {}),                    # Slam
+        2: ("UNKNOWN", 0, 0, 0, {}),                    # Preparing
+        3: ("UNKNOWN", 0, 0, 0, {"split": 1}),
+        4: ("STRONG_DEBUFF", 0, 0, 0, {"slimed": 3}),   # Goop Spray
+    }},
+    "TheGuardian": {"hp": (240, 240), "powers": {"Mode Shift": 30}, "moves": {
+        1: ("ATTACK", 5, 4, 0, {}),                     # Whirlwind
+        2: ("DEFEND", 0, 0, 9, {}),                     # Charging Up
+        3: ("ATTACK", 32, 1, 0, {}),                    # Fierce Bash
+        4: ("BUFF", 0, 0, 20, {"sharp_hide": 3}),       # Roll Attack 前的防御形态（简化）
+        5: ("ATTACK", 9, 1, 0, {}),                     # Roll Attack
+        6: ("ATTACK", 8, 2, 0, {}),                     # Twin Slam
+        7: ("DEBUFF", 0, 0, 0, {"weak": 2, "vuln": 2}), # Vent Steam
+    }},
+    "Hexaghost": {"hp": (250, 250), "moves": {
+        1: ("ATTACK", -1, 6, 0, {}),                    # Divider（(玩家血量/12+1) × 6）
+        2: ("ATTACK", 5, 2, 0, {}),                     # Tackle
+        3: ("UNKNOWN", 0, 0, 0, {}),                    # Activate
+        4: ("ATTACK_DEBUFF", 6, 1, 0, {"burn": 1}),     # Sear
+        5: ("DEFEND_BUFF", 0, 0, 12, {"str": 2}),       # Inflame
+        6: ("ATTACK_DEBUFF", 2, 6, 0, {"burn": 3}),     # Inferno
+    }},
+}
+
+# Act 1 遭遇（A0）
+ENCOUNTERS: Dict[str, List[str]] = {
+    "Cultist": ["Cultist"],
+    "Jaw Worm": ["JawWorm"],
+    "2 Louse": ["FuzzyLouseNormal", "FuzzyLouseDefensive"],
+    "Small Slimes": ["SpikeSlime_S", "AcidSlime_M"],
+    "Gremlin Gang": ["GremlinFat", "GremlinThief", "GremlinWarrior", "GremlinWizard"],
+    "Large Slime": ["AcidSlime_L"],
+    "Lots of Slimes": ["SpikeSlime_S", "SpikeSlime_S", "SpikeSlime_S", "AcidSlime_S", "AcidSlime_S"],
+    "Blue Slaver": ["SlaverBlue"],
+    "Red Slaver": ["SlaverRed"],
+    "3 Louse": ["FuzzyLouseNormal", "FuzzyLouseDefensive", "FuzzyLouseNormal"],
+    "2 Fungi Beasts": ["FungiBeast", "FungiBeast"],
+    "Exordium Thugs": ["FuzzyLouseNormal", "SlaverBlue"],
+    "Exordium Wildlife": ["FungiBeast", "JawWorm"],
+    "Looter": ["Looter"],
+    "Gremlin Nob": ["GremlinNob"],
+    "Lagavulin": ["Lagavulin"],
+    "3 Sentries": ["Sentry", "Sentry", "Sentry"],
+    "Slime Boss": ["SlimeBoss"],
+    "The Guardian": ["TheGuardian"],
+    "Hexaghost": ["Hexaghost"],
+}
+NORMAL_ENCOUNTERS = [k for k in ENCOUNTERS if k not in
+                     ("Gremlin Nob", "Lagavulin", "3 Sentries", "Slime Boss", "The Guardian", "Hexaghost")]
+
+
+class MonsterInst:
+    """怪物实例"""
+    __slots__ = ("id", "spec", "hp", "max_hp", "block", "powers", "move", "history",
+                 "is_gone", "half_dead", "bite", "vars")
+
+    def __init__(self, mid: str, hp: int):
+        self.id = mid
+        self.spec = MONSTERS[mid]
+        self.hp = hp
+        self.max_hp = hp
+        self.block = 0
+        self.powers: Dict[str, int] = {}
+        self.move = 0
+        self.history: List[int] = []
+        self.is_gone = False
+        self.half_dead = False
+        self.bite = 0
+        self.vars: Dict[str, int] = {}
+
+    @property
+    def alive(self) -> bool:
+        return not self.is_gone and self.hp > 0
+
+    def copy(self) -> "MonsterInst":
+        m = MonsterInst.__new__(MonsterInst)
+        m.id, m.spec, m.hp, m.max_hp, m.block = self.id, self.spec, self.hp, self.max_hp, self.block
+        m.powers, m.history, m.vars = dict(self.powers), list(self.history), dict(self.vars)
+        m.move, m.is_gone, m.half_dead, m.bite = self.move, self.is_gone, self.half_dead, self.bite
+        return m
+
+    def last(self, n: int = 1) -> int:
+        return self.history[-n] if len(self.history) >= n else -1
+
+    def last_two(self, move: int) -> bool:
+        return len(self.history) >= 2 and self.history[-1] == move and self.history[-2] == move
+
+
+# ==================== 模拟器 ====================
+
+
+class SilentCombatSim:
+    """
+    单场战斗模拟器
+
+    Args:
+        seed: 随机种子
+        deck: 牌组（卡牌 ID 列表，默认初始牌组）
+        max_hp / hp: 玩家血量
+        base_energy: 每回合能量
+        ring_of_the_snake: 首回合多抽 2 张
+    """
+
+    HAND_LIMIT = 10
+
+    def __init__(
+        self,
+        seed: Optional[int] = None,
+        deck: Optional[List[str]] = None,
+        max_hp: int = 70,
+        hp: Optional[int] = None,
+        base_energy: int = 3,
+        ring_of_the_snake: bool = True,
+        floor: int = 1,
+    ):
+        self.rng = random.Random(seed)
+        self.deck = list(deck) if deck else list(STARTER_DECK)
+        unknown = [c for c in self.deck if c not in CARDS]
+        if unknown:
+            raise ValueError(f"Unknown cards in deck: {unknown}")
+        self.max_hp = max_hp
+        self.start_hp = hp if hp is not None else max_hp
+        self.base_energy = base_energy
+        self.ring_of_the_snake = ring_of_the_snake
+        self.floor = floor
+        self.encounter = ""
+        self._uuid = 0
+        self.steps = 0
+        self._reset_state()
+
+    # ==================== 对外接口 ====================
+
+    def reset(self, encounter: Optional[str] = None, monsters: Optional[List[str]] = None) -> Dict[str, Any]:
+        """开始新战斗，返回首帧（encounter=None 时随机普通遭遇）"""
+        if monsters is None:
+            if encounter is None:
+                encounter = self.rng.choice(NORMAL_ENCOUNTERS)
+            if encounter not in ENCOUNTERS:
+                raise ValueError(f"Unknown encounter: {encounter}")
+            monsters = ENCOUNTERS[encounter]
+        self.encounter = encounter or "+".join(monsters)
+        self._reset_state()
+
+        rng = self.rng
+        for mid in monsters:
+            lo, hi = MONSTERS[mid]["hp"]
+            m = MonsterInst(mid, rng.randint(lo, hi))
+            for name, amount in MONSTERS[mid].get("powers", {}).items():
+                m.powers[name] = rng.randint(*amount) if isinstance(amount, tuple) else amount
+            if mid.startswith("FuzzyLouse"):
+                m.bite = rng.randint(5, 7)
+            if mid == "Lagavulin":
+                m.vars["asleep"] = 1
+                m.vars["idle"] = 0
+            self.monsters.append(m)
+        if len(self.monsters) >= 3 and all(m.id == "Sentry" for m in self.monsters):
+            self.monsters[1].vars["beam_first"] = 1
+
+        draw = [self._new_card(cid) for cid in self.deck]
+        rng.shuffle(draw)
+        # 固有牌置顶
+        draw.sort(key=lambda c: c.spec.innate)
+        self.draw_pile = draw
+
+        for m in self.monsters:
+            self._roll_move(m)
+        self._start_player_turn(first=True)
+        return self.frame()
+
+    @property
+    def done(self) -> bool:
+        return self.player_hp <= 0 or not any(m.alive for m in self.monsters)
+
+    @property
+    def won(self) -> bool:
+        return self.player_hp > 0 and not any(m.alive for m in self.monsters)
+
+    def step_action(self, action_id: int) -> Dict[str, Any]:
+        """按动作 ID（179 维动作空间）执行；不支持的动作视为 state"""
+        if 0 <= action_id < 70:
+            self.play_card(action_id % 10, action_id // 10 - 1)
+        elif action_id == 170:
+            self.end_turn()
+        return self.frame()
+
+    def step_command(self, command: str) -> Dict[str, Any]:
+        """按 Mod 命令执行（play i [t] / end / state），返回新帧"""
+        parts = command.split()
+        if parts and parts[0] == "play" and len(parts) >= 2:
+            target = int(parts[2]) if len(parts) > 2 else -1
+            self.play_card(int(parts[1]) - 1, target)
+        elif parts and parts[0] == "end":
+            self.end_turn()
+        return self.frame()
+
+    def clone(self, seed: Optional[int] = None) -> "SilentCombatSim":
+        """
+        复制当前战斗（搜索用的前向模型）
+
+        Args:
+            seed: 新随机种子；None 时复制当前随机数状态（与原模拟器走出相同的随机序列）
+        """
+        new = SilentCombatSim.__new__(SilentCombatSim)
+        new.__dict__.update(self.__dict__)
+        new.rng = random.Random(seed)
+        if seed is None:
+            new.rng.setstate(self.rng.getstate())
+        new.deck = list(self.deck)
+        new.player_powers = dict(self.player_powers)
+        new.hand = [c.copy() for c in self.hand]
+        new.draw_pile = [c.copy() for c in self.draw_pile]
+        new.discard_pile = [c.copy() for c in self.discard_pile]
+        new.exhaust_pile = [c.copy() for c in self.exhaust_pile]
+        new.monsters = [m.copy() for m in self.monsters]
+        new.vars = dict(self.vars)
+        if "Piercing Wail" in self.vars:
+            index = {id(m): i for i, m in enumerate(self.monsters)}
+            new.vars["Piercing Wail"] = [(new.monsters[index[id(m)]], a) for m, a in self.vars["Piercing Wail"]]
+        if "Nightmare" in self.vars:
+            new.vars["Nightmare"] = list(self.vars["Nightmare"])
+        return new
+
+    @classmethod
+    def from_frame(cls, frame: Dict[str, Any], seed: Optional[int] = None,
+                   base_energy: int = 3) -> "SilentCombatSim":
+        """
+        由 Mod 战斗帧重建模拟器（搜索用的前向模型）
+
+        - 牌：按 id 对应模拟器卡牌（忽略大小写与空格/下划线）；未收录的牌按类型换成同类基础牌
+        - 抽牌堆顺序对玩家未知，按 seed 洗牌
+        - 怪物：续用帧中的 move_id 与最近两招；更早的出招历史、遗物、药水、升级不还原
+
+        Raises:
+            ValueError: 帧中没有 combat_state，或含模拟器未实现的怪物
+        """
+        gs = frame.get("game_state") or {}
+        cs = gs.get("combat_state")
+        if not cs:
+            raise ValueError("frame has no combat_state")
+        player = cs.get("player") or {}
+        deck = [cid for cid in (_sim_card_id(c) for c in gs.get("deck") or []) if cid]
+        sim = cls(seed=seed, deck=deck or None, max_hp=player.get("max_hp", gs.get("max_hp", 70)),
+                  hp=player.get("current_hp"), base_energy=base_energy, ring_of_the_snake=False,
+                  floor=gs.get("floor", 1))
+        sim.encounter = "frame"
+        sim.player_block = player.get("block", 0)
+        sim.energy = player.get("energy", 0)
+        sim.player_powers = {p.get("id"): p.get("amount", 0) for p in player.get("powers") or []}
+        sim.turn = cs.get("turn", 1)
+        sim.gold = gs.get("gold", 0)
+        sim.discarded_this_turn = cs.get("cards_discarded_this_turn", 0)
+        sim.times_damaged = cs.get("times_damaged", 0)
+
+        def pile(key):
+            out = []
+            for c in cs.get(key) or []:
+                cid = _sim_card_id(c)
+                if cid is None:
+                    continue
+                inst = sim._new_card(cid)
+                cost = c.get("cost", inst.cost)
+                if 0 == cost < inst.cost and inst.spec.special != "eviscerate":
+                    inst.free = True
+                out.append(inst)
+            return out
+
+        sim.hand = pile("hand")
+        sim.draw_pile = pile("draw_pile")
+        sim.discard_pile = pile("discard_pile")
+        sim.exhaust_pile = pile("exhaust_pile")
+        sim.rng.shuffle(sim.draw_pile)
+
+        for md in cs.get("monsters") or []:
+            mid = md.get("id")
+            if mid not in MONSTERS:
+                raise ValueError(f"Unsupported monster: {mid}")
+            m = MonsterInst(mid, md.get("max_hp", 1))
+            m.hp = md.get("current_hp", 0)
+            m.block = md.get("block", 0)
+            m.is_gone = md.get("is_gone", False) or m.hp <= 0
+            m.half_dead = md.get("half_dead", False)
+            m.powers = {p.get("id"): p.get("amount", 0) for p in md.get("powers") or []}
+            m.history = [h for h in (md.get("second_last_move_id"), md.get("last_move_id"))
+                         if isinstance(h, int) and h >= 0]
+            m.move = md.get("move_id", 0)
+            base = md.get("move_base_damage", -1)
+            if mid.startswith("FuzzyLouse"):
+                m.bite = base if m.move == 3 and base > 0 else sim.rng.randint(5, 7)
+            if mid == "Lagavulin":
+                m.vars["asleep"] = int(m.move == 4)
+                m.vars["idle"] = m.history.count(4)
+            if mid == "Hexaghost" and m.move == 1 and base > 0:
+                m.vars["divider"] = base
+            if m.powers.get("Split") and m.move == 3:
+                m.vars["splitting"] = 1
+            if mid == "TheGuardian" and m.powers.get("Sharp Hide"):
+                m.vars["defensive"] = 1
+            sim.monsters.append(m)
+        for m in sim.monsters:
+            if m.alive and m.move not in m.spec["moves"]:
+                sim._roll_move(m)
+        return sim
+
+    def card_playable(self, c: CardInst) -> bool:
+        s = c.spec
+        if s.unplayable or self.done:
+            return False
+        if s.special == "grand_finale" and self.draw_pile:
+            return False
+        if s.type == _A and self.player_powers.get("Entangled"):
+            return False
+        cost = self._cost(c)
+        return cost < 0 or cost <= self.energy
+
+    def play_card(self, index: int, target: int = -1) -> bool:
+        """
+        打出手牌
+
+        Args:
+            index: 手牌下标（0-based）
+            target: 目标怪物下标（Mod 语义，0-based；-1 为无目标）
+
+        Returns:
+            是否成功打出
+        """
+        if not (0 <= index < len(self.hand)) or self.done:
+            return False
+        card = self.hand[index]
+        if not self.card_playable(card):
+            return False
+        spec = card.spec
+        tgt = None
+        if spec.target:
+            if 0 <= target < len(self.monsters) and self.monsters[target].alive:
+                tgt = self.monsters[target]
+            else:
+                tgt = self._first_alive()
+
+        cost = self._cost(card)
+        x = self.energy if cost < 0 else 0
+        self.energy -= x if cost < 0 else cost
+        self.hand.pop(index)
+        self.steps += 1
+
+        times = 2 if spec.type == _S and self.player_powers.get("Burst") else 1
+        if times == 2:
+            self._add_power(self.player_powers, "Burst", -1)
+        for _ in range(times):
+            self._resolve(card, tgt, x)
+            if self.done:
+                break
+
+        if spec.type == _A:
+            self.attacks_played += 1
+        elif spec.type == _S:
+            for m in self.monsters:
+                if m.alive and m.powers.get("Enrage"):
+                    self._add_power(m.powers, "Strength", m.powers["Enrage"])
+
+        # 打出后触发
+        for m in self.monsters:
+            if m.alive and m.powers.get("Choked"):
+                m.hp -= m.powers["Choked"]
+                if m.hp <= 0:
+                    self._on_monster_death(m)
+        if self.player_powers.get("After Image"):
+            self._gain_block(self.player_powers["After Image"], raw=True)
+        if self.player_powers.get("Thousand Cuts"):
+            for m in self.monsters:
+                if m.alive:
+                    self._damage_monster(m, self.player_powers["Thousand Cuts"], thorns=True)
+
+        card.free = False
+        if spec.exhaust or spec.type == _P:
+            if spec.type != _P:
+                self.exhaust_pile.append(card)
+        else:
+            self.discard_pile.append(card)
+        return True
+
+    def end_turn(self):
+        """结束回合：弃牌 → 怪物行动 → 下回合开始"""
+        if self.done:
+            return
+        self.steps += 1
+        pp = self.player_powers
+
+        # 回合末：手牌中的 Burn 造成伤害
+        for c in self.hand:
+            if c.spec.special == "burn":
+                self._damage_player(2, source=None)
+        if pp.get("Metallicize"):
+            self._gain_block(pp["Metallicize"], raw=True)
+
+        # 弃手牌（虚无消耗）
+        for c in self.hand:
+            c.free = False
+            (self.exhaust_pile if c.spec.ethereal else self.discard_pile).append(c)
+        self.hand = []
+        if pp.get("Wraith Form"):
+            self._add_power(pp, "Dexterity", -pp["Wraith Form"])
+        pp.pop("Entangled", None)
+        pp.pop("No Draw", None)
+        self.vars.pop("bullet_time", None)
+        for m in self.monsters:
+            m.powers.pop("Choked", None)
+        if "Piercing Wail" in self.vars:
+            for m, amount in self.vars.pop("Piercing Wail"):
+                self._add_power(m.powers, "Strength", amount)
+
+        # 怪物回合
+        for m in list(self.monsters):
+            if not m.alive:
+                continue
+            m.block = 0
+            if m.powers.get("Poison"):
+                self._tick_poison(m)
+                if not m.alive:
+                    continue
+            if self.done:
+                break
+            self._monster_act(m)
+            if self.done:
+                break
+            if m.powers.get("Metallicize") and m.alive:
+                m.block += m.powers["Metallicize"]
+
+        if self.done:
+            return
+
+        # 回合结束：递减 debuff、Ritual
+        self._end_of_round()
+        for m in self.monsters:
+            if m.alive:
+                self._roll_move(m)
+        self._start_player_turn()
+
+    # ==================== 帧输出 ====================
+
+    def frame(self) -> Dict[str, Any]:
+        """CommunicationMod 格式的当前帧"""
+        playable = [self.card_playable(c) for c in self.hand]
+        combat_state = {
+            "hand": [c.to_frame(p, self._cost(c)) for c, p in zip(self.hand, playable)],
+            "draw_pile": [c.to_frame(False) for c in self.draw_pile],
+            "discard_pile": [c.to_frame(False) for c in self.discard_pile],
+            "exhaust_pile": [c.to_frame(False) for c in self.exhaust_pile],
+            "limbo": [],
+            "player": {
+                "current_hp": max(self.player_hp, 0),
+                "max_hp": self.max_hp,
+                "block": self.player_block,
+                "energy": self.energy,
+                "powers": self._powers_frame(self.player_powers),
+                "orbs": [],
+            },
+            "monsters": [self._monster_frame(m) for m in self.monsters],
+            "turn": self.turn,
+            "cards_discarded_this_turn": self.discarded_this_turn,
+            "times_damaged": self.times_damaged,
+        }
+        game_state = {
+            "screen_type": "NONE",
+            "screen_state": {},
+            "screen_name": "NONE",
+            "room_phase": "COMBAT",
+            "room_type": "MonsterRoom",
+            "action_phase": "WAITING_ON_USER",
+            "current_hp": max(self.player_hp, 0),
+            "max_hp": self.max_hp,
+            "floor": self.floor,
+            "act": 1,
+            "gold": self.gold,
+            "class": "THE_SILENT",
+            "ascension_level": 0,
+            "relics": [{"id": "Ring of the Snake", "name": "Ring of the Snake", "counter": -1}]
+            if self.ring_of_the_snake else [],
+            "deck": [{"id": cid, "name": cid, "cost": CARDS[cid].cost, "type": CARDS[cid].type,
+                      "rarity": CARDS[cid].rarity, "upgrades": 0} for cid in self.deck],
+            "potions": [],
+            "map": [],
+            "combat_state": combat_state,
+        }
+        if self.done:
+            commands = ["proceed", "key", "click", "wait", "state"]
+            if self.won:
+                game_state.update(room_phase="COMPLETE", screen_type="COMBAT_REWARD",
+                                  screen_state={"rewards": [{"type": "GOLD", "gold": 15}]})
+            else:
+                game_state.update(screen_type="GAME_OVER", screen_state={"victory": False, "score": 0})
+        else:
+            commands = (["play"] if any(playable) else []) + ["end", "key", "click", "wait", "state"]
+        return {
+            "available_commands": commands,
+            "ready_for_command": True,
+            "in_game": True,
+            "game_state": game_state,
+        }
+
+    # ==================== 内部：回合 ====================
+
+    def _reset_state(self):
+        self.player_hp = self.start_hp
+        self.player_block = 0
+        self.player_powers: Dict[str, int] = {}
+        self.energy = 0
+        self.turn = 0
+        self.gold = 99
+        self.hand: List[CardInst] = []
+        self.draw_pile: List[CardInst] = []
+        self.discard_pile: List[CardInst] = []
+        self.exhaust_pile: List[CardInst] = []
+        self.monsters: List[MonsterInst] = []
+        self.attacks_played = 0
+        self.discarded_this_turn = 0
+        self.times_damaged = 0
+        self.vars: Dict[str, Any] = {}
+
+    def _new_card(self, cid: str) -> CardInst:
+        self._uuid += 1
+        return CardInst(CARDS[cid], self._uuid)
+
+    def _start_player_turn(self, first: bool = False):
+        pp = self.player_powers
+        self.turn += 1
+        self.attacks_played = 0
+        self.discarded_this_turn = 0
+        if pp.get("Blur"):
+            self._add_power(pp, "Blur", -1)
+        else:
+            self.player_block = 0
+        if pp.get("Intangible") and not first:
+            self._add_power(pp, "Intangible", -1)
+        if pp.get("Next Turn Block"):
+            self._gain_block(pp.pop("Next Turn Block"), raw=True)
+
+        self.energy = self.base_energy + pp.pop("Energized", 0)
+        draw = 5 + pp.pop("Draw Card", 0)
+        if first and self.ring_of_the_snake:
+            draw += 2
+        if pp.get("Doppelganger"):
+            n = pp.pop("Doppelganger")
+            self.energy += n
+            draw += n
+        self._draw(draw)
+
+        if pp.get("Infinite Blades"):
+            self._add_shivs(pp["Infinite Blades"])
+        if pp.get("Noxious Fumes"):
+            for m in self.monsters:
+                if m.alive:
+                    self._apply_debuff(m, "Poison", pp["Noxious Fumes"])
+        if pp.get("Tools Of The Trade"):
+            self._draw(pp["Tools Of The Trade"])
+            self._auto_discard(pp["Tools Of The Trade"])
+        if "Nightmare" in self.vars:
+            for cid in self.vars.pop("Nightmare"):
+                if len(self.hand) < self.HAND_LIMIT:
+                    self.hand.append(self._new_card(cid))
+        # Void 抽到时失去 1 能量
+        self.energy -= sum(1 for c in self.hand if c.spec.special == "void")
+        self.energy = max(self.energy, 0)
+
+    def _end_of_round(self):
+        for powers in [self.player_powers] + [m.powers for m in self.monsters if m.alive]:
+            for name in ("Weakened", "Vulnerable", "Frail"):
+                if powers.get(name):
+                    self._add_power(powers, name, -1)
+        for m in self.monsters:
+            if m.alive and m.powers.get("Ritual"):
+                if m.vars.pop("ritual_skip", 0):
+                    continue
+                self._add_power(m.powers, "Strength", m.powers["Ritual"])
+        self.player_powers.pop("Phantasmal Active", None)
+        if self.player_powers.pop("Phantasmal", 0):
+            self.player_powers["Phantasmal Active"] = 1
+
+    def _draw(self, n: int):
+        if self.player_powers.get("No Draw"):
+            return
+        for _ in range(n):
+            if len(self.hand) >= self.HAND_LIMIT:
+                break
+            if not self.draw_pile:
+                if not self.discard_pile:
+                    break
+                self.draw_pile = self.discard_pile
+                self.discard_pile = []
+                self.rng.shuffle(self.draw_pile)
+            card = self.draw_pile.pop()
+            if self.vars.get("bullet_time"):
+                card.free = True
+            self.hand.append(card)
+
+    def _auto_discard(self, n: int):
+        """自动弃牌：优先状态/诅咒/不可打出，其次费用最高"""
+        for _ in range(min(n, len(self.hand))):
+            idx = max(range(len(self.hand)), key=lambda i: (self.hand[i].spec.unplayable
+                                                            or self.hand[i].spec.type in (_ST, _CU),
+                                                            self.hand[i].cost))
+            self._discard(idx)
+
+    def _discard(self, idx: int):
+        card = self.hand.pop(idx)
+        card.free = False
+        self.discard_pile.append(card)
+        self.discarded_this_turn += 1
+        special = card.spec.special
+        if special == "reflex":
+            self._draw(2)
+        elif special == "tactician":
+            self.energy += 1
+
+    def _add_shivs(self, n: int):
+        for _ in range(n):
+            card = self._new_card("Shiv")
+            if len(self.hand) < self.HAND_LIMIT:
+                self.hand.append(card)
+            else:
+                self.discard_pile.append(card)
+
+    def _cost(self, c: CardInst) -> int:
+        if c.spec.special == "eviscerate":
+            return max(0, c.cost - self.discarded_this_turn)
+        if c.free and c.cost > 0:
+            return 0
+        return c.cost
+
+    def _first_alive(self) -> Optional[MonsterInst]:
+        for m in self.monsters:
+            if m.alive:
+                return m
+        return None
+
+    # ==================== 内部：卡牌结算 ====================
+
+    def _resolve(self, card: CardInst, tgt: Optional[MonsterInst], x: int):
+        s = card.spec
+        sp = s.special
+        pp = self.player_powers
+
+        if sp == "gamble":
+            n = len(self.hand)
+            while self.hand:
+                self._discard(len(self.hand) - 1)
+            self._draw(n)
+            return
+        if sp == "storm_of_steel":
+            n = len(self.hand)
+            while self.hand:
+                self._discard(len(self.hand) - 1)
+            self._add_shivs(n)
+            return
+        if sp == "bouncing_flask":
+            for _ in range(3):
+                alive = [m for m in self.monsters if m.alive]
+                if alive:
+                    self._apply_debuff(self.rng.choice(alive), "Poison", 3)
+            return
+
+        # 伤害
+        if s.dmg:
+            base = s.dmg
+            hits = s.hits
+            if sp == "x_hits":
+                hits = x
+            elif sp == "finisher":
+                hits = self.attacks_played
+            elif sp == "flechettes":
+                hits = sum(1 for c in self.hand if c.spec.type == _S)
+            elif sp == "glass_knife":
+                base = max(0, base - card.dmg_penalty)
+                card.dmg_penalty += 2
+            elif sp == "shiv":
+                base += pp.get("Accuracy", 0)
+            if sp == "bane" and tgt is not None and tgt.powers.get("Poison"):
+                hits = 2
+            for _ in range(hits):
+                if s.aoe:
+                    for m in self.monsters:
+                        if m.alive:
+                            self._attack(m, base)
+                elif tgt is not None and tgt.alive:
+                    self._attack(tgt, base)
+                else:
+                    break
+                if self.done:
+                    break
+
+        if s.block:
+            self._gain_block(s.block)
+
+        # debuff
+        targets = [m for m in self.monsters if m.alive] if s.aoe else ([tgt] if tgt is not None and tgt.alive else [])
+        for m in targets:
+            if s.weak:
+                self._apply_debuff(m, "Weakened", s.weak)
+            if s.vuln:
+                self._apply_debuff(m, "Vulnerable", s.vuln)
+            if s.poison:
+                self._apply_debuff(m, "Poison", s.poison)
+
+        if sp == "heel_hook" and tgt is not None and tgt.powers.get("Weakened"):
+            self.energy += 1
+            self._draw(1)
+        elif sp == "sneaky" and self.discarded_this_turn:
+            self.energy += 2
+        elif sp == "choke" and tgt is not None and tgt.alive:
+            self._add_power(tgt.powers, "Choked", 3)
+        elif sp == "catalyst" and tgt is not None and tgt.alive and tgt.powers.get("Poison"):
+            tgt.powers["Poison"] *= 2
+        elif sp == "corpse_explosion" and tgt is not None and tgt.alive:
+            self._add_power(tgt.powers, "Corpse Explosion", 1)
+        elif sp == "malaise" and tgt is not None and tgt.alive and x:
+            self._apply_debuff(tgt, "Strength", -x)
+            self._apply_debuff(tgt, "Weakened", x)
+        elif sp == "piercing_wail":
+            wail = []
+            for m in self.monsters:
+                if m.alive and not self._artifact_blocks(m):
+                    self._add_power(m.powers, "Strength", -6)
+                    wail.append((m, 6))
+            self.vars.setdefault("Piercing Wail", []).extend(wail)
+        elif sp == "escape_plan":
+            before = len(self.hand)
+            self._draw(1)
+            if len(self.hand) > before and self.hand[-1].spec.type == _S:
+                self._gain_block(3)
+        elif sp == "expertise":
+            self._draw(max(0, 6 - len(self.hand)))
+        elif sp == "unload":
+            i = len(self.hand) - 1
+            while i >= 0:
+                if self.hand[i].spec.type != _A:
+                    self._discard(i)
+                i -= 1
+        elif sp == "discard_random" and self.hand:
+            self._discard(self.rng.randrange(len(self.hand)))
+        elif sp == "distraction":
+            self._add_card_to_hand(self.rng.choice(_SKILL_POOL), free=True)
+        elif sp == "setup" and self.hand:
+            idx = max(range(len(self.hand)), key=lambda i: self.hand[i].cost)
+            c = self.hand.pop(idx)
+            c.free = True
+            self.draw_pile.append(c)
+        elif sp == "bullet_time":
+            for c in self.hand:
+                c.free = True
+            self.vars["bullet_time"] = 1
+            pp["No Draw"] = 1
+        elif sp == "doppelganger" and x:
+            self._add_power(pp, "Doppelganger", x)
+        elif sp == "nightmare" and self.hand:
+            c = max(self.hand, key=lambda h: h.cost)
+            self.vars.setdefault("Nightmare", []).extend([c.spec.id] * 3)
+        elif sp == "wraith_form":
+            self._add_power(pp, "Intangible", 2)
+            self._add_power(pp, "Wraith Form", 1)
+
+        if s.draw:
+            self._draw(s.draw)
+        if s.discard:
+            self._auto_discard(s.discard)
+        if s.energy:
+            self.energy += s.energy
+        if s.shivs:
+            self._add_shivs(s.shivs)
+        if s.power:
+            name, amount = s.power
+            self._add_power(pp, name, amount)
+
+    def _add_card_to_hand(self, cid: str, free: bool = False):
+        card = self._new_card(cid)
+        card.free = free
+        (self.hand if len(self.hand) < self.HAND_LIMIT else self.discard_pile).append(card)
+
+    # ==================== 内部：数值 ====================
+
+    @staticmethod
+    def _add_power(powers: Dict[str, int], name: str, amount: int):
+        v = powers.get(name, 0) + amount
+        if v:
+            powers[name] = v
+        else:
+            powers.pop(name, None)
+
+    def _artifact_blocks(self, m: MonsterInst) -> bool:
+        if m.powers.get("Artifact"):
+            self._add_power(m.powers, "Artifact", -1)
+            return True
+        return False
+
+    def _apply_debuff(self, m: MonsterInst, name: str, amount: int):
+        if self._artifact_blocks(m):
+            return
+        self._add_power(m.powers, name, amount)
+
+    def _gain_block(self, amount: int, raw: bool = False):
+        if not raw:
+            amount += self.player_powers.get("Dexterity", 0)
+            if self.player_powers.get("Frail"):
+                amount = int(amount * 0.75)
+        if amount > 0:
+            self.player_block += amount
+
+    def _attack(self, m: MonsterInst, base: int):
+        """玩家攻击伤害（力量 → 虚弱 → 易伤 → 幻影杀手）"""
+        pp = self.player_powers
+        dmg = base + pp.get("Strength", 0)
+        if pp.get("Weakened"):
+            dmg = int(dmg * 0.75)
+        if m.powers.get("Vulnerable"):
+            dmg = int(dmg * 1.5)
+        if pp.get("Phantasmal Active"):
+            dmg *= 2
+        unblocked = self._damage_monster(m, max(dmg, 0))
+        if unblocked > 0 and pp.get("Envenom") and m.alive:
+            self._apply_debuff(m, "Poison", pp["Envenom"])
+
+    def _damage_monster(self, m: MonsterInst, dmg: int, thorns: bool = False) -> int:
+        """对怪物造成伤害（扣格挡），返回未被格挡的伤害"""
+        if not m.alive:
+            return 0
+        blocked = min(m.block, dmg)
+        m.block -= blocked
+        unblocked = dmg - blocked
+        if unblocked > 0:
+            m.hp -= unblocked
+            if m.powers.get("Curl Up"):
+                m.block += m.powers.pop("Curl Up")
+            if m.powers.get("Angry"):
+                self._add_power(m.powers, "Strength", m.powers["Angry"])
+            if m.id == "Lagavulin" and m.vars.get("asleep"):
+                self._wake_lagavulin(m)
+            if m.powers.get("Mode Shift"):
+                m.powers["Mode Shift"] -= unblocked
+                if m.powers["Mode Shift"] <= 0:
+                    m.powers.pop("Mode Shift")
+                    m.vars["defensive"] = 1
+                    m.move = 4
+            if m.powers.get("Split") and 0 < m.hp <= m.max_hp // 2 and not m.vars.get("splitting"):
+                m.vars["splitting"] = 1
+                m.move = 3
+        if not thorns and m.powers.get("Sharp Hide"):
+            self._damage_player(m.powers["Sharp Hide"], source=None)
+        if m.hp <= 0:
+            self._on_monster_death(m)
+        return unblocked
+
+    def _on_monster_death(self, m: MonsterInst):
+        m.hp = 0
+        m.is_gone = True
+        m.block = 0
+        if m.powers.get("Spore Cloud"):
+            self.player_powers["Vulnerable"] = self.player_powers.get("Vulnerable", 0) + m.powers["Spore Cloud"]
+        if m.powers.get("Corpse Explosion"):
+            for other in self.monsters:
+                if other is not m and other.alive:
+                    self._damage_monster(other, m.max_hp * m.powers["Corpse Explosion"], thorns=True)
+
+    def _tick_poison(self, m: MonsterInst):
+        p = m.powers["Poison"]
+        m.hp -= p
+        self._add_power(m.powers, "Poison", -1)
+        if m.hp <= 0:
+            self._on_monster_death(m)
+
+    def _damage_player(self, dmg: int, source: Optional[MonsterInst]):
+        if dmg <= 0:
+            return
+        if self.player_powers.get("Intangible"):
+            dmg = 1
+        blocked = min(self.player_block, dmg)
+        self.player_block -= blocked
+        unblocked = dmg - blocked
+        if unblocked > 0:
+            self.player_hp -= unblocked
+            self.times_damaged += 1
+        if source is not None and self.player_powers.get("Thorns") and source.alive:
+            self._damage_monster(source, self.player_powers["Thorns"], thorns=True)
+
+    def _monster_damage(self, m: MonsterInst, base: int) -> int:
+        """怪物对玩家的单段伤害（用于意图显示与结算）"""
+        dmg = base + m.powers.get("Strength", 0)
+        if m.powers.get("Weakened"):
+            dmg = int(dmg * 0.75)
+        if self.player_powers.get("Vulnerable"):
+            dmg = int(dmg * 1.5)
+        if self.player_powers.get("Intangible"):
+            dmg = min(dmg, 1)
+        return max(dmg, 0)
+
+    def _move_base(self, m: MonsterInst) -> Tuple[str, int, int, int, Dict[str, int]]:
+        intent, dmg, hits, block, fx = m.spec["moves"][m.move]
+        if dmg == -1:
+            dmg = m.bite if m.bite else (self.player_hp // 12 + 1)
+        return intent, dmg, hits, block, fx
+
+    # ==================== 内部：怪物 ====================
+
+    def _monster_act(self, m: MonsterInst):
+        intent, dmg, hits, block, fx = self._move_base(m)
+        if m.id == "Hexaghost" and m.move == 1:
+            dmg = m.vars.get("divider", dmg)
+        for _ in range(hits):
+            if dmg > 0 or intent.startswith("ATTACK"):
+                self._damage_player(self._monster_damage(m, dmg), source=m)
+            if self.player_hp <= 0:
+                return
+        if block:
+            m.block += block
+        if fx:
+            pp = self.player_powers
+            if fx.get("str"):
+                self._add_power(m.powers, "Strength", fx["str"])
+            if fx.get("ritual"):
+                self._add_power(m.powers, "Ritual", fx["ritual"])
+                m.vars["ritual_skip"] = 1
+            if fx.get("enrage"):
+                self._add_power(m.powers, "Enrage", fx["enrage"])
+            for key, name in (("weak", "Weakened"), ("vuln", "Vulnerable"), ("frail", "Frail")):
+                if fx.get(key):
+                    self._add_power(pp, name, fx[key])
+            if fx.get("str_down"):
+                self._add_power(pp, "Strength", -fx["str_down"])
+            if fx.get("dex_down"):
+                self._add_power(pp, "Dexterity", -fx["dex_down"])
+            if fx.get("entangle"):
+                pp["Entangled"] = 1
+            for key, cid in (("slimed", "Slimed"), ("dazed", "Dazed"), ("burn", "Burn")):
+                for _ in range(fx.get(key, 0)):
+                    self.discard_pile.append(self._new_card(cid))
+            if fx.get("steal"):
+                self.gold = max(0, self.gold - fx["steal"])
+            if fx.get("escape"):
+                m.is_gone = True
+            if fx.get("protect"):
+                allies = [o for o in self.monsters if o.alive and o is not m] or [m]
+                self.rng.choice(allies).block += fx["protect"]
+            if fx.get("sharp_hide"):
+                m.powers["Sharp Hide"] = fx["sharp_hide"]
+            if fx.get("split"):
+                self._split(m)
+        m.history.append(m.move)
+
+    def _split(self, m: MonsterInst):
+        children = {
+            "AcidSlime_L": ["AcidSlime_M", "AcidSlime_M"],
+            "SpikeSlime_L": ["SpikeSlime_M", "SpikeSlime_M"],
+            "SlimeBoss": ["SpikeSlime_L", "AcidSlime_L"],
+        }[m.id]
+        hp = m.hp
+        m.is_gone = True
+        m.hp = 0
+        idx = self.monsters.index(m)
+        new = []
+        for cid in children:
+            child = MonsterInst(cid, hp)
+            for name, amount in MONSTERS[cid].get("powers", {}).items():
+                child.powers[name] = amount if not isinstance(amount, tuple) else self.rng.randint(*amount)
+            new.append(child)
+        self.monsters[idx + 1:idx + 1] = new
+
+    def _wake_lagavulin(self, m: MonsterInst):
+        m.vars["asleep"] = 0
+        m.powers.pop("Metallicize", None)
+        m.move = 5  # 眩晕一回合
+
+    def _roll_move(self, m: MonsterInst):
+        """根据出招规律决定下一招（写入 m.move）"""
+        r = self.rng.randrange(100)
+        mid = m.id
+        last = m.last()
+
+        if m.vars.get("splitting"):
+            m.move = 3
+            return
+        if mid == "Cultist":
+            m.move = 3 if not m.history else 1
+        elif mid == "JawWorm":
+            if not m.history:
+                m.move = 1
+            elif r < 25:
+                m.move = 1 if last != 1 else (2 if self.rng.random() < 0.5625 else 3)
+            elif r < 55:
+                m.move = 3 if not m.last_two(3) else (1 if self.rng.random() < 0.357 else 2)
+            else:
+                m.move = 2 if last != 2 else (1 if self.rng.random() < 0.416 else 3)
+        elif mid in ("FuzzyLouseNormal", "FuzzyLouseDefensive"):
+            if r < 25:
+                m.move = 4 if last != 4 else 3
+            else:
+                m.move = 3 if not m.last_two(3) else 4
+        elif mid == "AcidSlime_S":
+            m.move = (1 if self.rng.random() < 0.5 else 2) if not m.history else (2 if last == 1 else 1)
+        elif mid in ("AcidSlime_M", "AcidSlime_L"):
+            if r < 30:
+                m.move = 1 if not m.last_two(1) else (2 if self.rng.random() < 0.5 else 4)
+            elif r < 70:
+                m.move = 2 if last != 2 else (1 if self.rng.random() < 0.5 else 4)
+            else:
+                m.move = 4 if last != 4 else (1 if self.rng.random() < 0.4 else 2)
+        elif mid == "SpikeSlime_S":
+            m.move = 1
+        elif mid in ("SpikeSlime_M", "SpikeSlime_L"):
+            if r < 30:
+                m.move = 1 if not m.last_two(1) else 4
+            else:
+                m.move = 4 if not m.last_two(4) else 1
+        elif mid == "FungiBeast":
+            if r < 60:
+                m.move = 1 if not m.last_two(1) else 2
+            else:
+                m.move = 2 if last != 2 else 1
+        elif mid == "Looter":
+            n = len(m.history)
+            if n < 2:
+                m.move = 1
+            elif n == 2:
+                m.move = 4 if self.rng.random() < 0.5 else 2
+            elif last == 4:
+                m.move = 2
+            else:
+                m.move = 3
+        elif mid == "SlaverBlue":
+            if r >= 40:
+                m.move = 1 if not m.last_two(1) else 4
+            else:
+                m.move = 4 if last != 4 else 1
+        elif mid == "SlaverRed":
+            if not m.history:
+                m.move = 1
+            elif r >= 75 and not m.vars.get("used_entangle"):
+                m.move = 2
+                m.vars["used_entangle"] = 1
+            elif r >= 55 and not m.last_two(3):
+                m.move = 3
+            else:
+                m.move = 1 if not m.last_two(1) else 3
+        elif mid == "GremlinFat":
+            m.move = 2
+        elif mid in ("GremlinThief", "GremlinWarrior"):
+            m.move = 1
+        elif mid == "GremlinTsundere":
+            others = any(o.alive and o is not m for o in self.monsters)
+            m.move = 1 if others else 2
+        elif mid == "GremlinWizard":
+            charge = m.vars.get("charge", 0) + 1
+            if charge >= 3:
+                m.move, m.vars["charge"] = 1, 0
+            else:
+                m.move, m.vars["charge"] = 2, charge
+        elif mid == "GremlinNob":
+            if not m.history:
+                m.move = 3
+            elif r < 33:
+                m.move = 2
+            else:
+                m.move = 1 if not m.last_two(1) else 2
+        elif mid == "Lagavulin":
+            if m.vars.get("asleep"):
+                idle = m.vars.get("idle", 0) + 1
+                m.vars["idle"] = idle
+                if idle > 3:
+                    m.vars["asleep"] = 0
+                    m.powers.pop("Metallicize", None)
+                    m.move = 3
+                else:
+                    m.move = 4
+            elif m.move == 5 or m.move == 4:
+                m.move = 3
+            else:
+                m.move = 1 if m.last_two(3) else 3
+        elif mid == "Sentry":
+            if not m.history:
+                m.move = 4 if m.vars.get("beam_first") else 3
+            else:
+                m.move = 4 if last == 3 else 3
+        elif mid == "SlimeBoss":
+            cycle = (4, 2, 1)
+            m.move = cycle[len(m.history) % 3]
+        elif mid == "TheGuardian":
+            if m.vars.get("defensive"):
+                if last == 4:
+                    m.move = 5
+                elif last == 5:
+                    m.move = 6
+                    m.vars["defensive"] = 0
+                    m.powers.pop("Sharp Hide", None)
+                    m.vars["shifts"] = m.vars.get("shifts", 0) + 1
+                    m.powers["Mode Shift"] = 30 + 10 * m.vars["shifts"]
+                else:
+                    m.move = 4
+            else:
+                cycle = (2, 3, 7, 1)
+                m.move = cycle[m.vars.get("offense", 0) % 4]
+                m.vars["offense"] = m.vars.get("offense", 0) + 1
+        elif mid == "Hexaghost":
+            n = len(m.history)
+            if n == 0:
+                m.move = 3
+            elif n == 1:
+                m.move = 1
+                m.vars["divider"] = self.player_hp // 12 + 1
+            else:
+                cycle = (4, 2, 4, 5, 2, 4, 6)
+                m.move = cycle[(n - 2) % 7]
+        else:
+            m.move = next(iter(m.spec["moves"]))
+
+    # ==================== 内部：帧 ====================
+
+    @staticmethod
+    def _powers_frame(powers: Dict[str, int]) -> List[Dict[str, Any]]:
+        return [{"id": k, "name": k, "amount": v} for k, v in powers.items()]
+
+    def monster_intent(self, m: MonsterInst) -> Tuple[str, int, int, int]:
+        """帧中显示的 (intent, move_base_damage, move_hits, move_adjusted_damage)；非攻击招式伤害为 -1"""
+        if m.alive and m.move in m.spec["moves"]:
+            intent, dmg, hits, _, _ = self._move_base(m)
+            if m.id == "Hexaghost" and m.move == 1:
+                dmg = m.vars.get("divider", dmg)
+            if not intent.startswith("ATTACK"):
+                dmg, hits = -1, 0
+            return intent, dmg, hits, self._monster_damage(m, dmg) if dmg >= 0 else -1
+        return "NONE", -1, 0, -1
+
+    def _monster_frame(self, m: MonsterInst) -> Dict[str, Any]:
+        intent, dmg, hits, adjusted = self.monster_intent(m)
+        return {
+            "id": m.id,
+            "name": m.id,
+            "current_hp": max(m.hp, 0),
+            "max_hp": m.max_hp,
+            "block": m.block,
+            "intent": intent,
+            "move_id": m.move,
+            "last_move_id": m.last(1),
+            "second_last_move_id": m.last(2),
+            "move_base_damage": dmg,
+            "move_adjusted_damage": adjusted,
+            "move_hits": hits,
+            "half_dead": m.half_dead,
+            "is_gone": m.is_gone or not m.alive,
+            "powers": self._powers_frame(m.powers),
+        }
+
+
+_CARD_LOOKUP = {cid.lower().replace("_", " "): cid for cid in CARDS}
+_CARD_SUBSTITUTES = {_A: "Strike_G", _S: "Defend_G", _P: "Footwork", _ST: "Wound", _CU: "AscendersBane"}
+
+
+def _sim_card_id(card: Dict[str, Any]) -> Optional[str]:
+    """Mod 卡牌 → 模拟器卡牌 id（未收录的按类型替换，类型未知返回 None）"""
+    cid = card.get("id", "")
+    if cid in CARDS:
+        return cid
+    hit = _CARD_LOOKUP.get(str(cid).lower().replace("_", " "))
+    return hit if hit is not None else _CARD_SUBSTITUTES.get(card.get("type"))
+
+
+def random_deck(rng: random.Random, extra_cards: int = 5) -> List[str]:
+    """初始牌组 + 随机 extra_cards 张 Silent 卡（用于增加训练多样性）"""
+    return list(STARTER_DECK) + [rng.choice(PLAYER_CARD_POOL) for _ in range(extra_cards)]
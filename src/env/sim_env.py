@@ -0,0 +1,228 @@
+#!/usr/bin/env python3
+"""
+模拟器驱动的战斗环境
+
+用 SilentCombatSim 作为 StsEnvironment 的动力学后端：每个 episode 是一场战斗，
+step 把动作交给模拟器结算，再把模拟器输出的 Mod 帧解析为 GameState，
+动作掩码、奖励、终止判断沿用 StsEnvironment 的实现。战斗进行中的观察由 encode_silent_sim
+直接读模拟器对象生成（与 encode(帧) 逐维一致），终局帧与非 2945 维观察仍走 StsEnvironment。
+
+用法：
+    env = SimEnv(seed=0)                        # 随机 Act 1 普通遭遇、初始牌组
+    env = SimEnv(encounters=["Gremlin Nob"], extra_cards=5)
+    obs, info = env.reset()
+    obs, reward, done, truncated, info = env.step(int(np.flatnonzero(info["action_mask"])[0]))
+"""
+import logging
+import random
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from src.core.action import ACTION_SPACE_SIZE
+from src.core.game_state import GameState
+from src.env.action_mask import build_action_mask, mask_to_valid_actions
+from src.env.silent_sim import SilentCombatSim, random_deck
+from src.env.sts_env import StsEnvironment
+from src.training.encoder import encode_silent_sim, get_output_dim, silent_sim_template
+
+logger = logging.getLogger(__name__)
+
+
+class SimEnv(StsEnvironment):
+    """
+    SilentCombatSim 驱动的单场战斗环境
+
+    info 在 StsEnvironment 的字段外另含：
+        encounter: 当前遭遇名
+        won: 战斗结束时是否胜利（未结束为 None）
+    """
+
+    def __init__(
+        self,
+        seed: Optional[int] = None,
+        encounters: Optional[List[str]] = None,
+        deck: Optional[List[str]] = None,
+        extra_cards: int = 0,
+        max_hp: int = 70,
+        max_episode_steps: int = 1000,
+        render_mode: str = "none",
+        observation_dim: int = None,
+        mode: str = "extended",
+    ):
+        """
+        Args:
+            seed: 随机种子（模拟器与遭遇抽取共用）
+            encounters: 可选遭遇列表（None=Act 1 普通遭遇）
+            deck: 固定牌组（None=初始牌组）
+            extra_cards: 每局在初始牌组上随机追加的卡牌数（deck 为 None 时生效）
+            max_hp: 玩家最大生命
+            max_episode_steps: 截断步数
+        """
+        super().__init__(render_mode=render_mode, observation_dim=observation_dim, character="silent", mode=mode)
+        self.encounters = list(encounters) if encounters else None
+        self.deck = list(deck) if deck else None
+        self.extra_cards = extra_cards
+        self.max_episode_steps = max_episode_steps
+        self._init_kwargs = dict(
+            encounters=encounters, deck=deck, extra_cards=extra_cards, max_hp=max_hp,
+            max_episode_steps=max_episode_steps, render_mode=render_mode,
+            observation_dim=observation_dim, mode=mode,
+        )
+        self._rng = random.Random(seed)
+        self.sim = SilentCombatSim(seed=seed, deck=deck, max_hp=max_hp)
+        self._mask = np.zeros(ACTION_SPACE_SIZE, dtype=bool)
+        self._direct_obs = self.observation_dim == get_output_dim()
+        self._obs_template: Optional[np.ndarray] = None
+
+        # 统计
+        self._combats = 0
+        self._wins = 0
+        self._total_steps = 0
+
+    # ==================== Gym 接口 ====================
+
+    def reset(
+        self,
+        seed: Optional[int] = None,
+        options: Optional[Dict] = None
+    ) -> Tuple[np.ndarray, Dict]:
+        """
+        开始新战斗
+
+        Args:
+            seed: 随机种子（重新播种模拟器）
+            options: {"encounter": 名称} 或 {"monsters": [怪物 ID, ...]} 指定本场敌人
+        """
+        super().reset(seed=seed)
+        if seed is not None:
+            self._rng.seed(seed)
+            self.sim.rng.seed(seed)
+        self._start_combat(options)
+        return self._encode_observation(), self._make_info()
+
+    def step(
+        self,
+        action: int
+    ) -> Tuple[np.ndarray, float, bool, bool, Dict]:
+        """在模拟器中执行动作；非法动作不推进状态，奖励 -1（与 StsEnvironment 一致）"""
+        if self._current_state is None:
+            return self._get_empty_step_result()
+
+        # _make_info 已为当前状态构建 _mask
+        reward, terminated, truncated, invalid = self._advance(action, self._mask)
+        if invalid:
+            logger.warning(f"[SimEnv] Invalid action {action}, valid: {mask_to_valid_actions(self._mask)}")
+            info = self._make_info()
+            info["error"] = "invalid_action"
+            return self._encode_observation(), reward, False, False, info
+
+        obs = self._encode_observation()
+        info = self._make_info()
+
+        if self.render_mode == "human":
+            self.render()
+
+        return obs, reward, terminated, truncated, info
+
+    def clone(self, seed: Optional[int] = None) -> "SimEnv":
+        """按相同配置创建一个独立的新环境（向量环境用）"""
+        return SimEnv(seed=seed, **self._init_kwargs)
+
+    def _encode_observation(self) -> np.ndarray:
+        """战斗进行中直接从模拟器编码；终局帧等其余情况同 StsEnvironment"""
+        if self._obs_template is None or self.sim.done:
+            return super()._encode_observation()
+        return encode_silent_sim(self.sim, self._obs_template)
+
+    def _encode_observation_into(self, out: np.ndarray) -> bool:
+        """战斗进行中把观察直接写进 out（向量环境 obs_buf 的一行）并返回 True；否则返回 False"""
+        if self._obs_template is None or self.sim.done:
+            return False
+        encode_silent_sim(self.sim, self._obs_template, out=out)
+        return True
+
+    def action_masks(self) -> np.ndarray:
+        """当前状态的动作掩码"""
+        return self._mask.copy()
+
+    def set_state(self, state: GameState):
+        """模拟环境由 SilentCombatSim 驱动，不接受外部状态"""
+        raise NotImplementedError("SimEnv is driven by SilentCombatSim; use reset()/step()")
+
+    # ==================== 核心推进（不编码观察，向量环境直接调用） ====================
+
+    def _start_combat(self, options: Optional[Dict] = None):
+        """开始新战斗：清零本 episode 的奖励与步数，并设置 _current_state"""
+        options = options or {}
+        if self.deck is None and self.extra_cards:
+            self.sim.deck = random_deck(self._rng, self.extra_cards)
+        encounter = options.get("encounter")
+        if encounter is None and self.encounters and "monsters" not in options:
+            encounter = self._rng.choice(self.encounters)
+        frame = self.sim.reset(encounter=encounter, monsters=options.get("monsters"))
+        self._episode_reward = 0.0
+        self._episode_length = 0
+        self._obs_template = silent_sim_template(frame) if self._direct_obs else None
+        super().set_state(GameState.from_mod_response(frame))
+
+    def _advance(self, action: int, mask: Optional[np.ndarray] = None) -> Tuple[float, bool, bool, bool]:
+        """
+        执行动作并更新 _current_state，不编码观察、不构造 info
+
+        Args:
+            action: 动作 ID
+            mask: 当前状态已算好的动作掩码（向量环境批量构建后传入；None 时现算）
+
+        Returns:
+            (reward, terminated, truncated, invalid)；非法动作不推进状态，奖励 -1
+        """
+        action = int(action)
+        if mask is None:
+            mask = build_action_mask(self._current_state, out=self._mask)
+        if not (0 <= action < ACTION_SPACE_SIZE and mask[action]):
+            return -1.0, False, False, True
+
+        frame = self.sim.step_action(action)
+        self._current_state = GameState.from_mod_response(frame)
+        self._episode_length += 1
+        self._total_steps += 1
+
+        reward = self._compute_reward()
+        self._episode_reward += reward
+
+        terminated = self._is_terminal()
+        truncated = self._episode_length >= self.max_episode_steps and not terminated
+        if terminated:
+            self._combats += 1
+            self._wins += int(self.sim.won)
+        return reward, terminated, truncated, False
+
+    # ==================== 统计 ====================
+
+    @property
+    def win_rate(self) -> float:
+        """已结束战斗的胜率"""
+        return self._wins / self._combats if self._combats else 0.0
+
+    def get_sim_stats(self) -> Dict[str, Any]:
+        """模拟统计"""
+        return {
+            "combats": self._combats,
+            "wins": self._wins,
+            "win_rate": self.win_rate,
+            "total_steps": self._total_steps,
+        }
+
+    def _make_info(self) -> Dict[str, Any]:
+        build_action_mask(self._current_state, out=self._mask)
+        mask = self._mask.copy()
+        return {
+            "action_mask": mask,
+            "valid_actions": mask_to_valid_actions(mask),
+            "state": self._current_state,
+            "encounter": self.sim.encounter,
+            "won": self.sim.won if self.sim.done else None,
+            "episode_reward": self._episode_reward,
+            "episode_length": self._episode_length,
+        }
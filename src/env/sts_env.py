@@ -44,6 +44,7 @@ except ImportError:
 from src.core.game_state import GameState, CombatState, RoomPhase
 from src.core.action import Action, ActionType, ACTION_SPACE_SIZE, ACTION_END_ID, ACTION_PROCEED_ID, ACTION_CANCEL_ID
 from src.core.config import get_config
+from src.env.action_mask import build_action_mask, mask_to_valid_actions
 
 logger = logging.getLogger(__name__)
 
@@ -161,7 +162,7 @@ class StsEnvironment(gym.Env):
 
         # 创建空状态的观察
         obs = np.zeros(self.observation_dim, dtype=np.float32)
-        action_mask = np.zeros(ACTION_SPACE_SIZE, dtype=np.int8)
+        action_mask = np.zeros(ACTION_SPACE_SIZE, dtype=bool)
 
         info = {
             "action_mask": action_mask,
@@ -207,11 +208,11 @@ class StsEnvironment(gym.Env):
         if self._current_state is None:
             return self._get_empty_step_result()
 
-        # 检查动作合法性
-        valid_actions = self._get_valid_actions()
-        action_mask = self._get_action_mask(valid_actions)
+        # 检查动作合法性（状态由外部驱动，本步内不变，掩码只算一次）
+        action_mask = build_action_mask(self._current_state)
+        valid_actions = mask_to_valid_actions(action_mask)
 
-        if action not in valid_actions and action != ACTION_END_ID:
+        if action != ACTION_END_ID and not (0 <= action < ACTION_SPACE_SIZE and action_mask[action]):
             logger.warning(f"Invalid action {action}, valid: {valid_actions}")
             # 惩罚非法动作
             reward = -1.0
@@ -240,10 +241,6 @@ class StsEnvironment(gym.Env):
         # 编码观察
         obs = self._encode_observation()
 
-        # 获取合法动作
-        valid_actions = self._get_valid_actions()
-        action_mask = self._get_action_mask(valid_actions)
-
         info = {
             "action_mask": action_mask,
             "valid_actions": valid_actions,
@@ -261,7 +258,7 @@ class StsEnvironment(gym.Env):
         """获取空状态的步骤结果"""
         obs = np.zeros(self.observation_dim, dtype=np.float32)
         return obs, 0.0, False, False, {
-            "action_mask": np.zeros(ACTION_SPACE_SIZE, dtype=np.int8),
+            "action_mask": np.zeros(ACTION_SPACE_SIZE, dtype=bool),
             "valid_actions": [],
             "state": None,
             "episode_reward": 0.0,
@@ -290,6 +287,9 @@ class StsEnvironment(gym.Env):
         """
         获取当前合法动作列表（Action Masking）
 
+        列表版参考实现；step() 走 src.env.action_mask 的向量化构建，
+        两者逐位一致（见 scripts/verify_action_mask.py）。
+
         【核心功能】实现 Action Masking，返回当前状态下所有合法的动作 ID。
         RL 模型应使用此列表创建掩码，避免选择非法动作。
 
@@ -395,6 +395,10 @@ class StsEnvironment(gym.Env):
 
         return valid
 
+    def action_masks(self) -> np.ndarray:
+        """当前状态的 179 维 bool 掩码（sb3-contrib MaskablePPO 约定的接口）"""
+        return build_action_mask(self._current_state)
+
     def _get_action_mask(self, valid_actions: List[int]) -> np.ndarray:
         """
         生成动作掩码（用于 Action Masking）
@@ -425,7 +429,7 @@ class StsEnvironment(gym.Env):
         - 奖励应该引导 AI  toward 最优策略
         - 避免奖励 hack（AI 找到获取奖励但不 win 的方法）
 
-        【奖励项】
+        【奖励项】（默认权重，configs/default.yaml 的 training.reward 可改）
         + 造成伤害：0.1 × 伤害值（鼓励进攻）
         + 击杀怪物：+5（鼓励完成战斗）
         - 受到伤害：-0.2 × 伤害值（鼓励防御）
@@ -436,9 +440,11 @@ class StsEnvironment(gym.Env):
             return 0.0
 
         combat = self._current_state.combat
-        player_hp = combat.player.current_hp
-        monster_hp = combat.total_monster_hp
+        return self._reward_from_hp(combat.player.current_hp, combat.total_monster_hp)
 
+    def _reward_from_hp(self, player_hp: int, monster_hp: int) -> float:
+        """按当前玩家/怪物血量计算奖励并更新 _last_combat_hp（_compute_reward 的核心，权重见 RewardConfig）"""
+        w = self.config.training.reward
         # 上次状态
         last_player_hp, last_monster_hp = self._last_combat_hp
 
@@ -447,24 +453,24 @@ class StsEnvironment(gym.Env):
         # 1. 怪物受伤（正面）
         monster_damage = last_monster_hp - monster_hp
         if monster_damage > 0:
-            reward += monster_damage * 0.1
+            reward += monster_damage * w.damage_dealt
 
         # 2. 击杀怪物（额外奖励）
         if last_monster_hp > 0 and monster_hp == 0:
-            reward += 5.0
+            reward += w.kill_bonus
 
         # 3. 玩家受伤（负面）
         player_damage = last_player_hp - player_hp
         if player_damage > 0:
-            reward -= player_damage * 0.2
+            reward -= player_damage * w.damage_taken
 
         # 4. 玩家死亡（大惩罚）
         if player_hp <= 0:
-            reward -= 50.0
+            reward -= w.death_penalty
 
         # 5. 回合长度惩罚（鼓励快速结束）
-        if self._episode_length > 20:
-            reward -= 0.01 * (self._episode_length - 20)
+        if self._episode_length > w.length_threshold:
+            reward -= w.length_penalty * (self._episode_length - w.length_threshold)
 
         # 更新上次状态
         self._last_combat_hp = (player_hp, monster_hp)
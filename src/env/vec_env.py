@@ -0,0 +1,240 @@
+#!/usr/bin/env python3
+"""
+批量向量环境
+
+一个进程内持有 N 个相互独立的环境实例，一次调用推进全部环境：
+- 观察直接写入预分配的 (N, 2945) float32 数组（encode(..., out=行)），
+  动作掩码用 build_action_masks 一次写入 (N, 179) bool 数组
+- 结束的环境自动 reset，终局观察放在 info["terminal_observation"]（SB3 约定）
+- 实现 Stable-Baselines3 VecEnv 接口；首次构造时把类注册为 VecEnv 的虚拟子类，
+  模块本身不导入 SB3（避免 import src.env 时拉起 torch）
+
+环境若实现 _advance(action, mask) / _start_combat(options)（如 SimEnv），走免 info、免拷贝的快速路径；
+否则退回逐个调用 env.step / env.reset，再把观察拷进缓冲区。
+
+用法：
+    from src.env import BatchedVecEnv, SimEnv
+    base = SimEnv()
+    vec = BatchedVecEnv([lambda i=i: base.clone(seed=i) for i in range(16)])
+    obs = vec.reset()                      # (16, 2945)
+    obs, rewards, dones, infos = vec.step(actions)
+    masks = vec.action_masks()             # (16, 179)
+"""
+import logging
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+import numpy as np
+
+from src.core.action import ACTION_SPACE_SIZE
+from src.env.action_mask import build_action_masks
+
+logger = logging.getLogger(__name__)
+
+_SB3_REGISTERED: set = set()
+
+
+def _register_sb3_vec_env(cls: type):
+    """SB3 已安装时把 cls 注册为 VecEnv 的虚拟子类（isinstance 检查通过，不会被再包一层 DummyVecEnv）"""
+    if cls in _SB3_REGISTERED:
+        return
+    _SB3_REGISTERED.add(cls)
+    try:
+        from stable_baselines3.common.vec_env import VecEnv
+    except ImportError:
+        return
+    VecEnv.register(cls)
+
+
+class BatchedVecEnv:
+    """
+    进程内批量向量环境（SB3 VecEnv 接口）
+
+    缓冲区（step / reset 后更新）：
+        obs_buf:  (N, D) float32
+        mask_buf: (N, 179) bool
+        rew_buf:  (N,) float32
+        done_buf: (N,) bool
+
+    info 字段：
+        episode_reward / episode_length: 当前（或刚结束的）episode 累计
+        terminal_observation: 结束时的最后观察（之后该行已是新 episode 的首个观察）
+        TimeLimit.truncated: 因步数截断而结束
+        episode: {"r", "l"}，结束时给出（与 SB3 Monitor 相同，供 ep_info_buffer 统计）
+        error: 非法动作时为 "invalid_action"
+    """
+
+    def __init__(self, env_fns: Sequence[Callable[[], Any]], copy_obs: bool = True):
+        """
+        Args:
+            env_fns: N 个环境构造函数（每个返回一个独立实例）
+            copy_obs: step/reset 返回缓冲区的拷贝（SB3 会保留上一步观察，必须为 True）；
+                      自写循环且每步立即消费观察时可设 False 省去拷贝
+        """
+        if not env_fns:
+            raise ValueError("BatchedVecEnv needs at least one env")
+        self.envs = [fn() for fn in env_fns]
+        if len({id(e) for e in self.envs}) != len(self.envs):
+            raise ValueError("env_fns must create independent env instances")
+
+        env0 = self.envs[0]
+        self.num_envs = len(self.envs)
+        self.observation_space = env0.observation_space
+        self.action_space = env0.action_space
+        self.metadata = getattr(env0, "metadata", {})
+        self.render_mode = None
+        self.copy_obs = copy_obs
+
+        n = self.num_envs
+        obs_dim = int(np.prod(self.observation_space.shape))
+        self.obs_buf = np.zeros((n, obs_dim), dtype=np.float32)
+        self.mask_buf = np.zeros((n, ACTION_SPACE_SIZE), dtype=bool)
+        self.rew_buf = np.zeros(n, dtype=np.float32)
+        self.done_buf = np.zeros(n, dtype=bool)
+        self.reset_infos: List[Dict[str, Any]] = [{} for _ in range(n)]
+        self._states: List[Any] = [None] * n
+        self._seeds: List[Optional[int]] = [None] * n
+        self._options: List[Dict[str, Any]] = [{} for _ in range(n)]
+        self._actions: Optional[np.ndarray] = None
+
+        # 快速路径：环境提供 _advance / _start_combat，且观察维度等于 encode 输出维度
+        from src.training.encoder import encode, get_output_dim
+        self._encode = encode
+        self._native = all(hasattr(e, "_advance") and hasattr(e, "_start_combat") for e in self.envs)
+        self._direct_encode = obs_dim == get_output_dim()
+        # 环境可直接把观察写进缓冲区（SimEnv._encode_observation_into），不经帧编码
+        self._encode_into = [getattr(e, "_encode_observation_into", None) if self._direct_encode else None
+                             for e in self.envs]
+
+        _register_sb3_vec_env(BatchedVecEnv)
+        logger.info(f"[BatchedVecEnv] {n} x {type(env0).__name__} (native={self._native})")
+
+    # ==================== VecEnv 接口 ====================
+
+    def reset(self) -> np.ndarray:
+        """重置全部环境，返回 (N, D) 观察"""
+        for i, env in enumerate(self.envs):
+            _, info = env.reset(seed=self._seeds[i], options=self._options[i] or None)
+            self.reset_infos[i] = {k: v for k, v in info.items() if k not in ("state", "action_mask")}
+            self._write_obs(i)
+        self._seeds = [None] * self.num_envs
+        self._options = [{} for _ in range(self.num_envs)]
+        self._refresh_masks()
+        self.done_buf[:] = False
+        return self.obs_buf.copy() if self.copy_obs else self.obs_buf
+
+    def step_async(self, actions: np.ndarray):
+        self._actions = np.asarray(actions).reshape(self.num_envs)
+
+    def step_wait(self):
+        """推进全部环境；返回 (obs, rewards, dones, infos)"""
+        actions = self._actions
+        infos: List[Dict[str, Any]] = []
+        for i, env in enumerate(self.envs):
+            if self._native:
+                reward, terminated, truncated, invalid = env._advance(int(actions[i]), self.mask_buf[i])
+            else:
+                _, reward, terminated, truncated, step_info = env.step(int(actions[i]))
+                invalid = step_info.get("error") == "invalid_action"
+            done = terminated or truncated
+            info = {"episode_reward": env._episode_reward, "episode_length": env._episode_length}
+            if invalid:
+                info["error"] = "invalid_action"
+            if done:
+                self._write_obs(i)
+                info["terminal_observation"] = self.obs_buf[i].copy()
+                info["TimeLimit.truncated"] = bool(truncated and not terminated)
+                info["episode"] = {"r": env._episode_reward, "l": env._episode_length}
+                if self._native:
+                    env._start_combat()
+                else:
+                    env.reset()
+            self._write_obs(i)
+            self.rew_buf[i] = reward
+            self.done_buf[i] = done
+            infos.append(info)
+        self._refresh_masks()
+        obs = self.obs_buf.copy() if self.copy_obs else self.obs_buf
+        return obs, self.rew_buf.copy(), self.done_buf.copy(), infos
+
+    def step(self, actions: np.ndarray):
+        self.step_async(actions)
+        return self.step_wait()
+
+    def action_masks(self) -> np.ndarray:
+        """当前 (N, 179) 动作掩码（拷贝）"""
+        return self.mask_buf.copy()
+
+    def close(self):
+        for env in self.envs:
+            env.close()
+
+    def seed(self, seed: Optional[int] = None) -> List[Optional[int]]:
+        """设置下次 reset 的种子（第 i 个环境用 seed + i）"""
+        if seed is None:
+            self._seeds = [None] * self.num_envs
+        else:
+            self._seeds = [seed + i for i in range(self.num_envs)]
+        return list(self._seeds)
+
+    def set_options(self, options=None):
+        if options is None:
+            options = {}
+        if isinstance(options, dict):
+            self._options = [dict(options) for _ in range(self.num_envs)]
+        else:
+            self._options = [dict(o) for o in options]
+
+    def get_attr(self, attr_name: str, indices=None) -> List[Any]:
+        return [getattr(self.envs[i], attr_name) for i in self._indices(indices)]
+
+    def set_attr(self, attr_name: str, value: Any, indices=None):
+        for i in self._indices(indices):
+            setattr(self.envs[i], attr_name, value)
+
+    def env_method(self, method_name: str, *method_args, indices=None, **method_kwargs) -> List[Any]:
+        if method_name == "action_masks":
+            # 掩码已在批量缓冲区中，不再逐环境重算
+            return [self.mask_buf[i].copy() for i in self._indices(indices)]
+        return [getattr(self.envs[i], method_name)(*method_args, **method_kwargs) for i in self._indices(indices)]
+
+    def env_is_wrapped(self, wrapper_class, indices=None) -> List[bool]:
+        return [False for _ in self._indices(indices)]
+
+    def render(self, mode: Optional[str] = None):
+        return None
+
+    def get_images(self) -> List[None]:
+        return [None for _ in range(self.num_envs)]
+
+    def getattr_depth_check(self, name: str, already_found: bool):
+        return None
+
+    @property
+    def unwrapped(self) -> "BatchedVecEnv":
+        return self
+
+    # ==================== 内部 ====================
+
+    def _indices(self, indices) -> List[int]:
+        if indices is None:
+            return list(range(self.num_envs))
+        if isinstance(indices, int):
+            return [indices]
+        return list(indices)
+
+    def _write_obs(self, i: int):
+        """把第 i 个环境的当前观察写进 obs_buf[i]"""
+        env = self.envs[i]
+        state = env._current_state
+        self._states[i] = state
+        encode_into = self._encode_into[i]
+        if encode_into is not None and encode_into(self.obs_buf[i]):
+            return
+        raw = getattr(state, "raw_response", None) if state is not None else None
+        if self._direct_encode and raw is not None and state.combat is not None:
+            self._encode(raw, out=self.obs_buf[i])
+        else:
+            self.obs_buf[i] = env._encode_observation()
+
+    def _refresh_masks(self):
+        build_action_masks(self._states, out=self.mask_buf)
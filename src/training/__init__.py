@@ -3,23 +3,78 @@
 训练模块
 
 包含状态编码、数据集处理、模型训练、实验跟踪等功能。
+
+子模块在首次访问对应属性时才导入（PEP 562 模块级 __getattr__），
+import src.training 本身不加载编码器与实验跟踪。
 """
-from .encoder import encode, get_output_dim, OUTPUT_DIM
-from .experiment import (
-    ExperimentTracker,
-    ExperimentConfig,
-    ExperimentResult,
-    get_tracker,
-    create_experiment,
-)
-
-__all__ = [
-    "encode",
-    "get_output_dim",
-    "OUTPUT_DIM",
-    "ExperimentTracker",
-    "ExperimentConfig",
-    "ExperimentResult",
-    "get_tracker",
-    "create_experiment",
-]
+import importlib
+from typing import TYPE_CHECKING
+
+# 导出名 → 所在子模块
+_LAZY_ATTRS = {
+    "encode": ".encoder",
+    "encode_batch": ".encoder",
+    "get_output_dim": ".encoder",
+    "OUTPUT_DIM": ".encoder",
+    "ExperimentTracker": ".experiment",
+    "ExperimentConfig": ".experiment",
+    "ExperimentResult": ".experiment",
+    "get_tracker": ".experiment",
+    "create_experiment": ".experiment",
+    "ShardWriter": ".shard_dataset",
+    "ShardDataset": ".shard_dataset",
+    "BlockShuffleSampler": ".shard_dataset",
+    "write_shards": ".shard_dataset",
+    "write_shards_from_sessions": ".shard_dataset",
+    "make_dataloader": ".shard_dataset",
+    "Trainer": ".trainer",
+    "TrainerConfig": ".trainer",
+    "train_data_parallel": ".distributed",
+    "NumpyMLPTrainer": ".numpy_mlp",
+    "PrioritizedReplayBuffer": ".replay_buffer",
+    "relabel_store": ".reward_relabel",
+    "write_labels": ".reward_relabel",
+    "load_labels": ".reward_relabel",
+    "record_teacher": ".distill",
+    "train_student": ".distill",
+}
+
+__all__ = list(_LAZY_ATTRS)
+
+
+def __getattr__(name: str):
+    module = _LAZY_ATTRS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module, __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
+
+
+if TYPE_CHECKING:
+    from .encoder import encode, encode_batch, get_output_dim, OUTPUT_DIM
+    from .experiment import (
+        ExperimentTracker,
+        ExperimentConfig,
+        ExperimentResult,
+        get_tracker,
+        create_experiment,
+    )
+    from .shard_dataset import (
+        ShardWriter,
+        ShardDataset,
+        BlockShuffleSampler,
+        write_shards,
+        write_shards_from_sessions,
+        make_dataloader,
+    )
+    from .trainer import Trainer, TrainerConfig
+    from .distributed import train_data_parallel
+    from .numpy_mlp import NumpyMLPTrainer
+    from .replay_buffer import PrioritizedReplayBuffer
+    from .reward_relabel import relabel_store, write_labels, load_labels
+    from .distill import record_teacher, train_student
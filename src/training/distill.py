@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+"""
+策略蒸馏：把慢的教师策略（大 MLP、MCTS、集成）压成一个小的学生 MLP
+
+collect_data.py 的逐帧决策预算容不下大网络或搜索。流程：
+1. record_teacher：教师（create_agent 创建的任意 Agent）在状态流上给出 179 维动作分布，
+   按合法动作掩码归一化后，与学生编码器的观察一起写入带软标签的分片（ShardWriter(soft_targets=True)）
+   - 状态来源：采集语料（iter_corpus_states，同 load_training_data 的目录格式）或
+     SimEnv 战斗（iter_sim_states，教师自己行动，状态分布即教师的在线分布）
+   - 教师提供 predict_proba_batch 时按批前向，否则逐帧 get_action_probabilities
+     （规则 / MCTS 的默认实现是所选动作的 one-hot）
+2. train_student：NumpyMLPTrainer 以软交叉熵（即 KL(教师 || 学生) + 常数）在分片上流式训练
+3. evaluate_student：验证集上与教师 argmax 的一致率、KL(教师 || 学生)
+
+学生导出为 NumpyPolicy（.npz / .flat），SupervisedAgentImpl.load 直接加载（model_type=numpy）。
+
+用法：
+    teacher = create_agent("mcts", "Teacher")
+    record_teacher(teacher, iter_sim_states(teacher, 20000), "data/shards/distill_mcts")
+    result = train_student("data/shards/distill_mcts", hidden_layers=(64, 32))
+    result["model"].save("models/student.npz")
+"""
+import time
+import logging
+import importlib
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Union
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+# ==================== 教师 ====================
+
+def teacher_distributions(teacher, states: Sequence) -> np.ndarray:
+    """
+    教师在一批状态上的动作分布 (N, 179)，按合法动作掩码截断后重新归一化
+
+    各状态是相互独立的查询：规则 / MCTS 教师每次查询前 reset_stuck_tracking，否则其防卡住检测
+    （面向与游戏的实时交互）会在长战斗中强制结束回合。合法动作上没有概率质量的行（教师只给出非法动作，
+    或回 "state" 等不在动作空间内的命令）全为 0，表示教师在该状态弃权。
+    """
+    from src.env.action_mask import build_action_masks
+
+    if hasattr(teacher, "predict_proba_batch"):
+        probs = np.asarray(teacher.predict_proba_batch(list(states)), dtype=np.float32)
+    else:
+        reset = getattr(teacher, "reset_stuck_tracking", None)
+        rows = []
+        for s in states:
+            if reset is not None:
+                reset()
+            rows.append(np.asarray(teacher.get_action_probabilities(s), dtype=np.float32))
+        probs = np.stack(rows)
+    masked = probs * build_action_masks(states)
+    mass = masked.sum(axis=1, keepdims=True)
+    return masked / np.maximum(mass, 1e-12)
+
+
+def iter_corpus_states(data_dir: str) -> Iterator:
+    """采集语料中的状态（记录的动作不用，标签来自教师）"""
+    from src.agents.supervised import iter_training_records
+
+    # 只按 batch_size 暂存，保留原始帧（教师与学生编码同离线语料）
+    for state, _ in iter_training_records(data_dir, keep_raw=True):
+        yield state
+
+
+def iter_sim_states(teacher, n_states: int, seed: int = 0, **env_kwargs) -> Iterator:
+    """
+    SimEnv 战斗中由教师行动（取其分布的 argmax）产生的状态
+
+    产出 (state, 教师分布) 对，record_teacher 不必再问一次教师（MCTS 一次决策就是几十毫秒）。
+    教师弃权的状态不产出，环境走第一个合法动作继续。
+    """
+    from src.env.sim_env import SimEnv
+
+    env = SimEnv(seed=seed, **env_kwargs)
+    env.reset()
+    produced = 0
+    while produced < n_states:
+        state = env._current_state
+        probs = teacher_distributions(teacher, [state])[0]
+        if probs.any():
+            yield state, probs
+            produced += 1
+            action = int(probs.argmax())
+        else:
+            action = int(env.action_masks().argmax())
+        _, _, terminated, truncated, _ = env.step(action)
+        if terminated or truncated:
+            env.reset()
+
+
+def record_teacher(
+    teacher,
+    states: Iterable,
+    out_dir: Union[str, Path],
+    encoder: str = "encoder_mvp",
+    batch_size: int = 64,
+    shard_size: int = 65536,
+    limit: Optional[int] = None,
+) -> Path:
+    """
+    把教师的动作分布写成带软标签的分片
+
+    Args:
+        teacher: 任意 Agent（select_action / get_action_probabilities / predict_proba_batch）
+        states: GameState 流，或 iter_sim_states 产出的 (GameState, 分布) 对
+        encoder: 学生的观察编码器（encoder_mvp = 31 维紧凑 S 向量，encoder = 2945 维稀疏 S 向量）
+        batch_size: 教师按批前向的批大小
+        limit: 最多记录的状态数
+    """
+    from src.training.shard_dataset import ShardWriter
+
+    module = importlib.import_module(f"src.training.{encoder}")
+    dim = module.get_output_dim()
+    t0 = time.perf_counter()
+    pending: List = []
+    n = skipped = 0
+
+    with ShardWriter(out_dir, dim, shard_size, encoder, soft_targets=True) as writer:
+        def flush():
+            frames = [s.raw_response or s.to_mod_response() for s, _ in pending]
+            given = [p for _, p in pending]
+            if any(p is None for p in given):
+                probs = teacher_distributions(teacher, [s for s, _ in pending])
+            else:
+                probs = np.stack(given)
+            keep = probs.any(axis=1)
+            if keep.any():
+                X = np.stack([module.encode(f) for f, k in zip(frames, keep) if k])
+                writer.extend(X, probs[keep].argmax(axis=1), probs[keep])
+            nonlocal skipped
+            skipped += int((~keep).sum())
+            pending.clear()
+
+        for item in states:
+            pending.append(item if isinstance(item, tuple) else (item, None))
+            n += 1
+            if len(pending) >= batch_size:
+                flush()
+            if limit is not None and n >= limit:
+                break
+        if pending:
+            flush()
+
+    elapsed = time.perf_counter() - t0
+    logger.info(f"[Distill] Recorded {n - skipped} teacher decisions ({skipped} abstained) in {elapsed:.1f}s "
+                f"({n / max(elapsed, 1e-9):,.0f}/s) → {out_dir}")
+    return Path(out_dir)
+
+
+# ==================== 学生 ====================
+
+def train_student(
+    shard_dir: Union[str, Path],
+    hidden_layers: Sequence[int] = (64, 32),
+    epochs: int = 100,
+    batch_size: int = 256,
+    learning_rate: float = 0.001,
+    val_split: float = 0.2,
+    n_iter_no_change: int = 10,
+    checkpoint_dir: Optional[str] = None,
+    seed: int = 42,
+) -> Dict[str, Any]:
+    """
+    在软标签分片上训练学生 MLP（软交叉熵，早停监控验证 KL）
+
+    Returns:
+        NumpyMLPTrainer.fit_stream 的结果，另含 model（NumpyPolicy）、agreement、kl
+    """
+    from src.training.numpy_mlp import NumpyMLPTrainer
+    from src.training.shard_dataset import ShardDataset, BlockShuffleSampler, iter_batches
+
+    dataset = ShardDataset(shard_dir)
+    if not dataset.soft_targets:
+        raise ValueError(f"{shard_dir} has no teacher distributions; use record_teacher")
+    train_idx, val_idx = dataset.split(val_split, seed=seed)
+    trainer = NumpyMLPTrainer(dataset.dim, hidden_layers, learning_rate=learning_rate, seed=seed,
+                              name=f"Student{list(hidden_layers)}")
+    sampler = BlockShuffleSampler(train_idx, batch_size, seed=seed)
+
+    def train_batches(epoch: int):
+        sampler.set_epoch(epoch)
+        return iter_batches(dataset, sampler, soft_targets=True)
+
+    def val_batches():
+        return iter_batches(dataset, BlockShuffleSampler(val_idx, 4096, shuffle=False), soft_targets=True)
+
+    result = trainer.fit_stream(train_batches, val_batches if len(val_idx) else None, epochs=epochs,
+                                n_iter_no_change=n_iter_no_change, checkpoint_dir=checkpoint_dir)
+    policy = trainer.to_policy(encoder=dataset.encoder)
+    policy.source = "distill"
+    result.update(evaluate_student(policy, dataset, val_idx if len(val_idx) else train_idx))
+    result.update({"model": policy, "hidden_layers": tuple(hidden_layers), "encoder": dataset.encoder})
+    logger.info(f"[Distill] Student {list(hidden_layers)}: agreement {result['agreement']:.4f}, "
+                f"KL {result['kl']:.4f} ({result['epochs_run']} epochs)")
+    return result
+
+
+def evaluate_student(policy, dataset, indices: np.ndarray, batch_size: int = 4096) -> Dict[str, float]:
+    """学生与教师在 indices 上的 argmax 一致率与平均 KL(教师 || 学生)"""
+    agree = 0
+    kl = 0.0
+    for start in range(0, len(indices), batch_size):
+        X, P = dataset.soft_batch(indices[start:start + batch_size])
+        Q = policy.predict_proba(X)
+        agree += int((Q.argmax(axis=1) == P.argmax(axis=1)).sum())
+        nz = P > 0
+        kl += float((P[nz] * (np.log(P[nz]) - np.log(np.maximum(Q[nz], 1e-12)))).sum())
+    n = max(len(indices), 1)
+    return {"agreement": agree / n, "kl": kl / n}
@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+"""
+多进程数据并行 CPU 训练（torch.distributed，gloo 后端）
+
+训练机多核无 GPU，而 _train_pytorch 是单进程、默认 intra-op 线程数、batch 32。这里用本机多进程数据并行：
+- 进程：torch.multiprocessing.spawn 起 world_size 个 worker，gloo 后端经 127.0.0.1 的 TCP 端口建组
+- 数据：各 worker 从同一份预编码分片（ShardDataset，memmap 共享页缓存）读取；BlockShuffleSampler 以
+  rank / world_size 分片，各进程批数相同
+- 梯度：DistributedDataParallel 在 backward 中 all-reduce 求平均；验证集同样分片，损失 / 正确数经
+  all_reduce 求和，所有进程得到一致的早停与学习率调度决策
+- 线程绑定：每个 worker threads_per_worker 个 intra-op 线程、1 个 inter-op 线程，并用 sched_setaffinity
+  绑定到互不重叠的核（OMP_NUM_THREADS / MKL_NUM_THREADS 同步设置，避免 world_size × 核数 的超额订阅）
+- 大批量学习率：全局批 = batch_size × world_size；lr_scaling=linear 时 lr × (全局批 / base_batch_size)，
+  sqrt 时乘其平方根；缩放倍数 > 1 时默认线性 warmup（Goyal et al. 2017）
+- 训练引擎复用 Trainer（早停、检查点、续训）；只有 rank 0 写检查点，结果经临时文件回传父进程
+
+用法：
+    result = train_data_parallel("data/shards/sl_full", world_size=4, batch_size=256, epochs=30)
+    model = result["model"]   # 普通 nn.Sequential（非 DDP 包装）
+"""
+import os
+import socket
+import logging
+import tempfile
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence
+
+logger = logging.getLogger(__name__)
+
+
+def scaled_learning_rate(learning_rate: float, global_batch: int, base_batch_size: int,
+                         rule: str = "linear") -> float:
+    """按全局批大小缩放学习率（linear / sqrt / none）"""
+    ratio = global_batch / base_batch_size
+    if rule == "linear":
+        return learning_rate * ratio
+    if rule == "sqrt":
+        return learning_rate * ratio ** 0.5
+    if rule == "none":
+        return learning_rate
+    raise ValueError(f"Unknown lr scaling rule: {rule}")
+
+
+def worker_cores(rank: int, world_size: int, threads_per_worker: int) -> List[int]:
+    """rank 绑定的 CPU 核（在当前进程可用核中按 rank 连续切分；核不够时循环复用）"""
+    available = sorted(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else list(range(os.cpu_count() or 1))
+    start = rank * threads_per_worker
+    return [available[(start + k) % len(available)] for k in range(threads_per_worker)]
+
+
+def _free_port() -> int:
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _pin_threads(rank: int, world_size: int, threads_per_worker: int) -> List[int]:
+    import torch
+
+    cores = worker_cores(rank, world_size, threads_per_worker)
+    if hasattr(os, "sched_setaffinity"):
+        os.sched_setaffinity(0, set(cores))
+    torch.set_num_threads(threads_per_worker)
+    try:
+        torch.set_num_interop_threads(1)
+    except RuntimeError:
+        # 已有并行任务运行过时不可再设
+        pass
+    return cores
+
+
+def _worker(rank: int, world_size: int, port: int, shard_dir: str, out_path: str, options: Dict[str, Any]):
+    import torch
+    import torch.distributed as dist
+    from torch.nn.parallel import DistributedDataParallel
+
+    from src.core.action import ACTION_SPACE_SIZE
+    from src.agents.supervised import _create_policy_net
+    from src.training.shard_dataset import ShardDataset, make_dataloader
+    from src.training.trainer import Trainer, TrainerConfig
+
+    cores = _pin_threads(rank, world_size, options["threads_per_worker"])
+    dist.init_process_group("gloo", init_method=f"tcp://127.0.0.1:{port}", rank=rank, world_size=world_size)
+    try:
+        dataset = ShardDataset(shard_dir)
+        train_idx, val_idx = dataset.split(options["val_split"])
+        batch_size = options["batch_size"]
+        train_loader = make_dataloader(dataset, train_idx, batch_size, shuffle=True,
+                                       num_workers=options["loader_workers"], block_size=options["block_size"],
+                                       seed=options["seed"], rank=rank, world_size=world_size)
+        val_loader = make_dataloader(dataset, val_idx, max(batch_size, 1024), shuffle=False,
+                                     num_workers=options["loader_workers"], rank=rank, world_size=world_size)
+
+        # 各进程同一种子初始化，DDP 构造时再从 rank 0 广播一次参数
+        torch.manual_seed(options["seed"])
+        model = _create_policy_net(dataset.dim, tuple(options["hidden_layers"]), ACTION_SPACE_SIZE)
+        ddp_model = DistributedDataParallel(model)
+
+        def reduce_sum(t):
+            dist.all_reduce(t, op=dist.ReduceOp.SUM)
+            return t
+
+        def train_batches(epoch: int):
+            train_loader.sampler.set_epoch(epoch)
+            return train_loader
+
+        config = TrainerConfig(**options["trainer"])
+        config.save_checkpoints = rank == 0
+        if rank != 0:
+            config.log_every = 10 ** 9
+        logger.info(f"[DDP-{rank}] pinned to cores {cores}, {len(train_loader)} batches/epoch")
+        trainer = Trainer(ddp_model, train_batches, lambda: val_loader, config,
+                          meta={"input_dim": dataset.dim, "hidden_layers": list(options["hidden_layers"])},
+                          name=f"DDP-{rank}", reduce_fn=reduce_sum)
+        result = trainer.fit()
+
+        if rank == 0:
+            torch.save({
+                "state_dict": result.model.state_dict(),
+                "input_dim": dataset.dim,
+                "train_samples": len(train_idx),
+                "result": {k: v for k, v in result.__dict__.items() if k != "model"},
+            }, out_path)
+    finally:
+        dist.destroy_process_group()
+
+
+def train_data_parallel(
+    shard_dir: str,
+    world_size: int = 2,
+    epochs: int = 100,
+    batch_size: int = 256,
+    learning_rate: float = 0.001,
+    base_batch_size: int = 32,
+    lr_scaling: str = "linear",
+    warmup_epochs: Optional[int] = None,
+    hidden_layers: Sequence[int] = (64, 32),
+    val_split: float = 0.2,
+    threads_per_worker: Optional[int] = None,
+    loader_workers: int = 0,
+    block_size: Optional[int] = None,
+    seed: int = 0,
+    **trainer_kwargs,
+) -> Dict[str, Any]:
+    """
+    数据并行训练监督学习策略网络
+
+    Args:
+        shard_dir: 预编码分片目录（见 shard_dataset.write_shards_from_sessions）
+        world_size: 训练进程数
+        batch_size: 每个进程的批大小（全局批 = batch_size × world_size）
+        learning_rate: base_batch_size 下的学习率，按 lr_scaling 缩放到全局批
+        warmup_epochs: 学习率线性 warmup 轮数（默认：缩放倍数 > 1 时 2 轮，否则 0）
+        threads_per_worker: 每进程 intra-op 线程数（默认 可用核数 // world_size，至少 1）
+        loader_workers: 每个训练进程的 DataLoader worker 数（memmap 读取很快，默认 0 即在训练进程内读）
+        **trainer_kwargs: 传给 TrainerConfig（patience、checkpoint_dir、resume、target_accuracy、lr_schedule 等）
+
+    Returns:
+        {"model", "learning_rate", "global_batch", "threads_per_worker", "samples_per_sec", ...Trainer 结果}
+    """
+    import torch
+    import torch.multiprocessing as mp
+    from src.core.action import ACTION_SPACE_SIZE
+    from src.agents.supervised import _create_policy_net
+
+    n_cores = len(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else (os.cpu_count() or 1)
+    threads_per_worker = threads_per_worker or max(1, n_cores // world_size)
+    global_batch = batch_size * world_size
+    lr = scaled_learning_rate(learning_rate, global_batch, base_batch_size, lr_scaling)
+    if warmup_epochs is None:
+        warmup_epochs = 2 if lr > learning_rate else 0
+    if world_size * threads_per_worker > n_cores:
+        logger.warning(f"[DDP] {world_size} workers × {threads_per_worker} threads > {n_cores} cores (oversubscribed)")
+
+    trainer_options = {"epochs": epochs, "learning_rate": lr, "warmup_epochs": warmup_epochs}
+    trainer_options.update(trainer_kwargs)
+    options = {
+        "batch_size": batch_size,
+        "hidden_layers": list(hidden_layers),
+        "val_split": val_split,
+        "threads_per_worker": threads_per_worker,
+        "loader_workers": loader_workers,
+        "block_size": block_size,
+        "seed": seed,
+        "trainer": trainer_options,
+    }
+    logger.info(f"[DDP] world_size={world_size} threads/worker={threads_per_worker} "
+                f"global_batch={global_batch} lr={lr:.2e} ({lr_scaling}, warmup {warmup_epochs})")
+
+    # 子进程继承线程数环境变量（在 import torch 时生效的 OpenMP / MKL 线程池）
+    saved_env = {k: os.environ.get(k) for k in ("OMP_NUM_THREADS", "MKL_NUM_THREADS")}
+    os.environ.update({k: str(threads_per_worker) for k in saved_env})
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            out_path = str(Path(tmp) / "result.pt")
+            mp.spawn(_worker, args=(world_size, _free_port(), str(shard_dir), out_path, options),
+                     nprocs=world_size, join=True)
+            payload = torch.load(out_path, map_location="cpu", weights_only=False)
+    finally:
+        for k, v in saved_env.items():
+            if v is None:
+                os.environ.pop(k, None)
+            else:
+                os.environ[k] = v
+
+    model = _create_policy_net(payload["input_dim"], tuple(hidden_layers), ACTION_SPACE_SIZE)
+    model.load_state_dict(payload["state_dict"])
+    result = dict(payload["result"])
+    result.update({
+        "model": model,
+        "learning_rate": lr,
+        "global_batch": global_batch,
+        "world_size": world_size,
+        "threads_per_worker": threads_per_worker,
+        "samples_per_sec": payload["train_samples"] * len(result["history"]) / max(result["elapsed_s"], 1e-9)
+        if result["history"] else 0.0,
+    })
+    return result
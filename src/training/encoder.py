@@ -30,7 +30,7 @@
 8. 区块1精简（删除与区块10重复的章节/房间/Buff信息）
 """
 import numpy as np
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional, Sequence
 
 # 从 encoder_dims 导入统一的维度常量
 try:
@@ -131,11 +131,54 @@ CARD_TYPE_MAP = {
 }
 
 
+# 房间阶段 → 区块 10 的 one-hot 位置
+_PHASE_MAP = {
+    "COMBAT": 5, "EVENT": 6, "MAP": 7, "SHOP": 8,
+    "REST": 9, "BOSS": 10, "NONE": 11, "CARD_REWARD": 12,
+}
+
+# 区块 10 [113-136] 的玩家 buff/debuff：(位置, 解析函数, 上限)；[132-135] 预留
+_B10_POWER_PARSERS = (
+    (113, parse_strength, MAX_POWER),
+    (114, parse_dexterity, 30),
+    (115, parse_weak, MAX_DEBUFF),
+    (116, parse_vulnerable, MAX_DEBUFF),
+    (117, parse_frail, MAX_DEBUFF),
+    (118, parse_ritual, 50),
+    (119, parse_artifact, 20),
+    (120, parse_regen, 30),
+    (121, parse_thorns, 20),
+    (122, parse_plated_armor, 50),
+    (123, parse_intangible, 10),
+    (124, parse_buffer, 10),
+    (125, parse_evolve, 10),
+    (126, parse_combust, 20),
+    (127, parse_juggernaut, 20),
+    (128, parse_after_image, 10),
+    (129, parse_corruption, 1),    # 腐化是bool
+    (130, parse_berserk, 1),       # 狂暴是bool
+    (131, parse_metallicize, 50),  # 金属化
+    (136, parse_barricade, 1),     # 路障是bool
+)
+
+# 各区块在 S 向量中的起始偏移
+_OFFSET_B2 = BLOCK1_DIM
+_OFFSET_B3 = _OFFSET_B2 + BLOCK2_DIM
+_OFFSET_B4 = _OFFSET_B3 + BLOCK3_DIM
+_OFFSET_B5 = _OFFSET_B4 + BLOCK4_DIM
+_OFFSET_B6 = _OFFSET_B5 + BLOCK5_DIM
+_OFFSET_B7 = _OFFSET_B6 + BLOCK6_DIM
+_OFFSET_B8 = _OFFSET_B7 + BLOCK7_DIM
+_OFFSET_B9 = _OFFSET_B8 + BLOCK8_DIM
+_OFFSET_B10 = _OFFSET_B9 + BLOCK9_DIM
+
+
 def _clamp_norm(val: float, max_val: float) -> float:
     """把数压到 0~1：val/max_val，max_val=0 时返回 0"""
     if max_val <= 0:
         return 0.0
-    return float(np.clip(val / max_val, 0.0, 1.0))
+    # 纯 Python 比较：每帧调用上百次，np.clip 的标量开销是编码的主要耗时
+    return min(max(val / max_val, 0.0), 1.0)
 
 
 def _encode_block1_player_core(mod_response: Dict[str, Any]) -> np.ndarray:
@@ -738,11 +781,7 @@ def _encode_block10_global(mod_response: Dict[str, Any]) -> np.ndarray:
         out[4] = 1.0
 
     phase = (gs.get("room_phase") or gs.get("screen_type") or "").upper()
-    phase_map = {
-        "COMBAT": 5, "EVENT": 6, "MAP": 7, "SHOP": 8,
-        "REST": 9, "BOSS": 10, "NONE": 11, "CARD_REWARD": 12,
-    }
-    idx = phase_map.get(phase, 11)
+    idx = _PHASE_MAP.get(phase, 11)
     out[idx] = 1.0
 
     out[13] = 1.0 if "play" in cmds else 0.0
@@ -769,7 +808,7 @@ def _encode_block10_global(mod_response: Dict[str, Any]) -> np.ndarray:
     room_subtype = 13  # 默认未知
     if phase == "COMBAT":
         # 判断是否是精英或Boss（使用统一的 monster type 函数）
-        monsters = gs.get("combat_state", {}).get("monsters") or []
+        monsters = (gs.get("combat_state") or {}).get("monsters") or []
         if any(get_monster_type(m.get("id", "")) == 2 for m in monsters):
             room_subtype = 2  # Boss房
         elif any(get_monster_type(m.get("id", "")) == 1 for m in monsters):
@@ -804,30 +843,8 @@ def _encode_block10_global(mod_response: Dict[str, Any]) -> np.ndarray:
     player = cs.get("player") or {}
     powers = player.get("powers") or []
 
-    out[113] = _clamp_norm(min(parse_strength(powers), MAX_POWER), MAX_POWER)
-    out[114] = _clamp_norm(min(parse_dexterity(powers), 30), 30)
-    out[115] = _clamp_norm(min(parse_weak(powers), MAX_DEBUFF), MAX_DEBUFF)
-    out[116] = _clamp_norm(min(parse_vulnerable(powers), MAX_DEBUFF), MAX_DEBUFF)
-    out[117] = _clamp_norm(min(parse_frail(powers), MAX_DEBUFF), MAX_DEBUFF)
-    out[118] = _clamp_norm(min(parse_ritual(powers), 50), 50)
-    out[119] = _clamp_norm(min(parse_artifact(powers), 20), 20)
-    out[120] = _clamp_norm(min(parse_regen(powers), 30), 30)
-    out[121] = _clamp_norm(min(parse_thorns(powers), 20), 20)
-    out[122] = _clamp_norm(min(parse_plated_armor(powers), 50), 50)
-    out[123] = _clamp_norm(min(parse_intangible(powers), 10), 10)
-    out[124] = _clamp_norm(min(parse_buffer(powers), 10), 10)
-    out[125] = _clamp_norm(min(parse_evolve(powers), 10), 10)
-    out[126] = _clamp_norm(min(parse_combust(powers), 20), 20)
-    out[127] = _clamp_norm(min(parse_juggernaut(powers), 20), 20)
-    out[128] = _clamp_norm(min(parse_after_image(powers), 10), 10)
-    out[129] = _clamp_norm(min(parse_corruption(powers), 1), 1)  # 腐化是bool
-    out[130] = _clamp_norm(min(parse_berserk(powers), 1), 1)  # 狂暴是bool
-    out[131] = _clamp_norm(min(parse_metallicize(powers), 50), 50)  # 金属化
-    out[132] = 0.0  # 预留
-    out[133] = 0.0  # 预留
-    out[134] = 0.0  # 预留
-    out[135] = 0.0  # 预留
-    out[136] = _clamp_norm(min(parse_barricade(powers), 1), 1)  # 路障是bool
+    for i, parse, cap in _B10_POWER_PARSERS:
+        out[i] = _clamp_norm(min(parse(powers), cap), cap)
 
     # [137-200] 地图编码 (64维) - 从 Mod 提供的 map 数组中提取信息
     # Mod 提供的 map 是数组，包含所有地图节点对象
@@ -1145,7 +1162,7 @@ def _encode_block10_global(mod_response: Dict[str, Any]) -> np.ndarray:
     return out
 
 
-def encode(mod_response: Dict[str, Any]) -> np.ndarray:
+def encode(mod_response: Dict[str, Any], out: Optional[np.ndarray] = None) -> np.ndarray:
     """
     把 Mod 一帧的 JSON 转成 S 向量 V2
 
@@ -1153,9 +1170,16 @@ def encode(mod_response: Dict[str, Any]) -> np.ndarray:
     含 game_state、combat_state、available_commands 等。
     缺失 combat_state 时，区块 2-7 填 0。
 
+    out: 可选的 (OUTPUT_DIM,) float32 缓冲区（如向量环境观察数组的一行），
+         传入时先清零再原地写入并返回 out
+
     总维度: 2949
     """
-    s = np.zeros(OUTPUT_DIM, dtype=np.float32)
+    if out is None:
+        s = np.zeros(OUTPUT_DIM, dtype=np.float32)
+    else:
+        s = out
+        s[:] = 0.0
     gs = mod_response.get("game_state") or {}
     has_combat = bool(gs.get("combat_state"))
 
@@ -1187,6 +1211,496 @@ def encode(mod_response: Dict[str, Any]) -> np.ndarray:
     return s
 
 
+def encode_batch(mod_responses: Sequence[Dict[str, Any]], out: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    把 N 帧 Mod JSON 编码为 (N, OUTPUT_DIM) 矩阵（逐行 encode(..., out=行)，不产生中间数组）
+
+    out: 可选的 (N, OUTPUT_DIM) float32 缓冲区；传入时原地写入并返回 out
+    """
+    n = len(mod_responses)
+    s = np.zeros((n, OUTPUT_DIM), dtype=np.float32) if out is None else out
+    for i, r in enumerate(mod_responses):
+        encode(r, out=s[i])
+    return s
+
+
+def encode_game_state(state) -> np.ndarray:
+    """
+    直接读取 GameState / CombatState 的强类型字段生成 S 向量，不构造 Mod 格式 dict。
+
+    结果与 encode(state.to_mod_response()) 逐维一致：typed 状态只保存抽牌堆/弃牌堆的
+    数量，按"数量张 UNKNOWN 牌"计入；消耗堆、Powers、遗物、药水、地图等 typed 状态
+    没有的字段保持 0。牌堆统计按数量直接算出，不再逐张遍历占位 dict。
+    """
+    s = np.zeros(OUTPUT_DIM, dtype=np.float32)
+    combat = state.combat
+    cmds = state.available_commands or []
+
+    if combat is not None:
+        player = combat.player
+        current_hp, max_hp = player.current_hp, max(player.max_hp, 1)
+        current_energy, max_energy = player.energy, player.max_energy
+        block = player.block
+        hand = combat.hand
+        monsters = combat.monsters
+        n_draw, n_discard = combat.draw_pile_count, combat.discard_pile_count
+    else:
+        current_hp, max_hp = state.current_hp, max(state.max_hp, 1)
+        current_energy, max_energy = 0, 3
+        block = 0
+        hand, monsters = [], []
+        n_draw = n_discard = 0
+    n_hand = len(hand)
+
+    # ---------- 区块 1：玩家核心 ----------
+    s[0] = _clamp_norm(current_hp, max_hp)
+    s[1] = _clamp_norm(min(max_hp, MAX_HP), MAX_HP)
+    s[2] = _clamp_norm(current_energy, max(max_energy, 1))
+    s[3] = _clamp_norm(min(max_energy, MAX_ENERGY), MAX_ENERGY)
+    s[4] = _clamp_norm(min(block, MAX_BLOCK), MAX_BLOCK)
+    s[5] = _clamp_norm(min(state.gold, MAX_GOLD), MAX_GOLD)
+    s[9] = _clamp_norm(min(n_hand, MAX_HAND), MAX_HAND)
+    s[10] = _clamp_norm(min(n_draw, MAX_DRAW), MAX_DRAW)
+    s[11] = _clamp_norm(min(n_discard, MAX_DISCARD), MAX_DISCARD)
+
+    hand_types = [c.card_type.value.lower() for c in hand]
+
+    if combat is not None:
+        # ---------- 区块 2：手牌 ----------
+        b = _OFFSET_B2
+        for card in hand:
+            idx = card_id_to_index(card.id or card.name or "")
+            if 0 <= idx < CARD_DIM:
+                s[b + idx] += 1
+        # typed Card 没有稀有度，与 Mod dict 缺字段时相同（默认 COMMON）
+        rarity_idx = card_rarity_to_index("")
+        for i, card in enumerate(hand[:10]):
+            base = b + 144 + i * 21
+            cost = max(card.cost, 0)
+            s[base + 0] = _clamp_norm(min(cost, 5), 5)
+            s[base + 1] = 1.0 if card.is_playable else 0.0
+            s[base + 2] = 1.0 if card.has_target else 0.0
+            s[base + 6] = s[base + 0]
+            type_idx = card_type_to_index(hand_types[i])
+            if 0 <= type_idx < 5:
+                s[base + 7 + type_idx] = 1.0
+            s[base + 14 + rarity_idx] = 1.0
+
+        base = b + 374
+        s[base + 0] = min(n_hand, 10) / 10.0
+        zero_cost = sum(1 for c in hand if (c.cost or 0) == 0)
+        s[base + 1] = min(zero_cost, 10) / 10.0
+        playable = sum(1 for c in hand if c.is_playable)
+        s[base + 2] = min(playable, 10) / 10.0
+        s[base + 3] = min(hand_types.count("attack"), 10) / 10.0
+        s[base + 4] = min(hand_types.count("skill"), 10) / 10.0
+        s[base + 5] = min(hand_types.count("power"), 10) / 10.0
+        status_curse_cnt = hand_types.count("status") + hand_types.count("curse")
+        s[base + 6] = min(status_curse_cnt, 10) / 10.0
+        total_cost = sum(max(c.cost, 0) for c in hand)
+        s[base + 8] = _clamp_norm(min(total_cost, 20), 20)
+
+        # ---------- 区块 3/4：抽牌堆/弃牌堆（只有数量，全部计为 UNKNOWN=0、0 费） ----------
+        b = _OFFSET_B3
+        s[b + 0] += n_draw
+        s[b + 144] = _clamp_norm(min(n_draw, 80), 80)
+        s[b + 145] = _clamp_norm(min(n_draw, 80), 80)
+        s[b + 146] = n_draw / max(n_draw, 1)
+
+        b = _OFFSET_B4
+        s[b + 0] += n_discard
+        s[b + 144] = _clamp_norm(min(n_discard, 80), 80)
+
+        # ---------- 区块 7：怪物 ----------
+        for m, mon in enumerate(monsters[:6]):
+            base = _OFFSET_B7 + m * 103
+            mid = mon.id or mon.name or ""
+            midx = monster_id_to_index(mid)
+            if 0 <= midx < MONSTER_DIM:
+                s[base + midx] = 1.0
+            s[base + 75] = _clamp_norm(mon.current_hp, max(mon.max_hp, 1))
+            s[base + 76] = _clamp_norm(min(mon.block, MAX_BLOCK), MAX_BLOCK)
+            s[base + 77 + get_monster_type(mid)] = 1.0
+            intent_idx = intent_to_index(mon.intent.value)
+            if 0 <= intent_idx < INTENT_DIM:
+                s[base + 83 + intent_idx] = 1.0
+            s[base + 97] = 0.0 if mon.is_gone else 1.0
+
+    # ---------- 区块 10：全局 ----------
+    b = _OFFSET_B10
+    floor = state.floor
+    s[b + 0] = _clamp_norm(min(floor, 60), 60)
+    act = state.act
+    if act in (1, 2, 3):
+        s[b + act] = 1.0
+    else:
+        s[b + 4] = 1.0
+
+    phase = state.room_phase.value if hasattr(state.room_phase, "value") else str(state.room_phase)
+    phase = (phase or state.screen_type or "").upper()
+    s[b + _PHASE_MAP.get(phase, 11)] = 1.0
+
+    s[b + 13] = 1.0 if "play" in cmds else 0.0
+    s[b + 14] = 1.0 if "end" in cmds else 0.0
+    s[b + 15] = 1.0 if "choose" in cmds else 0.0
+    s[b + 16] = 1.0 if "proceed" in cmds else 0.0
+    s[b + 17] = 1.0 if "potion" in cmds else 0.0
+    s[b + 18] = 1.0 if "confirm" in cmds else 0.0
+    s[b + 20] = min(len(cmds), 20) / 20.0
+
+    room_subtype = 13
+    if phase == "COMBAT":
+        monster_types = [get_monster_type(mon.id) for mon in monsters]
+        if 2 in monster_types:
+            room_subtype = 2
+        elif 1 in monster_types:
+            room_subtype = 1
+        else:
+            room_subtype = 0
+    elif phase == "REST":
+        room_subtype = 3
+    elif phase == "SHOP":
+        room_subtype = 7
+    elif phase == "EVENT":
+        room_subtype = 8
+    elif phase == "MAP":
+        room_subtype = 12
+    s[b + 73 + room_subtype] = 1.0
+    s[b + 88] = _clamp_norm(min(floor, 60), 60)
+
+    s[b + 231] = _clamp_norm(min(n_hand, MAX_HAND), MAX_HAND)
+    s[b + 232] = _clamp_norm(min(n_draw, MAX_DRAW), MAX_DRAW)
+    s[b + 233] = _clamp_norm(min(n_discard, MAX_DISCARD), MAX_DISCARD)
+    cost_distribution = [0] * 5
+    for card in hand:
+        cost_distribution[min(max(card.cost, 0), 4)] += 1
+    for i in range(5):
+        s[b + 235 + i] = min(cost_distribution[i], 10) / 10.0
+    playable = sum(1 for c in hand if c.is_playable)
+    s[b + 240] = min(playable, 10) / 10.0
+    s[b + 241] = _clamp_norm(min(current_energy, max(max_energy, 1)), max(max_energy, 1))
+    s[b + 242] = _clamp_norm(min(max_energy, MAX_ENERGY), MAX_ENERGY)
+
+    return s
+
+
+# ==================== SilentCombatSim 直连编码 ====================
+
+# 战斗进行中随每步变化的维度；其余维度（遗物、药水、牌组、地图、楼层等）整场战斗不变
+_SIM_B10_DYNAMIC = np.r_[13:22, 73:88, 113:137, 203:206, 210:251, 336:374]
+_SIM_DYNAMIC = np.zeros(OUTPUT_DIM, dtype=bool)
+_SIM_DYNAMIC[0:13] = True
+_SIM_DYNAMIC[16] = True
+_SIM_DYNAMIC[_OFFSET_B2:_OFFSET_B8] = True
+_SIM_DYNAMIC[_OFFSET_B10 + _SIM_B10_DYNAMIC] = True
+
+_IMPORTANT_EXHAUST = (
+    "AscendersBane", "Injury", "Regret", "Pain", "Shame",
+    "Normality", "Doubt", "Writhe", "Necronomicurse", "Clumsy",
+    "Decay", "CurseOfTheBell", "Parasite",
+    "Deadly Poison", "Catalyst", "Bane",
+)
+_PILE_CATEGORY = {"attack": 0, "skill": 1, "power": 2, "status": 3, "curse": 3}
+_TYPE_DIST = {"attack": 0, "skill": 1, "power": 2, "status": 3, "curse": 4}
+
+# 按 id 缓存的查表结果（卡牌 / Power / 怪物 / intent），以及手牌每张牌的 21 维属性行
+_sim_cards: Dict[str, tuple] = {}
+_sim_powers: Dict[str, tuple] = {}
+_sim_monsters: Dict[str, tuple] = {}
+_sim_intents: Dict[str, tuple] = {}
+_sim_hand_rows: Dict[tuple, np.ndarray] = {}
+
+
+def _sim_card(spec) -> tuple:
+    """(multi-hot 下标, 牌堆类别, 类型分布下标, 重要消耗牌下标)"""
+    info = _sim_cards.get(spec.id)
+    if info is None:
+        card_type = spec.type.lower()
+        exhaust_slot = _IMPORTANT_EXHAUST.index(spec.id) if spec.id in _IMPORTANT_EXHAUST else -1
+        info = (card_id_to_index(spec.id), _PILE_CATEGORY.get(card_type, -1), _TYPE_DIST.get(card_type, -1),
+                exhaust_slot)
+        _sim_cards[spec.id] = info
+    return info
+
+
+def _sim_hand_row(spec, cost: int, playable: bool) -> np.ndarray:
+    """手牌一张牌在区块 2 [144 + 21i, 144 + 21i + 19) 的属性（同 _encode_block2_hand）"""
+    key = (spec.id, cost, playable)
+    row = _sim_hand_rows.get(key)
+    if row is None:
+        row = np.zeros(19, dtype=np.float32)
+        cost = max(cost, 0)
+        row[0] = _clamp_norm(min(cost, 5), 5)
+        row[1] = 1.0 if playable else 0.0
+        row[2] = 1.0 if spec.target else 0.0
+        row[3] = 1.0 if spec.ethereal else 0.0
+        row[4] = 1.0 if spec.exhaust else 0.0
+        row[6] = row[0]
+        type_idx = card_type_to_index(spec.type.lower())
+        if 0 <= type_idx < 5:
+            row[7 + type_idx] = 1.0
+        row[14 + card_rarity_to_index(spec.rarity)] = 1.0
+        _sim_hand_rows[key] = row
+    return row
+
+
+def _sim_power(name: str) -> tuple:
+    """(区块 6 下标, 命中的区块 10 解析项, 是否计入怪物力量, 是否计入怪物易伤)"""
+    info = _sim_powers.get(name)
+    if info is None:
+        probe = [{"id": name, "name": name, "amount": 1}]
+        info = (power_id_to_index(name),
+                tuple((i, cap) for i, parse, cap in _B10_POWER_PARSERS if parse(probe)),
+                bool(parse_strength(probe)), bool(parse_vulnerable(probe)))
+        _sim_powers[name] = info
+    return info
+
+
+def _sim_monster(mid: str) -> tuple:
+    """(multi-hot 下标, 怪物类型)"""
+    info = _sim_monsters.get(mid)
+    if info is None:
+        info = _sim_monsters[mid] = (monster_id_to_index(mid), get_monster_type(mid))
+    return info
+
+
+def _sim_intent(intent: str) -> tuple:
+    """(intent 下标, 是否攻击意图)"""
+    info = _sim_intents.get(intent)
+    if info is None:
+        info = _sim_intents[intent] = (intent_to_index(intent), "attack" in intent.lower())
+    return info
+
+
+def silent_sim_template(frame: Dict[str, Any]) -> np.ndarray:
+    """
+    encode_silent_sim 的整场不变部分：对开局帧 encode 后把逐步变化的维度清零
+
+    frame: SilentCombatSim.reset() 返回的帧（同一场战斗内遗物、药水、牌组、地图不变）
+    """
+    s = encode(frame)
+    s[_SIM_DYNAMIC] = 0.0
+    return s
+
+
+def _encode_sim_pile(s: np.ndarray, b: int, pile, cap: int) -> List[int]:
+    """
+    牌堆区块（从偏移 b 起）的 multi-hot 与 [144] 张数；返回计数
+    [张数, 攻击, 技能, 能力, 状态/诅咒, 0 费, 虚无, 消耗, 非负费用之和, 非负费用张数]
+    """
+    stats = [len(pile), 0, 0, 0, 0, 0, 0, 0, 0, 0]
+    for c in pile:
+        spec = c.spec
+        idx, cat, _, _ = _sim_card(spec)
+        if 0 <= idx < CARD_DIM:
+            s[b + idx] += 1
+        if cat >= 0:
+            stats[1 + cat] += 1
+        cost = 0 if c.free and c.cost > 0 else c.cost
+        if cost == 0:
+            stats[5] += 1
+        if spec.ethereal:
+            stats[6] += 1
+        if spec.exhaust:
+            stats[7] += 1
+        if cost >= 0:
+            stats[8] += cost
+            stats[9] += 1
+    s[b + 144] = _clamp_norm(min(stats[0], cap), cap)
+    return stats
+
+
+def encode_silent_sim(sim, template: np.ndarray, out: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    直接读取 SilentCombatSim 的牌 / 怪物 / Power 对象生成 S 向量，不生成帧 dict。
+
+    结果与 encode(sim.frame()) 逐维一致（scripts/bench_silent_sim.py 校验）；仅用于战斗进行中
+    （sim.done 为 False）的状态，终局帧仍走 encode。整场不变的维度取自 template
+    （silent_sim_template(开局帧)），牌 / Power / 怪物 / intent 的查表结果按 id 缓存。
+
+    out: 可选的 (OUTPUT_DIM,) float32 缓冲区，传入时原地写入并返回 out
+    """
+    s = template.copy() if out is None else out
+    if out is not None:
+        s[:] = template
+    hand, draw_pile, discard_pile, exhaust_pile = sim.hand, sim.draw_pile, sim.discard_pile, sim.exhaust_pile
+    monsters = sim.monsters
+    hp, max_hp = max(sim.player_hp, 0), max(sim.max_hp, 1)
+    energy, discarded, times_damaged = sim.energy, sim.discarded_this_turn, sim.times_damaged
+    n_hand, n_draw, n_discard, n_exhaust = len(hand), len(draw_pile), len(discard_pile), len(exhaust_pile)
+
+    # ---------- 区块 1：玩家核心（[13-15] 钥匙在 template 中） ----------
+    s[0] = _clamp_norm(hp, max_hp)
+    s[1] = _clamp_norm(min(max_hp, MAX_HP), MAX_HP)
+    s[2] = _clamp_norm(energy, 3)
+    s[3] = _clamp_norm(3, MAX_ENERGY)
+    s[4] = _clamp_norm(min(sim.player_block, MAX_BLOCK), MAX_BLOCK)
+    s[5] = _clamp_norm(min(sim.gold, MAX_GOLD), MAX_GOLD)
+    s[7] = _clamp_norm(min(discarded, MAX_CARDS_DISCARDED), MAX_CARDS_DISCARDED)
+    s[8] = _clamp_norm(min(times_damaged, MAX_TIMES_DAMAGED), MAX_TIMES_DAMAGED)
+    s[9] = _clamp_norm(min(n_hand, MAX_HAND), MAX_HAND)
+    s[10] = _clamp_norm(min(n_draw, MAX_DRAW), MAX_DRAW)
+    s[11] = _clamp_norm(min(n_discard, MAX_DISCARD), MAX_DISCARD)
+    s[12] = _clamp_norm(min(n_exhaust, MAX_EXHAUST), MAX_EXHAUST)
+    s[16] = _clamp_norm(min(sim.turn, MAX_TURN), MAX_TURN)
+
+    # ---------- 区块 2：手牌 ----------
+    b = _OFFSET_B2
+    type_counts = [0, 0, 0, 0]
+    cost_distribution = [0] * 5
+    zero_cost = playable = total_cost = 0
+    for i, c in enumerate(hand):
+        spec = c.spec
+        idx, cat, _, _ = _sim_card(spec)
+        if 0 <= idx < CARD_DIM:
+            s[b + idx] += 1
+        if cat >= 0:
+            type_counts[cat] += 1
+        cost = sim._cost(c)
+        ok = sim.card_playable(c)
+        if i < 10:
+            row = b + 144 + i * 21
+            s[row:row + 19] = _sim_hand_row(spec, cost, ok)
+        if cost == 0:
+            zero_cost += 1
+        playable += ok
+        cost = max(cost, 0)
+        total_cost += cost
+        cost_distribution[min(cost, 4)] += 1
+    base = b + 374
+    s[base + 0] = min(n_hand, 10) / 10.0
+    s[base + 1] = min(zero_cost, 10) / 10.0
+    s[base + 2] = min(playable, 10) / 10.0
+    s[base + 3] = min(type_counts[0], 10) / 10.0
+    s[base + 4] = min(type_counts[1], 10) / 10.0
+    s[base + 5] = min(type_counts[2], 10) / 10.0
+    s[base + 6] = min(type_counts[3], 10) / 10.0
+    s[base + 8] = _clamp_norm(min(total_cost, 20), 20)
+
+    # ---------- 区块 3-5：抽牌堆 / 弃牌堆 / 消耗堆 ----------
+    b = _OFFSET_B3 + 144
+    st = _encode_sim_pile(s, _OFFSET_B3, draw_pile, 80)
+    n = max(st[0], 1)
+    s[b + 1] = _clamp_norm(min(st[5], 80), 80)
+    s[b + 2] = st[5] / n
+    for k in range(4):
+        s[b + 3 + 2 * k] = _clamp_norm(min(st[1 + k], 80), 80)
+        s[b + 4 + 2 * k] = st[1 + k] / n
+    s[b + 13] = _clamp_norm(min(st[6], 80), 80)
+    s[b + 14] = _clamp_norm(min(st[7], 80), 80)
+    if st[9]:
+        s[b + 15] = _clamp_norm(min(st[8] / st[9], 5), 5)
+        s[b + 16] = _clamp_norm(min(st[8], 300), 300)
+
+    b = _OFFSET_B4 + 144
+    st = _encode_sim_pile(s, _OFFSET_B4, discard_pile, 80)
+    n = max(st[0], 1)
+    for k in range(4):
+        s[b + 1 + 2 * k] = _clamp_norm(min(st[1 + k], 80), 80)
+        s[b + 2 + 2 * k] = st[1 + k] / n
+    s[b + 9] = _clamp_norm(min(discarded, MAX_CARDS_DISCARDED), MAX_CARDS_DISCARDED)
+    s[b + 12] = _clamp_norm(min(st[6], 80), 80)
+    s[b + 13] = _clamp_norm(min(st[7], 80), 80)
+
+    b = _OFFSET_B5 + 144
+    st = _encode_sim_pile(s, _OFFSET_B5, exhaust_pile, 50)
+    n = max(st[0], 1)
+    for k in range(4):
+        s[b + 1 + 2 * k] = _clamp_norm(min(st[1 + k], 50), 50)
+        s[b + 2 + 2 * k] = st[1 + k] / n
+
+    # ---------- 区块 6 + 区块 10 [113-136]：玩家 Powers ----------
+    b10 = _OFFSET_B10
+    sums: Dict[tuple, int] = {}
+    for name, amount in sim.player_powers.items():
+        idx, hits, _, _ = _sim_power(name)
+        if 0 <= idx < POWER_DIM:
+            s[_OFFSET_B6 + idx] += _clamp_norm(amount, 10)
+        for key in hits:
+            sums[key] = sums.get(key, 0) + amount
+    for (i, cap), total in sums.items():
+        s[b10 + i] = _clamp_norm(min(total, cap), cap)
+
+    # ---------- 区块 7 + 区块 10 怪物相关 ----------
+    room_subtype = 0
+    expected = 0
+    for k, m in enumerate(monsters):
+        midx, mon_type = _sim_monster(m.id)
+        if mon_type == 2:
+            room_subtype = 2
+        elif mon_type == 1 and room_subtype == 0:
+            room_subtype = 1
+        intent, _, hits, adj = sim.monster_intent(m)
+        intent_idx, attack = _sim_intent(intent)
+        gone = m.is_gone or not m.alive
+        hits = hits or 1
+        adj_dmg = max(0, adj * hits) if adj > 0 else 0
+        if not gone and attack:
+            expected += adj_dmg
+        if k >= 6:
+            continue
+        last_move, second_last_move = m.last(1), m.last(2)
+        dmg = max(0, adj * hits)
+        base = _OFFSET_B7 + k * 103
+        if 0 <= midx < MONSTER_DIM:
+            s[base + midx] = 1.0
+        s[base + 75] = _clamp_norm(max(m.hp, 0), max(m.max_hp, 1))
+        s[base + 76] = _clamp_norm(min(m.block, MAX_BLOCK), MAX_BLOCK)
+        s[base + 77 + mon_type] = 1.0
+        s[base + 80] = _clamp_norm(min(m.move or 0, 100), 100)
+        if 0 <= intent_idx < INTENT_DIM:
+            s[base + 83 + intent_idx] = 1.0
+        s[base + 96] = _clamp_norm(min(dmg, MAX_DAMAGE), MAX_DAMAGE)
+        s[base + 97] = 0.0 if gone else 1.0
+        s[base + 98] = 1.0 if m.half_dead else 0.0
+        s[base + 99] = _clamp_norm(last_move or 0, 100)
+        s[base + 100] = _clamp_norm(second_last_move or 0, 100)
+        strength = vulnerable = 0
+        for name, amount in m.powers.items():
+            _, _, is_strength, is_vulnerable = _sim_power(name)
+            if is_strength:
+                strength += amount
+            if is_vulnerable:
+                vulnerable += amount
+        s[base + 101] = _clamp_norm(min(strength, 30), 30)
+        s[base + 102] = _clamp_norm(min(vulnerable, MAX_DEBUFF), MAX_DEBUFF)
+
+        if k < 4:
+            s[b10 + 213 + k * 2] = _clamp_norm(min(last_move or 0, 50), 50) / 50.0
+            s[b10 + 214 + k * 2] = _clamp_norm(min(second_last_move or 0, 50), 50) / 50.0
+        s[b10 + 221 + k] = _clamp_norm(min(adj_dmg, 50), 50) / 50.0
+    s[b10 + 73 + room_subtype] = 1.0
+
+    # ---------- 区块 10：可用命令 / 本回合动态 / 消耗堆统计 ----------
+    n_cmds = 6 if playable else 5  # [play] end key click wait state
+    s[b10 + 13] = 1.0 if playable else 0.0
+    s[b10 + 14] = 1.0
+    s[b10 + 20] = min(n_cmds, 20) / 20.0
+    s[b10 + 205] = _clamp_norm(min(times_damaged, 20), 20)
+    s[b10 + 231] = _clamp_norm(min(n_hand, MAX_HAND), MAX_HAND)
+    s[b10 + 232] = _clamp_norm(min(n_draw, MAX_DRAW), MAX_DRAW)
+    s[b10 + 233] = _clamp_norm(min(n_discard, MAX_DISCARD), MAX_DISCARD)
+    s[b10 + 234] = _clamp_norm(min(n_exhaust, MAX_EXHAUST), MAX_EXHAUST)
+    for i in range(5):
+        s[b10 + 235 + i] = min(cost_distribution[i], 10) / 10.0
+    s[b10 + 240] = min(playable, 10) / 10.0
+    s[b10 + 241] = _clamp_norm(min(energy, 3), 3)
+    s[b10 + 242] = _clamp_norm(3, MAX_ENERGY)
+    s[b10 + 243] = _clamp_norm(min(expected, 100), 100) / 100.0
+
+    s[b10 + 336] = _clamp_norm(min(n_exhaust, MAX_EXHAUST), MAX_EXHAUST)
+    exhaust_type_dist = [0] * 5
+    for c in exhaust_pile:
+        _, _, type_idx, exhaust_slot = _sim_card(c.spec)
+        if type_idx >= 0:
+            exhaust_type_dist[type_idx] += 1
+        if exhaust_slot >= 0:
+            s[b10 + 342 + exhaust_slot] = 1.0
+    for i in range(5):
+        s[b10 + 337 + i] = min(exhaust_type_dist[i], 20) / 20.0
+    return s
+
+
 def get_output_dim() -> int:
     """返回 2945"""
     return OUTPUT_DIM
@@ -1207,8 +1721,27 @@ class StateEncoder:
         return self._dim
 
     def encode_state(self, state) -> np.ndarray:
-        """将 GameState 编码为观察向量"""
+        """
+        将 GameState 编码为观察向量
+
+        优先使用 state 保留的原始 Mod 帧（与离线 encode 完全一致，信息最全）；
+        没有原始帧时（模拟器/手工构造的状态）直接读 typed 字段，不走 to_mod_response。
+        """
         if state is None:
             return np.zeros(self._dim, dtype=np.float32)
-        mod_response = state.to_mod_response()
-        return encode(mod_response)
\ No newline at end of file
+        raw = getattr(state, "raw_response", None)
+        if raw is not None:
+            return encode(raw)
+        return encode_game_state(state)
+
+    def encode_states(self, states, out: Optional[np.ndarray] = None) -> np.ndarray:
+        """批量编码 N 个 GameState 为 (N, D) 矩阵（规则同 encode_state，有原始帧的行原地写入）"""
+        n = len(states)
+        s = np.zeros((n, self._dim), dtype=np.float32) if out is None else out
+        for i, state in enumerate(states):
+            raw = getattr(state, "raw_response", None) if state is not None else None
+            if raw is not None:
+                encode(raw, out=s[i])
+            else:
+                s[i] = self.encode_state(state)
+        return s
@@ -4,16 +4,23 @@ Encoder 工具：ID 归一化 + 查表
 
 把 Mod 日志里的 id 转成 encoder_ids.yaml 里的编号，供 encoder 用。
 与 Mod 日志数据互通：支持 Mod 发送的各种 id 格式（空格/下划线、大小写）。
+
+查表字典优先读预计算缓存 configs/encoder_ids.cache.json（scripts/build_encoder_id_cache.py 生成，
+记录 yaml 内容的 sha1，yaml 变化后自动失效）；缓存缺失或过期时解析 yaml（只解析一次）。
 """
 import re
+import hashlib
 from pathlib import Path
 from typing import Dict, List, Optional
 
-import yaml
-
 # 项目根目录
 _PROJECT_ROOT = Path(__file__).resolve().parent.parent.parent
 _IDS_PATH = _PROJECT_ROOT / "configs" / "encoder_ids.yaml"
+_IDS_CACHE_PATH = _PROJECT_ROOT / "configs" / "encoder_ids.cache.json"
+_IDS_CACHE_VERSION = 1
+
+# 需要查表的 yaml 段（其余映射为固定字典）
+_ID_TABLE_KEYS = ("cards", "relics", "potions", "powers", "intents", "monsters", "events")
 
 # 从 encoder_dims 导入维度常量（统一来源）
 # 防止维度不一致问题
@@ -44,10 +51,84 @@ _intent_to_index: Optional[Dict[str, int]] = None
 _monster_id_to_index: Optional[Dict[str, int]] = None
 
 
+_SEPARATORS_RE = re.compile(r"[\s_]+")
+
+_ids_data: Optional[dict] = None
+_id_tables: Optional[Dict[str, Dict[str, int]]] = None
+
+
 def _load_ids() -> dict:
-    """加载 encoder_ids.yaml"""
-    with open(_IDS_PATH, encoding="utf-8") as f:
-        return yaml.safe_load(f)
+    """加载 encoder_ids.yaml（进程内只解析一次）"""
+    global _ids_data
+    if _ids_data is None:
+        import yaml
+        with open(_IDS_PATH, encoding="utf-8") as f:
+            _ids_data = yaml.safe_load(f)
+    return _ids_data
+
+
+def _build_index(names: List[str]) -> Dict[str, int]:
+    """名称列表 → {归一化 id: 下标}（重复 id 保留第一次出现的下标）"""
+    result = {}
+    for idx, name in enumerate(names):
+        if name:
+            norm = normalize_id(name)
+            if norm and norm not in result:
+                result[norm] = idx
+    return result
+
+
+def _ids_source_digest() -> str:
+    with open(_IDS_PATH, "rb") as f:
+        return hashlib.sha1(f.read()).hexdigest()
+
+
+def build_id_tables() -> Dict[str, Dict[str, int]]:
+    """从 encoder_ids.yaml 构建全部查表字典"""
+    data = _load_ids()
+    return {key: _build_index(data.get(key, []) or []) for key in _ID_TABLE_KEYS}
+
+
+def write_id_cache(path: Optional[Path] = None) -> Path:
+    """把查表字典写入预计算缓存（JSON），返回路径"""
+    from src.core import json_codec
+
+    path = Path(path) if path else _IDS_CACHE_PATH
+    cache = {
+        "version": _IDS_CACHE_VERSION,
+        "source_sha1": _ids_source_digest(),
+        "tables": build_id_tables(),
+    }
+    json_codec.dump(cache, path)
+    return path
+
+
+def _read_id_cache() -> Optional[Dict[str, Dict[str, int]]]:
+    """读取预计算缓存；不存在、损坏或与 yaml 不一致时返回 None"""
+    if not _IDS_CACHE_PATH.exists():
+        return None
+    from src.core import json_codec
+
+    try:
+        cache = json_codec.load(_IDS_CACHE_PATH)
+    except (OSError, ValueError):
+        return None
+    if not isinstance(cache, dict) or cache.get("version") != _IDS_CACHE_VERSION:
+        return None
+    if cache.get("source_sha1") != _ids_source_digest():
+        return None
+    tables = cache.get("tables") or {}
+    if any(key not in tables for key in _ID_TABLE_KEYS):
+        return None
+    return tables
+
+
+def _load_id_tables() -> Dict[str, Dict[str, int]]:
+    """全部查表字典：优先预计算缓存，否则解析 yaml"""
+    global _id_tables
+    if _id_tables is None:
+        _id_tables = _read_id_cache() or build_id_tables()
+    return _id_tables
 
 
 def normalize_id(raw: str) -> str:
@@ -64,21 +145,13 @@ def normalize_id(raw: str) -> str:
         return ""
     s = raw.strip().lower()
     # 空格与下划线统一为下划线
-    s = re.sub(r"[\s_]+", "_", s)
+    s = _SEPARATORS_RE.sub("_", s)
     return s
 
 
 def _build_card_id_to_index() -> Dict[str, int]:
     """构建 card_id -> index 字典"""
-    data = _load_ids()
-    cards: List[str] = data.get("cards", [])
-    result = {}
-    for idx, cid in enumerate(cards):
-        if cid:
-            norm = normalize_id(cid)
-            if norm and norm not in result:
-                result[norm] = idx
-    return result
+    return _load_id_tables()["cards"]
 
 
 def card_id_to_index(card_id: str) -> int:
@@ -96,15 +169,7 @@ def card_id_to_index(card_id: str) -> int:
 
 def _build_relic_id_to_index() -> Dict[str, int]:
     """构建 relic_id -> index 字典"""
-    data = _load_ids()
-    relics: List[str] = data.get("relics", [])
-    result = {}
-    for idx, rid in enumerate(relics):
-        if rid:
-            norm = normalize_id(rid)
-            if norm and norm not in result:
-                result[norm] = idx
-    return result
+    return _load_id_tables()["relics"]
 
 
 def relic_id_to_index(relic_id: str) -> int:
@@ -122,15 +187,7 @@ def relic_id_to_index(relic_id: str) -> int:
 
 def _build_potion_id_to_index() -> Dict[str, int]:
     """构建 potion_id -> index 字典"""
-    data = _load_ids()
-    potions: List[str] = data.get("potions", [])
-    result = {}
-    for idx, pid in enumerate(potions):
-        if pid:
-            norm = normalize_id(pid)
-            if norm and norm not in result:
-                result[norm] = idx
-    return result
+    return _load_id_tables()["potions"]
 
 
 def potion_id_to_index(potion_id: str) -> int:
@@ -148,15 +205,7 @@ def potion_id_to_index(potion_id: str) -> int:
 
 def _build_power_id_to_index() -> Dict[str, int]:
     """构建 power_id -> index 字典"""
-    data = _load_ids()
-    powers: List[str] = data.get("powers", [])
-    result = {}
-    for idx, pid in enumerate(powers):
-        if pid:
-            norm = normalize_id(pid)
-            if norm and norm not in result:
-                result[norm] = idx
-    return result
+    return _load_id_tables()["powers"]
 
 
 def power_id_to_index(power_id: str) -> int:
@@ -174,15 +223,7 @@ def power_id_to_index(power_id: str) -> int:
 
 def _build_intent_to_index() -> Dict[str, int]:
     """构建 intent -> index 字典"""
-    data = _load_ids()
-    intents: List[str] = data.get("intents", [])
-    result = {}
-    for idx, iid in enumerate(intents):
-        if iid:
-            norm = normalize_id(iid)
-            if norm and norm not in result:
-                result[norm] = idx
-    return result
+    return _load_id_tables()["intents"]
 
 
 def intent_to_index(intent: str) -> int:
@@ -200,15 +241,7 @@ def intent_to_index(intent: str) -> int:
 
 def _build_monster_id_to_index() -> Dict[str, int]:
     """构建 monster_id -> index 字典"""
-    data = _load_ids()
-    monsters: List[str] = data.get("monsters", [])
-    result = {}
-    for idx, mid in enumerate(monsters):
-        if mid:
-            norm = normalize_id(mid)
-            if norm and norm not in result:
-                result[norm] = idx
-    return result
+    return _load_id_tables()["monsters"]
 
 
 def monster_id_to_index(monster_id: str) -> int:
@@ -251,15 +284,7 @@ _event_id_to_index: Optional[Dict[str, int]] = None
 
 def _build_event_id_to_index() -> Dict[str, int]:
     """构建 event_id -> index 字典"""
-    data = _load_ids()
-    events: List[str] = data.get("events", [])
-    result = {}
-    for idx, eid in enumerate(events):
-        if eid:
-            norm = normalize_id(eid)
-            if norm and norm not in result:
-                result[norm] = idx
-    return result
+    return _load_id_tables()["events"]
 
 
 def event_id_to_index(event_id: str) -> int:
@@ -13,6 +13,8 @@ from datetime import datetime
 from typing import Dict, Any, List, Optional
 from dataclasses import dataclass, field, asdict
 
+from src.core import json_codec
+
 logger = logging.getLogger(__name__)
 
 
@@ -28,7 +30,7 @@ class ExperimentConfig:
     # Agent 配置
     agent_type: str = "rule"  # rule, supervised, rl
     model_type: str = "sklearn"  # sklearn, pytorch
-    algorithm: str = "ppo"  # ppo, a2c, dqn
+    algorithm: str = "ppo"  # ppo, maskable_ppo, a2c, dqn
 
     # 训练配置
     data_dir: str = ""
@@ -48,6 +50,7 @@ class ExperimentConfig:
 
     def to_hash(self) -> str:
         """生成配置哈希"""
+        # 固定用标准库序列化：哈希不随 JSON 后端变化，已有实验 ID 保持不变
         config_str = json.dumps(asdict(self), sort_keys=True)
         return hashlib.md5(config_str.encode()).hexdigest()[:8]
 
@@ -111,14 +114,12 @@ class ExperimentTracker:
     def _load_index(self) -> Dict[str, Dict]:
         """加载实验索引"""
         if self.index_file.exists():
-            with open(self.index_file, 'r', encoding='utf-8') as f:
-                return json.load(f)
+            return json_codec.load(self.index_file)
         return {}
 
     def _save_index(self):
         """保存实验索引"""
-        with open(self.index_file, 'w', encoding='utf-8') as f:
-            json.dump(self._index, f, indent=2, ensure_ascii=False)
+        json_codec.dump(self._index, self.index_file, pretty=True)
 
     def create_experiment(
         self,
@@ -147,8 +148,7 @@ class ExperimentTracker:
 
         # 保存配置
         config_file = exp_dir / "config.json"
-        with open(config_file, 'w', encoding='utf-8') as f:
-            json.dump(asdict(config), f, indent=2, ensure_ascii=False)
+        json_codec.dump(asdict(config), config_file, pretty=True)
 
         # 创建结果
         result = ExperimentResult(
@@ -181,8 +181,7 @@ class ExperimentTracker:
         exp_dir = self.experiments_dir / experiment_id
         result_file = exp_dir / "result.json"
 
-        with open(result_file, 'w', encoding='utf-8') as f:
-            json.dump(asdict(result), f, indent=2, ensure_ascii=False)
+        json_codec.dump(asdict(result), result_file, pretty=True)
 
     def update_result(
         self,
@@ -267,8 +266,7 @@ class ExperimentTracker:
         if not result_file.exists():
             return None
 
-        with open(result_file, 'r', encoding='utf-8') as f:
-            data = json.load(f)
+        data = json_codec.load(result_file)
 
         return ExperimentResult(**data)
 
@@ -280,8 +278,7 @@ class ExperimentTracker:
         if not config_file.exists():
             return None
 
-        with open(config_file, 'r', encoding='utf-8') as f:
-            data = json.load(f)
+        data = json_codec.load(config_file)
 
         return ExperimentConfig(**data)
 
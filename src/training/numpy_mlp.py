@@ -0,0 +1,333 @@
+#!/usr/bin/env python3
+"""
+NumPy MLP 分类器训练：可流式、可续训的 sklearn MLPClassifier 替代
+
+_train_sklearn 用 MLPClassifier.fit 在整表矩阵上单进程训练，不能流式读取、不能续训。
+NumpyMLPTrainer 用同样的网络与优化器（ReLU 隐藏层、softmax 交叉熵、Adam、L2 正则 alpha，
+Glorot 均匀初始化，超参默认值与 sklearn 一致），但：
+- partial_fit(X, y)：对一个批做一次前向 / 反向 / Adam 更新，全部是批量矩阵运算（float32，
+  多线程由 BLAS 负责，OPENBLAS_NUM_THREADS / MKL_NUM_THREADS 控制）
+- fit_stream(train_batches, val_batches)：逐 epoch 消费批迭代器（ShardDataset + BlockShuffleSampler，
+  数据不必放进内存），验证损失 n_iter_no_change 轮未下降 tol 即早停并恢复最优权重
+- checkpoint_dir：每轮原子写出 last.npz（权重 + Adam 矩 + 早停计数 + RNG 状态），best.npz 为最优权重；
+  resume=True 时从 last.npz 续训
+- y 可以是 (N, 179) 软标签（策略蒸馏的教师分布）：损失为软交叉熵（与 KL(教师 || 学生) 只差教师熵常数），
+  准确率为与教师 argmax 的一致率
+- 输出层固定 179 维（不像 sklearn 只覆盖训练中出现过的类别），to_policy() 得到 NumpyPolicy，
+  可直接 .save 成 .npz 供 SupervisedAgentImpl / RLAgentImpl 加载
+
+用法：
+    trainer = NumpyMLPTrainer(input_dim=31, hidden_layers=(64, 32))
+    ds = ShardDataset("data/shards/sl_mvp"); train_idx, val_idx = ds.split(0.2)
+    sampler = BlockShuffleSampler(train_idx, 256)
+    def train_batches(epoch):
+        sampler.set_epoch(epoch)
+        return iter_batches(ds, sampler)
+    result = trainer.fit_stream(train_batches, lambda: iter_batches(ds, BlockShuffleSampler(val_idx, 4096, shuffle=False)))
+    trainer.to_policy(encoder="encoder_mvp").save("models/sl.npz")
+"""
+import os
+import json
+import time
+import logging
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence
+
+import numpy as np
+
+from src.core.action import ACTION_SPACE_SIZE
+
+logger = logging.getLogger(__name__)
+
+LAST_CHECKPOINT = "last.npz"
+BEST_CHECKPOINT = "best.npz"
+
+
+class NumpyMLPTrainer:
+    """
+    ReLU MLP + softmax 交叉熵 + Adam（小批量，向量化）
+
+    Args:
+        input_dim: 输入维度
+        hidden_layers: 隐藏层大小
+        n_classes: 输出类别数（默认 179 维动作空间）
+        learning_rate: Adam 学习率（sklearn learning_rate_init）
+        alpha: L2 正则系数（sklearn alpha，按批大小归一）
+        beta_1 / beta_2 / epsilon: Adam 参数
+        seed: 初始化与打乱的随机种子
+    """
+
+    def __init__(self, input_dim: int, hidden_layers: Sequence[int] = (64, 32), n_classes: int = ACTION_SPACE_SIZE,
+                 learning_rate: float = 0.001, alpha: float = 0.0001, beta_1: float = 0.9, beta_2: float = 0.999,
+                 epsilon: float = 1e-8, seed: int = 42, name: str = "NumpyMLP"):
+        self.input_dim = input_dim
+        self.hidden_layers = list(hidden_layers)
+        self.n_classes = n_classes
+        self.learning_rate = learning_rate
+        self.alpha = alpha
+        self.beta_1, self.beta_2, self.epsilon = beta_1, beta_2, epsilon
+        self.name = name
+
+        self.rng = np.random.default_rng(seed)
+        dims = [input_dim] + self.hidden_layers + [n_classes]
+        self.weights: List[np.ndarray] = []
+        self.biases: List[np.ndarray] = []
+        for fan_in, fan_out in zip(dims[:-1], dims[1:]):
+            # sklearn 的 Glorot 均匀初始化（ReLU / softmax 用系数 6）
+            bound = np.sqrt(6.0 / (fan_in + fan_out))
+            self.weights.append(self.rng.uniform(-bound, bound, (fan_in, fan_out)).astype(np.float32))
+            self.biases.append(self.rng.uniform(-bound, bound, fan_out).astype(np.float32))
+        self._m = [np.zeros_like(p) for p in self._params()]
+        self._v = [np.zeros_like(p) for p in self._params()]
+        self.t = 0  # Adam 步数
+
+        # 训练进度（检查点保存 / 恢复）
+        self.epoch = 0
+        self.best_val_loss = float("inf")
+        self.best_val_acc = 0.0
+        self.best_epoch = 0
+        self.bad_epochs = 0
+        self.elapsed_s = 0.0
+        self.history: List[Dict[str, float]] = []
+        self._best: Optional[List[np.ndarray]] = None
+
+    def _params(self) -> List[np.ndarray]:
+        return [p for pair in zip(self.weights, self.biases) for p in pair]
+
+    # ==================== 前向 / 反向 ====================
+
+    def _forward(self, X: np.ndarray) -> List[np.ndarray]:
+        """返回各层激活（最后一层为 logits）"""
+        acts = [X]
+        h = X
+        last = len(self.weights) - 1
+        for i, (w, b) in enumerate(zip(self.weights, self.biases)):
+            h = h @ w
+            h += b
+            if i < last:
+                np.maximum(h, 0.0, out=h)
+            acts.append(h)
+        return acts
+
+    @staticmethod
+    def _log_softmax(z: np.ndarray) -> np.ndarray:
+        z = z - z.max(axis=1, keepdims=True)
+        return z - np.log(np.exp(z).sum(axis=1, keepdims=True))
+
+    @staticmethod
+    def _targets(y: np.ndarray) -> np.ndarray:
+        """硬标签 → int64 (N,)；软标签 → float32 (N, C)"""
+        y = np.asarray(y)
+        return y.astype(np.float32, copy=False) if y.ndim == 2 else y.astype(np.int64, copy=False)
+
+    def _loss_correct(self, z: np.ndarray, logp: np.ndarray, y: np.ndarray):
+        """批内交叉熵之和与正确数（软标签时正确 = 与教师 argmax 一致）"""
+        if y.ndim == 2:
+            return -float((y * logp).sum()), int((z.argmax(axis=1) == y.argmax(axis=1)).sum())
+        return -float(logp[np.arange(len(y)), y].sum()), int((z.argmax(axis=1) == y).sum())
+
+    def gradients(self, X: np.ndarray, y: np.ndarray):
+        """
+        一个批的损失（含 L2）、正确数与梯度
+
+        Args:
+            y: (N,) 动作标签，或 (N, 179) 软标签
+
+        Returns:
+            (loss, correct, grads)，grads 顺序为 [W0, b0, W1, b1, ...]
+        """
+        X = np.asarray(X, dtype=np.float32)
+        y = self._targets(y)
+        n = len(y)
+        acts = self._forward(X)
+        logp = self._log_softmax(acts[-1])
+        loss_sum, correct = self._loss_correct(acts[-1], logp, y)
+        loss = loss_sum / n + 0.5 * self.alpha * sum(float((w * w).sum()) for w in self.weights) / n
+
+        # softmax 交叉熵梯度：(p - 目标分布) / n
+        delta = np.exp(logp)
+        if y.ndim == 2:
+            delta -= y
+        else:
+            delta[np.arange(n), y] -= 1.0
+        delta /= n
+        grads = []
+        for i in range(len(self.weights) - 1, -1, -1):
+            gw = acts[i].T @ delta
+            gw += (self.alpha / n) * self.weights[i]
+            grads.append(delta.sum(axis=0))
+            grads.append(gw)
+            if i > 0:
+                delta = delta @ self.weights[i].T
+                delta *= acts[i] > 0
+        grads.reverse()
+        return loss, correct, grads
+
+    def partial_fit(self, X: np.ndarray, y: np.ndarray) -> Dict[str, float]:
+        """一个小批的 Adam 更新；返回该批的平均损失与正确数"""
+        loss, correct, grads = self.gradients(X, y)
+        self._adam_step(grads)
+        return {"loss": loss, "correct": correct, "n": len(y)}
+
+    def _adam_step(self, grads: List[np.ndarray]):
+        self.t += 1
+        b1, b2 = self.beta_1, self.beta_2
+        lr = self.learning_rate * np.sqrt(1 - b2 ** self.t) / (1 - b1 ** self.t)
+        for p, g, m, v in zip(self._params(), grads, self._m, self._v):
+            m *= b1
+            m += (1 - b1) * g
+            v *= b2
+            v += (1 - b2) * (g * g)
+            p -= np.float32(lr) * m / (np.sqrt(v) + np.float32(self.epsilon))
+
+    def evaluate(self, batches: Iterable) -> Dict[str, float]:
+        """逐批计算平均交叉熵与准确率（软标签时为与教师 argmax 的一致率）"""
+        loss_sum = 0.0
+        correct = n = 0
+        for X, y in batches:
+            z = self._forward(np.asarray(X, dtype=np.float32))[-1]
+            y = self._targets(y)
+            batch_loss, batch_correct = self._loss_correct(z, self._log_softmax(z), y)
+            loss_sum += batch_loss
+            correct += batch_correct
+            n += len(y)
+        return {"loss": loss_sum / n if n else float("nan"), "acc": correct / n if n else 0.0, "n": n}
+
+    def predict_proba(self, X: np.ndarray) -> np.ndarray:
+        return np.exp(self._log_softmax(self._forward(np.asarray(X, dtype=np.float32))[-1]))
+
+    # ==================== 训练循环 ====================
+
+    def fit_stream(
+        self,
+        train_batches: Callable[[int], Iterable],
+        val_batches: Optional[Callable[[], Iterable]] = None,
+        epochs: int = 100,
+        n_iter_no_change: int = 20,
+        tol: float = 1e-4,
+        checkpoint_dir: Optional[str] = None,
+        resume: bool = True,
+        log_every: int = 10,
+    ) -> Dict[str, Any]:
+        """
+        逐 epoch 训练
+
+        Args:
+            train_batches: epoch → 可迭代的 (X, y) 批
+            val_batches: () → 验证批；None 时监控训练损失
+            n_iter_no_change / tol: 早停（与 sklearn 同名参数含义一致）
+            checkpoint_dir: 检查点目录；resume=True 时从 last.npz 续训
+        """
+        ckpt = Path(checkpoint_dir) if checkpoint_dir else None
+        resumed_from = 0
+        if ckpt is not None:
+            ckpt.mkdir(parents=True, exist_ok=True)
+            if resume and (ckpt / LAST_CHECKPOINT).exists():
+                resumed_from = self.load_checkpoint(ckpt / LAST_CHECKPOINT)
+
+        stop_reason = "early_stopping" if self.bad_epochs >= n_iter_no_change else None
+        while stop_reason is None and self.epoch < epochs:
+            t0 = time.perf_counter()
+            loss_sum = 0.0
+            correct = n = 0
+            for X, y in train_batches(self.epoch):
+                r = self.partial_fit(X, y)
+                loss_sum += r["loss"] * r["n"]
+                correct += r["correct"]
+                n += r["n"]
+            train = {"loss": loss_sum / max(n, 1), "acc": correct / max(n, 1)}
+            monitor = self.evaluate(val_batches()) if val_batches is not None else train
+            if val_batches is not None and monitor["n"] == 0:
+                monitor = train
+
+            self.epoch += 1
+            self.elapsed_s += time.perf_counter() - t0
+            if monitor["loss"] < self.best_val_loss - tol:
+                self.best_val_loss = monitor["loss"]
+                self.best_val_acc = monitor["acc"]
+                self.best_epoch = self.epoch
+                self.bad_epochs = 0
+                self._best = [p.copy() for p in self._params()]
+                if ckpt is not None:
+                    self._save_arrays(ckpt / BEST_CHECKPOINT, {f"p{i}": p for i, p in enumerate(self._best)})
+            else:
+                self.bad_epochs += 1
+            self.history.append({"epoch": self.epoch, "train_loss": train["loss"], "train_acc": train["acc"],
+                                 "val_loss": monitor["loss"], "val_acc": monitor["acc"],
+                                 "samples": n, "elapsed_s": self.elapsed_s})
+            if ckpt is not None:
+                self.save_checkpoint(ckpt / LAST_CHECKPOINT)
+            if self.epoch % log_every == 0:
+                logger.info(f"[{self.name}] Epoch {self.epoch}/{epochs}, Loss: {train['loss']:.4f}, "
+                            f"Val Loss: {monitor['loss']:.4f}, Val Acc: {monitor['acc']:.4f}")
+            if self.bad_epochs >= n_iter_no_change:
+                stop_reason = "early_stopping"
+
+        if self._best is not None:
+            for p, best in zip(self._params(), self._best):
+                p[...] = best
+        samples = sum(h["samples"] for h in self.history)
+        return {
+            "best_epoch": self.best_epoch,
+            "best_val_loss": self.best_val_loss,
+            "best_val_acc": self.best_val_acc,
+            "epochs_run": self.epoch,
+            "stop_reason": stop_reason or "completed",
+            "elapsed_s": self.elapsed_s,
+            "samples_per_sec": samples / self.elapsed_s if self.elapsed_s > 0 else 0.0,
+            "resumed_from_epoch": resumed_from,
+            "history": self.history,
+        }
+
+    # ==================== 检查点 ====================
+
+    @staticmethod
+    def _save_arrays(path: Path, arrays: Dict[str, np.ndarray]):
+        tmp = path.with_name(path.name + ".tmp")
+        with open(tmp, "wb") as f:
+            np.savez(f, **arrays)
+        os.replace(tmp, path)
+
+    def save_checkpoint(self, path: Path):
+        """权重、Adam 矩、进度与 RNG 状态（npz，无 pickle）"""
+        params = self._params()
+        arrays = {f"p{i}": p for i, p in enumerate(params)}
+        arrays.update({f"m{i}": m for i, m in enumerate(self._m)})
+        arrays.update({f"v{i}": v for i, v in enumerate(self._v)})
+        if self._best is not None:
+            arrays.update({f"best{i}": p for i, p in enumerate(self._best)})
+        state = {
+            "input_dim": self.input_dim, "hidden_layers": self.hidden_layers, "n_classes": self.n_classes,
+            "t": self.t, "epoch": self.epoch, "best_val_loss": self.best_val_loss, "best_val_acc": self.best_val_acc,
+            "best_epoch": self.best_epoch, "bad_epochs": self.bad_epochs, "elapsed_s": self.elapsed_s,
+            "history": self.history, "rng": self.rng.bit_generator.state,
+        }
+        arrays["state"] = np.array(json.dumps(state))
+        self._save_arrays(Path(path), arrays)
+
+    def load_checkpoint(self, path: Path) -> int:
+        """从 save_checkpoint 的文件恢复，返回恢复到的 epoch"""
+        with np.load(path, allow_pickle=False) as data:
+            state = json.loads(str(data["state"]))
+            shape = (state["input_dim"], state["hidden_layers"], state["n_classes"])
+            if shape != (self.input_dim, self.hidden_layers, self.n_classes):
+                raise ValueError(f"Checkpoint {path} is for network {shape}, "
+                                 f"not {(self.input_dim, self.hidden_layers, self.n_classes)}")
+            n = len(self._params())
+            for i, p in enumerate(self._params()):
+                p[...] = data[f"p{i}"]
+            self._m = [data[f"m{i}"].copy() for i in range(n)]
+            self._v = [data[f"v{i}"].copy() for i in range(n)]
+            self._best = [data[f"best{i}"].copy() for i in range(n)] if "best0" in data.files else None
+        for key in ("t", "epoch", "best_val_loss", "best_val_acc", "best_epoch", "bad_epochs", "elapsed_s", "history"):
+            setattr(self, key, state[key])
+        self.rng.bit_generator.state = state["rng"]
+        logger.info(f"[{self.name}] Resumed from {path} at epoch {self.epoch}")
+        return self.epoch
+
+    def to_policy(self, encoder: str = "encoder_mvp"):
+        """导出为 NumpyPolicy（推理用，.save 成 .npz）"""
+        from src.agents.numpy_policy import NumpyPolicy
+        activations = ["relu"] * len(self.hidden_layers) + ["identity"]
+        return NumpyPolicy([w.copy() for w in self.weights], [b.copy() for b in self.biases], activations,
+                           encoder=encoder, source="numpy_mlp")
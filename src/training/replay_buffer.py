@@ -0,0 +1,380 @@
+#!/usr/bin/env python3
+"""
+优先经验回放缓冲区（NumPy 线段树 + 超出内存上限时落盘）
+
+离策略更新要反复从「大量人类对局日志 + 在线经验」中按 TD 误差优先采样：
+- 存储：obs / action / reward / next_obs / mask / next_mask / done 预分配为定长数组，环形覆盖；
+  掩码按位打包（179 位 → 23 字节）
+- 落盘：每行字节数 × 行数超过 memory_limit_mb 时，超出部分的行放在 spill_dir 下的 .npy memmap 中，
+  前 ram_rows 行仍在内存（同一行的所有字段总在同一层）；采样时按层分组、排序后读取
+- 优先级：SumSegmentTree / MinSegmentTree（容量向上取 2 的幂，叶子存 p^alpha），
+  批量更新与批量前缀和查找都是每层一次向量运算，O(log n) 层
+- 采样：把总优先级等分成 batch_size 段、每段均匀取一个前缀和（分层采样），
+  重要性权重 w_i = (N · P(i))^-beta / max_j w_j；新写入的转移取当前最大优先级
+- 批量加载：ReplayStore（或 ReplayStore.save 的 .npy 目录，mmap 读取）中的日志转移，
+  奖励与终止沿用 ReplayEnv 的规则（reward_relabel 向量化计算）
+
+用法：
+    buffer = PrioritizedReplayBuffer(1_000_000, obs_dim=2945, memory_limit_mb=2048)
+    buffer.add_replay_store("data/replay_store")           # 日志语料
+    buffer.add(obs, action, reward, next_obs, done, mask, next_mask)   # 在线经验
+    batch = buffer.sample(256, beta=0.4)
+    buffer.update_priorities(batch["indices"], np.abs(td_error) + 1e-6)
+"""
+import shutil
+import logging
+import tempfile
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple, Union
+
+import numpy as np
+
+from src.core.action import ACTION_SPACE_SIZE
+
+logger = logging.getLogger(__name__)
+
+_MASK_BYTES = (ACTION_SPACE_SIZE + 7) // 8
+
+
+# ==================== 线段树 ====================
+
+class SegmentTree:
+    """
+    数组实现的完全二叉线段树：tree[1] 为根，叶子在 [size, 2·size)
+
+    update / query 均接受索引数组，每层一次向量运算。
+    """
+
+    def __init__(self, capacity: int, op, neutral: float):
+        self.size = 1
+        while self.size < capacity:
+            self.size *= 2
+        self.depth = self.size.bit_length() - 1
+        self._op = op
+        self.neutral = neutral
+        self.tree = np.full(2 * self.size, neutral, dtype=np.float64)
+
+    def update(self, idx: np.ndarray, values: np.ndarray):
+        """叶子 idx 置为 values，并沿路径重算父节点（重复索引以最后一次为准）"""
+        pos = np.asarray(idx, dtype=np.int64) + self.size
+        self.tree[pos] = values
+        for _ in range(self.depth):
+            pos = np.unique(pos >> 1)
+            self.tree[pos] = self._op(self.tree[2 * pos], self.tree[2 * pos + 1])
+
+    def __getitem__(self, idx) -> np.ndarray:
+        return self.tree[np.asarray(idx, dtype=np.int64) + self.size]
+
+    def root(self) -> float:
+        return float(self.tree[1])
+
+
+class SumSegmentTree(SegmentTree):
+    def __init__(self, capacity: int):
+        super().__init__(capacity, np.add, 0.0)
+
+    def find_prefixsum_idx(self, prefix: np.ndarray) -> np.ndarray:
+        """每个前缀和所在的叶子：最小的 i 使 sum(tree[0..i]) > prefix"""
+        prefix = np.array(prefix, dtype=np.float64)
+        idx = np.ones(len(prefix), dtype=np.int64)
+        for _ in range(self.depth):
+            left = 2 * idx
+            left_sum = self.tree[left]
+            go_right = prefix >= left_sum
+            prefix -= np.where(go_right, left_sum, 0.0)
+            idx = left + go_right
+        return idx - self.size
+
+
+class MinSegmentTree(SegmentTree):
+    def __init__(self, capacity: int):
+        super().__init__(capacity, np.minimum, np.inf)
+
+
+# ==================== 分层存储 ====================
+
+class _TieredArray:
+    """前 ram_rows 行在内存、其余行在 .npy memmap 的定长数组（落盘部分首次写入时才创建）"""
+
+    def __init__(self, name: str, capacity: int, tail: Tuple[int, ...], dtype, ram_rows: int, spill_dir: Path):
+        self.name = name
+        self.capacity = capacity
+        self.tail = tail
+        self.dtype = np.dtype(dtype)
+        self.ram_rows = min(ram_rows, capacity)
+        self.spill_dir = spill_dir
+        self.ram = np.zeros((self.ram_rows,) + tail, dtype=self.dtype)
+        self.disk: Optional[np.memmap] = None
+
+    @property
+    def row_bytes(self) -> int:
+        return int(np.prod(self.tail, dtype=np.int64)) * self.dtype.itemsize
+
+    def _disk(self) -> np.memmap:
+        if self.disk is None:
+            self.spill_dir.mkdir(parents=True, exist_ok=True)
+            self.disk = np.lib.format.open_memmap(self.spill_dir / f"{self.name}.npy", mode="w+", dtype=self.dtype,
+                                                  shape=(self.capacity - self.ram_rows,) + self.tail)
+        return self.disk
+
+    def write(self, idx: np.ndarray, values: np.ndarray):
+        in_ram = idx < self.ram_rows
+        if in_ram.all():
+            self.ram[idx] = values
+            return
+        self.ram[idx[in_ram]] = values[in_ram]
+        self._disk()[idx[~in_ram] - self.ram_rows] = values[~in_ram]
+
+    def take(self, idx: np.ndarray) -> np.ndarray:
+        """按 idx 取行（idx 已排序时落盘部分是顺序读）"""
+        in_ram = idx < self.ram_rows
+        if in_ram.all():
+            return self.ram[idx]
+        out = np.empty((len(idx),) + self.tail, dtype=self.dtype)
+        out[in_ram] = self.ram[idx[in_ram]]
+        out[~in_ram] = self.disk[idx[~in_ram] - self.ram_rows]
+        return out
+
+
+# ==================== 缓冲区 ====================
+
+class PrioritizedReplayBuffer:
+    """
+    优先经验回放缓冲区
+
+    Args:
+        capacity: 最大转移数（环形覆盖最旧的）
+        obs_dim: 观察维度（encoder = 2945，encoder_mvp = 31）
+        alpha: 优先级指数（0 = 均匀采样）
+        beta: 默认重要性采样指数（sample 可覆盖，通常从 0.4 退火到 1）
+        memory_limit_mb: 存储数组的内存上限（None = 全部在内存）；超出的行落盘
+        spill_dir: 落盘目录（None = 临时目录，close() 时删除）
+        obs_dtype: 观察存储类型（float16 可把内存 / 磁盘占用减半，采样时转回 float32）
+        eps: 优先级下限，避免 0 优先级的转移永远采不到
+    """
+
+    def __init__(
+        self,
+        capacity: int,
+        obs_dim: int,
+        alpha: float = 0.6,
+        beta: float = 0.4,
+        memory_limit_mb: Optional[float] = None,
+        spill_dir: Optional[Union[str, Path]] = None,
+        obs_dtype=np.float32,
+        eps: float = 1e-6,
+        seed: Optional[int] = None,
+    ):
+        self.capacity = int(capacity)
+        self.obs_dim = obs_dim
+        self.alpha = alpha
+        self.beta = beta
+        self.eps = eps
+        self._rng = np.random.default_rng(seed)
+        self._own_spill_dir = spill_dir is None
+        self.spill_dir = Path(spill_dir) if spill_dir is not None else None
+
+        fields = {
+            "obs": ((obs_dim,), obs_dtype),
+            "next_obs": ((obs_dim,), obs_dtype),
+            "actions": ((), np.int16),
+            "rewards": ((), np.float32),
+            "dones": ((), np.bool_),
+            "masks": ((_MASK_BYTES,), np.uint8),
+            "next_masks": ((_MASK_BYTES,), np.uint8),
+        }
+        row_bytes = sum(int(np.prod(tail, dtype=np.int64)) * np.dtype(dt).itemsize for tail, dt in fields.values())
+        if memory_limit_mb is None:
+            self.ram_rows = self.capacity
+        else:
+            self.ram_rows = min(self.capacity, int(memory_limit_mb * 2 ** 20) // row_bytes)
+        if self.ram_rows < self.capacity and self.spill_dir is None:
+            self.spill_dir = Path(tempfile.mkdtemp(prefix="replay_spill_"))
+        self._arrays = {name: _TieredArray(name, self.capacity, tail, dt, self.ram_rows, self.spill_dir)
+                        for name, (tail, dt) in fields.items()}
+        self.row_bytes = row_bytes
+
+        self._sum = SumSegmentTree(self.capacity)
+        self._min = MinSegmentTree(self.capacity)
+        self._max_priority = 1.0
+        self._next = 0
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    # ==================== 写入 ====================
+
+    def add(self, obs, action: int, reward: float, next_obs, done: bool,
+            mask: Optional[np.ndarray] = None, next_mask: Optional[np.ndarray] = None,
+            priority: Optional[float] = None):
+        """写入一条转移（掩码缺省为全部合法）"""
+        self.extend(
+            np.asarray(obs)[None], np.array([action]), np.array([reward]), np.asarray(next_obs)[None],
+            np.array([done]),
+            None if mask is None else np.asarray(mask)[None],
+            None if next_mask is None else np.asarray(next_mask)[None],
+            None if priority is None else np.array([priority]),
+        )
+
+    def extend(self, obs: np.ndarray, actions: np.ndarray, rewards: np.ndarray, next_obs: np.ndarray,
+               dones: np.ndarray, masks: Optional[np.ndarray] = None, next_masks: Optional[np.ndarray] = None,
+               priorities: Optional[np.ndarray] = None):
+        """
+        批量写入 N 条转移
+
+        Args:
+            masks / next_masks: (N, 179) bool，None = 全部合法
+            priorities: (N,) 初始优先级，None = 当前最大优先级
+        """
+        n = len(actions)
+        if n == 0:
+            return
+        if n > self.capacity:
+            # 只有最后 capacity 条会留下
+            cut = slice(n - self.capacity, n)
+            obs, actions, rewards, next_obs, dones = obs[cut], actions[cut], rewards[cut], next_obs[cut], dones[cut]
+            masks = None if masks is None else masks[cut]
+            next_masks = None if next_masks is None else next_masks[cut]
+            priorities = None if priorities is None else priorities[cut]
+            n = self.capacity
+        idx = (self._next + np.arange(n)) % self.capacity
+        values = {
+            "obs": obs,
+            "next_obs": next_obs,
+            "actions": np.asarray(actions, dtype=np.int16),
+            "rewards": np.asarray(rewards, dtype=np.float32),
+            "dones": np.asarray(dones, dtype=np.bool_),
+            "masks": self._pack(masks, n),
+            "next_masks": self._pack(next_masks, n),
+        }
+        for name, arr in self._arrays.items():
+            arr.write(idx, np.asarray(values[name], dtype=arr.dtype).reshape((n,) + arr.tail))
+
+        if priorities is None:
+            p = np.full(n, self._max_priority ** self.alpha)
+        else:
+            priorities = np.maximum(np.asarray(priorities, dtype=np.float64), self.eps)
+            self._max_priority = max(self._max_priority, float(priorities.max()))
+            p = priorities ** self.alpha
+        self._sum.update(idx, p)
+        self._min.update(idx, p)
+        self._next = int((self._next + n) % self.capacity)
+        self._size = min(self._size + n, self.capacity)
+
+    @staticmethod
+    def _pack(masks: Optional[np.ndarray], n: int) -> np.ndarray:
+        if masks is None:
+            return np.full((n, _MASK_BYTES), 0xFF, dtype=np.uint8)
+        return np.packbits(np.asarray(masks, dtype=bool).reshape(n, ACTION_SPACE_SIZE), axis=1)
+
+    def add_replay_store(self, store, unit: str = "combat", chunk: int = 8192,
+                         priorities: Optional[np.ndarray] = None, reward=None) -> int:
+        """
+        批量加载日志转移：每个回放单元内 t → t+1，跳过没有记录动作（-1）的帧
+
+        奖励 / 终止由 reward_relabel.relabel_store 对全部单元一次向量化算出，与 ReplayEnv 沿记录动作
+        回放时逐步得到的相同；观察与掩码直接从 store 的数组切片（ReplayStore.load(mmap=True) 时按块从磁盘读）。
+
+        Args:
+            store: ReplayStore，或 ReplayStore.save 的目录
+            unit: 回放单元（combat / episode）
+            chunk: 每次写入的转移数
+            reward: 可选 RewardConfig（默认配置文件中的 training.reward）
+        Returns:
+            写入的转移数
+        """
+        from src.env.replay_env import ReplayStore
+        from src.training.reward_relabel import relabel_store
+
+        if not isinstance(store, ReplayStore):
+            store = ReplayStore.load(store, mmap=True)
+        labels = relabel_store(store, unit=unit, reward=reward)
+        frames = np.flatnonzero(labels["valid"] & (np.asarray(store.actions) >= 0))
+        rewards, dones = labels["rewards"][frames], labels["dones"][frames]
+        for start in range(0, len(frames), chunk):
+            t = frames[start:start + chunk]
+            self.extend(
+                store.obs[t], store.actions[t], rewards[start:start + chunk], store.obs[t + 1],
+                dones[start:start + chunk], store.masks[t], store.masks[t + 1],
+                None if priorities is None else priorities[start:start + chunk],
+            )
+        logger.info(f"[ReplayBuffer] Loaded {len(frames)} logged transitions from {len(store.segments(unit))} "
+                    f"{unit} segments (size {len(self)}/{self.capacity}, {self.spilled_rows} rows on disk)")
+        return len(frames)
+
+    # ==================== 采样 ====================
+
+    def sample(self, batch_size: int, beta: Optional[float] = None) -> Dict[str, np.ndarray]:
+        """
+        按优先级分层采样一批
+
+        Returns:
+            obs / next_obs (B, D) float32，actions (B,) int64，rewards (B,) float32，dones (B,) bool，
+            masks / next_masks (B, 179) bool，indices (B,)（update_priorities 用），weights (B,) float32
+            （行按存储位置排序，落盘部分顺序读）
+        """
+        if self._size == 0:
+            raise ValueError("Cannot sample from an empty replay buffer")
+        beta = self.beta if beta is None else beta
+        total = self._sum.root()
+        prefix = (np.arange(batch_size) + self._rng.random(batch_size)) * (total / batch_size)
+        idx = np.sort(np.minimum(self._sum.find_prefixsum_idx(prefix), self._size - 1))
+
+        p = self._sum[idx] / total
+        p_min = self._min.root() / total
+        weights = (p / p_min) ** -beta
+
+        batch = {name: arr.take(idx) for name, arr in self._arrays.items()}
+        batch["obs"] = batch["obs"].astype(np.float32, copy=False)
+        batch["next_obs"] = batch["next_obs"].astype(np.float32, copy=False)
+        batch["actions"] = batch["actions"].astype(np.int64)
+        for name in ("masks", "next_masks"):
+            batch[name] = np.unpackbits(batch[name], axis=1, count=ACTION_SPACE_SIZE).astype(bool)
+        batch["indices"] = idx
+        batch["weights"] = weights.astype(np.float32)
+        return batch
+
+    def update_priorities(self, indices: np.ndarray, priorities: np.ndarray):
+        """用新的优先级（通常是 |TD 误差| + eps）更新已采样的转移"""
+        priorities = np.maximum(np.asarray(priorities, dtype=np.float64), self.eps)
+        self._max_priority = max(self._max_priority, float(priorities.max()))
+        p = priorities ** self.alpha
+        self._sum.update(indices, p)
+        self._min.update(indices, p)
+
+    def priorities(self, indices: np.ndarray) -> np.ndarray:
+        """当前优先级（p^alpha 还原为 p）"""
+        return self._sum[indices] ** (1.0 / self.alpha) if self.alpha else np.ones(len(indices))
+
+    # ==================== 状态 ====================
+
+    @property
+    def spilled_rows(self) -> int:
+        """当前落盘的行数"""
+        return max(0, self._size - self.ram_rows)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "size": self._size,
+            "capacity": self.capacity,
+            "ram_rows": self.ram_rows,
+            "spilled_rows": self.spilled_rows,
+            "ram_mb": self.ram_rows * self.row_bytes / 2 ** 20,
+            "disk_mb": self.spilled_rows * self.row_bytes / 2 ** 20,
+            "total_priority": self._sum.root(),
+            "max_priority": self._max_priority,
+        }
+
+    def close(self):
+        """释放 memmap；spill_dir 为临时目录时删除"""
+        for arr in self._arrays.values():
+            arr.disk = None
+        if self._own_spill_dir and self.spill_dir is not None:
+            shutil.rmtree(self.spill_dir, ignore_errors=True)
+
+    def __enter__(self) -> "PrioritizedReplayBuffer":
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,219 @@
+#!/usr/bin/env python3
+"""
+离线奖励重标注：对整个语料一次性向量化计算奖励、折扣回报与 GAE 优势
+
+StsEnvironment._compute_reward 逐步依赖 _last_combat_hp 与 _episode_length，改了奖励权重就只能用
+ReplayEnv 把所有对局逐帧重放一遍。这里把 ReplayStore 的逐帧数组（player_hp / monster_hp / flags）
+与回放单元边界（combats / episodes）摊平成「单元内位置」数组，所有对局一起算：
+- 奖励：单元内「上一个有战斗的帧」用 np.maximum.accumulate 找到，血量差、击杀、死亡、步数惩罚
+  全部是逐元素运算；规则与 StsEnvironment._reward_from_hp 相同，权重来自 RewardConfig
+- 终止：与 ReplayEnv.step 相同（combat 单元遇到战斗结束 / 死亡 / 怪物全灭即止，单元末帧必止），
+  每个单元的实际终点用 np.minimum.reduceat 求出，之后的帧不参与
+- 回报 / GAE：按「距单元终点的步数」分组，从终点往前每一步对所有单元同时做一次向量更新，
+  循环次数 = 最长单元的转移数，而不是总帧数
+
+结果按帧对齐（第 t 帧 = 在第 t 帧行动后的转移），写到 ReplayStore 目录下的 <name>/ 子目录，
+与 obs.npy / masks.npy 等编码数组并列：
+    rewards.npy (T,) float32    dones.npy (T,) bool    valid.npy (T,) bool（该帧是否开始一次转移）
+    returns.npy (T,) float32    advantages.npy (T,) float32    labels.json（权重、gamma、lambda、单元）
+
+用法：
+    labels = relabel_store(store, unit="combat", reward=RewardConfig(damage_taken=0.5), gamma=0.99)
+    write_labels("data/replay_store", labels, name="labels_dt05")
+"""
+import json
+import logging
+from dataclasses import asdict
+from pathlib import Path
+from typing import Any, Dict, Optional, Union
+
+import numpy as np
+
+from src.core.config import RewardConfig, get_config
+
+logger = logging.getLogger(__name__)
+
+LABEL_COLUMNS = ("rewards", "dones", "valid", "returns", "advantages")
+
+
+def _flatten_segments(segments: np.ndarray):
+    """(K, 2) [start, end) → (单元编号, 单元内步数, 帧号, 各单元起点位置)，长度 = 各单元帧数之和"""
+    segments = np.asarray(segments, dtype=np.int64).reshape(-1, 2)
+    lengths = segments[:, 1] - segments[:, 0]
+    offsets = np.concatenate([[0], np.cumsum(lengths)[:-1]]).astype(np.int64)
+    seg_id = np.repeat(np.arange(len(segments)), lengths)
+    step = np.arange(int(lengths.sum()), dtype=np.int64) - offsets[seg_id]
+    frame = segments[seg_id, 0] + step
+    return seg_id, step, frame, offsets, lengths
+
+
+def relabel(
+    player_hp: np.ndarray,
+    monster_hp: np.ndarray,
+    flags: np.ndarray,
+    segments: np.ndarray,
+    unit: str = "combat",
+    reward: Optional[RewardConfig] = None,
+    gamma: Optional[float] = None,
+    gae_lambda: float = 0.95,
+    values: Optional[np.ndarray] = None,
+) -> Dict[str, np.ndarray]:
+    """
+    向量化计算全部回放单元的奖励、终止、折扣回报与 GAE 优势
+
+    Args:
+        player_hp / monster_hp / flags: (T,) 逐帧数组（ReplayStore 同名字段，flags 为 FLAG_* 位）
+        segments: (K, 2) 回放单元 [start, end)，互不重叠（ReplayStore.segments(unit)）
+        unit: combat（战斗结束 / 死亡 / 怪物全灭时终止）或 episode（只在单元末帧终止）
+        reward: 奖励权重（默认配置文件中的 training.reward）
+        gamma: 折扣因子（默认 training.gamma）
+        gae_lambda: GAE 的 lambda
+        values: 可选 (T,) 逐帧状态价值 V(s_t)；None 时视为 0，优势即 gamma·lambda 折扣的回报
+
+    Returns:
+        按帧对齐的 (T,) 列：rewards / dones / valid / returns / advantages（valid 为 False 的帧全为 0）
+    """
+    from src.env.replay_env import FLAG_IN_GAME, FLAG_IS_COMBAT, FLAG_HAS_COMBAT
+
+    if unit not in ("combat", "episode"):
+        raise ValueError(f"Unknown replay unit: {unit}")
+    config = get_config().training
+    w = reward or config.reward
+    gamma = config.gamma if gamma is None else gamma
+    n_frames = len(flags)
+
+    segments = np.asarray(segments, dtype=np.int64).reshape(-1, 2)
+    segments = segments[segments[:, 1] > segments[:, 0]]
+    seg_id, step, frame, offsets, lengths = _flatten_segments(segments)
+    n = len(frame)
+    out = {
+        "rewards": np.zeros(n_frames, dtype=np.float32),
+        "dones": np.zeros(n_frames, dtype=bool),
+        "valid": np.zeros(n_frames, dtype=bool),
+        "returns": np.zeros(n_frames, dtype=np.float32),
+        "advantages": np.zeros(n_frames, dtype=np.float32),
+    }
+    if n == 0:
+        return out
+
+    f = np.asarray(flags)[frame]
+    p = np.asarray(player_hp)[frame].astype(np.float64)
+    m = np.asarray(monster_hp)[frame].astype(np.float64)
+    has_combat = (f & FLAG_HAS_COMBAT) != 0
+
+    # ---- 奖励：位置 j 的奖励 = 从 j-1 走到 j 时 _reward_from_hp 的返回值 ----
+    # 上一个有战斗的位置（单元内；没有则基准为 (0, 0)，同 reset 后的 _last_combat_hp）
+    last = np.maximum.accumulate(np.where(has_combat, np.arange(n), -1))
+    prev = np.concatenate([[-1], last[:-1]])
+    prev_ok = prev >= offsets[seg_id]
+    prev = np.maximum(prev, 0)
+    last_p = np.where(prev_ok, p[prev], 0.0)
+    last_m = np.where(prev_ok, m[prev], 0.0)
+
+    r = np.maximum(last_m - m, 0.0) * w.damage_dealt
+    r += np.where((last_m > 0) & (m == 0), w.kill_bonus, 0.0)
+    r -= np.maximum(last_p - p, 0.0) * w.damage_taken
+    r -= np.where(p <= 0, w.death_penalty, 0.0)
+    r -= np.where(step > w.length_threshold, w.length_penalty * (step - w.length_threshold), 0.0)
+    r = np.where(has_combat & (step >= 1), r, 0.0)
+
+    # ---- 终止：每个单元第一个终止位置（单元内步数），之后的帧不再访问 ----
+    last_step = step == lengths[seg_id] - 1
+    if unit == "combat":
+        terminal = ((f & FLAG_IN_GAME) == 0) | ((f & FLAG_IS_COMBAT) == 0) | (p <= 0) | (m <= 0) | last_step
+    else:
+        terminal = last_step
+    big = np.iinfo(np.int64).max
+    end_step = np.minimum.reduceat(np.where(terminal & (step >= 1), step, big), offsets)
+    end_step = np.minimum(end_step, lengths - 1)
+
+    # ---- 转移：位置 j（单元内步数 < 终点）→ j+1 ----
+    end_of = end_step[seg_id]
+    valid = step < end_of
+    next_r = np.zeros(n)
+    next_r[:-1] = r[1:]
+    rew = np.where(valid, next_r, 0.0)
+    done = valid & (step + 1 == end_of)
+
+    v = np.zeros(n) if values is None else np.asarray(values, dtype=np.float64)[frame]
+    v_next = np.zeros(n)
+    v_next[:-1] = v[1:]
+    delta = np.where(valid, rew + gamma * np.where(done, 0.0, v_next) - v, 0.0)
+
+    # ---- 回报 / GAE：按距终点的步数分组，从终点往前对所有单元同时更新 ----
+    ret = np.zeros(n)
+    adv = np.zeros(n)
+    pos = np.flatnonzero(valid)
+    dist = (end_of - 1 - step)[pos]
+    order = np.argsort(dist, kind="stable")
+    pos, counts = pos[order], np.bincount(dist)
+    start = 0
+    for d, c in enumerate(counts):
+        idx = pos[start:start + c]
+        start += c
+        if d == 0:
+            ret[idx] = rew[idx]
+            adv[idx] = delta[idx]
+        else:
+            ret[idx] = rew[idx] + gamma * ret[idx + 1]
+            adv[idx] = delta[idx] + gamma * gae_lambda * adv[idx + 1]
+
+    t = frame[valid]
+    out["rewards"][t] = rew[valid]
+    out["dones"][t] = done[valid]
+    out["valid"][t] = True
+    out["returns"][t] = ret[valid]
+    out["advantages"][t] = adv[valid]
+    return out
+
+
+def relabel_store(
+    store,
+    unit: str = "combat",
+    reward: Optional[RewardConfig] = None,
+    gamma: Optional[float] = None,
+    gae_lambda: float = 0.95,
+    values: Optional[np.ndarray] = None,
+) -> Dict[str, Any]:
+    """对 ReplayStore（或其 save 目录）重标注；返回 relabel 的各列，另含 meta（权重与参数）"""
+    from src.env.replay_env import ReplayStore
+
+    if not isinstance(store, ReplayStore):
+        store = ReplayStore.load(store, mmap=True)
+    config = get_config().training
+    reward = reward or config.reward
+    gamma = config.gamma if gamma is None else gamma
+    labels = relabel(store.player_hp, store.monster_hp, store.flags, store.segments(unit), unit=unit,
+                     reward=reward, gamma=gamma, gae_lambda=gae_lambda, values=values)
+    labels["meta"] = {
+        "unit": unit,
+        "gamma": gamma,
+        "gae_lambda": gae_lambda,
+        "reward": asdict(reward),
+        "values": values is not None,
+        "num_frames": int(len(store.flags)),
+        "num_transitions": int(labels["valid"].sum()),
+    }
+    return labels
+
+
+def write_labels(store_dir: Union[str, Path], labels: Dict[str, Any], name: str = "labels") -> Path:
+    """把各列写到 <store_dir>/<name>/（.npy + labels.json），与 ReplayStore 的编码数组并列"""
+    out_dir = Path(store_dir) / name
+    out_dir.mkdir(parents=True, exist_ok=True)
+    for col in LABEL_COLUMNS:
+        np.save(out_dir / f"{col}.npy", labels[col])
+    with open(out_dir / "labels.json", "w", encoding="utf-8") as f:
+        json.dump(labels.get("meta", {}), f, ensure_ascii=False, indent=2)
+    logger.info(f"[RewardRelabel] {int(labels['valid'].sum())} transitions → {out_dir}")
+    return out_dir
+
+
+def load_labels(store_dir: Union[str, Path], name: str = "labels", mmap: bool = True) -> Dict[str, Any]:
+    """读取 write_labels 的结果（mmap=True 时按需映射）"""
+    label_dir = Path(store_dir) / name
+    labels: Dict[str, Any] = {col: np.load(label_dir / f"{col}.npy", mmap_mode="r" if mmap else None)
+                              for col in LABEL_COLUMNS}
+    with open(label_dir / "labels.json", "r", encoding="utf-8") as f:
+        labels["meta"] = json.load(f)
+    return labels
@@ -0,0 +1,361 @@
+#!/usr/bin/env python3
+"""
+预编码分片数据集：监督学习训练的流式读取
+
+_train_pytorch 原先要 GameState 列表 → _encode_states 整表 NumPy → torch.FloatTensor，整份数据在内存里
+同时有三份。这里把编码与训练拆开：
+- ShardWriter：逐条编码后写入固定大小的 .npy 分片（x: float32 (N, D)，y: int64 (N,)，可选 p: float16 (N, 179)
+  软标签，如策略蒸馏时教师的动作分布），index.json 记录分片行数、维度与编码器；写入时只保留一个分片的缓冲
+- ShardDataset：np.load(mmap_mode="r") 打开全部分片；dataset[indices] 按分片分组、排序后读取再按原顺序还原，
+  只把这一批读进内存
+- BlockShuffleSampler：把样本切成连续块，打乱块顺序与块内顺序后按 batch 产出索引数组——
+  读取基本是顺序的（页缓存友好），随机性接近全量打乱；set_epoch 换种子
+- make_dataloader：torch 可用时包成 DataLoader（batch_size=None，sampler 产出整批索引），
+  多 worker + prefetch；iter_batches 是不依赖 torch 的同等迭代
+
+峰值内存 O(batch)：任一时刻只有 worker 数 × prefetch_factor 个批在内存中，其余由页缓存按需换入。
+
+用法：
+    write_shards_from_sessions("data/A20_Slient/Raw_Data_json_FORSL", "data/shards/sl_mvp")
+    ds = ShardDataset("data/shards/sl_mvp")
+    train_idx, val_idx = ds.split(0.2)
+    loader = make_dataloader(ds, train_idx, batch_size=256, num_workers=2)
+    for epoch in range(epochs):
+        loader.sampler.set_epoch(epoch)
+        for xb, yb in loader: ...
+"""
+import json
+import logging
+from pathlib import Path
+from typing import Callable, Dict, Any, Iterable, Iterator, List, Optional, Tuple, Union
+
+import numpy as np
+
+from src.core.action import ACTION_SPACE_SIZE
+
+logger = logging.getLogger(__name__)
+
+INDEX_FILE = "index.json"
+DEFAULT_SHARD_SIZE = 65536
+
+
+# ==================== 写入 ====================
+
+class ShardWriter:
+    """
+    逐条 / 逐批追加样本，写满 shard_size 行落盘一个分片
+
+    Args:
+        out_dir: 输出目录（已有 index.json 时覆盖）
+        dim: 观察维度
+        shard_size: 每分片行数
+        encoder: 记录生成观察所用的编码器模块名
+        soft_targets: 同时写 (N, 179) 软标签（append / extend 的 p / P 参数）
+    """
+
+    def __init__(self, out_dir: Union[str, Path], dim: int, shard_size: int = DEFAULT_SHARD_SIZE,
+                 encoder: str = "", soft_targets: bool = False):
+        self.out_dir = Path(out_dir)
+        self.out_dir.mkdir(parents=True, exist_ok=True)
+        self.dim = dim
+        self.shard_size = shard_size
+        self.encoder = encoder
+        self._x = np.empty((shard_size, dim), dtype=np.float32)
+        self._y = np.empty(shard_size, dtype=np.int64)
+        self._p = np.empty((shard_size, ACTION_SPACE_SIZE), dtype=np.float16) if soft_targets else None
+        self._fill = 0
+        self._shards: List[Dict[str, Any]] = []
+
+    def __len__(self) -> int:
+        return sum(s["rows"] for s in self._shards) + self._fill
+
+    def append(self, x: np.ndarray, y: int, p: Optional[np.ndarray] = None):
+        self._x[self._fill] = x
+        self._y[self._fill] = y
+        if self._p is not None:
+            self._p[self._fill] = p
+        self._fill += 1
+        if self._fill == self.shard_size:
+            self._flush()
+
+    def extend(self, X: np.ndarray, y: np.ndarray, P: Optional[np.ndarray] = None):
+        X = np.asarray(X, dtype=np.float32).reshape(-1, self.dim)
+        y = np.asarray(y, dtype=np.int64).reshape(-1)
+        start = 0
+        while start < len(X):
+            take = min(self.shard_size - self._fill, len(X) - start)
+            self._x[self._fill:self._fill + take] = X[start:start + take]
+            self._y[self._fill:self._fill + take] = y[start:start + take]
+            if self._p is not None:
+                self._p[self._fill:self._fill + take] = P[start:start + take]
+            self._fill += take
+            start += take
+            if self._fill == self.shard_size:
+                self._flush()
+
+    def _flush(self):
+        if self._fill == 0:
+            return
+        stem = f"shard_{len(self._shards):05d}"
+        np.save(self.out_dir / f"{stem}.x.npy", self._x[:self._fill])
+        np.save(self.out_dir / f"{stem}.y.npy", self._y[:self._fill])
+        if self._p is not None:
+            np.save(self.out_dir / f"{stem}.p.npy", self._p[:self._fill])
+        self._shards.append({"name": stem, "rows": int(self._fill)})
+        self._fill = 0
+
+    def close(self) -> Path:
+        """写出最后一个分片与 index.json，返回输出目录"""
+        self._flush()
+        index = {"dim": self.dim, "encoder": self.encoder, "rows": len(self), "shards": self._shards,
+                 "soft_targets": self._p is not None}
+        with open(self.out_dir / INDEX_FILE, "w", encoding="utf-8") as f:
+            json.dump(index, f, indent=2)
+        logger.info(f"[ShardWriter] {len(self)} 条样本 → {len(self._shards)} 个分片 ({self.out_dir})")
+        return self.out_dir
+
+    def __enter__(self) -> "ShardWriter":
+        return self
+
+    def __exit__(self, exc_type, *exc):
+        if exc_type is None:
+            self.close()
+
+
+def write_shards(
+    samples: Iterable[Tuple[Any, int]],
+    out_dir: Union[str, Path],
+    encode_fn: Callable[[Any], np.ndarray],
+    dim: int,
+    shard_size: int = DEFAULT_SHARD_SIZE,
+    encoder: str = "",
+) -> Path:
+    """把 (状态, 动作 ID) 流逐条编码写成分片；samples 可以是生成器，不必整表在内存"""
+    with ShardWriter(out_dir, dim, shard_size, encoder) as writer:
+        for state, action_id in samples:
+            writer.append(encode_fn(state), action_id)
+    return Path(out_dir)
+
+
+def write_shards_from_sessions(
+    data_dir: Union[str, Path],
+    out_dir: Union[str, Path],
+    encoder: str = "encoder_mvp",
+    shard_size: int = DEFAULT_SHARD_SIZE,
+) -> Path:
+    """
+    从采集数据（.json / .jsonl，格式同 load_training_data）流式编码写分片
+
+    Args:
+        encoder: encoder_mvp（31 维，监督学习默认）或 encoder（2945 维）
+    """
+    import importlib
+    from src.agents.supervised import iter_training_records
+
+    module = importlib.import_module(f"src.training.{encoder}")
+    encode = module.encode
+
+    def _samples():
+        # 逐条编码后即丢弃，保留原始帧不会累积内存
+        for state, action in iter_training_records(data_dir, keep_raw=True):
+            yield state.raw_response or state.to_mod_response(), action.to_id()
+
+    return write_shards(_samples(), out_dir, encode, module.get_output_dim(), shard_size, encoder)
+
+
+# ==================== 读取 ====================
+
+class ShardDataset:
+    """
+    memmap 打开的分片数据集
+
+    dataset[i] → (x, y)；dataset[indices]（整数数组）→ (X, y) 一批，行序与 indices 一致。
+    可直接作为 torch DataLoader 的 map-style 数据集（配合 BlockShuffleSampler、batch_size=None）。
+    带软标签的分片（soft_targets）可用 soft_batch(indices) → (X, P) 读取。
+    """
+
+    def __init__(self, shard_dir: Union[str, Path]):
+        self.shard_dir = Path(shard_dir)
+        with open(self.shard_dir / INDEX_FILE, "r", encoding="utf-8") as f:
+            self.index = json.load(f)
+        self.dim = int(self.index["dim"])
+        self.encoder = self.index.get("encoder", "")
+        self.soft_targets = bool(self.index.get("soft_targets", False))
+        rows = [s["rows"] for s in self.index["shards"]]
+        self._offsets = np.concatenate([[0], np.cumsum(rows)]).astype(np.int64)
+        self._x: Optional[list] = None
+        self._y: Optional[list] = None
+        self._p: Optional[list] = None
+
+    def _open(self):
+        # 延迟到首次读取：DataLoader worker 各自打开自己的 memmap
+        shards = self.index["shards"]
+        self._x = [np.load(self.shard_dir / f"{s['name']}.x.npy", mmap_mode="r") for s in shards]
+        self._y = [np.load(self.shard_dir / f"{s['name']}.y.npy", mmap_mode="r") for s in shards]
+        if self.soft_targets:
+            self._p = [np.load(self.shard_dir / f"{s['name']}.p.npy", mmap_mode="r") for s in shards]
+
+    def __len__(self) -> int:
+        return int(self._offsets[-1])
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["_x"] = state["_y"] = state["_p"] = None
+        return state
+
+    def __getitem__(self, idx):
+        if self._x is None:
+            self._open()
+        if np.isscalar(idx):
+            i = int(idx)
+            s = int(np.searchsorted(self._offsets, i, side="right")) - 1
+            j = i - self._offsets[s]
+            return np.array(self._x[s][j]), int(self._y[s][j])
+
+        X = np.empty((len(idx), self.dim), dtype=np.float32)
+        y = np.empty(len(idx), dtype=np.int64)
+        self._gather(idx, (self._x, X), (self._y, y))
+        return X, y
+
+    def soft_batch(self, idx) -> Tuple[np.ndarray, np.ndarray]:
+        """(X, P) 一批：观察与 float32 软标签 (N, 179)"""
+        if not self.soft_targets:
+            raise ValueError(f"{self.shard_dir} has no soft targets")
+        if self._x is None:
+            self._open()
+        X = np.empty((len(idx), self.dim), dtype=np.float32)
+        P = np.empty((len(idx), ACTION_SPACE_SIZE), dtype=np.float32)
+        self._gather(idx, (self._x, X), (self._p, P))
+        return X, P
+
+    def _gather(self, idx, *pairs):
+        """按分片分组、排序后读取，再按 idx 原顺序写入各 (分片数组列表, 输出) 对"""
+        idx = np.asarray(idx, dtype=np.int64)
+        order = np.argsort(idx, kind="stable")
+        sorted_idx = idx[order]
+        shard_of = np.searchsorted(self._offsets, sorted_idx, side="right") - 1
+        bounds = np.flatnonzero(np.diff(shard_of)) + 1
+        for start, stop in zip(np.concatenate([[0], bounds]), np.concatenate([bounds, [len(idx)]])):
+            s = shard_of[start]
+            local = sorted_idx[start:stop] - self._offsets[s]
+            rows = order[start:stop]
+            for arrays, out in pairs:
+                out[rows] = arrays[s][local]
+
+    def labels(self) -> np.ndarray:
+        """全部标签（int64，只有 N 个整数，可放内存）"""
+        if self._y is None:
+            self._open()
+        return np.concatenate([np.asarray(y) for y in self._y]) if self._y else np.empty(0, dtype=np.int64)
+
+    def split(self, val_split: float = 0.2, seed: int = 42) -> Tuple[np.ndarray, np.ndarray]:
+        """随机划分训练 / 验证索引（与 _train_pytorch 的 permutation 划分一致）"""
+        rng = np.random.RandomState(seed)
+        indices = rng.permutation(len(self))
+        n_val = int(len(self) * val_split)
+        return np.sort(indices[n_val:]), np.sort(indices[:n_val])
+
+
+class BlockShuffleSampler:
+    """
+    块打乱批采样器：每个 epoch 打乱块顺序与块内顺序，按 batch_size 产出索引数组
+
+    Args:
+        indices: 参与采样的样本索引（升序；如 ShardDataset.split 的结果）
+        batch_size: 每批样本数
+        block_size: 连续块大小（默认 8 × batch_size；越大越接近全量打乱，读取越随机）
+        shuffle: False 时按顺序产出（验证集）
+        drop_last: 丢弃最后不满一批的样本
+        seed: 基础种子，实际种子为 seed + epoch
+        rank / world_size: 数据并行时的分片（各进程种子相同、全局排列相同，按 rank 交错取样；
+            不能整除时从排列开头补齐，保证每个进程批数相同，避免梯度 all-reduce 等待）
+    """
+
+    def __init__(self, indices: np.ndarray, batch_size: int, block_size: Optional[int] = None,
+                 shuffle: bool = True, drop_last: bool = False, seed: int = 0,
+                 rank: int = 0, world_size: int = 1):
+        self.indices = np.asarray(indices, dtype=np.int64)
+        self.batch_size = batch_size
+        self.block_size = block_size or 8 * batch_size
+        self.shuffle = shuffle
+        self.drop_last = drop_last
+        self.seed = seed
+        self.epoch = 0
+        self.rank = rank
+        self.world_size = world_size
+
+    def set_epoch(self, epoch: int):
+        self.epoch = epoch
+
+    def num_samples(self) -> int:
+        """本进程每个 epoch 的样本数"""
+        return -(-len(self.indices) // self.world_size)
+
+    def __len__(self) -> int:
+        n = self.num_samples()
+        return n // self.batch_size if self.drop_last else -(-n // self.batch_size)
+
+    def permutation(self) -> np.ndarray:
+        """本进程本 epoch 的样本顺序"""
+        perm = self._global_permutation()
+        if self.world_size == 1:
+            return perm
+        total = self.num_samples() * self.world_size
+        if total > len(perm):
+            perm = np.concatenate([perm, np.resize(perm, total - len(perm))])
+        return perm[self.rank:total:self.world_size]
+
+    def _global_permutation(self) -> np.ndarray:
+        if not self.shuffle:
+            return self.indices
+        rng = np.random.default_rng(self.seed + self.epoch)
+        n_blocks = -(-len(self.indices) // self.block_size)
+        perm = []
+        for b in rng.permutation(n_blocks):
+            block = self.indices[b * self.block_size:(b + 1) * self.block_size]
+            perm.append(block[rng.permutation(len(block))])
+        return np.concatenate(perm) if perm else self.indices
+
+    def __iter__(self) -> Iterator[np.ndarray]:
+        perm = self.permutation()
+        for start in range(0, len(perm), self.batch_size):
+            batch = perm[start:start + self.batch_size]
+            if self.drop_last and len(batch) < self.batch_size:
+                return
+            yield batch
+
+
+def iter_batches(dataset: ShardDataset, sampler: BlockShuffleSampler,
+                 soft_targets: bool = False) -> Iterator[Tuple[np.ndarray, np.ndarray]]:
+    """单进程逐批读取（不依赖 torch；sklearn partial_fit / 验证集评估用）；soft_targets=True 时产出 (X, P)"""
+    for batch in sampler:
+        yield dataset.soft_batch(batch) if soft_targets else dataset[batch]
+
+
+def make_dataloader(
+    dataset: ShardDataset,
+    indices: np.ndarray,
+    batch_size: int = 256,
+    shuffle: bool = True,
+    num_workers: int = 0,
+    prefetch_factor: int = 2,
+    block_size: Optional[int] = None,
+    seed: int = 0,
+    rank: int = 0,
+    world_size: int = 1,
+):
+    """
+    torch DataLoader：sampler 在主进程产出整批索引，worker 读 memmap 组批，prefetch_factor 批预取
+
+    loader.sampler.set_epoch(epoch) 换打乱种子（sampler 在主进程，worker 不需要重建）。
+    rank / world_size 为数据并行分片（见 BlockShuffleSampler）。
+    """
+    from torch.utils.data import DataLoader
+
+    sampler = BlockShuffleSampler(indices, batch_size, block_size, shuffle=shuffle, seed=seed,
+                                  rank=rank, world_size=world_size)
+    kwargs = {}
+    if num_workers > 0:
+        kwargs.update(prefetch_factor=prefetch_factor, persistent_workers=True)
+    # batch_size=None：sampler 的每个元素就是一批，default_convert 把 NumPy 批转成 Tensor（不复制）
+    return DataLoader(dataset, batch_size=None, sampler=sampler, num_workers=num_workers, **kwargs)
@@ -0,0 +1,324 @@
+#!/usr/bin/env python3
+"""
+PyTorch 训练引擎：早停、最优模型检查点、断点续训、学习率调度
+
+SupervisedAgentImpl._fit_pytorch 原先固定跑满 epochs（默认 100），不读 training.early_stopping_patience，
+也不保存中间状态。Trainer 把训练循环独立出来：
+- 早停：验证损失 patience 个 epoch 未下降（超过 min_delta）即停止，结束时恢复最优权重
+- 检查点：checkpoint_dir 下 last.pt（模型 + 优化器 + 调度器 + 早停计数 + 历史 + RNG 状态，每个 epoch 原子写入）
+  与 best.pt（最优权重）；resume=True 时从 last.pt 接着训练，崩溃后重跑同一命令即可续上
+- 指标：损失与正确数在 Tensor 上逐批累加，每个 epoch 只取一次标量
+- 学习率调度：plateau（验证损失停滞时衰减）/ cosine / none，可选线性 warmup
+- 达标时间：target_accuracy 给出时记录首次达到的 epoch 与累计训练秒数（含续训前的时间），
+  stop_at_target=True 时达标即停
+
+用法：
+    trainer = Trainer(model, train_batches, val_batches,
+                      TrainerConfig(epochs=100, patience=10, checkpoint_dir="models/sl_ckpt", target_accuracy=0.8))
+    result = trainer.fit()   # result.model 为最优权重
+"""
+import os
+import time
+import logging
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+LAST_CHECKPOINT = "last.pt"
+BEST_CHECKPOINT = "best.pt"
+
+
+@dataclass
+class TrainerConfig:
+    """训练引擎配置"""
+    epochs: int = 100
+    learning_rate: float = 0.001
+    weight_decay: float = 0.0
+
+    # 早停（监控验证损失；没有验证集时监控训练损失）
+    patience: int = 10
+    min_delta: float = 1e-4
+
+    # 学习率调度
+    lr_schedule: str = "plateau"  # plateau, cosine, none
+    lr_factor: float = 0.5        # plateau 衰减倍数
+    lr_patience: int = 3          # plateau 容忍的停滞 epoch 数
+    min_lr: float = 1e-6
+    warmup_epochs: int = 0
+
+    # 达标时间
+    target_accuracy: Optional[float] = None
+    stop_at_target: bool = False
+
+    # 检查点
+    checkpoint_dir: Optional[str] = None
+    resume: bool = True
+    save_checkpoints: bool = True  # 数据并行时只有 rank 0 写检查点，其余进程只读（续训）
+
+    grad_clip: Optional[float] = None
+    log_every: int = 1
+
+
+@dataclass
+class TrainResult:
+    """训练结果"""
+    model: Any
+    best_epoch: int
+    best_val_loss: float
+    best_val_acc: float
+    epochs_run: int
+    stop_reason: str  # completed, early_stopping, target_reached
+    elapsed_s: float
+    target_epoch: Optional[int] = None
+    time_to_target_s: Optional[float] = None
+    resumed_from_epoch: int = 0
+    history: List[Dict[str, float]] = field(default_factory=list)
+
+
+class Trainer:
+    """
+    分类训练循环（交叉熵）
+
+    Args:
+        model: torch.nn.Module
+        train_batches: epoch → 可迭代的 (X, y) Tensor 批（每个 epoch 重新调用，便于换打乱种子）
+        val_batches: () → 可迭代的验证批；None 表示没有验证集
+        config: TrainerConfig
+        meta: 写进检查点的附加信息（如输入维度、隐藏层），续训时不一致则拒绝加载
+        reduce_fn: 数据并行时对每个 epoch 的 [损失和, 正确数, 样本数] 做跨进程求和（如 dist.all_reduce），
+            使各进程的指标、早停与学习率调度决策一致
+    """
+
+    def __init__(self, model, train_batches: Callable[[int], Iterable],
+                 val_batches: Optional[Callable[[], Iterable]] = None,
+                 config: Optional[TrainerConfig] = None, meta: Optional[Dict[str, Any]] = None,
+                 name: str = "Trainer", reduce_fn: Optional[Callable] = None):
+        import torch
+
+        self.model = model
+        # DistributedDataParallel 包装时检查点只存内部模块，与单进程训练的检查点互通
+        self.module = getattr(model, "module", model)
+        self.reduce_fn = reduce_fn
+        self.train_batches = train_batches
+        self.val_batches = val_batches
+        self.config = config or TrainerConfig()
+        self.meta = meta or {}
+        self.name = name
+
+        cfg = self.config
+        self.criterion = torch.nn.CrossEntropyLoss(reduction="sum")
+        self.optimizer = torch.optim.Adam(model.parameters(), lr=cfg.learning_rate, weight_decay=cfg.weight_decay)
+        if cfg.lr_schedule == "plateau":
+            self.scheduler = torch.optim.lr_scheduler.ReduceLROnPlateau(
+                self.optimizer, mode="min", factor=cfg.lr_factor, patience=cfg.lr_patience, min_lr=cfg.min_lr)
+        elif cfg.lr_schedule == "cosine":
+            self.scheduler = torch.optim.lr_scheduler.CosineAnnealingLR(
+                self.optimizer, T_max=max(cfg.epochs - cfg.warmup_epochs, 1), eta_min=cfg.min_lr)
+        elif cfg.lr_schedule == "none":
+            self.scheduler = None
+        else:
+            raise ValueError(f"Unknown lr_schedule: {cfg.lr_schedule}")
+
+        self.ckpt_dir = Path(cfg.checkpoint_dir) if cfg.checkpoint_dir else None
+        # 训练进度（检查点保存 / 恢复的全部状态）
+        self.epoch = 0
+        self.best_val_loss = float("inf")
+        self.best_val_acc = 0.0
+        self.best_epoch = 0
+        self.bad_epochs = 0
+        self.elapsed_s = 0.0
+        self.target_epoch: Optional[int] = None
+        self.time_to_target_s: Optional[float] = None
+        self.history: List[Dict[str, float]] = []
+        self._best_state: Optional[Dict[str, Any]] = None
+
+    # ==================== 一个 epoch ====================
+
+    def _run_epoch(self, batches: Iterable, train: bool) -> Dict[str, float]:
+        """逐批累加损失和与正确数（Tensor 上累加，结束时取一次标量）"""
+        import torch
+
+        loss_sum = torch.zeros((), dtype=torch.float64)
+        correct = torch.zeros((), dtype=torch.float64)
+        n = 0
+        self.model.train(train)
+        with torch.set_grad_enabled(train):
+            for batch_X, batch_y in batches:
+                outputs = self.model(batch_X)
+                loss = self.criterion(outputs, batch_y)
+                if train:
+                    self.optimizer.zero_grad()
+                    (loss / len(batch_y)).backward()
+                    if self.config.grad_clip:
+                        torch.nn.utils.clip_grad_norm_(self.model.parameters(), self.config.grad_clip)
+                    self.optimizer.step()
+                loss_sum += loss.detach()
+                correct += (outputs.detach().argmax(dim=1) == batch_y).sum()
+                n += len(batch_y)
+        totals = torch.stack([loss_sum, correct, torch.tensor(float(n), dtype=torch.float64)])
+        if self.reduce_fn is not None:
+            totals = self.reduce_fn(totals)
+        loss_sum, correct, n = totals.tolist()
+        if n == 0:
+            return {"loss": float("nan"), "acc": 0.0, "n": 0}
+        return {"loss": loss_sum / n, "acc": correct / n, "n": int(n)}
+
+    def _set_warmup_lr(self, epoch: int):
+        cfg = self.config
+        if epoch < cfg.warmup_epochs:
+            for group in self.optimizer.param_groups:
+                group["lr"] = cfg.learning_rate * (epoch + 1) / cfg.warmup_epochs
+
+    def _step_scheduler(self, epoch: int, monitor: float):
+        if self.scheduler is None or epoch < self.config.warmup_epochs:
+            return
+        if self.config.lr_schedule == "plateau":
+            self.scheduler.step(monitor)
+        else:
+            self.scheduler.step()
+
+    # ==================== 检查点 ====================
+
+    def _atomic_save(self, obj: Dict[str, Any], path: Path):
+        import torch
+        tmp = path.with_suffix(path.suffix + ".tmp")
+        torch.save(obj, tmp)
+        os.replace(tmp, path)
+
+    def _save_checkpoint(self):
+        import torch
+        state = {
+            "meta": self.meta,
+            "epoch": self.epoch,
+            "model": self.module.state_dict(),
+            "optimizer": self.optimizer.state_dict(),
+            "scheduler": self.scheduler.state_dict() if self.scheduler is not None else None,
+            "best_val_loss": self.best_val_loss,
+            "best_val_acc": self.best_val_acc,
+            "best_epoch": self.best_epoch,
+            "bad_epochs": self.bad_epochs,
+            "elapsed_s": self.elapsed_s,
+            "target_epoch": self.target_epoch,
+            "time_to_target_s": self.time_to_target_s,
+            "history": self.history,
+            "torch_rng": torch.get_rng_state(),
+            "numpy_rng": np.random.get_state(),
+        }
+        self._atomic_save(state, self.ckpt_dir / LAST_CHECKPOINT)
+
+    def _save_best(self):
+        self._best_state = {k: v.detach().clone() for k, v in self.module.state_dict().items()}
+        if self.ckpt_dir is not None and self.config.save_checkpoints:
+            self._atomic_save({"meta": self.meta, "epoch": self.best_epoch, "model": self._best_state,
+                               "val_loss": self.best_val_loss, "val_acc": self.best_val_acc},
+                              self.ckpt_dir / BEST_CHECKPOINT)
+
+    def _try_resume(self) -> int:
+        """从 last.pt 恢复；返回恢复到的 epoch（0 表示从头开始）"""
+        import torch
+
+        if self.ckpt_dir is None or not self.config.resume:
+            return 0
+        path = self.ckpt_dir / LAST_CHECKPOINT
+        if not path.exists():
+            return 0
+        state = torch.load(path, map_location="cpu", weights_only=False)
+        if state.get("meta", {}) != self.meta:
+            raise ValueError(f"Checkpoint {path} was written for {state.get('meta')}, not {self.meta}")
+        self.module.load_state_dict(state["model"])
+        self.optimizer.load_state_dict(state["optimizer"])
+        if self.scheduler is not None and state["scheduler"] is not None:
+            self.scheduler.load_state_dict(state["scheduler"])
+        for key in ("epoch", "best_val_loss", "best_val_acc", "best_epoch", "bad_epochs", "elapsed_s",
+                    "target_epoch", "time_to_target_s", "history"):
+            setattr(self, key, state[key])
+        torch.set_rng_state(state["torch_rng"])
+        np.random.set_state(state["numpy_rng"])
+        best_path = self.ckpt_dir / BEST_CHECKPOINT
+        if best_path.exists():
+            self._best_state = torch.load(best_path, map_location="cpu", weights_only=False)["model"]
+        logger.info(f"[{self.name}] Resumed from {path} at epoch {self.epoch} "
+                    f"(best epoch {self.best_epoch}, val loss {self.best_val_loss:.4f})")
+        return self.epoch
+
+    # ==================== 主循环 ====================
+
+    def _stop_reason(self) -> Optional[str]:
+        cfg = self.config
+        if cfg.stop_at_target and self.target_epoch is not None:
+            return "target_reached"
+        if self.bad_epochs >= cfg.patience:
+            return "early_stopping"
+        return None
+
+    def fit(self) -> TrainResult:
+        cfg = self.config
+        if self.ckpt_dir is not None and cfg.save_checkpoints:
+            self.ckpt_dir.mkdir(parents=True, exist_ok=True)
+        resumed_from = self._try_resume()
+
+        stop_reason = self._stop_reason() if resumed_from else None
+        while stop_reason is None and self.epoch < cfg.epochs:
+            t0 = time.perf_counter()
+            epoch = self.epoch
+            self._set_warmup_lr(epoch)
+            train = self._run_epoch(self.train_batches(epoch), train=True)
+            val = self._run_epoch(self.val_batches(), train=False) if self.val_batches is not None else None
+            monitor = val if val is not None and val["n"] > 0 else train
+            self._step_scheduler(epoch, monitor["loss"])
+
+            self.epoch = epoch + 1
+            self.elapsed_s += time.perf_counter() - t0
+            if monitor["loss"] < self.best_val_loss - cfg.min_delta:
+                self.best_val_loss = monitor["loss"]
+                self.best_val_acc = monitor["acc"]
+                self.best_epoch = self.epoch
+                self.bad_epochs = 0
+                self._save_best()
+            else:
+                self.bad_epochs += 1
+            if cfg.target_accuracy is not None and self.target_epoch is None and monitor["acc"] >= cfg.target_accuracy:
+                self.target_epoch = self.epoch
+                self.time_to_target_s = self.elapsed_s
+                logger.info(f"[{self.name}] Reached accuracy {cfg.target_accuracy:.3f} at epoch {self.epoch} "
+                            f"after {self.elapsed_s:.1f}s")
+
+            self.history.append({
+                "epoch": self.epoch,
+                "train_loss": train["loss"], "train_acc": train["acc"],
+                "val_loss": monitor["loss"], "val_acc": monitor["acc"],
+                "lr": self.optimizer.param_groups[0]["lr"],
+                "elapsed_s": self.elapsed_s,
+            })
+            if self.ckpt_dir is not None and cfg.save_checkpoints:
+                self._save_checkpoint()
+            if self.epoch % cfg.log_every == 0:
+                logger.info(
+                    f"[{self.name}] Epoch {self.epoch}/{cfg.epochs}, "
+                    f"Loss: {train['loss']:.4f}, Val Loss: {monitor['loss']:.4f}, "
+                    f"Val Acc: {monitor['acc']:.4f}, LR: {self.optimizer.param_groups[0]['lr']:.2e}"
+                )
+            stop_reason = self._stop_reason()
+
+        stop_reason = stop_reason or "completed"
+        if self._best_state is not None:
+            self.module.load_state_dict(self._best_state)
+        logger.info(f"[{self.name}] Stopped ({stop_reason}) after {self.epoch} epochs, {self.elapsed_s:.1f}s; "
+                    f"best epoch {self.best_epoch} val loss {self.best_val_loss:.4f} acc {self.best_val_acc:.4f}")
+        return TrainResult(
+            model=self.module,
+            best_epoch=self.best_epoch,
+            best_val_loss=self.best_val_loss,
+            best_val_acc=self.best_val_acc,
+            epochs_run=self.epoch,
+            stop_reason=stop_reason,
+            elapsed_s=self.elapsed_s,
+            target_epoch=self.target_epoch,
+            time_to_target_s=self.time_to_target_s,
+            resumed_from_epoch=resumed_from,
+            history=self.history,
+        )